@@ -2,12 +2,37 @@
 """
 Launcher script for running Python applications from a virtual environment.
 Provides a system tray icon with exit functionality.
+
+The script is started before anything else is loaded. The launcher then waits on
+the process handle in a background thread, so it notices the exit at once
+instead of polling. PySide6 is only imported when the tray icon is actually
+shown. With --no-tray (or "tray=false" in .venv-association), no GUI toolkit is
+loaded at all and the launcher just waits for the script to finish.
+
+Optional .venv-association keys:
+    restart=no|on-failure|always   Restart the script when it exits (default: no)
+    restart_max=N                  Give up after N restarts in a row (default: 5, 0 = unlimited)
+Restarts back off from 1 s up to 30 s. A run that lasted at least a minute
+resets the backoff. With the tray, the script's stdout and stderr are kept in
+ring buffers of the last lines, and "Show Output" in the tray menu displays them.
+
+Usage:
+    pythonw launcher.py [--no-tray]
+    python launcher.py --benchmark     Compare startup time and memory with and without the tray
 """
 import sys
 import os
+import json
+import time
+import threading
 import subprocess
-from PySide6.QtWidgets import QApplication, QSystemTrayIcon, QMenu
-from PySide6.QtGui import QIcon, QAction
+from collections import deque
+
+BENCHMARK_RUNS = 5  # Launches per mode in --benchmark
+OUTPUT_BUFFER_LINES = 500  # Lines of stdout/stderr kept for the tray's output viewer
+RESTART_BACKOFF_START = 1.0
+RESTART_BACKOFF_MAX = 30.0
+RESTART_STABLE_SECONDS = 60  # A run at least this long resets the backoff
 
 # --- VENV SAFETY CHECK ---
 expected_venv = os.path.join(os.path.dirname(__file__), 'venv')
@@ -42,94 +67,130 @@ script_name = config.get("main_script", "")
 # Build absolute paths
 venv_path = os.path.join(script_dir, venv_rel_path)
 script_path = os.path.join(script_dir, script_name)
-venv_python = os.path.join(venv_path, "Scripts", "pythonw.exe")
-
-# Import PySide6
-venv_site_packages = os.path.join(venv_path, "Lib", "site-packages")
-if venv_site_packages not in sys.path:
-    sys.path.insert(0, venv_site_packages)
-
-try:
-    from PySide6.QtWidgets import QApplication, QSystemTrayIcon, QMenu, QAction
-    from PySide6.QtGui import QIcon, QPixmap, QPainter, QColor, QBrush, QPen
-    from PySide6.QtCore import QTimer
-except ImportError:
-    # Try to install PySide6 in the venv
-    pip_path = os.path.join(venv_path, "Scripts", "pip.exe")
-    if os.path.exists(pip_path):
-        subprocess.run([pip_path, "install", "PySide6"], check=True)
-        from PySide6.QtWidgets import QApplication, QSystemTrayIcon, QMenu, QAction
-        from PySide6.QtGui import QIcon, QPixmap, QPainter, QColor, QBrush, QPen
-        from PySide6.QtCore import QTimer
-
-# Create function to generate an icon
-def create_icon():
-    """Create a simple icon for the system tray"""
-    pixmap = QPixmap(64, 64)
-    pixmap.fill(QColor(0, 0, 0, 0))
-    painter = QPainter(pixmap)
-    painter.setBrush(QBrush(QColor(0, 97, 255)))
-    painter.setPen(QPen(QColor(0, 0, 0, 0)))
-    painter.drawRect(0, 0, 64, 64)
-    painter.setBrush(QBrush(QColor(255, 255, 255)))
-    painter.drawRect(20, 20, 24, 24)
-    painter.end()
-    return pixmap
-
-# Create QApplication instance
-app = QApplication(sys.argv)
-app.setQuitOnLastWindowClosed(False)
-
-# Track all timers for cleanup
-process_check_timer = None
-
-# Full path to icon, or create one if it doesn't exist
-icon_path = os.path.join(script_dir, "launcher_icon.ico")
-icon = None
-if os.path.exists(icon_path):
-    icon = QIcon(icon_path)
+if sys.platform == "win32":
+    venv_python = os.path.join(venv_path, "Scripts", "pythonw.exe")
 else:
-    # Create and save a default icon
-    pixmap = create_icon()
-    pixmap.save(icon_path)
-    icon = QIcon(pixmap)
-
-# Create tray icon with proper error handling
-tray = QSystemTrayIcon()
-tray.setIcon(icon)
-tray.setToolTip(f"Launcher for {script_name}")
-
-# Create menu for the tray icon
-menu = QMenu()
-
-# Process handle
-process = None
-
-# Function to properly clean up resources
-def cleanup():
-    print("[INFO] Cleaning up resources...")
-    
-    # Stop and delete the timer
-    global process_check_timer
-    if process_check_timer is not None:
-        try:
-            process_check_timer.stop()
-            # In Qt, deleteLater is preferred over direct deletion
-            process_check_timer.deleteLater()
-            process_check_timer = None
-            print("[INFO] Timer stopped and scheduled for deletion")
-        except Exception as e:
-            print(f"[ERROR] Failed to stop timer: {e}")
-    
-    # Hide tray before anything else
-    if tray:
+    venv_python = os.path.join(venv_path, "bin", "python")
+
+
+# Last lines of the script's output; filled by reader threads when output is captured
+output_buffers = {"stdout": deque(maxlen=OUTPUT_BUFFER_LINES), "stderr": deque(maxlen=OUTPUT_BUFFER_LINES)}
+output_listeners = []  # Called as listener(stream_name, line) from reader threads
+
+
+class RestartPolicy:
+    """Decides whether and when to restart the script after it exits"""
+
+    def __init__(self, mode="no", max_restarts=5):
+        self.mode = mode if mode in ("no", "on-failure", "always") else "no"
+        self.max_restarts = max_restarts
+        self.delay = RESTART_BACKOFF_START
+        self.restarts = 0
+
+    @classmethod
+    def from_config(cls):
         try:
-            tray.hide()
-            print("[INFO] Tray icon hidden")
-        except Exception as e:
-            print(f"[ERROR] Failed to hide tray: {e}")
-    
-    # Kill any running process
+            max_restarts = int(config.get("restart_max", "5"))
+        except ValueError:
+            max_restarts = 5
+        return cls(config.get("restart", "no").lower(), max_restarts)
+
+    def next_delay(self, code, ran_for):
+        """Seconds to wait before restarting, or None to stop"""
+        if self.mode == "no" or (self.mode == "on-failure" and code == 0):
+            return None
+        if ran_for >= RESTART_STABLE_SECONDS:
+            self.delay = RESTART_BACKOFF_START
+            self.restarts = 0
+        if self.max_restarts and self.restarts >= self.max_restarts:
+            print(f"[ERROR] Script exited {self.restarts + 1} times in a row, not restarting again")
+            return None
+        delay = self.delay
+        self.delay = min(self.delay * 2, RESTART_BACKOFF_MAX)
+        self.restarts += 1
+        return delay
+
+
+def log_error(message):
+    """Print an error and keep it in launcher_error.log (pythonw has no console)"""
+    print(f"[ERROR] {message}")
+    try:
+        with open(os.path.join(script_dir, 'launcher_error.log'), 'w') as f:
+            f.write(message)
+    except Exception:
+        pass
+
+
+def peak_rss_bytes():
+    """Peak resident memory of this process in bytes, or None if it can't be read"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024  # Linux reports KB
+    except ImportError:
+        pass
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        get_current_process = ctypes.windll.kernel32.GetCurrentProcess
+        get_current_process.restype = wintypes.HANDLE
+        get_memory_info = ctypes.windll.psapi.GetProcessMemoryInfo
+        get_memory_info.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESS_MEMORY_COUNTERS), wintypes.DWORD]
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        if get_memory_info(get_current_process(), ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize
+    except Exception:
+        pass
+    return None
+
+
+def read_output(stream, name):
+    """Reader thread: keep the stream's lines in its ring buffer and pass them on"""
+    echo = sys.stdout if name == "stdout" else sys.stderr  # None under pythonw
+    for line in stream:
+        line = line.rstrip("\n")
+        output_buffers[name].append(line)
+        for listener in list(output_listeners):
+            listener(name, line)
+        if echo is not None:
+            print(line, file=echo, flush=True)
+    stream.close()
+
+
+def launch_script(command, capture_output=False):
+    """Start the main script without waiting. Returns (process, error message)."""
+    try:
+        pipe = subprocess.PIPE if capture_output else None
+        env = dict(os.environ, PYTHONUNBUFFERED="1") if capture_output else None
+        process = subprocess.Popen(
+            command,
+            cwd=script_dir,
+            stdout=pipe,
+            stderr=pipe,
+            text=True,
+            errors="replace",
+            env=env,
+            creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+        )
+        print(f"[INFO] Launched process with PID: {process.pid}")
+        if capture_output:
+            for name in ("stdout", "stderr"):
+                threading.Thread(target=read_output, args=(getattr(process, name), name), daemon=True).start()
+        return process, None
+    except Exception as e:
+        return None, f"Error launching script: {str(e)}"
+
+
+def terminate(process):
     try:
         if process and process.poll() is None:
             process.terminate()
@@ -137,72 +198,270 @@ def cleanup():
     except Exception as e:
         print(f"[ERROR] Failed to terminate process: {e}")
 
-# Hook cleanup to application exit
-app.aboutToQuit.connect(cleanup)
-
-# Launch the main script
-try:
-    # Use Popen to launch the script without waiting
-    process = subprocess.Popen(
-        [venv_python, script_path], 
-        cwd=script_dir,
-        creationflags=subprocess.CREATE_NO_WINDOW
-    )
-    print(f"[INFO] Launched process with PID: {process.pid}")
-except Exception as e:
-    error_msg = f"Error launching script: {str(e)}"
-    print(f"[ERROR] {error_msg}")
-    error_action = QAction(error_msg)
-    error_action.setEnabled(False)
-    menu.addAction(error_action)
-
-def kill_app():
-    """Terminate the process and exit the launcher"""
-    print("[INFO] Exiting application...")
-    cleanup()  # Ensure cleanup happens before quit
-    QApplication.quit()
-
-# Function to safely handle window actions
-def handle_window_action(reason):
-    # First check if process is running
-    if process and process.poll() is None:
-        # Process is running, but we don't know if window is accessible
-        print("[INFO] Tray icon clicked, process is still running")
+
+def supervise_headless(process, command, policy, on_ready=None, capture_output=False):
+    """Block on the process handle until the script exits (restarting per policy); no GUI toolkit is loaded"""
+    if on_ready:
+        on_ready()
+    while True:
+        started = time.monotonic()
+        try:
+            code = process.wait()
+        except KeyboardInterrupt:
+            terminate(process)
+            return process.wait()
+        delay = policy.next_delay(code, time.monotonic() - started)
+        if delay is None:
+            print(f"[INFO] Main process ended with code {code}, exiting launcher")
+            return code
+        print(f"[INFO] Main process ended with code {code}, restarting in {delay:.0f}s")
+        try:
+            time.sleep(delay)
+        except KeyboardInterrupt:
+            return code
+        process, launch_error = launch_script(command, capture_output)
+        if launch_error:
+            log_error(launch_error)
+            return 1
+
+
+def supervise_with_tray(process, launch_error, command, policy, on_ready=None):
+    """Show the tray icon; a waiter thread reports the script's exit to the Qt loop as it happens"""
+    try:
+        from PySide6.QtWidgets import (QApplication, QSystemTrayIcon, QMenu, QDialog, QVBoxLayout,
+                                       QTabWidget, QPlainTextEdit)
+        from PySide6.QtGui import QIcon, QAction, QPixmap, QPainter, QColor, QBrush, QPen
+        from PySide6.QtCore import QObject, Signal, QTimer
+    except ImportError as e:
+        # Never pip install at launch time; the script itself doesn't need the tray
+        log_error(f"PySide6 is not available in {venv_path} ({e}); running without a tray icon.")
+        if process is None:
+            return 1
+        return supervise_headless(process, command, policy, on_ready, capture_output=True)
+
+    # Create function to generate an icon
+    def create_icon():
+        """Create a simple icon for the system tray"""
+        pixmap = QPixmap(64, 64)
+        pixmap.fill(QColor(0, 0, 0, 0))
+        painter = QPainter(pixmap)
+        painter.setBrush(QBrush(QColor(0, 97, 255)))
+        painter.setPen(QPen(QColor(0, 0, 0, 0)))
+        painter.drawRect(0, 0, 64, 64)
+        painter.setBrush(QBrush(QColor(255, 255, 255)))
+        painter.drawRect(20, 20, 24, 24)
+        painter.end()
+        return pixmap
+
+    class ProcessWatcher(QObject):
+        """Carries events from the waiter and reader threads into the Qt event loop"""
+        exited = Signal(object, int)  # (process, exit code)
+        output = Signal(str, str)  # (stream name, line)
+
+    # Create QApplication instance
+    app = QApplication(sys.argv)
+    app.setQuitOnLastWindowClosed(False)
+
+    # Full path to icon, or create one if it doesn't exist
+    icon_path = os.path.join(script_dir, "launcher_icon.ico")
+    if os.path.exists(icon_path):
+        icon = QIcon(icon_path)
+    else:
+        # Create and save a default icon
+        pixmap = create_icon()
+        pixmap.save(icon_path)
+        icon = QIcon(pixmap)
+
+    tray = QSystemTrayIcon()
+    tray.setIcon(icon)
+    tray.setToolTip(f"Launcher for {script_name}")
+    menu = QMenu()
+
+    if launch_error:
+        log_error(launch_error)
+        error_action = QAction(launch_error)
+        error_action.setEnabled(False)
+        menu.addAction(error_action)
+
+    state = {"process": process, "started": time.monotonic(), "stopping": False}
+    watcher = ProcessWatcher()
+
+    def watch(proc):
+        # Wait on the process handle in a thread; the signal is queued into the Qt loop
+        threading.Thread(target=lambda: watcher.exited.emit(proc, proc.wait()), daemon=True).start()
+
+    # Function to properly clean up resources
+    def cleanup():
+        print("[INFO] Cleaning up resources...")
+        state["stopping"] = True
+        try:
+            tray.hide()
+            print("[INFO] Tray icon hidden")
+        except Exception as e:
+            print(f"[ERROR] Failed to hide tray: {e}")
+        terminate(state["process"])
+
+    app.aboutToQuit.connect(cleanup)
+
+    def kill_app():
+        """Terminate the process and exit the launcher"""
+        print("[INFO] Exiting application...")
+        cleanup()  # Ensure cleanup happens before quit
+        QApplication.quit()
+
+    def handle_window_action(reason):
+        if state["process"] and state["process"].poll() is None:
+            print("[INFO] Tray icon clicked, process is still running")
+        elif not state["stopping"]:
+            print("[INFO] Tray icon clicked but main process not running, exiting")
+            kill_app()
+
+    def restart():
+        if state["stopping"]:
+            return
+        new_process, error = launch_script(command, capture_output=True)
+        if error:
+            log_error(error)
+            kill_app()
+            return
+        state["process"] = new_process
+        state["started"] = time.monotonic()
+        tray.setToolTip(f"Launcher for {script_name}")
+        watch(new_process)
+
+    def process_exited(proc, code):
+        if state["stopping"] or proc is not state["process"]:
+            return
+        delay = policy.next_delay(code, time.monotonic() - state["started"])
+        if delay is None:
+            print(f"[INFO] Main process ended with code {code}, exiting tray app")
+            kill_app()
+            return
+        print(f"[INFO] Main process ended with code {code}, restarting in {delay:.0f}s")
+        tray.setToolTip(f"{script_name} exited with code {code}, restarting in {delay:.0f}s")
+        QTimer.singleShot(int(delay * 1000), restart)
+
+    # Output viewer: shows the ring buffers and follows new lines while open
+    viewer = {}
+
+    def show_output():
+        if "dialog" not in viewer:
+            dialog = QDialog()
+            dialog.setWindowTitle(f"Output of {script_name}")
+            dialog.resize(800, 500)
+            tabs = QTabWidget(dialog)
+            layout = QVBoxLayout(dialog)
+            layout.addWidget(tabs)
+            for name in ("stdout", "stderr"):
+                text = QPlainTextEdit()
+                text.setReadOnly(True)
+                text.setMaximumBlockCount(OUTPUT_BUFFER_LINES)
+                tabs.addTab(text, name)
+                viewer[name] = text
+            viewer["dialog"] = dialog
+        for name in ("stdout", "stderr"):
+            viewer[name].setPlainText("\n".join(output_buffers[name]))
+        viewer["dialog"].show()
+        viewer["dialog"].raise_()
+        viewer["dialog"].activateWindow()
+
+    def append_output(name, line):
+        if "dialog" in viewer and viewer["dialog"].isVisible():
+            viewer[name].appendPlainText(line)
+
+    tray.activated.connect(handle_window_action)
+    watcher.exited.connect(process_exited)
+    watcher.output.connect(append_output)
+    output_listeners.append(watcher.output.emit)
+    if process is not None:
+        watch(process)
+        print("[INFO] Process waiter thread started")
+
+    output_action = QAction("Show Output")
+    output_action.triggered.connect(show_output)
+    menu.addAction(output_action)
+
+    # Add Exit option to the tray menu
+    exit_action = QAction("Exit App")
+    exit_action.triggered.connect(kill_app)
+    menu.addAction(exit_action)
+
+    # Display the tray icon
+    tray.setContextMenu(menu)
+    tray.show()
+    print("[INFO] Tray icon displayed")
+    if on_ready:
+        on_ready()
+
+    # Run the event loop
+    print("[INFO] Entering main event loop")
+    return app.exec()
+
+
+def benchmark(runs=BENCHMARK_RUNS):
+    """Launch the supervisor repeatedly in each mode and report time-to-ready and peak memory"""
+    print(f"Launcher benchmark ({runs} runs per mode, child is an idle Python process)")
+    for mode in ("no-tray", "tray"):
+        samples = []
+        for _ in range(runs):
+            started = time.time()
+            completed = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--benchmark-run", mode],
+                capture_output=True, text=True, timeout=120
+            )
+            reports = [line for line in completed.stdout.splitlines() if line.startswith("{")]
+            if not reports:
+                print(f"  {mode}: failed ({(completed.stderr or completed.stdout).strip()[-200:]})")
+                break
+            report = json.loads(reports[-1])
+            samples.append((report["ready_at"] - started, report["peak_rss"]))
+        if samples:
+            times = sorted(s[0] for s in samples)
+            rss = [s[1] for s in samples if s[1]]
+            rss_text = f"{max(rss) / (1024 * 1024):.1f} MB" if rss else "unknown"
+            print(f"  {mode:<8} ready in {times[len(times) // 2] * 1000:.0f} ms (median), "
+                  f"min {times[0] * 1000:.0f} ms; peak RSS {rss_text}")
+    return 0
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the associated script and supervise it.")
+    parser.add_argument("--no-tray", action="store_true", help="Don't show a tray icon (no GUI toolkit is loaded)")
+    parser.add_argument("--benchmark", action="store_true", help="Measure startup time and memory of both modes")
+    parser.add_argument("--benchmark-run", choices=["tray", "no-tray"], help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        return benchmark()
+
+    on_ready = None
+    policy = RestartPolicy.from_config()
+    if args.benchmark_run:
+        # Measurement run: supervise an idle child, report once ready, then end it
+        command = [sys.executable, "-c", "import time; time.sleep(60)"]
+        use_tray = args.benchmark_run == "tray"
+        policy = RestartPolicy("no")
+
+        def report_ready():
+            print(json.dumps({"ready_at": time.time(), "peak_rss": peak_rss_bytes()}), flush=True)
+            terminate(process)
+
+        on_ready = report_ready
     else:
-        # Process not running, exit
-        print("[INFO] Tray icon clicked but main process not running, exiting")
-        kill_app()
-
-# Add tray icon click handler with window existence check
-tray.activated.connect(handle_window_action)
-
-# Periodically check if the main process is still alive
-def check_process():
-    if not process:
-        print("[INFO] No process to monitor")
-        return
-        
-    if process.poll() is not None:
-        # Process has ended, clean up and exit
-        print(f"[INFO] Main process ended with code {process.poll()}, exiting tray app")
-        kill_app()
-
-# Create and start the timer
-process_check_timer = QTimer()
-process_check_timer.timeout.connect(check_process)
-process_check_timer.start(1000)  # Check every second
-print("[INFO] Process monitor timer started")
-
-# Add Exit option to the tray menu
-exit_action = QAction("Exit App")
-exit_action.triggered.connect(kill_app)
-menu.addAction(exit_action)
-
-# Display the tray icon
-tray.setContextMenu(menu)
-tray.show()
-print("[INFO] Tray icon displayed")
-
-# Run the event loop
-print("[INFO] Entering main event loop")
-sys.exit(app.exec()) 
\ No newline at end of file
+        command = [venv_python, script_path]
+        use_tray = not args.no_tray and config.get("tray", "true").lower() not in ("false", "0", "no")
+
+    # Output is only worth capturing when the tray can show it
+    process, launch_error = launch_script(command, capture_output=use_tray)
+    if use_tray:
+        return supervise_with_tray(process, launch_error, command, policy, on_ready)
+    if launch_error:
+        log_error(launch_error)
+        return 1
+    return supervise_headless(process, command, policy, on_ready)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,16 +7,36 @@ import os
 import sys
 import datetime
 import logging
+import hashlib
+import re
+import gzip
+import json
+import threading
+import time
+import urllib.parse
+from array import array
+from collections import defaultdict, deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from pathlib import Path
 from PySide6.QtWidgets import (
     QApplication, QWidget, QFileDialog, QPushButton, QVBoxLayout, QHBoxLayout,
     QTableWidget, QTableWidgetItem, QLineEdit, QMessageBox, QDialog, QHeaderView,
-    QAbstractItemView, QLabel, QTextEdit, QStyle
+    QAbstractItemView, QLabel, QPlainTextEdit, QStyle, QCheckBox, QTableView, QProgressDialog, QComboBox
 )
-from PySide6.QtCore import Qt, QDate # Added QDate
+from PySide6.QtCore import Qt, QDate, QAbstractTableModel, QModelIndex, QObject, QThread, QTimer, Signal # Added QDate
+from PySide6.QtGui import QBrush
 import subprocess
 import send2trash
 
+# Optional: filesystem notifications for watch mode (inotify on Linux); polling is used without it
+try:
+    from watchdog.observers import Observer
+    WATCHDOG_AVAILABLE = True
+    logging.getLogger("watchdog").setLevel(logging.WARNING) # Its per-event DEBUG output would flood file_scanner.log
+except ImportError:
+    WATCHDOG_AVAILABLE = False
+
 # Set up logging to a file and to the debug window
 # File logging
 log_file_path = Path(__file__).parent / "file_scanner.log"
@@ -30,9 +50,168 @@ stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(m
 logging.basicConfig(level=logging.DEBUG, handlers=[file_handler, stream_handler])
 logger = logging.getLogger(__name__)
 
+# Debug log pipeline (see LogRingBuffer): entries kept for "Save Log...", how often and how many
+# entries the debug window takes per pull, lines kept on screen, and the DEBUG rate limit
+LOG_BUFFER_SIZE = 100000
+LOG_DRAIN_INTERVAL_MS = 200
+LOG_DRAIN_BATCH = 5000
+LOG_DISPLAY_LINES = 5000
+LOG_DEBUG_MAX_PER_SECOND = 500
+LOG_LEVELS = {name: getattr(logging, name) for name in ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")}
+
+
+def format_log_entry(entry):
+    created, levelno, message = entry
+    timestamp = datetime.datetime.fromtimestamp(created).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+    return f"{timestamp} - {logging.getLevelName(levelno)} - {message}"
+
+
+class LogRingBuffer:
+    """
+    Sink for debug messages from any thread. log() only appends a tuple to two bounded
+    deques (atomic in CPython, so no lock and no Qt call on the caller's thread): history
+    keeps the latest LOG_BUFFER_SIZE entries for dumping, pending holds entries until the
+    debug window drains them. Messages below min_level are dropped, and DEBUG messages
+    beyond LOG_DEBUG_MAX_PER_SECOND are only counted (the counters are approximate under
+    concurrent logging, which is fine for a rate limit).
+    """
+
+    def __init__(self):
+        self.history = deque(maxlen=LOG_BUFFER_SIZE)
+        self.pending = deque(maxlen=LOG_BUFFER_SIZE)
+        self.min_level = logging.DEBUG
+        self.suppressed = 0
+        self._debug_second = 0
+        self._debug_count = 0
+
+    def enabled_for(self, levelno):
+        return levelno >= self.min_level
+
+    def log(self, message, level="INFO"):
+        levelno = LOG_LEVELS.get(level.upper(), logging.INFO)
+        if levelno < self.min_level:
+            return
+        now = time.time()
+        if levelno == logging.DEBUG:
+            if int(now) != self._debug_second:
+                self._debug_second, self._debug_count = int(now), 0
+            self._debug_count += 1
+            if self._debug_count > LOG_DEBUG_MAX_PER_SECOND:
+                self.suppressed += 1
+                return
+        entry = (now, levelno, message)
+        self.history.append(entry)
+        self.pending.append(entry)
+
+    def drain(self, limit=LOG_DRAIN_BATCH):
+        """Take up to limit pending entries, plus the number of DEBUG messages suppressed since the last drain."""
+        entries = []
+        while self.pending and len(entries) < limit:
+            entries.append(self.pending.popleft())
+        suppressed, self.suppressed = self.suppressed, 0
+        return entries, suppressed
+
+    def dump(self, file_path):
+        with open(file_path, "w", encoding="utf-8", buffering=1024 * 1024) as f:
+            for entry in list(self.history):
+                f.write(format_log_entry(entry) + "\n")
+
+
+debug_log_buffer = LogRingBuffer()
+
+# Duplicate detection: bytes hashed from the start of each same-size file before
+# committing to a full hash, and the read size used while streaming full hashes.
+PARTIAL_HASH_BYTES = 64 * 1024
+HASH_CHUNK_BYTES = 1024 * 1024
+HASH_WORKERS = min(8, (os.cpu_count() or 2) * 2)
+HASH_WINDOW = HASH_WORKERS * 4 # Hashes in flight at once, across size groups
+DUPLICATE_PROGRESS_EVERY = 1000 # Files between progress reports (and cancel checks) during the size pass
+
+# Background scanning: files handed to the UI per batch, and minimum seconds between progress updates
+SCAN_BATCH_SIZE = 5000
+SCAN_PROGRESS_INTERVAL = 0.25
+
+# Scan snapshots (per scanned root) live in the same app data directory as the package manager.
+# Directories modified within SNAPSHOT_MTIME_GRACE_NS of a scan are always re-listed next time,
+# since a later change in the same timestamp tick would leave their mtime unchanged.
+if sys.platform == "darwin":
+    BASE_DATA_DIR = os.path.expanduser("~/Library/Application Support")
+elif sys.platform == "win32":
+    BASE_DATA_DIR = os.getenv('APPDATA') or os.path.expanduser("~\\AppData\\Roaming")
+else:
+    BASE_DATA_DIR = os.path.expanduser("~/.local/share")
+APP_DATA_DIR = os.path.join(BASE_DATA_DIR, "Python_Global_Package_Manager")
+SNAPSHOT_DIR = os.path.join(APP_DATA_DIR, "scan_snapshots")
+METADATA_CACHE_FILE = os.path.join(APP_DATA_DIR, "file_metadata_cache.json.gz")
+SNAPSHOT_VERSION = 1
+SNAPSHOT_MTIME_GRACE_NS = 2 * 10**9
+
+# Queued deletions: files of one directory are trashed together in batches of TRASH_BATCH_SIZE,
+# TRASH_WORKERS batches at a time. Every trashed file is appended to the undo journal
+# (JSON Lines: original path, trash location where it can be determined, time).
+TRASH_BATCH_SIZE = 200
+TRASH_WORKERS = 4
+DELETION_JOURNAL_FILE = os.path.join(APP_DATA_DIR, "deletion_journal.jsonl")
+# Windows and macOS trash a list of paths natively; the freedesktop trash used elsewhere
+# picks each file's name inside the trash without locking, so two same-named files
+# (every __init__.py) trashed concurrently could overwrite each other there.
+TRASH_LISTS_NATIVELY = sys.platform in ("win32", "darwin")
+TRASH_LOCATION_PROBES = 200
+_freedesktop_trash_lock = threading.Lock()
+
+# Watch mode: change notifications arriving within WATCH_COALESCE_MS become one refresh;
+# without watchdog the snapshot is re-checked every WATCH_POLL_INTERVAL_MS.
+WATCH_COALESCE_MS = 1000
+WATCH_POLL_INTERVAL_MS = 5000
+
+# Exports: columns written (the first five table columns), rows between progress/cancel checks,
+# write buffer for text formats, rows per Parquet row group and per XLSX sheet (Excel's limit)
+EXPORT_HEADERS = ['Directory', 'Filename', 'Created', 'Modified', 'Status']
+EXPORT_PROGRESS_EVERY = 2000
+EXPORT_BUFFER_BYTES = 1024 * 1024
+EXPORT_PARQUET_ROW_GROUP = 50000
+EXPORT_XLSX_MAX_ROWS = 1048575
+# format -> (button label, file dialog filter)
+EXPORT_FORMATS = {
+    "csv": ("CSV", "CSV Files (*.csv)"),
+    "xlsx": ("XLSX", "Excel Files (*.xlsx)"),
+    "txt": ("TXT", "Text Files (*.txt)"),
+    "pdf": ("PDF", "PDF Files (*.pdf)"),
+    "parquet": ("Parquet", "Parquet Files (*.parquet)"),
+    "jsonl": ("JSON Lines", "JSON Lines Files (*.jsonl)"),
+}
+
+# Status codes stored per scanned file, and how they are shown in the table
+STATUS_FILE_FOUND = 0
+STATUS_QUEUED = 1
+STATUS_TRASHED = 2
+STATUS_DELETE_FAILED = 3
+STATUS_LABELS = ["File Found", "Queued for Deletion", "Sent to Trash", "Deletion Failed"]
+STATUS_COLORS = [Qt.darkGreen, Qt.red, Qt.gray, Qt.darkRed]
+COLUMN_LABELS = ["Directory", "Filename", "Created", "Modified", "Status", "Duplicate Group",
+                 "Size", "Lines", "Shebang", "Imports", "Last Compiled (.pyc)"]
+METADATA_COLUMNS = range(6, 11) # Filled in by the optional "Collect file details" pass
+
+# File details: files per worker task, worker threads, largest file parsed for imports,
+# and the cache of source-derived details keyed by path and validated by (mtime, size)
+ENRICH_BATCH_SIZE = 500
+ENRICH_WORKERS = min(8, (os.cpu_count() or 2))
+ENRICH_MAX_PARSE_BYTES = 2 * 1024 * 1024
+# Module-level (unindented) import statements; "import a, b as c" lists several modules
+TOP_LEVEL_IMPORT_PATTERN = re.compile(rb'^(?:import\s+([\w.]+(?:\s+as\s+\w+)?(?:[ \t]*,[ \t]*[\w.]+(?:\s+as\s+\w+)?)*)|from\s+(\w[\w.]*)\s+import\b)', re.MULTILINE)
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def format_timestamp(timestamp):
+    return time.strftime(TIMESTAMP_FORMAT, time.localtime(timestamp))
+
 
 class DebugWindow(QDialog):
-    """A debug window to display log messages from the application."""
+    """
+    A debug window to display log messages from the application. Messages go into
+    debug_log_buffer from any thread; a timer pulls them in batches for the display
+    and the main logger (file_scanner.log).
+    """
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -41,30 +220,71 @@ class DebugWindow(QDialog):
         self.setObjectName("DebugWindow") 
 
         layout = QVBoxLayout(self) 
-        self.log_text = QTextEdit()
+        self.log_text = QPlainTextEdit()
         self.log_text.setReadOnly(True)
         self.log_text.setObjectName("LogText")
+        self.log_text.setMaximumBlockCount(LOG_DISPLAY_LINES) # Older lines stay available via "Save Log..."
         layout.addWidget(self.log_text)
 
+        button_layout = QHBoxLayout()
+        button_layout.addWidget(QLabel("Level:"))
+        self.level_combo = QComboBox()
+        self.level_combo.addItems(list(LOG_LEVELS))
+        self.level_combo.setCurrentText(logging.getLevelName(debug_log_buffer.min_level))
+        self.level_combo.currentTextChanged.connect(self.set_log_level)
+        button_layout.addWidget(self.level_combo)
+        button_layout.addStretch(1)
+
+        self.save_button = QPushButton("Save Log...")
+        self.save_button.clicked.connect(self.save_log)
+        button_layout.addWidget(self.save_button)
+
         self.clear_button = QPushButton("Clear Log")
         self.clear_button.clicked.connect(self.clear_log_display)
-        layout.addWidget(self.clear_button)
+        button_layout.addWidget(self.clear_button)
+        layout.addLayout(button_layout)
 
         self.setLayout(layout)
+
+        self.drain_timer = QTimer(self)
+        self.drain_timer.setInterval(LOG_DRAIN_INTERVAL_MS)
+        self.drain_timer.timeout.connect(self.flush)
+        self.drain_timer.start()
         logger.info("DebugWindow initialized.")
 
     def log_message(self, message, level="INFO"):
-        """Add a message to the log display and the main logger."""
-        timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
-        formatted_message = f"{timestamp} - {level} - {message}"
-        self.log_text.append(formatted_message)
-        
-        if level.upper() == "DEBUG": logger.debug(message)
-        elif level.upper() == "INFO": logger.info(message)
-        elif level.upper() == "WARNING": logger.warning(message)
-        elif level.upper() == "ERROR": logger.error(message)
-        elif level.upper() == "CRITICAL": logger.critical(message)
-        else: logger.info(message)
+        """Queue a message for the log display and the main logger. Safe to call from any thread."""
+        debug_log_buffer.log(message, level)
+
+    def flush(self):
+        """Move queued messages to the display and the main logger."""
+        entries, suppressed = debug_log_buffer.drain()
+        if not entries and not suppressed:
+            return
+        lines = []
+        for entry in entries:
+            logger.log(entry[1], entry[2])
+            lines.append(format_log_entry(entry))
+        if suppressed:
+            lines.append(f"... {suppressed} DEBUG messages suppressed (more than {LOG_DEBUG_MAX_PER_SECOND} per second)")
+            logger.debug(lines[-1])
+        self.log_text.appendPlainText("\n".join(lines))
+
+    def set_log_level(self, level_name):
+        debug_log_buffer.min_level = LOG_LEVELS[level_name]
+        self.log_message(f"Debug log level set to {level_name}.", "INFO")
+
+    def save_log(self):
+        default_filename = f"DebugLog_{datetime.datetime.now().strftime('%Y-%m-%d_%H%M%S')}.log"
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save Debug Log", str(Path.home() / default_filename),
+                                                   "Log Files (*.log);;Text Files (*.txt);;All Files (*)")
+        if not file_path:
+            return
+        try:
+            debug_log_buffer.dump(file_path)
+            self.log_message(f"Debug log ({len(debug_log_buffer.history)} entries) saved to {file_path}", "INFO")
+        except OSError as e:
+            QMessageBox.critical(self, "Save Error", f"Could not save the debug log: {e}")
 
     def clear_log_display(self):
         """Clear the log display in the debug window."""
@@ -72,62 +292,474 @@ class DebugWindow(QDialog):
         self.log_message("Debug log display cleared.", "INFO")
 
 
+class _DirNode:
+    __slots__ = ("children", "count")
+
+    def __init__(self):
+        self.children = {}
+        self.count = 0
+
+
+class DirectoryIndex:
+    """
+    Prefix tree of resolved directory paths. Every node counts the tracked files at or
+    below it, so "does this directory still hold tracked files?" costs one walk of the
+    path's depth. Each distinct directory string is resolved on disk only once.
+    """
+
+    def __init__(self):
+        self.root = _DirNode()
+        self._parts_cache = {}
+
+    def path_parts(self, directory_str):
+        parts = self._parts_cache.get(directory_str)
+        if parts is None:
+            try:
+                resolved = Path(directory_str).resolve()
+            except Exception:
+                resolved = Path(directory_str)
+            parts = tuple(os.path.normcase(part) for part in resolved.parts)
+            self._parts_cache[directory_str] = parts
+        return parts
+
+    def add(self, directory_str, count=1):
+        node = self.root
+        node.count += count
+        for part in self.path_parts(directory_str):
+            child = node.children.get(part)
+            if child is None:
+                child = node.children[part] = _DirNode()
+            node = child
+            node.count += count
+
+    def remove(self, directory_str, count=1):
+        """Stop tracking `count` files directly inside directory_str."""
+        nodes = [self.root]
+        for part in self.path_parts(directory_str):
+            child = nodes[-1].children.get(part)
+            if child is None:
+                return
+            nodes.append(child)
+        for node in nodes:
+            node.count = max(0, node.count - count)
+
+    def tracked_count(self, directory_str):
+        node = self.root
+        for part in self.path_parts(directory_str):
+            node = node.children.get(part)
+            if node is None:
+                return 0
+        return node.count
+
+
+def freedesktop_trash_location(original_path):
+    """Best-effort path of a just-trashed file in the freedesktop home trash, or None."""
+    trash_dir = os.path.join(os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share"), "Trash")
+    base_name, ext = os.path.splitext(os.path.basename(original_path))
+    path_line = f"\nPath={urllib.parse.quote(os.path.abspath(original_path))}\n"
+    location = None
+    # send2trash takes the first free "name", "name 1", "name 2", ... - the newest match wins
+    for counter in range(TRASH_LOCATION_PROBES):
+        trash_name = base_name + ext if counter == 0 else f"{base_name} {counter}{ext}"
+        try:
+            with open(os.path.join(trash_dir, "info", trash_name + ".trashinfo"), encoding="utf-8") as f:
+                trash_info = f.read()
+        except OSError:
+            break
+        if path_line in trash_info:
+            location = os.path.join(trash_dir, "files", trash_name)
+    return location
+
+
+def _snapshot_files(snapshot):
+    return {os.path.join(directory_str, file_name): file_info
+            for directory_str, (_, _, python_files, _) in snapshot["directories"].items()
+            for file_name, file_info in python_files.items()}
+
+
+def diff_snapshots(old_snapshot, new_snapshot):
+    """Return {"added", "removed", "modified"} lists of full paths between two scan snapshots."""
+    old_files = _snapshot_files(old_snapshot)
+    new_files = _snapshot_files(new_snapshot)
+    modified = [path for path, file_info in new_files.items()
+                if file_info and old_files.get(path) and file_info[1:] != old_files[path][1:]] # mtime or size
+    return {
+        "added": sorted(new_files.keys() - old_files.keys()),
+        "removed": sorted(old_files.keys() - new_files.keys()),
+        "modified": sorted(modified),
+    }
+
+
+def snapshot_changes(snapshot, scan_diff):
+    """
+    Turn a diff of paths into table updates: (directory, filename, ctime, mtime) for
+    added and modified files, taken from the snapshot, and (directory, filename) for removed ones.
+    """
+    directories = snapshot["directories"]
+
+    def with_times(paths):
+        for path in paths:
+            directory_str, file_name = os.path.split(path)
+            entry = directories.get(directory_str)
+            file_info = entry[2].get(file_name) if entry else None
+            if file_info:
+                yield (directory_str, file_name, file_info[0], file_info[1])
+
+    return {
+        "added": list(with_times(scan_diff["added"])),
+        "removed": [os.path.split(path) for path in scan_diff["removed"]],
+        "modified": list(with_times(scan_diff["modified"])),
+    }
+
+
+class DuplicateSearchCancelled(Exception):
+    """Raised inside FileScanner.find_duplicate_files when its cancel event is set."""
+
+
 class FileScanner:
     """Handles the file scanning logic separate from the UI."""
 
     def __init__(self, debug_logger_func=None):
-        self.scanned_files = []
+        self.scanned_files = ScanResultStore()
+        self.snapshot = None # Snapshot of the last complete scan (see scan_directory)
+        self.scan_diff = None
         self.debug_log = debug_logger_func if debug_logger_func else logger.info
+        self._critical_dir_parts = None # Resolved once, on first directory deletion attempt
         self.debug_log("FileScanner initialized.", "INFO")
 
     def _walk_error_handler(self, os_error):
         error_message = f"Access error during scan: {os_error.filename} - {os_error.strerror}. Skipping this path."
         self.debug_log(error_message, "WARNING")
 
-    def scan_directory(self, directory):
+    def scan_directory(self, directory, batch_callback=None, progress_callback=None, cancel_event=None,
+                       batch_size=SCAN_BATCH_SIZE, previous_snapshot=None):
+        """
+        Collect .py/.pyw files under directory into a ScanResultStore. With batch_callback,
+        found files are handed over in stores of batch_size rows instead of being kept in
+        self.scanned_files. progress_callback(items_processed, python_files_found) is called
+        at most every SCAN_PROGRESS_INTERVAL seconds; setting cancel_event stops the walk early.
+
+        With previous_snapshot (from load_snapshot), directories whose mtime is unchanged are
+        not listed again; only their known Python files are re-stat'ed. After a complete scan
+        self.snapshot holds the new snapshot and, if there was a previous one, self.scan_diff
+        the added/removed/modified files.
+        """
         self.debug_log(f"Starting scan of directory: {directory}", "INFO")
-        self.scanned_files = []
+        self.scanned_files = ScanResultStore()
+        self.snapshot = None
+        self.scan_diff = None
+        previous_directories = previous_snapshot["directories"] if previous_snapshot else {}
+        snapshot_directories = {}
         files_processed_count = 0
         python_files_found_count = 0
+        relisted_count = 0
+        last_progress_time = time.monotonic()
+        recent_mtime_ns = time.time_ns() - SNAPSHOT_MTIME_GRACE_NS
+        completed = False
+        log_directories = debug_log_buffer.enabled_for(logging.DEBUG) # Skip formatting per-directory messages nobody keeps
 
         if not Path(directory).is_dir():
             self.debug_log(f"Provided path is not a valid directory: {directory}", "ERROR")
-            return []
+            return self.scanned_files
 
+        pending_directories = [os.path.normpath(directory)]
         try:
-            for root, dirs, files in os.walk(directory, onerror=self._walk_error_handler, followlinks=False):
-                self.debug_log(f"Scanning: {root} (Found {len(dirs)} subdirs, {len(files)} files in current dir)", "DEBUG")
-                for file_name in files:
-                    files_processed_count += 1
-                    if file_name.lower().endswith((".py", ".pyw")): # Only scan for .py and .pyw files
-                        python_files_found_count += 1
-                        try:
-                            full_path = Path(root) / file_name
-                            stat_info = full_path.stat()
-                            created_time = datetime.datetime.fromtimestamp(stat_info.st_ctime).strftime('%Y-%m-%d %H:%M:%S')
-                            modified_time = datetime.datetime.fromtimestamp(stat_info.st_mtime).strftime('%Y-%m-%d %H:%M:%S')
-                            file_info = {
-                                "directory": str(full_path.parent),
-                                "filename": full_path.name,
-                                "created": created_time,
-                                "modified": modified_time,
-                                "status": "File Found" # Initial status
-                            }
-                            self.scanned_files.append(file_info)
-                            if python_files_found_count <= 10:
-                                self.debug_log(f"Found Python file: {full_path.name} in {full_path.parent}", "DEBUG")
-                        except FileNotFoundError:
-                            self.debug_log(f"File not found during stat: {full_path}. Potentially a broken symlink or race condition.", "WARNING")
-                        except PermissionError:
-                            self.debug_log(f"Permission error accessing metadata for: {full_path}", "WARNING")
-                        except Exception as e:
-                            self.debug_log(f"Error processing file metadata for {file_name} in {root}: {e}", "ERROR")
+            while pending_directories:
+                if cancel_event is not None and cancel_event.is_set():
+                    self.debug_log("Scan cancelled.", "INFO")
+                    break
+                directory_str = pending_directories.pop()
+                try:
+                    mtime_ns = os.stat(directory_str).st_mtime_ns
+                except OSError as e:
+                    self._walk_error_handler(e)
+                    continue
+                previous = previous_directories.get(directory_str)
+                if previous and previous[0] == mtime_ns:
+                    _, subdirectories, previous_files, file_count = previous
+                    python_names = list(previous_files)
+                else:
+                    listing = self._list_directory(directory_str)
+                    if listing is None:
+                        continue
+                    subdirectories, python_names, file_count = listing
+                    relisted_count += 1
+                    if log_directories:
+                        self.debug_log(f"Scanning: {directory_str} (Found {len(subdirectories)} subdirs, {file_count} files in current dir)", "DEBUG")
+                files_processed_count += file_count
+                python_files = {}
+                for file_name in python_names:
+                    python_files_found_count += 1
+                    full_path = os.path.join(directory_str, file_name)
+                    python_files[file_name] = None # Kept even if stat fails, so incremental scans still see it
+                    try:
+                        stat_info = os.stat(full_path)
+                        self.scanned_files.append(directory_str, file_name, stat_info.st_ctime, stat_info.st_mtime)
+                        python_files[file_name] = [stat_info.st_ctime, stat_info.st_mtime, stat_info.st_size]
+                        if python_files_found_count <= 10:
+                            self.debug_log(f"Found Python file: {file_name} in {directory_str}", "DEBUG")
+                    except FileNotFoundError:
+                        self.debug_log(f"File not found during stat: {full_path}. Potentially a broken symlink or race condition.", "WARNING")
+                    except PermissionError:
+                        self.debug_log(f"Permission error accessing metadata for: {full_path}", "WARNING")
+                    except Exception as e:
+                        self.debug_log(f"Error processing file metadata for {file_name} in {directory_str}: {e}", "ERROR")
+                snapshot_directories[directory_str] = [mtime_ns if mtime_ns < recent_mtime_ns else -1,
+                                                       subdirectories, python_files, file_count]
+                pending_directories.extend(os.path.join(directory_str, name) for name in reversed(subdirectories))
+                if batch_callback and len(self.scanned_files) >= batch_size:
+                    batch_callback(self.scanned_files)
+                    self.scanned_files = ScanResultStore()
+                if progress_callback and time.monotonic() - last_progress_time >= SCAN_PROGRESS_INTERVAL:
+                    progress_callback(files_processed_count, python_files_found_count)
+                    last_progress_time = time.monotonic()
+            else:
+                completed = True
         except Exception as e:
             self.debug_log(f"General error during directory scan operation: {e}", "CRITICAL")
 
-        self.debug_log(f"Scan complete. Processed {files_processed_count} total items. Found {len(self.scanned_files)} Python files.", "INFO")
+        if batch_callback and len(self.scanned_files):
+            batch_callback(self.scanned_files)
+            self.scanned_files = ScanResultStore()
+        if progress_callback:
+            progress_callback(files_processed_count, python_files_found_count)
+        if completed:
+            self.snapshot = {"version": SNAPSHOT_VERSION, "root": os.path.normpath(directory), "directories": snapshot_directories}
+            if previous_snapshot:
+                self.scan_diff = diff_snapshots(previous_snapshot, self.snapshot)
+        self.debug_log(f"Scan complete. Processed {files_processed_count} total items. Found {python_files_found_count} Python files. "
+                       f"Listed {relisted_count} of {len(snapshot_directories)} directories.", "INFO")
         return self.scanned_files
 
+    def refresh_snapshot_directories(self, snapshot, directories):
+        """
+        Re-list the given directories of a snapshot in place and return the diff (as
+        diff_snapshots does). New subdirectories are scanned, vanished ones dropped with
+        their files; directories the snapshot doesn't know yet are reached from their
+        nearest known ancestor.
+        """
+        snapshot_directories = snapshot["directories"]
+        added, removed, modified = [], [], []
+
+        def drop_tree(directory_str):
+            entry = snapshot_directories.pop(directory_str, None)
+            if entry is not None:
+                removed.extend(os.path.join(directory_str, file_name) for file_name in entry[2])
+                for name in entry[1]:
+                    drop_tree(os.path.join(directory_str, name))
+
+        dirty_directories = set()
+        for directory_str in directories:
+            directory_str = os.path.normpath(directory_str)
+            while directory_str not in snapshot_directories:
+                parent = os.path.dirname(directory_str)
+                if parent == directory_str: # Outside the scanned root
+                    break
+                directory_str = parent
+            if directory_str in snapshot_directories:
+                dirty_directories.add(directory_str)
+
+        refreshed = set()
+        for dirty_directory in sorted(dirty_directories, key=len): # Parents before their children
+            if dirty_directory in refreshed or dirty_directory not in snapshot_directories:
+                continue # Already done, or dropped along with its parent
+            pending_directories = [dirty_directory]
+            while pending_directories:
+                directory_str = pending_directories.pop()
+                refreshed.add(directory_str)
+                old_entry = snapshot_directories.get(directory_str)
+                try:
+                    mtime_ns = os.stat(directory_str).st_mtime_ns
+                    listing = self._list_directory(directory_str)
+                except OSError:
+                    listing = None
+                if listing is None: # Gone (or unreadable): forget it and everything below
+                    drop_tree(directory_str)
+                    parent_entry = snapshot_directories.get(os.path.dirname(directory_str))
+                    if parent_entry and os.path.basename(directory_str) in parent_entry[1]:
+                        parent_entry[1].remove(os.path.basename(directory_str))
+                    continue
+                subdirectories, python_names, file_count = listing
+                old_files = old_entry[2] if old_entry else {}
+                python_files = {}
+                for file_name in python_names:
+                    full_path = os.path.join(directory_str, file_name)
+                    try:
+                        stat_info = os.stat(full_path)
+                        python_files[file_name] = [stat_info.st_ctime, stat_info.st_mtime, stat_info.st_size]
+                    except OSError:
+                        python_files[file_name] = None
+                    if file_name not in old_files:
+                        added.append(full_path)
+                    elif python_files[file_name] and old_files[file_name] and python_files[file_name][1:] != old_files[file_name][1:]:
+                        modified.append(full_path)
+                removed.extend(os.path.join(directory_str, file_name) for file_name in old_files if file_name not in python_files)
+                old_subdirectories = set(old_entry[1]) if old_entry else set()
+                for name in old_subdirectories.difference(subdirectories):
+                    drop_tree(os.path.join(directory_str, name))
+                pending_directories.extend(os.path.join(directory_str, name) for name in subdirectories if name not in old_subdirectories)
+                recent_mtime_ns = time.time_ns() - SNAPSHOT_MTIME_GRACE_NS
+                snapshot_directories[directory_str] = [mtime_ns if mtime_ns < recent_mtime_ns else -1,
+                                                       subdirectories, python_files, file_count]
+        return {"added": sorted(added), "removed": sorted(removed), "modified": sorted(modified)}
+
+    def _list_directory(self, directory_str):
+        """Return (subdirectory names, Python file names, file count) for one directory, or None if unreadable."""
+        subdirectories, python_names, file_count = [], [], 0
+        try:
+            with os.scandir(directory_str) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        if not entry.is_symlink(): # Like os.walk(followlinks=False)
+                            subdirectories.append(entry.name)
+                    else:
+                        file_count += 1
+                        if entry.name.lower().endswith((".py", ".pyw")): # Only scan for .py and .pyw files
+                            python_names.append(entry.name)
+        except OSError as e:
+            self._walk_error_handler(e)
+            return None
+        return subdirectories, python_names, file_count
+
+    def snapshot_path(self, directory):
+        root = os.path.normcase(os.path.abspath(directory))
+        return os.path.join(SNAPSHOT_DIR, hashlib.sha1(root.encode("utf-8")).hexdigest()[:16] + ".json.gz")
+
+    def load_snapshot(self, directory):
+        """Return the saved snapshot for directory, or None if there is no usable one."""
+        snapshot_file = self.snapshot_path(directory)
+        if not os.path.exists(snapshot_file):
+            return None
+        try:
+            with gzip.open(snapshot_file, "rt", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError) as e:
+            self.debug_log(f"Ignoring unreadable scan snapshot {snapshot_file}: {e}", "WARNING")
+            return None
+        if snapshot.get("version") != SNAPSHOT_VERSION or snapshot.get("root") != os.path.normpath(directory):
+            return None
+        self.debug_log(f"Loaded scan snapshot with {len(snapshot['directories'])} directories from {snapshot_file}", "INFO")
+        return snapshot
+
+    def save_snapshot(self, snapshot):
+        snapshot_file = self.snapshot_path(snapshot["root"])
+        temp_file = snapshot_file + ".tmp"
+        try:
+            os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+            with gzip.open(temp_file, "wt", encoding="utf-8", compresslevel=1) as f:
+                json.dump(snapshot, f, separators=(",", ":"))
+            os.replace(temp_file, snapshot_file)
+            self.debug_log(f"Saved scan snapshot to {snapshot_file}", "INFO")
+        except OSError as e:
+            self.debug_log(f"Could not save scan snapshot {snapshot_file}: {e}", "WARNING")
+
+    def _hash_file(self, file_path_str, limit=None):
+        """BLAKE2b of the file (or of its first `limit` bytes), read in fixed-size chunks."""
+        digest = hashlib.blake2b(digest_size=20)
+        remaining = limit
+        try:
+            with open(file_path_str, "rb") as f:
+                while remaining is None or remaining > 0:
+                    chunk = f.read(HASH_CHUNK_BYTES if remaining is None else min(HASH_CHUNK_BYTES, remaining))
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    if remaining is not None:
+                        remaining -= len(chunk)
+        except OSError as e:
+            self.debug_log(f"Could not read {file_path_str} for hashing: {e}", "WARNING")
+            return None
+        return digest.digest()
+
+    def _split_groups_by_hash(self, pool, size_groups, limit, stage=None, progress=None, cancel_event=None):
+        """
+        Hash every file in the (size, paths) groups in parallel and split each group by digest.
+        Files from all groups share one window of HASH_WINDOW pool tasks, so the many two-file
+        groups don't leave workers idle; progress is reported at most every SCAN_PROGRESS_INTERVAL.
+        """
+        jobs = ((index, path) for index, (_, paths) in enumerate(size_groups) for path in paths)
+        total = sum(len(paths) for _, paths in size_groups)
+        digests_by_group = defaultdict(lambda: defaultdict(list))
+        pending = {}
+        done = 0
+        last_progress_time = time.monotonic()
+        try:
+            while True:
+                for index, path in islice(jobs, HASH_WINDOW - len(pending)):
+                    pending[pool.submit(self._hash_file, path, limit)] = (index, path)
+                if not pending:
+                    break
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise DuplicateSearchCancelled()
+                    index, path = pending.pop(future)
+                    digest = future.result()
+                    if digest is not None:
+                        digests_by_group[index][digest].append(path)
+                    done += 1
+                if progress and time.monotonic() - last_progress_time >= SCAN_PROGRESS_INTERVAL:
+                    last_progress_time = time.monotonic()
+                    progress(stage, done, total)
+        finally:
+            for future in pending:
+                future.cancel()
+        if progress and total:
+            progress(stage, total, total)
+        return [
+            (size_groups[index][0], same)
+            for index, by_digest in sorted(digests_by_group.items())
+            for same in by_digest.values() if len(same) > 1
+        ]
+
+    def find_duplicate_files(self, file_paths, progress=None, cancel_event=None):
+        """
+        Group files with identical content. Returns a list of (size, [paths]) with two or
+        more paths each, largest files first.
+        Files are grouped by size, then by a hash of their first PARTIAL_HASH_BYTES, and
+        only files still colliding after that are hashed in full. Only sizes and digests
+        are kept in memory, never file contents. Empty files are ignored.
+        progress(stage, done, total) is called as each stage advances; setting cancel_event
+        raises DuplicateSearchCancelled.
+        """
+        self.debug_log(f"Duplicate search started over {len(file_paths)} files.", "INFO")
+        by_size = defaultdict(list)
+        for index, path in enumerate(file_paths):
+            if index % DUPLICATE_PROGRESS_EVERY == 0:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise DuplicateSearchCancelled()
+                if progress:
+                    progress("Comparing file sizes", index, len(file_paths))
+            try:
+                size = os.stat(path).st_size
+            except OSError as e:
+                self.debug_log(f"Could not stat {path} for duplicate check: {e}", "WARNING")
+                continue
+            if size > 0:
+                by_size[size].append(path)
+        size_groups = [(size, paths) for size, paths in by_size.items() if len(paths) > 1]
+        del by_size
+        self.debug_log(f"Duplicate search: {sum(len(p) for _, p in size_groups)} files share a size with another file.", "DEBUG")
+
+        with ThreadPoolExecutor(max_workers=HASH_WORKERS) as pool:
+            groups = self._split_groups_by_hash(pool, size_groups, PARTIAL_HASH_BYTES,
+                                                "Hashing file starts", progress, cancel_event)
+            self.debug_log(f"Duplicate search: {len(groups)} groups left after partial hashing.", "DEBUG")
+            # Files no larger than the partial window were already hashed in full
+            small_groups = [(size, paths) for size, paths in groups if size <= PARTIAL_HASH_BYTES]
+            large_groups = [(size, paths) for size, paths in groups if size > PARTIAL_HASH_BYTES]
+            groups = small_groups + self._split_groups_by_hash(pool, large_groups, None,
+                                                               "Hashing whole files", progress, cancel_event)
+
+        groups = [(size, sorted(paths)) for size, paths in groups]
+        groups.sort(key=lambda group: (-group[0], group[1][0]))
+        self.debug_log(f"Duplicate search complete: {len(groups)} groups of identical files.", "INFO")
+        return groups
+
     def delete_file_to_trash(self, file_path_str):
         file_path = Path(file_path_str)
         if not file_path.exists():
@@ -143,73 +775,188 @@ class FileScanner:
             self.debug_log(f"Error sending file to trash {file_path_str}: {e}", "ERROR")
         return False
 
-    def try_delete_empty_dir_to_trash(self, directory_str, all_py_files_not_in_current_deletion_batch):
+    def load_metadata_cache(self):
+        """Return {path: [mtime, size, line_count, shebang, imports]} from the last runs, or {}."""
+        try:
+            with gzip.open(METADATA_CACHE_FILE, "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            self.debug_log(f"Ignoring unreadable file details cache {METADATA_CACHE_FILE}: {e}", "WARNING")
+            return {}
+
+    def save_metadata_cache(self, metadata_cache):
+        temp_file = METADATA_CACHE_FILE + ".tmp"
+        try:
+            os.makedirs(APP_DATA_DIR, exist_ok=True)
+            with gzip.open(temp_file, "wt", encoding="utf-8", compresslevel=1) as f:
+                json.dump(metadata_cache, f, separators=(",", ":"))
+            os.replace(temp_file, METADATA_CACHE_FILE)
+        except OSError as e:
+            self.debug_log(f"Could not save file details cache {METADATA_CACHE_FILE}: {e}", "WARNING")
+
+    def extract_file_metadata(self, file_path_str, metadata_cache, pycache_listings):
+        """
+        Return (size, line_count, shebang, imports, pyc_mtime) for a Python file, or None if it
+        can't be read. imports is a comma-separated list of top-level modules imported at
+        module level. pyc_mtime is the newest matching .pyc (0.0 if none): Python rewrites it
+        whenever the source changed and the module was imported, so it hints at last use.
+        Source-derived values come from metadata_cache while the file's mtime and size match.
+        """
+        try:
+            stat_info = os.stat(file_path_str)
+        except OSError as e:
+            self.debug_log(f"Could not read metadata for {file_path_str}: {e}", "WARNING")
+            return None
+        cached = metadata_cache.get(file_path_str)
+        if cached and cached[0] == stat_info.st_mtime and cached[1] == stat_info.st_size:
+            line_count, shebang, imports = cached[2:]
+        else:
+            try:
+                with open(file_path_str, "rb") as f:
+                    source = f.read()
+            except OSError as e:
+                self.debug_log(f"Could not read {file_path_str}: {e}", "WARNING")
+                return None
+            line_count = source.count(b"\n") + (1 if source and not source.endswith(b"\n") else 0)
+            shebang = ""
+            if source.startswith(b"#!"):
+                shebang = sys.intern(source.split(b"\n", 1)[0].decode("utf-8", "replace").strip())
+            imports = ", ".join(self._top_level_imports(source)) if len(source) <= ENRICH_MAX_PARSE_BYTES else ""
+            metadata_cache[file_path_str] = [stat_info.st_mtime, stat_info.st_size, line_count, shebang, imports]
+        return stat_info.st_size, line_count, shebang, imports, self._pyc_mtime(file_path_str, pycache_listings)
+
+    def _top_level_imports(self, source):
+        modules = {} # Ordered set
+        for match in TOP_LEVEL_IMPORT_PATTERN.finditer(source):
+            if match.group(1):
+                names = [part.split()[0] for part in match.group(1).split(b",")]
+            else:
+                names = [match.group(2)]
+            for name in names:
+                modules[name.split(b".")[0].decode("ascii", "replace")] = None
+        return list(modules)
+
+    def _pyc_mtime(self, file_path_str, pycache_listings):
+        """Newest mtime of __pycache__/<stem>.*.pyc (or a legacy <stem>.pyc next to the file)."""
+        directory_str, file_name = os.path.split(file_path_str)
+        stem = os.path.splitext(file_name)[0]
+        pycache_dir = os.path.join(directory_str, "__pycache__")
+        listing = pycache_listings.get(pycache_dir)
+        if listing is None:
+            try:
+                listing = os.listdir(pycache_dir)
+            except OSError:
+                listing = []
+            pycache_listings[pycache_dir] = listing
+        candidates = [os.path.join(pycache_dir, name) for name in listing
+                      if name.startswith(stem + ".") and name.endswith(".pyc") and name.count(".") == 2]
+        candidates.append(os.path.join(directory_str, stem + ".pyc"))
+        newest = 0.0
+        for candidate in candidates:
+            try:
+                newest = max(newest, os.stat(candidate).st_mtime)
+            except OSError:
+                pass
+        return newest
+
+    def trash_files(self, directory_str, file_names):
+        """
+        Send several files from one directory to the trash. Returns a list of
+        (file_name, ok, trash_location); trash_location is None where it is unknown.
+        """
+        results = []
+        existing_names = []
+        for file_name in file_names:
+            if os.path.exists(os.path.join(directory_str, file_name)):
+                existing_names.append(file_name)
+            else:
+                self.debug_log(f"Attempted to delete non-existent file: {os.path.join(directory_str, file_name)}", "ERROR")
+                results.append((file_name, False, None))
+        if not existing_names:
+            return results
+
+        batch_attempted = TRASH_LISTS_NATIVELY and len(existing_names) > 1
+        if batch_attempted:
+            try:
+                send2trash.send2trash([os.path.join(directory_str, file_name) for file_name in existing_names])
+                self.debug_log(f"Successfully sent {len(existing_names)} files to trash from: {directory_str}", "INFO")
+                return results + [(file_name, True, None) for file_name in existing_names]
+            except Exception as e:
+                # Older send2trash versions take a single path; also find out which file failed
+                self.debug_log(f"Batch trash failed in {directory_str} ({e}); retrying one file at a time.", "WARNING")
+
+        for file_name in existing_names:
+            file_path_str = os.path.join(directory_str, file_name)
+            if batch_attempted and not os.path.exists(file_path_str):
+                # The failed batch call still moved this one before raising
+                self.debug_log(f"Sent to trash by the batch call: {file_path_str}", "INFO")
+                results.append((file_name, True, None))
+                continue
+            if TRASH_LISTS_NATIVELY:
+                results.append((file_name, self.delete_file_to_trash(file_path_str), None))
+                continue
+            with _freedesktop_trash_lock:
+                ok = self.delete_file_to_trash(file_path_str)
+                results.append((file_name, ok, freedesktop_trash_location(file_path_str) if ok else None))
+        return results
+
+    def build_directory_index(self, file_directories):
+        """DirectoryIndex over the parent directory of every scanned file (one entry per file)."""
+        index = DirectoryIndex()
+        files_per_directory = defaultdict(int)
+        for directory_str in file_directories:
+            files_per_directory[directory_str] += 1
+        for directory_str, count in files_per_directory.items():
+            index.add(directory_str, count)
+        return index
+
+    def critical_dir_parts(self, index):
+        """Path parts of critical OS/User directories, resolved through the index once per scanner."""
+        if self._critical_dir_parts is None:
+            home_dir = Path.home()
+            # Expand the list of user-specific critical subfolders
+            user_critical_subfolders = [
+                "Documents", "Desktop", "Downloads", "Pictures", "Music", "Videos",
+                "AppData", ".config", ".local", # Common hidden config folders
+                "OneDrive", "Dropbox", "Google Drive" # Common cloud sync folders
+            ]
+            critical_paths = [Path(p) for p in [
+                os.getenv("SystemRoot", "C:\\Windows"),
+                os.getenv("ProgramFiles", "C:\\Program Files"),
+                os.getenv("ProgramFiles(x86)", "C:\\Program Files (x86)"),
+                home_dir
+            ] if p] # Ensure p is not None
+            for folder_name in user_critical_subfolders:
+                critical_paths.append(home_dir / folder_name)
+            self._critical_dir_parts = {index.path_parts(str(p)) for p in critical_paths if p.exists()}
+        return self._critical_dir_parts
+
+    def try_delete_empty_dir_to_trash(self, directory_str, directory_index):
         """
         Try to delete a directory by sending it to trash, subject to conditions:
         1. Not a critical OS/User directory.
-        2. No other application-tracked .py/.pyw files (from all_py_files_not_in_current_deletion_batch) 
-           remain within this directory path.
+        2. No application-tracked .py/.pyw files that have not been deleted yet remain
+           within this directory path (according to directory_index).
         3. The directory is physically empty on disk.
         """
         directory = Path(directory_str)
         self.debug_log(f"Attempting conditional delete for directory: {directory}", "DEBUG")
 
-        home_dir = Path.home()
-        # Expand the list of user-specific critical subfolders
-        user_critical_subfolders = [
-            "Documents", "Desktop", "Downloads", "Pictures", "Music", "Videos",
-            "AppData", ".config", ".local", # Common hidden config folders
-            "OneDrive", "Dropbox", "Google Drive" # Common cloud sync folders
-        ]
-        
-        critical_paths = [Path(p) for p in [
-            os.getenv("SystemRoot", "C:\\Windows"),
-            os.getenv("ProgramFiles", "C:\\Program Files"),
-            os.getenv("ProgramFiles(x86)", "C:\\Program Files (x86)"),
-            home_dir 
-        ] if p] # Ensure p is not None
-        
-        for folder_name in user_critical_subfolders:
-            critical_paths.append(home_dir / folder_name)
-        
-        try:
-            normalized_directory_to_check = directory.resolve()
-        except Exception: 
-            normalized_directory_to_check = directory
-
-        is_critical_dir_or_child = any(
-            crit_path.exists() and (normalized_directory_to_check == crit_path.resolve() or crit_path.resolve() in normalized_directory_to_check.parents)
-            for crit_path in critical_paths
-        )
+        directory_parts = directory_index.path_parts(directory_str)
+        critical_parts = self.critical_dir_parts(directory_index)
+        is_critical_dir_or_child = any(directory_parts[:depth] in critical_parts for depth in range(1, len(directory_parts) + 1))
         if is_critical_dir_or_child:
             self.debug_log(f"Skipping deletion attempt for critical OS/User directory or its child: {directory_str}", "WARNING")
             return
 
-        remaining_py_files_in_dir_path = 0
-        normalized_target_dir_path = normalized_directory_to_check
-
-        # Check against files NOT in the current deletion batch
-        for file_info in all_py_files_not_in_current_deletion_batch: 
-            try:
-                # Ensure 'directory' and 'filename' keys exist
-                if "directory" not in file_info or "filename" not in file_info:
-                    self.debug_log(f"Skipping file_info with missing keys: {file_info}", "WARNING")
-                    continue
-
-                file_parent_dir = Path(file_info["directory"]).resolve()
-                if file_parent_dir == normalized_target_dir_path or normalized_target_dir_path in file_parent_dir.parents:
-                    if file_info["filename"].lower().endswith((".py", ".pyw")):
-                        remaining_py_files_in_dir_path += 1
-                        self.debug_log(f"Found remaining PY file: {file_info['filename']} in {file_parent_dir}", "DEBUG")
-                        break 
-            except Exception as e:
-                self.debug_log(f"Error processing file_info during remaining PY check for {directory_str}: {file_info} - {e}", "ERROR")
-
+        remaining_py_files_in_dir_path = directory_index.tracked_count(directory_str)
         if remaining_py_files_in_dir_path > 0:
-            self.debug_log(f"Directory {directory_str} not deleted: {remaining_py_files_in_dir_path} other Python files still tracked by the app (and not in current deletion batch) within this path.", "INFO")
+            self.debug_log(f"Directory {directory_str} not deleted: {remaining_py_files_in_dir_path} other Python files still tracked by the app within this path.", "INFO")
             return
 
-        self.debug_log(f"No other app-tracked Python files (outside current batch) found in {directory_str} path. Proceeding to physical emptiness check.", "INFO")
+        self.debug_log(f"No other app-tracked Python files found in {directory_str} path. Proceeding to physical emptiness check.", "INFO")
 
         try:
             if directory.is_dir(): 
@@ -242,6 +989,774 @@ class FileScanner:
             self.debug_log(f"Error during final directory deletion attempt for {directory_str}: {e}", "WARNING")
 
 
+class ScanResultStore:
+    """
+    Column-oriented storage for scanned files: one list or array per column instead of
+    one dict per file. Directory strings are pooled so every file in a folder shares one
+    string (and one lowercase copy for filtering), timestamps are raw floats formatted
+    only when displayed, and statuses and duplicate groups are small ints. Columns that
+    are only needed for filtering are derived on first use and kept in step with appends.
+    """
+
+    def __init__(self):
+        self.directories = []
+        self.directories_lower = []
+        self.filenames = []
+        self.created = array('d')
+        self.modified = array('d')
+        self.status = bytearray()
+        self.duplicate_group = array('I') # 0 = not part of a duplicate group
+        self.duplicate_group_sizes = {}
+        # File details (see FileScanner.extract_file_metadata); size -1 = not collected yet
+        self.size = array('q')
+        self.line_count = array('q')
+        self.shebang = []
+        self.imports = []
+        self.pyc_mtime = array('d')
+        self._directory_pool = {}
+        self._derived_columns = {}
+        self._row_by_key = None # (directory, filename) -> row, built on first lookup
+
+    def __len__(self):
+        return len(self.filenames)
+
+    def append(self, directory, filename, created, modified):
+        pooled = self._directory_pool.get(directory)
+        if pooled is None:
+            pooled = self._directory_pool[directory] = (sys.intern(directory), directory.lower())
+        self.directories.append(pooled[0])
+        self.directories_lower.append(pooled[1])
+        self.filenames.append(filename)
+        self.created.append(created)
+        self.modified.append(modified)
+        self.status.append(STATUS_FILE_FOUND)
+        self.duplicate_group.append(0)
+        self.size.append(-1)
+        self.line_count.append(-1)
+        self.shebang.append("")
+        self.imports.append("")
+        self.pyc_mtime.append(0.0)
+        self._row_by_key = None
+
+    def extend(self, other):
+        """Append every row of another store (a scan batch), keeping statuses and groups at their defaults."""
+        for directory, filename, created, modified in zip(other.directories, other.filenames, other.created, other.modified):
+            self.append(directory, filename, created, modified)
+
+    def update_times(self, row, created, modified):
+        self.created[row] = created
+        self.modified[row] = modified
+        self.size[row] = -1 # File details are stale too
+        self._derived_columns.pop("created_text", None)
+        self._derived_columns.pop("modified_text", None)
+        self._drop_column_text(METADATA_COLUMNS)
+
+    def remove_rows(self, rows):
+        """Drop rows (files gone from disk). Returns a list mapping old rows to new ones (None if removed)."""
+        removed = set(rows)
+        kept_rows = [row for row in range(len(self)) if row not in removed]
+        new_row_of = [None] * len(self)
+        for new_row, row in enumerate(kept_rows):
+            new_row_of[row] = new_row
+        self.directories = [self.directories[row] for row in kept_rows]
+        self.directories_lower = [self.directories_lower[row] for row in kept_rows]
+        self.filenames = [self.filenames[row] for row in kept_rows]
+        self.created = array('d', (self.created[row] for row in kept_rows))
+        self.modified = array('d', (self.modified[row] for row in kept_rows))
+        self.status = bytearray(self.status[row] for row in kept_rows)
+        self.duplicate_group = array('I', (self.duplicate_group[row] for row in kept_rows))
+        self.size = array('q', (self.size[row] for row in kept_rows))
+        self.line_count = array('q', (self.line_count[row] for row in kept_rows))
+        self.shebang = [self.shebang[row] for row in kept_rows]
+        self.imports = [self.imports[row] for row in kept_rows]
+        self.pyc_mtime = array('d', (self.pyc_mtime[row] for row in kept_rows))
+        self._derived_columns = {}
+        self._row_by_key = None
+        return new_row_of
+
+    def _derived_column(self, name, source, transform):
+        values = self._derived_columns.setdefault(name, [])
+        if len(values) < len(source):
+            values.extend(map(transform, islice(source, len(values), None)))
+        return values
+
+    def _column_text_lower(self, column):
+        """Lowercased cell text of a column, cached like the filename column and extended as rows arrive."""
+        return self._derived_column(f"column_{column}_lower", range(len(self)),
+                                    lambda row: self.cell_text(row, column).lower())
+
+    def _drop_column_text(self, columns):
+        for column in columns:
+            self._derived_columns.pop(f"column_{column}_lower", None)
+
+    def row_for(self, directory, filename):
+        if self._row_by_key is None:
+            self._row_by_key = {key: row for row, key in enumerate(zip(self.directories, self.filenames))}
+        return self._row_by_key.get((directory, filename))
+
+    def full_path(self, row):
+        return os.path.join(self.directories[row], self.filenames[row])
+
+    def set_duplicate_groups(self, groups_of_rows):
+        self.duplicate_group = array('I', bytes(4 * len(self)))
+        self.duplicate_group_sizes = {}
+        for group_id, rows in enumerate(groups_of_rows, 1):
+            self.duplicate_group_sizes[group_id] = len(rows)
+            for row in rows:
+                self.duplicate_group[row] = group_id
+        self._drop_column_text((5,))
+
+    def set_metadata(self, row, metadata):
+        self.size[row], self.line_count[row], self.shebang[row], self.imports[row], self.pyc_mtime[row] = metadata
+        self._drop_column_text(METADATA_COLUMNS)
+
+    def rows_missing_metadata(self):
+        return [row for row, size in enumerate(self.size) if size < 0]
+
+    def duplicate_label(self, row):
+        group_id = self.duplicate_group[row]
+        if not group_id:
+            return ""
+        # Zero-padded so the text filter and exports keep groups in order
+        width = len(str(len(self.duplicate_group_sizes)))
+        return f"{group_id:0{width}d} ({self.duplicate_group_sizes[group_id]} copies)"
+
+    def cell_text(self, row, column):
+        if column == 0: return self.directories[row]
+        if column == 1: return self.filenames[row]
+        if column == 2: return format_timestamp(self.created[row])
+        if column == 3: return format_timestamp(self.modified[row])
+        if column == 4: return STATUS_LABELS[self.status[row]]
+        if column == 5: return self.duplicate_label(row)
+        if self.size[row] < 0: return "" # File details not collected
+        if column == 6: return f"{self.size[row] / 1024:,.1f} KB"
+        if column == 7: return str(self.line_count[row])
+        if column == 8: return self.shebang[row]
+        if column == 9: return self.imports[row]
+        return format_timestamp(self.pyc_mtime[row]) if self.pyc_mtime[row] else "None"
+
+    def display_row(self, row):
+        return tuple(self.cell_text(row, column) for column in range(len(COLUMN_LABELS)))
+
+    def filter_column(self, column):
+        """Lowercase text per row for substring filtering."""
+        if column == 0: return self.directories_lower
+        if column == 1: return self._derived_column("filenames_lower", self.filenames, str.lower)
+        if column == 2: return self._derived_column("created_text", self.created, format_timestamp)
+        if column == 3: return self._derived_column("modified_text", self.modified, format_timestamp)
+        if column == 4:
+            labels = [label.lower() for label in STATUS_LABELS]
+            return [labels[code] for code in self.status]
+        return self._column_text_lower(column)
+
+    def sort_column(self, column):
+        if column == 0: return self.directories_lower
+        if column == 1: return self._derived_column("filenames_lower", self.filenames, str.lower)
+        if column == 2: return self.created
+        if column == 3: return self.modified
+        if column == 4: return self.status
+        if column == 5: return self.duplicate_group
+        if column == 6: return self.size
+        if column == 7: return self.line_count
+        if column == 8: return self.shebang
+        if column == 9: return self.imports
+        return self.pyc_mtime
+
+
+class ScanTableModel(QAbstractTableModel):
+    """
+    Table model over a ScanResultStore. Filtering and sorting work like a
+    QSortFilterProxyModel, but on whole columns at once: the model keeps the list of
+    store rows currently shown, in display order, so a keystroke in a filter box is one
+    pass over a precomputed lowercase column rather than a Python call per row.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.store = ScanResultStore()
+        self.visible_rows = []
+        self.filter_terms = {} # column -> lowercase term
+        self.duplicates_only = False
+        self.sort_order = None # (column, Qt.SortOrder)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.visible_rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMN_LABELS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.visible_rows[index.row()]
+        if role == Qt.DisplayRole:
+            return self.store.cell_text(row, index.column())
+        if role == Qt.ForegroundRole and index.column() == 4:
+            return QBrush(STATUS_COLORS[self.store.status[row]])
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return COLUMN_LABELS[section]
+        return str(section + 1)
+
+    def set_store(self, store):
+        self.store = store
+        self.refresh()
+
+    def set_filters(self, filter_terms, duplicates_only):
+        self.filter_terms = filter_terms
+        self.duplicates_only = duplicates_only
+        self.refresh()
+
+    def refresh(self):
+        """Recompute the visible rows after the store, filters or statuses changed."""
+        self.beginResetModel()
+        self.visible_rows = self._filter_rows(range(len(self.store)))
+        self._sort_visible_rows()
+        self.endResetModel()
+
+    def rows_appended(self, first_row):
+        """Store rows from first_row on are new: insert the ones passing the filters."""
+        if self.sort_order is not None:
+            self.refresh() # New rows have to be merged into the sorted order
+            return
+        new_rows = self._filter_rows(range(first_row, len(self.store)))
+        if new_rows:
+            start = len(self.visible_rows)
+            self.beginInsertRows(QModelIndex(), start, start + len(new_rows) - 1)
+            self.visible_rows.extend(new_rows)
+            self.endInsertRows()
+
+    def _filter_rows(self, rows):
+        for column, term in self.filter_terms.items():
+            values = self.store.filter_column(column)
+            rows = [row for row in rows if term in values[row]]
+        if self.duplicates_only:
+            groups = self.store.duplicate_group
+            rows = [row for row in rows if groups[row]]
+        return list(rows)
+
+    def rows_changed(self, columns=(4,)):
+        """Values in columns (statuses by default) changed; refilter/resort only if that depends on them."""
+        if any(column in self.filter_terms for column in columns) or (self.sort_order and self.sort_order[0] in columns):
+            self.refresh()
+        elif self.visible_rows:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self.visible_rows) - 1, len(COLUMN_LABELS) - 1))
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        if column < 0: # No sort column: back to scan order
+            self.sort_order = None
+            self.refresh()
+            return
+        self.sort_order = (column, order)
+        self.layoutAboutToBeChanged.emit()
+        self._sort_visible_rows()
+        self.layoutChanged.emit()
+
+    def _sort_visible_rows(self):
+        if self.sort_order is None:
+            return
+        column, order = self.sort_order
+        keys = self.store.sort_column(column)
+        self.visible_rows.sort(key=keys.__getitem__, reverse=order == Qt.DescendingOrder)
+
+    def store_row(self, view_row):
+        return self.visible_rows[view_row]
+
+
+class ScanWorker(QObject):
+    """Runs FileScanner.scan_directory on a QThread and reports through signals."""
+    batch_ready = Signal(object) # ScanResultStore holding the next batch of files
+    progress = Signal(int, int) # items processed, Python files found
+    diff_ready = Signal(object) # changes since the saved snapshot (see diff_snapshots)
+    snapshot_ready = Signal(object) # snapshot of a completed scan, for watch mode
+    finished = Signal(bool) # True if the scan was cancelled
+
+    def __init__(self, directory, incremental=True):
+        super().__init__()
+        self.directory = directory
+        self.incremental = incremental
+        self.cancel_event = threading.Event()
+
+    def run(self):
+        # A scanner of its own, logging to the thread-safe debug_log_buffer rather than the debug window
+        scanner = FileScanner(debug_logger_func=debug_log_buffer.log)
+        try:
+            previous_snapshot = scanner.load_snapshot(self.directory) if self.incremental else None
+            scanner.scan_directory(self.directory, batch_callback=self.batch_ready.emit,
+                                   progress_callback=self.progress.emit, cancel_event=self.cancel_event,
+                                   previous_snapshot=previous_snapshot)
+            if scanner.snapshot:
+                scanner.save_snapshot(scanner.snapshot)
+                self.snapshot_ready.emit(scanner.snapshot)
+            if scanner.scan_diff is not None:
+                self.diff_ready.emit(scanner.scan_diff)
+        finally:
+            self.finished.emit(self.cancel_event.is_set())
+
+    def cancel(self):
+        self.cancel_event.set()
+
+
+class EnrichmentWorker(QObject):
+    """
+    Collects file details (see FileScanner.extract_file_metadata) for the given store
+    rows on a QThread, ENRICH_BATCH_SIZE files per task in a thread pool, and reports
+    them per batch. The details cache is loaded before and saved after each run.
+    """
+    batch_ready = Signal(object) # [(row, metadata)]
+    finished = Signal(bool) # True if cancelled
+
+    def __init__(self, rows_and_paths):
+        super().__init__()
+        self.rows_and_paths = rows_and_paths
+        self.cancel_event = threading.Event()
+
+    def run(self):
+        scanner = FileScanner(debug_logger_func=debug_log_buffer.log)
+        metadata_cache = scanner.load_metadata_cache()
+        pycache_listings = {}
+        try:
+            batches = [self.rows_and_paths[start:start + ENRICH_BATCH_SIZE]
+                       for start in range(0, len(self.rows_and_paths), ENRICH_BATCH_SIZE)]
+            with ThreadPoolExecutor(max_workers=ENRICH_WORKERS) as pool:
+                futures = [pool.submit(self._extract_batch, scanner, batch, metadata_cache, pycache_listings) for batch in batches]
+                for future in as_completed(futures):
+                    if self.cancel_event.is_set():
+                        for pending in futures:
+                            pending.cancel()
+                        continue
+                    if not future.cancelled():
+                        self.batch_ready.emit(future.result())
+            scanner.save_metadata_cache(metadata_cache)
+        except Exception as e:
+            debug_log_buffer.log(f"Error collecting file details: {e}", "ERROR")
+        finally:
+            self.finished.emit(self.cancel_event.is_set())
+
+    def _extract_batch(self, scanner, batch, metadata_cache, pycache_listings):
+        results = []
+        for row, file_path_str in batch:
+            if self.cancel_event.is_set():
+                break
+            metadata = scanner.extract_file_metadata(file_path_str, metadata_cache, pycache_listings)
+            if metadata:
+                results.append((row, metadata))
+        return results
+
+    def cancel(self):
+        self.cancel_event.set()
+
+
+class _WatchEventHandler:
+    """watchdog event handler: marks directories whose Python files or subdirectories changed."""
+
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def dispatch(self, event):
+        if event.event_type not in ("created", "deleted", "modified", "moved"):
+            return # e.g. opened/closed events
+        for path in (event.src_path, getattr(event, "dest_path", "")):
+            if not path:
+                continue
+            path = os.fsdecode(path)
+            if event.is_directory:
+                # A created/deleted/moved folder changes its parent's listing; "modified"
+                # events on folders only echo changes to their entries
+                if event.event_type != "modified":
+                    self.watcher.mark_dirty(os.path.dirname(path))
+            elif path.lower().endswith((".py", ".pyw")):
+                self.watcher.mark_dirty(os.path.dirname(path))
+
+
+class DirectoryWatcher(QObject):
+    """
+    Keeps a scan snapshot current in watch mode. With watchdog installed, filesystem
+    notifications mark directories dirty and only those are re-listed; otherwise the
+    snapshot is re-checked by directory mtimes every WATCH_POLL_INTERVAL_MS. Bursts of
+    events become one refresh per WATCH_COALESCE_MS, and refreshes run on a background
+    thread one at a time.
+    """
+    changes_ready = Signal(object) # see snapshot_changes
+    _changes_pending = Signal() # emitted from the watchdog thread
+    _refresh_finished = Signal(object)
+
+    def __init__(self, snapshot, parent=None):
+        super().__init__(parent)
+        self.snapshot = snapshot
+        self.root = snapshot["root"]
+        self.scanner = FileScanner(debug_logger_func=self._scanner_log)
+        self._dirty_directories = set()
+        self._dirty_lock = threading.Lock()
+        self._observer = None
+        self._refresh_thread = None
+        self._refresh_again = False
+        self._coalesce_timer = QTimer(self)
+        self._coalesce_timer.setSingleShot(True)
+        self._coalesce_timer.setInterval(WATCH_COALESCE_MS)
+        self._coalesce_timer.timeout.connect(self._start_refresh)
+        self._poll_timer = QTimer(self)
+        self._poll_timer.setInterval(WATCH_POLL_INTERVAL_MS)
+        self._poll_timer.timeout.connect(self._schedule_refresh)
+        self._changes_pending.connect(self._schedule_refresh)
+        self._refresh_finished.connect(self._on_refresh_finished)
+
+    def _scanner_log(self, message, level="INFO"):
+        if level not in ("DEBUG", "INFO"): # Every poll would otherwise log a full scan
+            debug_log_buffer.log(message, level)
+
+    def start(self):
+        """Start watching; returns "notifications" or "polling"."""
+        if WATCHDOG_AVAILABLE:
+            try:
+                self._observer = Observer()
+                self._observer.schedule(_WatchEventHandler(self), self.root, recursive=True)
+                self._observer.start()
+                return "notifications"
+            except Exception as e: # e.g. the inotify watch limit is reached
+                debug_log_buffer.log(f"Filesystem notifications unavailable for {self.root} ({e}); polling instead.", "WARNING")
+                self._observer = None
+        self._poll_timer.start()
+        return "polling"
+
+    def stop(self):
+        """Stop watching, wait for a running refresh and save the updated snapshot."""
+        if self._observer:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        self._poll_timer.stop()
+        self._coalesce_timer.stop()
+        if self._refresh_thread:
+            self._refresh_thread.join()
+            self._refresh_thread = None
+        self.scanner.save_snapshot(self.snapshot)
+
+    def mark_dirty(self, directory_str):
+        with self._dirty_lock:
+            was_clean = not self._dirty_directories
+            self._dirty_directories.add(directory_str)
+        if was_clean: # One wake-up per burst, not per event
+            self._changes_pending.emit()
+
+    def _schedule_refresh(self):
+        if self._refresh_thread is not None:
+            self._refresh_again = True
+        elif not self._coalesce_timer.isActive():
+            self._coalesce_timer.start()
+
+    def _start_refresh(self):
+        dirty_directories = None # None: poll the whole snapshot
+        if self._observer:
+            with self._dirty_lock:
+                dirty_directories, self._dirty_directories = self._dirty_directories, set()
+            if not dirty_directories:
+                return
+        self._refresh_thread = threading.Thread(target=self._refresh, args=(dirty_directories,), daemon=True)
+        self._refresh_thread.start()
+
+    def _refresh(self, dirty_directories):
+        changes = None
+        try:
+            if dirty_directories is None:
+                self.scanner.scan_directory(self.root, previous_snapshot=self.snapshot)
+                if self.scanner.snapshot:
+                    self.snapshot = self.scanner.snapshot
+                    changes = snapshot_changes(self.snapshot, self.scanner.scan_diff)
+                self.scanner.scanned_files = ScanResultStore() # Only the snapshot is kept
+            else:
+                changes = snapshot_changes(self.snapshot, self.scanner.refresh_snapshot_directories(self.snapshot, dirty_directories))
+        except Exception as e:
+            debug_log_buffer.log(f"Error refreshing watched directory {self.root}: {e}", "ERROR")
+        self._refresh_finished.emit(changes)
+
+    def _on_refresh_finished(self, changes):
+        if self._refresh_thread:
+            self._refresh_thread.join()
+            self._refresh_thread = None
+        if changes and any(changes.values()):
+            self.changes_ready.emit(changes)
+        if self._refresh_again:
+            self._refresh_again = False
+            self._schedule_refresh()
+
+
+class DeletionWorker(QObject):
+    """
+    Sends queued files to the trash on a QThread. Files are grouped by directory and
+    trashed in batches from a thread pool; results are reported per batch, written to
+    the undo journal, and emptied directories are trashed as their last file goes.
+    """
+    batch_done = Signal(object) # [(directory, file_name, ok)]
+    finished = Signal(bool) # True if cancelled before every batch ran
+
+    def __init__(self, items, directory_index):
+        super().__init__()
+        self.items = list(items)
+        self.directory_index = directory_index # Only used from this worker's thread while it runs
+        self.cancel_event = threading.Event()
+
+    def run(self):
+        scanner = FileScanner(debug_logger_func=debug_log_buffer.log)
+        names_by_directory = defaultdict(list)
+        for dir_path, file_name in self.items:
+            names_by_directory[dir_path].append(file_name)
+        batches = [(dir_path, names[start:start + TRASH_BATCH_SIZE])
+                   for dir_path, names in names_by_directory.items()
+                   for start in range(0, len(names), TRASH_BATCH_SIZE)]
+        cancelled = False
+        try:
+            os.makedirs(APP_DATA_DIR, exist_ok=True)
+            with open(DELETION_JOURNAL_FILE, "a", encoding="utf-8") as journal, \
+                    ThreadPoolExecutor(max_workers=TRASH_WORKERS) as pool:
+                futures = {pool.submit(scanner.trash_files, dir_path, names): dir_path for dir_path, names in batches}
+                for future in as_completed(futures):
+                    if self.cancel_event.is_set() and not cancelled:
+                        cancelled = True
+                        for pending in futures:
+                            pending.cancel()
+                    if future.cancelled():
+                        continue
+                    dir_path = futures[future]
+                    results = future.result()
+                    trashed_at = datetime.datetime.now().isoformat(timespec="seconds")
+                    for file_name, ok, trash_location in results:
+                        if ok:
+                            journal.write(json.dumps({"original": os.path.join(dir_path, file_name),
+                                                      "trash_location": trash_location, "trashed_at": trashed_at}) + "\n")
+                            self.directory_index.remove(dir_path)
+                    journal.flush()
+                    self.batch_done.emit([(dir_path, file_name, ok) for file_name, ok, _ in results])
+                    if any(ok for _, ok, _ in results):
+                        # Attempt to delete the parent directory once it no longer holds tracked files
+                        with _freedesktop_trash_lock:
+                            scanner.try_delete_empty_dir_to_trash(dir_path, self.directory_index)
+        except Exception as e:
+            debug_log_buffer.log(f"Deletion run stopped: {e}", "CRITICAL")
+        finally:
+            self.finished.emit(cancelled)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+
+class DuplicateWorker(QObject):
+    """
+    Runs FileScanner.find_duplicate_files on a QThread over a list of paths taken from
+    the store when the search started, reporting each stage's progress.
+    """
+    progress = Signal(str, int, int) # stage, files done, files in stage
+    finished = Signal(object, bool, str) # groups of paths (None unless completed), cancelled, error message
+
+    def __init__(self, paths):
+        super().__init__()
+        self.paths = paths
+        self.cancel_event = threading.Event()
+
+    def run(self):
+        groups, cancelled, error_message = None, False, ""
+        try:
+            scanner = FileScanner(debug_logger_func=debug_log_buffer.log)
+            groups = scanner.find_duplicate_files(self.paths, self.progress.emit, self.cancel_event)
+        except DuplicateSearchCancelled:
+            cancelled = True
+        except Exception as e:
+            error_message = str(e)
+        self.finished.emit(groups, cancelled, error_message)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+class ExportWorker(QObject):
+    """
+    Writes the scanned files list on a QThread. Rows are produced one at a time from the
+    store and streamed to the file, so no format holds the whole list in memory.
+    """
+    progress = Signal(int) # rows written
+    finished = Signal(bool, str) # cancelled, error message ("" on success)
+
+    def __init__(self, store, file_format, file_path):
+        super().__init__()
+        self.store = store
+        self.row_count = len(store) # Rows appended later (e.g. a new scan) are not exported
+        self.file_format = file_format
+        self.file_path = file_path
+        self.cancel_event = threading.Event()
+
+    def run(self):
+        cancelled, error_message = False, ""
+        try:
+            getattr(self, f"export_to_{self.file_format}")(self.file_path, self._rows())
+        except ExportCancelled:
+            cancelled = True
+        except Exception as e:
+            error_message = str(e)
+        if cancelled or error_message:
+            try:
+                os.remove(self.file_path) # Don't leave a truncated export behind
+            except OSError:
+                pass
+        self.finished.emit(cancelled, error_message)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def _rows(self):
+        for row in range(self.row_count):
+            if row % EXPORT_PROGRESS_EVERY == 0:
+                if self.cancel_event.is_set():
+                    raise ExportCancelled()
+                self.progress.emit(row)
+            yield self.store.display_row(row)[:len(EXPORT_HEADERS)]
+        self.progress.emit(self.row_count)
+
+    def export_to_txt(self, file_path, items_to_export):
+        """Export data to a text file."""
+        with open(file_path, 'w', encoding='utf-8', buffering=EXPORT_BUFFER_BYTES) as f:
+            f.write(f"Scanned Files List - {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+            f.write("=" * 40 + "\n")
+            f.write("Files scanned:\n\n")
+            for directory, filename, created, modified, status in items_to_export:
+                f.write(f"Directory: {directory}\nFilename:  {filename}\n"
+                        f"Created: {created}\nModified: {modified}\n"
+                        f"Status: {status}\n---\n")
+
+    def export_to_csv(self, file_path, items_to_export):
+        """Export data to a CSV file."""
+        import csv
+        with open(file_path, 'w', newline='', encoding='utf-8', buffering=EXPORT_BUFFER_BYTES) as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPORT_HEADERS)
+            writer.writerows(items_to_export)
+
+    def export_to_jsonl(self, file_path, items_to_export):
+        """Export data as one JSON object per line."""
+        keys = [header.lower() for header in EXPORT_HEADERS]
+        with open(file_path, 'w', encoding='utf-8', buffering=EXPORT_BUFFER_BYTES) as f:
+            for row_values in items_to_export:
+                f.write(json.dumps(dict(zip(keys, row_values))) + "\n")
+
+    def export_to_xlsx(self, file_path, items_to_export):
+        """Export data to an Excel file using a write-only (streaming) workbook."""
+        try:
+            import openpyxl
+            from openpyxl.cell import WriteOnlyCell
+            from openpyxl.styles import Font
+        except ImportError:
+            raise Exception("Excel export requires the openpyxl module. Please install it with 'pip install openpyxl'.")
+
+        wb = openpyxl.Workbook(write_only=True)
+        bold_font = Font(bold=True)
+        column_widths = [80, 40, 21, 21, 22] # Fixed: write-only sheets can't be measured after the fact
+
+        def add_sheet(sheet_number):
+            ws = wb.create_sheet("Scanned Files" if sheet_number == 1 else f"Scanned Files ({sheet_number})")
+            for col_num, width in enumerate(column_widths, 1):
+                ws.column_dimensions[openpyxl.utils.get_column_letter(col_num)].width = width
+            header_cells = []
+            for header in EXPORT_HEADERS:
+                cell = WriteOnlyCell(ws, value=header)
+                cell.font = bold_font
+                header_cells.append(cell)
+            ws.append(header_cells)
+            return ws
+
+        sheet_number, rows_in_sheet = 1, 0
+        ws = add_sheet(sheet_number)
+        for row_values in items_to_export:
+            if rows_in_sheet == EXPORT_XLSX_MAX_ROWS:
+                sheet_number, rows_in_sheet = sheet_number + 1, 0
+                ws = add_sheet(sheet_number)
+            ws.append(row_values)
+            rows_in_sheet += 1
+        wb.save(file_path)
+
+    def export_to_parquet(self, file_path, items_to_export):
+        """Export data to a Parquet file, one row group at a time."""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise Exception("Parquet export requires the pyarrow module. Please install it with 'pip install pyarrow'.")
+
+        schema = pa.schema([(header.lower(), pa.string()) for header in EXPORT_HEADERS])
+        with pq.ParquetWriter(file_path, schema) as writer:
+            while True:
+                chunk = list(islice(items_to_export, EXPORT_PARQUET_ROW_GROUP))
+                if not chunk:
+                    break
+                columns = [pa.array(values, type=pa.string()) for values in zip(*chunk)]
+                writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+
+    def export_to_pdf(self, file_path, items_to_export):
+        """Export data to a PDF file, drawing one page of the table at a time."""
+        try:
+            from reportlab.lib import colors
+            from reportlab.lib.pagesizes import letter, landscape
+            from reportlab.pdfbase.pdfmetrics import stringWidth
+            from reportlab.pdfgen import canvas
+        except ImportError:
+            raise Exception("PDF export requires the reportlab module. Please install it with 'pip install reportlab'.")
+
+        page_width, page_height = landscape(letter)
+        margin, row_height, font_size = 36, 14, 7
+        column_widths = [300, 150, 85, 85, 100]
+        table_width = sum(column_widths)
+
+        def fit(text, width, font_name):
+            # Long paths keep their end, which is the part that tells files apart
+            if stringWidth(text, font_name, font_size) <= width:
+                return text
+            while text and stringWidth("..." + text, font_name, font_size) > width:
+                text = text[max(1, len(text) // 20):]
+            return "..." + text
+
+        def draw_row(y, values, font_name, fill_color, text_color):
+            pdf.setFillColor(fill_color)
+            pdf.rect(margin, y, table_width, row_height, fill=1, stroke=1)
+            pdf.setFillColor(text_color)
+            pdf.setFont(font_name, font_size)
+            x = margin
+            for value, width in zip(values, column_widths):
+                pdf.drawString(x + 3, y + 4, fit(str(value), width - 6, font_name))
+                pdf.line(x, y, x, y + row_height)
+                x += width
+
+        pdf = canvas.Canvas(file_path, pagesize=(page_width, page_height))
+        pdf.setTitle("Scanned Files List")
+        pdf.setStrokeColor(colors.black)
+        title = f"Scanned Files List - {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        y = None
+        for row_values in items_to_export:
+            if y is None or y < margin:
+                if y is not None:
+                    pdf.showPage()
+                y = page_height - margin
+                if pdf.getPageNumber() == 1:
+                    pdf.setFont("Helvetica-Bold", 16)
+                    pdf.setFillColor(colors.black)
+                    pdf.drawString(margin, y - 16, title)
+                    y -= 32
+                y -= row_height
+                draw_row(y, EXPORT_HEADERS, "Helvetica-Bold", colors.grey, colors.whitesmoke)
+                y -= row_height
+            draw_row(y, row_values, "Helvetica", colors.beige, colors.black)
+            y -= row_height
+        if y is None: # No rows: still write the title and header
+            pdf.setFont("Helvetica-Bold", 16)
+            pdf.drawString(margin, page_height - margin - 16, title)
+        pdf.save()
+
+
 class ReviewDialog(QDialog):
     """Dialog for reviewing files before adding them to the deletion queue."""
 
@@ -452,8 +1967,23 @@ class FileScannerApp(QWidget):
     def __init__(self):
         super().__init__()
         self.scanner = None 
-        self.current_scanned_files_data = [] 
+        self.table_model = ScanTableModel(self)
         self.files_queued_for_deletion = set()
+        self.duplicate_groups = [] # (size, [store rows]) from the last duplicate search
+        self.scan_thread = QThread(self) # Reused for every scan
+        self.scan_worker = None
+        self.export_thread = QThread(self) # Reused for every export
+        self.export_worker = None
+        self.duplicate_thread = QThread(self) # Reused for every duplicate search
+        self.duplicate_worker = None
+        self.deletion_thread = QThread(self)
+        self.deletion_worker = None
+        self.scan_snapshot = None # Snapshot of the last completed scan, kept current in watch mode
+        self.directory_watcher = None
+        self.pending_watch_changes = [] # Changes that arrived while a background task was running
+        self.enrichment_thread = QThread(self)
+        self.enrichment_worker = None
+        self.last_scan_diff = None
         self.is_exit_after_deletion = False  # Flag to track if we're exiting after deletion
         
         self.debug_window = DebugWindow(self) 
@@ -469,10 +1999,47 @@ class FileScannerApp(QWidget):
     def setup_ui(self):
         main_layout = QVBoxLayout(self)
         top_controls_layout = QHBoxLayout()
-        scan_button = QPushButton("Select Directory & Scan")
-        scan_button.setIcon(self.style().standardIcon(QStyle.SP_DirOpenIcon))
-        scan_button.clicked.connect(self.select_and_scan_directory)
-        top_controls_layout.addWidget(scan_button)
+        self.scan_button = QPushButton("Select Directory & Scan")
+        self.scan_button.setIcon(self.style().standardIcon(QStyle.SP_DirOpenIcon))
+        self.scan_button.clicked.connect(self.select_and_scan_directory)
+        top_controls_layout.addWidget(self.scan_button)
+
+        self.cancel_scan_button = QPushButton("Cancel Scan")
+        self.cancel_scan_button.setIcon(self.style().standardIcon(QStyle.SP_BrowserStop))
+        self.cancel_scan_button.clicked.connect(self.cancel_scan)
+        self.cancel_scan_button.hide()
+        top_controls_layout.addWidget(self.cancel_scan_button)
+
+        self.incremental_scan_checkbox = QCheckBox("Incremental rescan")
+        self.incremental_scan_checkbox.setChecked(True)
+        self.incremental_scan_checkbox.setToolTip("Reuse the saved snapshot of this directory and only re-list folders that changed since the last scan.")
+        top_controls_layout.addWidget(self.incremental_scan_checkbox)
+
+        self.details_checkbox = QCheckBox("Collect file details")
+        self.details_checkbox.setToolTip("Add size, line count, shebang, imports and last .pyc compile time columns, collected in the background.")
+        self.details_checkbox.toggled.connect(self.toggle_file_details)
+        top_controls_layout.addWidget(self.details_checkbox)
+
+        self.watch_checkbox = QCheckBox("Watch for changes")
+        self.watch_checkbox.setToolTip("Keep the table up to date as Python files are created, modified or removed under the scanned directory.")
+        self.watch_checkbox.toggled.connect(self.toggle_watch_mode)
+        top_controls_layout.addWidget(self.watch_checkbox)
+
+        self.scan_progress_label = QLabel("")
+        top_controls_layout.addWidget(self.scan_progress_label)
+
+        self.find_duplicates_button = QPushButton("Find Duplicates")
+        self.find_duplicates_button.setIcon(self.style().standardIcon(QStyle.SP_FileDialogDetailedView))
+        self.find_duplicates_button.clicked.connect(self.find_duplicates)
+        top_controls_layout.addWidget(self.find_duplicates_button)
+
+        self.queue_duplicates_button = QPushButton("Queue Duplicates (Keep Oldest)...")
+        self.queue_duplicates_button.clicked.connect(self.queue_duplicate_copies_for_deletion)
+        top_controls_layout.addWidget(self.queue_duplicates_button)
+
+        self.duplicates_only_checkbox = QCheckBox("Show duplicates only")
+        self.duplicates_only_checkbox.toggled.connect(self.filter_table_view)
+        top_controls_layout.addWidget(self.duplicates_only_checkbox)
 
         self.debug_button = QPushButton("Toggle Debug Window")
         self.debug_button.setCheckable(True)
@@ -487,22 +2054,22 @@ class FileScannerApp(QWidget):
         main_layout.addWidget(search_header_label)
         search_layout = QHBoxLayout()
         self.search_boxes = {} 
-        column_labels = ["Directory", "Filename", "Created", "Modified", "Status"]
-        for idx, label_text in enumerate(column_labels):
+        for idx, label_text in enumerate(COLUMN_LABELS):
             search_box = QLineEdit()
             search_box.setPlaceholderText(f"Filter by {label_text}...")
             search_box.textChanged.connect(self.filter_table_view)
-            self.search_boxes[label_text.lower()] = search_box 
+            self.search_boxes[idx] = search_box # Keyed by column index
             search_layout.addWidget(search_box)
         main_layout.addLayout(search_layout)
 
-        self.table = QTableWidget(0, len(column_labels))
-        self.table.setHorizontalHeaderLabels(column_labels)
+        self.table = QTableView()
+        self.table.setModel(self.table_model)
         self.table.setSortingEnabled(True)
+        self.table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder) # Keep scan order until a header is clicked
         self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.table.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.table.setEditTriggers(QAbstractItemView.NoEditTriggers) 
-        self.table.cellDoubleClicked.connect(self.open_file_directory_action)
+        self.table.doubleClicked.connect(self.open_file_directory_action)
         
         # Make columns user-adjustable
         header = self.table.horizontalHeader()
@@ -514,6 +2081,11 @@ class FileScannerApp(QWidget):
         header.resizeSection(2, 150)             # Created
         header.resizeSection(3, 150)             # Modified
         header.resizeSection(4, 100)             # Status
+        header.resizeSection(5, 130)             # Duplicate Group
+        header.resizeSection(9, 250)             # Imports
+        for column in METADATA_COLUMNS: # Shown once "Collect file details" is checked
+            self.table.setColumnHidden(column, True)
+            self.search_boxes[column].hide()
         
         self.table.setAlternatingRowColors(True) 
         main_layout.addWidget(self.table)
@@ -592,148 +2164,252 @@ class FileScannerApp(QWidget):
             self.debug_window.log_message("Directory selection cancelled by user.", "INFO")
             return
         self.debug_window.log_message(f"Directory selected for scan: {directory}", "INFO")
-        self.table.setRowCount(0) 
-        self.table.setCurrentItem(None) 
-        self.current_scanned_files_data = [] 
+        self.stop_watching()
+        self.stop_enrichment() # Its rows belong to the old store
+        self.scan_snapshot = None
+        self.pending_watch_changes = []
+        self.table_model.set_store(ScanResultStore())
+        self.table.clearSelection()
+        self.duplicate_groups = []
         self.files_queued_for_deletion.clear() 
         self.update_queue_counter() # Update counter after clearing queue
 
-        QApplication.setOverrideCursor(Qt.WaitCursor)
         self.debug_window.log_message("Starting file scan operation...", "INFO")
-        found_files_data = self.scanner.scan_directory(directory)
-        # Store the original data. The 'status' in this list will be updated if items are queued.
-        self.current_scanned_files_data = [dict(item) for item in found_files_data] # Make copies
-        
-        self.debug_window.log_message(f"Scan finished. Populating table with {len(found_files_data)} files.", "INFO")
-        self.populate_table_view() # Will use self.current_scanned_files_data
-        QApplication.restoreOverrideCursor()
-        self.debug_window.log_message("Table population complete. Cursor restored.", "INFO")
-        if not found_files_data:
-            QMessageBox.information(self, "Scan Complete", "No Python files (.py, .pyw) found in the selected directory or its subdirectories.")
+        self.scan_started_at = time.monotonic()
+        self.last_scan_diff = None
+        self.scan_worker = ScanWorker(directory, incremental=self.incremental_scan_checkbox.isChecked())
+        self.scan_worker.moveToThread(self.scan_thread)
+        self.scan_thread.started.connect(self.scan_worker.run)
+        self.scan_worker.batch_ready.connect(self.on_scan_batch)
+        self.scan_worker.progress.connect(self.on_scan_progress)
+        self.scan_worker.diff_ready.connect(self.on_scan_diff)
+        self.scan_worker.snapshot_ready.connect(self.on_scan_snapshot)
+        self.scan_worker.finished.connect(self.on_scan_finished)
+        self.set_scan_controls_running(True)
+        self.scan_thread.start()
+
+    def set_scan_controls_running(self, running):
+        """Disable actions that need a complete scan while one is in progress."""
+        for button in (self.scan_button, self.find_duplicates_button, self.queue_duplicates_button,
+                       self.execute_delete_button, self.export_button):
+            button.setEnabled(not running)
+        self.cancel_scan_button.setVisible(running)
+        self.cancel_scan_button.setEnabled(running)
+        if running:
+            self.scan_progress_label.setText("Scanning...")
         else:
-            QMessageBox.information(self, "Scan Complete", f"Found {len(found_files_data)} Python files.")
-
-    def populate_table_view(self): # No longer takes files_data_list as arg
-        """Populates the main table using self.current_scanned_files_data."""
-        self.table.setRowCount(0) 
-        if not self.current_scanned_files_data:
-            self.debug_window.log_message("No files data to populate in table.", "WARNING")
-            self.table.setCurrentItem(None) 
-            return
-
-        self.table.setSortingEnabled(False) 
-        self.table.setRowCount(len(self.current_scanned_files_data))
-        for row_idx, file_entry in enumerate(self.current_scanned_files_data):
-            try:
-                dir_val = file_entry.get("directory", "N/A")
-                file_val = file_entry.get("filename", "N/A")
-                created_val = file_entry.get("created", "N/A")
-                modified_val = file_entry.get("modified", "N/A")
-                
-                # Determine status based on whether it's in the deletion queue
-                current_status = "File Found"
-                if (dir_val, file_val) in self.files_queued_for_deletion:
-                    current_status = "Queued for Deletion"
-                else: # Ensure the status in the data reflects "File Found" if not queued
-                    file_entry["status"] = "File Found"
-
-
-                self.table.setItem(row_idx, 0, QTableWidgetItem(dir_val))
-                self.table.setItem(row_idx, 1, QTableWidgetItem(file_val))
-                self.table.setItem(row_idx, 2, QTableWidgetItem(created_val))
-                self.table.setItem(row_idx, 3, QTableWidgetItem(modified_val))
-                
-                status_item = QTableWidgetItem(current_status)
-                if current_status == "File Found": status_item.setForeground(Qt.darkGreen) 
-                elif current_status == "Queued for Deletion": status_item.setForeground(Qt.red)
-                self.table.setItem(row_idx, 4, status_item)
-            except Exception as e:
-                self.debug_window.log_message(f"Error populating table row {row_idx} with data {file_entry}: {e}", "ERROR")
-        
-        self.table.setSortingEnabled(True) 
-        self.table.setCurrentItem(None) 
-        self.debug_window.log_message(f"Table populated/refreshed with {self.table.rowCount()} rows.", "DEBUG")
-
-    def filter_table_view(self):
-        # This method now implicitly uses self.current_scanned_files_data for filtering
-        # and then calls populate_table_view to show filtered results,
-        # or directly manipulates row visibility based on the full self.current_scanned_files_data.
-        # For simplicity with status, we'll repopulate based on a filtered list.
-
-        search_terms = {key: box.text().lower() for key, box in self.search_boxes.items()}
-        active_search_terms = {k: v for k, v in search_terms.items() if v}
+            pending_watch_changes, self.pending_watch_changes = self.pending_watch_changes, []
+            for changes in pending_watch_changes:
+                self.apply_watch_changes(changes)
+
+    def on_scan_batch(self, batch_store):
+        store = self.table_model.store
+        first_new_row = len(store)
+        store.extend(batch_store)
+        self.table_model.rows_appended(first_new_row)
+
+    def on_scan_progress(self, items_processed, python_files_found):
+        self.scan_progress_label.setText(f"Scanned {items_processed:,} files, found {python_files_found:,} Python files...")
+
+    def cancel_scan(self):
+        if self.scan_worker:
+            self.debug_window.log_message("Scan cancellation requested.", "INFO")
+            self.cancel_scan_button.setEnabled(False)
+            self.scan_progress_label.setText("Cancelling scan...")
+            self.scan_worker.cancel()
+
+    def toggle_file_details(self, checked):
+        for column in METADATA_COLUMNS:
+            self.table.setColumnHidden(column, not checked)
+            self.search_boxes[column].setVisible(checked)
+        if checked:
+            self.start_enrichment()
+        else:
+            self.cancel_enrichment()
 
-        if not active_search_terms: # If no filters, show all
-            self.populate_table_view() # Uses the full current_scanned_files_data
+    def start_enrichment(self):
+        """Collect file details for every row that doesn't have them yet."""
+        if self.enrichment_worker or self.scan_worker or not self.details_checkbox.isChecked():
             return
+        store = self.table_model.store
+        rows = store.rows_missing_metadata()
+        if not rows:
+            return
+        self.enrichment_worker = EnrichmentWorker([(row, store.full_path(row)) for row in rows])
+        self.enrichment_worker.moveToThread(self.enrichment_thread)
+        self.enrichment_thread.started.connect(self.enrichment_worker.run)
+        self.enrichment_worker.batch_ready.connect(self.on_enrichment_batch)
+        self.enrichment_worker.finished.connect(self.on_enrichment_finished)
+        self.enrichment_total, self.enrichment_done = len(rows), 0
+        self.debug_window.log_message(f"Collecting file details for {len(rows)} files.", "INFO")
+        self.enrichment_thread.start()
+
+    def cancel_enrichment(self):
+        if self.enrichment_worker:
+            self.enrichment_worker.cancel()
+
+    def stop_enrichment(self):
+        """Cancel the details worker and tear it down now; batches it already queued are dropped."""
+        worker = self.enrichment_worker
+        if not worker:
+            return
+        worker.cancel()
+        worker.batch_ready.disconnect(self.on_enrichment_batch)
+        worker.finished.disconnect(self.on_enrichment_finished)
+        self.enrichment_thread.quit()
+        self.enrichment_thread.wait()
+        self.enrichment_thread.started.disconnect(worker.run)
+        worker.deleteLater()
+        self.enrichment_worker = None
+
+    def on_enrichment_batch(self, results):
+        if self.sender() is None or self.sender() is not self.enrichment_worker:
+            return # Queued by a worker that was stopped; its row numbers are for a replaced store
+        store = self.table_model.store
+        for row, metadata in results:
+            store.set_metadata(row, metadata)
+        self.enrichment_done += len(results)
+        self.table_model.rows_changed(METADATA_COLUMNS)
+        self.scan_progress_label.setText(f"Collecting file details: {self.enrichment_done:,}/{self.enrichment_total:,}")
+
+    def on_enrichment_finished(self, cancelled):
+        if self.sender() is None or self.sender() is not self.enrichment_worker:
+            return
+        self.enrichment_thread.quit()
+        self.enrichment_thread.wait()
+        self.enrichment_thread.started.disconnect(self.enrichment_worker.run)
+        self.enrichment_worker.deleteLater()
+        self.enrichment_worker = None
+        self.scan_progress_label.setText(f"File details {'cancelled' if cancelled else 'collected'} for {self.enrichment_done:,} files")
+        self.debug_window.log_message(f"File details {'cancelled' if cancelled else 'complete'}: {self.enrichment_done} files.", "INFO")
+        pending_watch_changes, self.pending_watch_changes = self.pending_watch_changes, []
+        for changes in pending_watch_changes:
+            self.apply_watch_changes(changes)
+        if not cancelled:
+            self.start_enrichment() # Rows added or modified by watch mode meanwhile
+
+    def on_scan_snapshot(self, snapshot):
+        self.scan_snapshot = snapshot
+
+    def toggle_watch_mode(self, checked):
+        if checked:
+            self.start_watching()
+        else:
+            self.stop_watching()
+            self.scan_progress_label.setText("")
+
+    def start_watching(self):
+        if self.directory_watcher or not self.scan_snapshot or self.scan_worker:
+            return # Started once a scan completes
+        self.directory_watcher = DirectoryWatcher(self.scan_snapshot, self)
+        self.directory_watcher.changes_ready.connect(self.apply_watch_changes)
+        mode = self.directory_watcher.start()
+        self.scan_progress_label.setText(f"Watching for changes ({mode})")
+        self.debug_window.log_message(f"Watching {self.scan_snapshot['root']} for changes using {mode}.", "INFO")
+
+    def stop_watching(self):
+        if self.directory_watcher:
+            self.directory_watcher.stop()
+            self.directory_watcher.deleteLater()
+            self.directory_watcher = None
+            self.debug_window.log_message("Stopped watching for changes.", "INFO")
+
+    def apply_watch_changes(self, changes):
+        """Apply added/removed/modified files reported by the directory watcher to the table."""
+        if self.scan_worker or self.export_worker or self.deletion_worker or self.enrichment_worker or self.duplicate_worker:
+            self.pending_watch_changes.append(changes) # Rows must not move under a running task
+            return
+        store = self.table_model.store
+        modified_rows = set()
+        for dir_path, file_name, created, modified in changes["modified"]:
+            row = store.row_for(dir_path, file_name)
+            if row is not None:
+                store.update_times(row, created, modified)
+                modified_rows.add(row)
+        removed_rows = []
+        for dir_path, file_name in changes["removed"]:
+            row = store.row_for(dir_path, file_name)
+            if row is not None:
+                removed_rows.append(row)
+            self.files_queued_for_deletion.discard((dir_path, file_name))
+
+        if removed_rows or modified_rows:
+            new_row_of = store.remove_rows(removed_rows) if removed_rows else list(range(len(store)))
+            # Changed files are no longer known to be identical to the rest of their group
+            duplicate_groups = []
+            for size, rows in self.duplicate_groups:
+                rows = [new_row_of[row] for row in rows if row not in modified_rows and new_row_of[row] is not None]
+                if len(rows) > 1:
+                    duplicate_groups.append((size, rows))
+            self.duplicate_groups = duplicate_groups
+            store.set_duplicate_groups([rows for _, rows in duplicate_groups])
+
+        first_new_row = len(store)
+        for dir_path, file_name, created, modified in changes["added"]:
+            if store.row_for(dir_path, file_name) is None:
+                store.append(dir_path, file_name, created, modified)
+        if removed_rows or modified_rows:
+            self.table_model.refresh()
+        else:
+            self.table_model.rows_appended(first_new_row)
+        self.update_queue_counter()
+        self.start_enrichment()
+
+        summary = f"{len(changes['added'])} added, {len(changes['removed'])} removed, {len(changes['modified'])} modified"
+        self.scan_progress_label.setText(f"{len(store):,} Python files - last change {datetime.datetime.now().strftime('%H:%M:%S')}: {summary}")
+        self.debug_window.log_message(f"Watch mode update: {summary}.", "INFO")
+
+    def on_scan_diff(self, scan_diff):
+        self.last_scan_diff = scan_diff
+        for change in ("added", "removed", "modified"):
+            paths = scan_diff[change]
+            for path in paths[:100]:
+                self.debug_window.log_message(f"Since last scan, {change}: {path}", "INFO")
+            if len(paths) > 100:
+                self.debug_window.log_message(f"... and {len(paths) - 100} more {change} files.", "INFO")
+
+    def on_scan_finished(self, cancelled):
+        self.scan_thread.quit()
+        self.scan_thread.wait()
+        self.scan_thread.started.disconnect(self.scan_worker.run)
+        self.scan_worker.deleteLater()
+        self.scan_worker = None
+        self.set_scan_controls_running(False)
+        found_count = len(self.table_model.store)
+        elapsed = time.monotonic() - self.scan_started_at
+        self.scan_progress_label.setText(f"{found_count:,} Python files ({elapsed:.1f}s){' - cancelled' if cancelled else ''}")
+        self.debug_window.log_message(f"Scan finished{' (cancelled)' if cancelled else ''}. {found_count} files in table.", "INFO")
+        if cancelled:
+            QMessageBox.information(self, "Scan Cancelled", f"Scan cancelled. {found_count} Python files were found before stopping.")
+        elif not found_count:
+            QMessageBox.information(self, "Scan Complete", "No Python files (.py, .pyw) found in the selected directory or its subdirectories.")
+        else:
+            message = f"Found {found_count} Python files."
+            if self.last_scan_diff is not None:
+                message += (f"\n\nChanges since the last scan: {len(self.last_scan_diff['added'])} added, "
+                            f"{len(self.last_scan_diff['removed'])} removed, {len(self.last_scan_diff['modified'])} modified.")
+            QMessageBox.information(self, "Scan Complete", message)
+        if not cancelled and self.watch_checkbox.isChecked():
+            self.start_watching()
+        self.start_enrichment()
+
+    def populate_table_view(self):
+        """Refresh the table from the scan store (statuses, duplicate groups, filters)."""
+        self.table_model.refresh()
+        self.table.clearSelection()
+        self.debug_window.log_message(f"Table populated/refreshed with {self.table_model.rowCount()} rows.", "DEBUG")
 
-        filtered_data = []
-        column_map_keys = {"directory": "directory", "filename": "filename", "created": "created", "modified": "modified", "status": "status"}
-
-        for file_entry in self.current_scanned_files_data:
-            match = True
-            for search_key_lower, term in active_search_terms.items():
-                data_key = column_map_keys.get(search_key_lower)
-                if not data_key: continue
-
-                # Special handling for status if it's derived (like from files_queued_for_deletion)
-                value_to_check = ""
-                if data_key == "status":
-                    value_to_check = "Queued for Deletion" if (file_entry.get("directory"), file_entry.get("filename")) in self.files_queued_for_deletion else "File Found"
-                else:
-                    value_to_check = file_entry.get(data_key, "").lower()
-                
-                if term not in value_to_check:
-                    match = False
-                    break
-            if match:
-                filtered_data.append(file_entry)
-        
-        # Temporarily populate with filtered data, but don't overwrite self.current_scanned_files_data
-        # This approach for filtering by repopulating is a bit heavy.
-        # A better way is to hide/show rows from the full table.
-        # Reverting to row hiding for filter_table_view:
-        
-        self.table.setSortingEnabled(False) # Performance
-        for row_idx in range(self.table.rowCount()):
-            should_hide_row = False
-            # Get data directly from table items for filtering visibility
-            # This assumes table is already populated with full self.current_scanned_files_data
-            # If populate_table_view is called after every filter text change, then this is fine.
-            # Let's ensure populate_table_view is called to reflect the correct data first.
-            # No, this is wrong. filter_table_view should HIDE rows, not repopulate.
-
-            # Corrected filter logic:
-            # Iterate through self.current_scanned_files_data, find corresponding row, and hide/show
-            # This is complex if table is sorted. Simpler: iterate table rows.
-            
-            for search_key_lower, term in active_search_terms.items():
-                col_idx = -1
-                if search_key_lower == "directory": col_idx = 0
-                elif search_key_lower == "filename": col_idx = 1
-                elif search_key_lower == "created": col_idx = 2
-                elif search_key_lower == "modified": col_idx = 3
-                elif search_key_lower == "status": col_idx = 4
-                
-                if col_idx == -1: continue
-
-                item = self.table.item(row_idx, col_idx)
-                if not item or term not in item.text().lower():
-                    should_hide_row = True
-                    break
-            self.table.setRowHidden(row_idx, should_hide_row)
-        self.table.setSortingEnabled(True)
-        self.table.setCurrentItem(None) 
-        # Log count of visible rows
-        visible_count = sum(1 for i in range(self.table.rowCount()) if not self.table.isRowHidden(i))
-        self.debug_window.log_message(f"Table filtered. Visible rows: {visible_count}", "DEBUG")
-
+    def filter_table_view(self):
+        filter_terms = {column: box.text().lower() for column, box in self.search_boxes.items() if box.text()}
+        self.table_model.set_filters(filter_terms, self.duplicates_only_checkbox.isChecked())
+        self.table.clearSelection()
+        self.debug_window.log_message(f"Table filtered. Visible rows: {self.table_model.rowCount()}", "DEBUG")
 
-    def open_file_directory_action(self, row, column):
+    def open_file_directory_action(self, index):
+        row = index.row()
         try:
-            dir_item = self.table.item(row, 0) 
-            if dir_item:
-                dir_path_str = dir_item.text()
+            if index.isValid():
+                dir_path_str = self.table_model.store.directories[self.table_model.store_row(row)]
                 dir_path = Path(dir_path_str)
                 if dir_path.is_dir():
                     self.debug_window.log_message(f"Opening directory: {dir_path_str}", "INFO")
@@ -744,13 +2420,13 @@ class FileScannerApp(QWidget):
                     self.debug_window.log_message(f"Path is not a valid directory: {dir_path_str}", "WARNING")
                     QMessageBox.warning(self, "Invalid Path", f"The path '{dir_path_str}' is not a valid directory.")
             else:
-                self.debug_window.log_message(f"No directory item found at row {row}, column 0.", "WARNING")
+                self.debug_window.log_message(f"No directory found at row {row}.", "WARNING")
         except Exception as e:
             self.debug_window.log_message(f"Error opening directory for row {row}: {e}", "ERROR")
             QMessageBox.critical(self, "Error", f"Could not open directory. Error: {e}")
 
     def queue_selected_files_for_deletion(self):
-        # Get the currently selected rows
+        # Get the currently selected rows (only visible rows can be selected in the view)
         selected_items_indices = self.table.selectionModel().selectedRows() 
         self.debug_window.log_message(f"SELECTION DEBUG: Number of rows selected: {len(selected_items_indices)}", "INFO")
         
@@ -758,67 +2434,27 @@ class FileScannerApp(QWidget):
             QMessageBox.information(self, "No Selection", "Please select one or more files to queue for deletion.")
             return
 
+        store = self.table_model.store
         items_to_review = []
-        self.debug_window.log_message(f"SELECTION DEBUG: Processing {len(selected_items_indices)} selected rows", "INFO")
-        
-        # Collect details about all selections for debugging
-        selection_details = []
-        for i, model_index in enumerate(selected_items_indices):
-            row = model_index.row()
-            selection_details.append(f"Selection {i+1}: Row {row}")
-        self.debug_window.log_message(f"SELECTION DEBUG: Selection details: {', '.join(selection_details)}", "INFO")
-        
-        # For each selected row
-        for i, model_index in enumerate(selected_items_indices):
-            row = model_index.row()
-            self.debug_window.log_message(f"SELECTION DEBUG: Processing selection {i+1}, row {row}", "INFO")
-            
-            # Skip if row is hidden
-            if self.table.isRowHidden(row):
-                self.debug_window.log_message(f"SELECTION DEBUG: Row {row} is hidden - skipping", "INFO")
+        already_queued = 0
+        for model_index in selected_items_indices:
+            row = self.table_model.store_row(model_index.row())
+            if store.status[row] != STATUS_FILE_FOUND: # Queued, or already processed
+                already_queued += 1
                 continue
-            
-            # Get all column items for this row to ensure we're looking at the right data
-            try:
-                dir_item = self.table.item(row, 0)  # Directory column
-                file_item = self.table.item(row, 1)  # Filename column
-                created_item = self.table.item(row, 2)  # Created column
-                modified_item = self.table.item(row, 3)  # Modified column
-                status_item = self.table.item(row, 4)  # Status column
-                
-                # Debug log all column values for this row
-                dir_text = dir_item.text() if dir_item else "None"
-                file_text = file_item.text() if file_item else "None"
-                created_text = created_item.text() if created_item else "None"
-                modified_text = modified_item.text() if modified_item else "None"
-                status_text = status_item.text() if status_item else "None"
-                
-                self.debug_window.log_message(
-                    f"SELECTION DEBUG: Row {row} data - Dir: {dir_text}, File: {file_text}, "
-                    f"Created: {created_text}, Modified: {modified_text}, Status: {status_text}", "INFO")
-                
-                # Check if already queued
-                if status_item and status_item.text() == "Queued for Deletion":
-                    self.debug_window.log_message(f"SELECTION DEBUG: Row {row} already queued for deletion - skipping", "INFO")
-                    continue
-                
-                # Verify both directory and filename exist
-                if dir_item is not None and file_item is not None:
-                    items_to_review.append((dir_text, file_text))
-                    self.debug_window.log_message(f"SELECTION DEBUG: Row {row} - Added to review list: {dir_text} / {file_text}", "INFO")
-                else:
-                    self.debug_window.log_message(f"SELECTION DEBUG: Row {row} - Skipping: Missing dir or file item", "WARNING")
-                    
-            except Exception as e:
-                self.debug_window.log_message(f"SELECTION DEBUG: Error processing row {row}: {str(e)}", "ERROR")
+            items_to_review.append((store.directories[row], store.filenames[row]))
 
-        self.debug_window.log_message(f"SELECTION DEBUG: Finished processing selections. Added {len(items_to_review)} items to review list", "INFO")
+        self.debug_window.log_message(f"SELECTION DEBUG: Finished processing selections. Added {len(items_to_review)} items to review list, skipped {already_queued} already queued", "INFO")
         
         if not items_to_review:
             QMessageBox.information(self, "No New Items", "No new files selected to queue (already queued or no selection).")
             return
 
         self.debug_window.log_message(f"SELECTION DEBUG: Creating ReviewDialog with {len(items_to_review)} items", "INFO")
+        self.review_and_queue_items(items_to_review)
+
+    def review_and_queue_items(self, items_to_review):
+        """Show the ReviewDialog for (directory, filename) pairs and queue the ones left checked."""
         review_dialog = ReviewDialog(items_to_review, self)
         
         if review_dialog.exec(): 
@@ -826,21 +2462,101 @@ class FileScannerApp(QWidget):
             self.debug_window.log_message(f"SELECTION DEBUG: ReviewDialog returned {len(items_confirmed_for_queue)} confirmed items", "INFO")
             
             if items_confirmed_for_queue:
+                store = self.table_model.store
                 for dir_path, file_name in items_confirmed_for_queue:
                     self.files_queued_for_deletion.add((dir_path, file_name))
-                    # Update status in self.current_scanned_files_data
-                    for data_entry in self.current_scanned_files_data:
-                        if data_entry.get("directory") == dir_path and data_entry.get("filename") == file_name:
-                            data_entry["status"] = "Queued for Deletion" 
-                            break
+                    row = store.row_for(dir_path, file_name)
+                    if row is not None:
+                        store.status[row] = STATUS_QUEUED
                 self.debug_window.log_message(f"Added {len(items_confirmed_for_queue)} items to deletion queue.", "INFO")
-                self.populate_table_view() # Refresh table to show new statuses
+                self.table_model.rows_changed() # Refresh table to show new statuses
                 self.update_queue_counter() # Update counter after adding to queue
             else:
                 self.debug_window.log_message("No items were ultimately confirmed for deletion queue.", "INFO")
         else: 
             self.debug_window.log_message("File queuing cancelled by user in review dialog.", "INFO")
-        self.table.setCurrentItem(None)
+        self.table.clearSelection()
+
+    def find_duplicates(self):
+        store = self.table_model.store
+        if not len(store):
+            QMessageBox.information(self, "No Files", "Scan a directory before searching for duplicates.")
+            return
+        # Paths are captured now; rows don't move while the search runs (watch changes wait)
+        paths = [store.full_path(row) for row in range(len(store))]
+        self.duplicate_worker = DuplicateWorker(paths)
+        self.duplicate_worker.moveToThread(self.duplicate_thread)
+        self.duplicate_progress = QProgressDialog(f"Searching {len(paths):,} files for duplicates...", "Cancel", 0, len(paths), self)
+        self.duplicate_progress.setWindowTitle("Finding Duplicates")
+        self.duplicate_progress.setWindowModality(Qt.WindowModal)
+        self.duplicate_progress.setMinimumDuration(500)
+        self.duplicate_progress.canceled.connect(self.duplicate_worker.cancel)
+        self.duplicate_thread.started.connect(self.duplicate_worker.run)
+        self.duplicate_worker.progress.connect(self.on_duplicate_progress)
+        self.duplicate_worker.finished.connect(self.on_duplicates_found)
+        self.set_scan_controls_running(True)
+        self.cancel_scan_button.hide() # Only the progress dialog can cancel the search
+        self.scan_progress_label.setText("Finding duplicates...")
+        self.duplicate_thread.start()
+
+    def on_duplicate_progress(self, stage, done, total):
+        if self.duplicate_progress.wasCanceled():
+            return
+        self.duplicate_progress.setLabelText(f"{stage}: {done:,} of {total:,} files")
+        self.duplicate_progress.setMaximum(max(total, 1))
+        self.duplicate_progress.setValue(min(done, total))
+
+    def on_duplicates_found(self, groups, cancelled, error_message):
+        self.duplicate_thread.quit()
+        self.duplicate_thread.wait()
+        self.duplicate_thread.started.disconnect(self.duplicate_worker.run)
+        paths = self.duplicate_worker.paths
+        self.duplicate_worker.deleteLater()
+        self.duplicate_worker = None
+        self.duplicate_progress.close()
+        self.set_scan_controls_running(False)
+        self.scan_progress_label.setText("")
+        if error_message:
+            QMessageBox.critical(self, "Duplicate Search", f"Could not search for duplicates: {error_message}")
+            self.debug_window.log_message(f"Error searching for duplicates: {error_message}", "ERROR")
+            return
+        if cancelled:
+            self.debug_window.log_message("Duplicate search cancelled.", "INFO")
+            return
+        store = self.table_model.store
+        row_by_path = {path: row for row, path in enumerate(paths)}
+        self.duplicate_groups = [
+            (size, [row_by_path[path] for path in group_paths])
+            for size, group_paths in groups
+        ]
+        store.set_duplicate_groups([rows for _, rows in self.duplicate_groups])
+        self.table_model.refresh()
+        if not self.duplicate_groups:
+            QMessageBox.information(self, "Duplicate Search", "No duplicate Python files found.")
+            return
+        redundant_copies = sum(len(rows) - 1 for _, rows in self.duplicate_groups)
+        wasted_bytes = sum(size * (len(rows) - 1) for size, rows in self.duplicate_groups)
+        QMessageBox.information(self, "Duplicate Search",
+                                f"Found {len(self.duplicate_groups)} groups of identical files.\n"
+                                f"{redundant_copies} redundant copies use {wasted_bytes / 1024:.1f} KB.")
+
+    def queue_duplicate_copies_for_deletion(self):
+        """Send every copy but the oldest (by modified time) of each duplicate group to review."""
+        if not self.duplicate_groups:
+            QMessageBox.information(self, "No Duplicates", "Run 'Find Duplicates' first.")
+            return
+        store = self.table_model.store
+        items_to_review = []
+        for _, rows in self.duplicate_groups:
+            keep = min(rows, key=lambda row: (store.modified[row], len(store.full_path(row)), store.full_path(row)))
+            for row in rows:
+                if row != keep and store.status[row] == STATUS_FILE_FOUND:
+                    items_to_review.append((store.directories[row], store.filenames[row]))
+        if not items_to_review:
+            QMessageBox.information(self, "No New Items", "All redundant copies are already queued.")
+            return
+        self.debug_window.log_message(f"Queuing {len(items_to_review)} redundant duplicate copies for review.", "INFO")
+        self.review_and_queue_items(items_to_review)
 
     def clear_all_queued_deletions(self):
         if not self.files_queued_for_deletion:
@@ -852,10 +2568,11 @@ class FileScannerApp(QWidget):
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
             self.files_queued_for_deletion.clear()
-            # Reset status in self.current_scanned_files_data
-            for data_entry in self.current_scanned_files_data:
-                data_entry["status"] = "File Found" # Reset all, populate_table_view will handle it
-            self.populate_table_view() # Refresh table
+            store = self.table_model.store
+            # Queued (and failed) files back to STATUS_FILE_FOUND; trashed files keep their status
+            unqueue = bytes(STATUS_FILE_FOUND if code in (STATUS_QUEUED, STATUS_DELETE_FAILED) else code for code in range(256))
+            store.status[:] = store.status.translate(unqueue)
+            self.table_model.rows_changed() # Refresh table
             self.update_queue_counter() # Update counter after clearing queue - resets to 0
             self.debug_window.log_message("Deletion queue cleared.", "INFO")
             QMessageBox.information(self, "Queue Cleared", "All files removed from the deletion queue.")
@@ -873,37 +2590,68 @@ class FileScannerApp(QWidget):
             self.debug_window.log_message("Execution of queued deletions cancelled by user.", "INFO")
             return
 
-        QApplication.setOverrideCursor(Qt.WaitCursor)
-        deleted_count = 0
-        failed_count = 0
-        
         # Create a list of (dir_path, file_name) from the set for iteration
         items_to_process_from_queue = list(self.files_queued_for_deletion)
+        self.deletion_counts = [0, 0] # sent to trash, failed
         
-        # For directory deletion logic, we need a list of Python files that will *remain*
-        # i.e., all scanned files MINUS those in the current deletion queue.
-        queued_keys = set(self.files_queued_for_deletion)
-        py_files_not_in_queue = [
-            item for item in self.current_scanned_files_data
-            if (item.get("directory"), item.get("filename")) not in queued_keys
-        ]
-
-        for dir_path, file_name in items_to_process_from_queue:
-            full_path = Path(dir_path) / file_name
-            self.debug_window.log_message(f"Executing deletion for: {full_path}", "INFO")
-            
-            if self.scanner.delete_file_to_trash(str(full_path)):
-                deleted_count += 1
-                # Attempt to delete parent directory, passing the list of PY files *not* in the queue
-                self.scanner.try_delete_empty_dir_to_trash(dir_path, py_files_not_in_queue)
+        # For directory deletion logic: every scanned file is tracked until it has actually
+        # been sent to the trash, so a directory is only considered once it holds none.
+        # Rows trashed by an earlier (cancelled or partial) run are already gone from disk
+        store = self.table_model.store
+        directory_index = self.scanner.build_directory_index(
+            directory_str for directory_str, code in zip(store.directories, store.status) if code != STATUS_TRASHED)
+
+        self.deletion_worker = DeletionWorker(items_to_process_from_queue, directory_index)
+        self.deletion_worker.moveToThread(self.deletion_thread)
+        self.deletion_progress = QProgressDialog(f"Sending {len(items_to_process_from_queue):,} files to the trash...",
+                                                 "Cancel", 0, len(items_to_process_from_queue), self)
+        self.deletion_progress.setWindowTitle("Executing Deletions")
+        self.deletion_progress.setWindowModality(Qt.WindowModal)
+        self.deletion_progress.setAutoClose(False)
+        self.deletion_progress.setAutoReset(False)
+        self.deletion_progress.canceled.connect(self.deletion_worker.cancel)
+        self.deletion_thread.started.connect(self.deletion_worker.run)
+        self.deletion_worker.batch_done.connect(self.on_deletion_batch)
+        self.deletion_worker.finished.connect(self.on_deletion_finished)
+        self.set_scan_controls_running(True)
+        self.cancel_scan_button.hide() # Only the progress dialog can cancel deletions
+        self.scan_progress_label.setText("Executing deletions...")
+        self.debug_window.log_message(f"Executing deletion of {len(items_to_process_from_queue)} files; undo journal: {DELETION_JOURNAL_FILE}", "INFO")
+        self.deletion_thread.start()
+
+    def on_deletion_batch(self, results):
+        store = self.table_model.store
+        for dir_path, file_name, ok in results:
+            row = store.row_for(dir_path, file_name)
+            if ok:
+                self.deletion_counts[0] += 1
+                self.files_queued_for_deletion.discard((dir_path, file_name))
             else:
-                failed_count += 1
-                self.debug_window.log_message(f"Failed to delete file: {full_path}", "ERROR")
-
-        QApplication.restoreOverrideCursor()
-        summary_message = f"Deletion process complete.\nSuccessfully sent to trash: {deleted_count} files.\nFailed to send to trash: {failed_count} files."
+                self.deletion_counts[1] += 1
+                self.debug_window.log_message(f"Failed to delete file: {os.path.join(dir_path, file_name)}", "ERROR")
+            if row is not None:
+                store.status[row] = STATUS_TRASHED if ok else STATUS_DELETE_FAILED
+        self.table_model.rows_changed()
+        self.update_queue_counter()
+        self.deletion_progress.setValue(sum(self.deletion_counts))
+
+    def on_deletion_finished(self, cancelled):
+        self.deletion_thread.quit()
+        self.deletion_thread.wait()
+        self.deletion_thread.started.disconnect(self.deletion_worker.run)
+        self.deletion_worker.deleteLater()
+        self.deletion_worker = None
+        self.deletion_progress.close()
+        self.set_scan_controls_running(False)
+        self.scan_progress_label.setText("")
+        deleted_count, failed_count = self.deletion_counts
+        summary_message = f"Deletion process {'cancelled' if cancelled else 'complete'}.\nSuccessfully sent to trash: {deleted_count} files.\nFailed to send to trash: {failed_count} files."
+        if cancelled:
+            summary_message += f"\nNot processed: {len(self.files_queued_for_deletion) - failed_count} files (still queued)."
         self.debug_window.log_message(summary_message.replace("\n", " "), "INFO")
         QMessageBox.information(self, "Deletion Summary", summary_message)
+        if cancelled:
+            return
         
         self.debug_window.log_message("Exiting application after executing deletions.", "INFO")
         
@@ -936,10 +2684,30 @@ class FileScannerApp(QWidget):
         if not self.close_application_handler(): # Check if there are unsaved changes
             event.ignore() # Ignore the close event if user cancels
             return
+
+        if self.scan_worker:
+            self.scan_worker.cancel()
+            self.scan_thread.quit()
+            self.scan_thread.wait()
+        if self.export_worker:
+            self.export_worker.cancel()
+            self.export_thread.quit()
+            self.export_thread.wait()
+        if self.duplicate_worker:
+            self.duplicate_worker.cancel()
+            self.duplicate_thread.quit()
+            self.duplicate_thread.wait()
+        if self.deletion_worker:
+            self.deletion_worker.cancel() # Batches already being trashed still finish
+            self.deletion_thread.quit()
+            self.deletion_thread.wait()
+        self.stop_watching()
+        self.stop_enrichment()
             
         if self.debug_window and self.debug_window.isVisible():
             self.debug_window.close()
         
+        self.debug_window.flush() # Write what is still queued to file_scanner.log
         logger.info("Application shutting down.")
         super().closeEvent(event)
 
@@ -953,8 +2721,8 @@ class FileScannerApp(QWidget):
             self.queue_counter_label.setStyleSheet("color: gray; font-weight: normal; font-size: 14px;")
 
     def export_current_list(self):
-        items_to_export = self.current_scanned_files_data
-        if not items_to_export:
+        store = self.table_model.store
+        if not len(store):
             QMessageBox.information(self, "No Items to Export", "No files are currently scanned.")
             return
 
@@ -967,27 +2735,17 @@ class FileScannerApp(QWidget):
         format_label = QLabel("<b>Select Export Format:</b>")
         format_layout.addWidget(format_label)
         
-        # Format selection buttons
-        csv_button = QPushButton("CSV")
-        xlsx_button = QPushButton("XLSX")
-        txt_button = QPushButton("TXT")
-        pdf_button = QPushButton("PDF")
-        
-        format_layout.addWidget(csv_button)
-        format_layout.addWidget(xlsx_button)
-        format_layout.addWidget(txt_button)
-        format_layout.addWidget(pdf_button)
-        
         selected_format = [None]  # Using list to store value by reference
         
         def set_format(fmt):
             selected_format[0] = fmt
             format_dialog.accept()
             
-        csv_button.clicked.connect(lambda: set_format("csv"))
-        xlsx_button.clicked.connect(lambda: set_format("xlsx"))
-        txt_button.clicked.connect(lambda: set_format("txt"))
-        pdf_button.clicked.connect(lambda: set_format("pdf"))
+        # Format selection buttons
+        for fmt, (label, _) in EXPORT_FORMATS.items():
+            format_button = QPushButton(label)
+            format_button.clicked.connect(lambda checked=False, fmt=fmt: set_format(fmt))
+            format_layout.addWidget(format_button)
         
         cancel_button = QPushButton("Cancel")
         cancel_button.clicked.connect(format_dialog.reject)
@@ -1002,20 +2760,8 @@ class FileScannerApp(QWidget):
         file_format = selected_format[0]
         self.debug_window.log_message(f"Selected export format: {file_format}", "INFO")
         
-        # Set default filename and filter based on selected format
-        if file_format == "csv":
-            default_filename = f"ScannedFiles_{QDate.currentDate().toString('yyyy-MM-dd')}.csv"
-            file_filter = "CSV Files (*.csv);;All Files (*)"
-        elif file_format == "xlsx":
-            default_filename = f"ScannedFiles_{QDate.currentDate().toString('yyyy-MM-dd')}.xlsx"
-            file_filter = "Excel Files (*.xlsx);;All Files (*)"
-        elif file_format == "pdf":
-            default_filename = f"ScannedFiles_{QDate.currentDate().toString('yyyy-MM-dd')}.pdf"
-            file_filter = "PDF Files (*.pdf);;All Files (*)"
-        else:  # txt format
-            default_filename = f"ScannedFiles_{QDate.currentDate().toString('yyyy-MM-dd')}.txt"
-            file_filter = "Text Files (*.txt);;All Files (*)"
-        
+        default_filename = f"ScannedFiles_{QDate.currentDate().toString('yyyy-MM-dd')}.{file_format}"
+        file_filter = f"{EXPORT_FORMATS[file_format][1]};;All Files (*)"
         file_path, _ = QFileDialog.getSaveFileName(
             self, 
             "Save Scanned Files List", 
@@ -1026,133 +2772,40 @@ class FileScannerApp(QWidget):
         if not file_path:
             return
             
-        try:
-            if file_format == "csv":
-                self.export_to_csv(file_path, items_to_export)
-            elif file_format == "xlsx":
-                self.export_to_xlsx(file_path, items_to_export)
-            elif file_format == "pdf":
-                self.export_to_pdf(file_path, items_to_export)
-            else:  # txt format
-                self.export_to_txt(file_path, items_to_export)
-                
+        # Exports keep the original five columns, in scan order, written on a worker thread
+        self.export_worker = ExportWorker(store, file_format, file_path)
+        self.export_worker.moveToThread(self.export_thread)
+        self.export_progress = QProgressDialog(f"Exporting {len(store):,} files...", "Cancel", 0, len(store), self)
+        self.export_progress.setWindowTitle("Exporting")
+        self.export_progress.setWindowModality(Qt.WindowModal)
+        self.export_progress.setMinimumDuration(500)
+        self.export_progress.canceled.connect(self.export_worker.cancel)
+        self.export_thread.started.connect(self.export_worker.run)
+        self.export_worker.progress.connect(self.export_progress.setValue)
+        self.export_worker.finished.connect(self.on_export_finished)
+        self.set_scan_controls_running(True)
+        self.cancel_scan_button.hide() # Only the progress dialog can cancel an export
+        self.scan_progress_label.setText("Exporting...")
+        self.export_thread.start()
+
+    def on_export_finished(self, cancelled, error_message):
+        self.export_thread.quit()
+        self.export_thread.wait()
+        self.export_thread.started.disconnect(self.export_worker.run)
+        file_path = self.export_worker.file_path
+        self.export_worker.deleteLater()
+        self.export_worker = None
+        self.export_progress.close()
+        self.set_scan_controls_running(False)
+        self.scan_progress_label.setText("")
+        if error_message:
+            QMessageBox.critical(self, "Export Error", f"Could not export scanned files list: {error_message}")
+            self.debug_window.log_message(f"Error exporting scanned files list: {error_message}", "ERROR")
+        elif cancelled:
+            self.debug_window.log_message(f"Export to {file_path} cancelled; partial file removed.", "INFO")
+        else:
             QMessageBox.information(self, "Export Successful", f"Scanned files list exported to:\n{file_path}")
             self.debug_window.log_message(f"Scanned files list exported to {file_path}", "INFO")
-        except Exception as e:
-            QMessageBox.critical(self, "Export Error", f"Could not export scanned files list: {e}")
-            self.debug_window.log_message(f"Error exporting scanned files list: {e}", "ERROR")
-    
-    def export_to_txt(self, file_path, items_to_export):
-        """Export data to a text file."""
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(f"Scanned Files List - {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write("=" * 40 + "\n")
-            f.write("Files scanned:\n\n")
-            for file_entry in items_to_export:
-                f.write(f"Directory: {file_entry['directory']}\nFilename:  {file_entry['filename']}\n")
-                f.write(f"Created: {file_entry['created']}\nModified: {file_entry['modified']}\n")
-                f.write(f"Status: {file_entry['status']}\n---\n")
-    
-    def export_to_csv(self, file_path, items_to_export):
-        """Export data to a CSV file."""
-        import csv
-        with open(file_path, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(['Directory', 'Filename', 'Created', 'Modified', 'Status'])
-            for file_entry in items_to_export:
-                writer.writerow([
-                    file_entry['directory'],
-                    file_entry['filename'],
-                    file_entry['created'],
-                    file_entry['modified'],
-                    file_entry['status']
-                ])
-    
-    def export_to_xlsx(self, file_path, items_to_export):
-        """Export data to an Excel file."""
-        try:
-            import openpyxl
-            from openpyxl.styles import Font
-            
-            wb = openpyxl.Workbook()
-            ws = wb.active
-            ws.title = "Scanned Files"
-            
-            # Add header row with bold font
-            headers = ['Directory', 'Filename', 'Created', 'Modified', 'Status']
-            bold_font = Font(bold=True)
-            for col_num, header in enumerate(headers, 1):
-                cell = ws.cell(row=1, column=col_num, value=header)
-                cell.font = bold_font
-            
-            # Add data rows
-            for row_num, file_entry in enumerate(items_to_export, 2):
-                ws.cell(row=row_num, column=1, value=file_entry['directory'])
-                ws.cell(row=row_num, column=2, value=file_entry['filename'])
-                ws.cell(row=row_num, column=3, value=file_entry['created'])
-                ws.cell(row=row_num, column=4, value=file_entry['modified'])
-                ws.cell(row=row_num, column=5, value=file_entry['status'])
-            
-            # Auto-adjust column widths
-            for col in ws.columns:
-                max_length = 0
-                column = col[0].column_letter
-                for cell in col:
-                    if cell.value:
-                        max_length = max(max_length, len(str(cell.value)))
-                adjusted_width = max_length + 2
-                ws.column_dimensions[column].width = adjusted_width
-            
-            wb.save(file_path)
-        except ImportError:
-            raise Exception("Excel export requires the openpyxl module. Please install it with 'pip install openpyxl'.")
-    
-    def export_to_pdf(self, file_path, items_to_export):
-        """Export data to a PDF file."""
-        try:
-            from reportlab.lib import colors
-            from reportlab.lib.pagesizes import letter, landscape
-            from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
-            from reportlab.lib.styles import getSampleStyleSheet
-            
-            doc = SimpleDocTemplate(file_path, pagesize=landscape(letter))
-            
-            # Create the data for the table
-            styles = getSampleStyleSheet()
-            title_style = styles['Heading1']
-            data = [['Directory', 'Filename', 'Created', 'Modified', 'Status']]
-            
-            for file_entry in items_to_export:
-                data.append([
-                    file_entry['directory'],
-                    file_entry['filename'],
-                    file_entry['created'],
-                    file_entry['modified'],
-                    file_entry['status']
-                ])
-            
-            # Create the table
-            table = Table(data, repeatRows=1)
-            
-            # Style the table
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ]))
-            
-            # Create title
-            title = Paragraph(f"Scanned Files List - {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", title_style)
-            
-            # Build the PDF
-            elements = [title, table]
-            doc.build(elements)
-        except ImportError:
-            raise Exception("PDF export requires the reportlab module. Please install it with 'pip install reportlab'.")
 
 
 def main():
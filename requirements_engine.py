@@ -0,0 +1,880 @@
+#!/usr/bin/env python
+"""
+Requirements Engine - GUI-free scanning, import mapping, install and cleanup logic
+shared by the Requirements Doctor window and the command line.
+
+Command line usage:
+    python requirements_engine.py scan DIR [DIR ...]
+    python requirements_engine.py diagnose DIR [DIR ...] --report report.jsonl --report-format jsonl [--compress]
+    python requirements_engine.py install DIR [DIR ...] [--resume]
+    python requirements_engine.py cleanup DIR [DIR ...] [--yes]
+
+Progress is written to stdout as NDJSON events (one JSON object per line) with
+--format ndjson (the default), or as a single JSON document with --format json.
+"""
+import os
+import sys
+import re
+import json
+import csv
+import gzip
+import hashlib
+import datetime
+import platform
+import subprocess
+import importlib.util
+import configparser
+import threading
+from collections import defaultdict
+
+# --- Configurations ---
+# These are less critical now that we're not scanning system-wide,
+# but can still be useful for sub-folders within user-selected directories.
+EXCLUDED_SUBFOLDER_NAMES = { # Common folders to skip within a project
+    "__pycache__", ".git", ".hg", ".svn", "venv", ".venv", "env", ".env",
+    "node_modules", "build", "dist", "target", "docs", "tests", "test"
+}
+
+JUNK_IMPORT_WORDS = {
+    "__main__", "__builtin__", "__init__", "self", "cls", "args", "kwargs", "true", "false", "none",
+    "if", "else", "elif", "for", "while", "try", "except", "finally", "with", "as", "import", "from", "def", "class",
+    "return", "yield", "lambda", "pass", "continue", "break", "global", "nonlocal", "del", "assert",
+    "a", "an", "the", "it", "be", "to", "of", "for", "on", "at", "by", "this", "that", "all", "any", "some",
+    "main", "util", "utils", "helper", "helpers", "config", "setup", "example", "examples",
+    "script", "scripts", "tool", "tools", "lib", "core", "app", "src", "pkg", "module", "package", "project",
+    "data", "api", "client", "server", "common", "base", "interface", "model", "models", "view", "views",
+    "string", "int", "float", "bool", "list", "dict", "set", "tuple", "object", "function", "method",
+    "variable", "constant", "parameter", "argument", "index", "item", "value", "result", "status", "code",
+    "name", "file", "path", "root", "dir", "folder", "user", "users", "system", "windows", "linux", "mac",
+    "http", "https", "url", "uri", "ip", "port", "host", "json", "xml", "csv", "yaml", "html", "css", "js",
+    "date", "time", "datetime", "timestamp", "year", "month", "day", "hour", "minute", "second",
+    "foo", "bar", "baz", "qux",
+    "_abcoll", "_manylinux", "_pydev_bundle", "_pydev_runfiles", "_pydevd_bundle", "_pytest",
+    "_pydevd_bundle_ext", "_pydevd_frame_eval", "_pydevd_frame_eval_ext",
+    "_pydevd_sys_monitoring", "_pypy__", "_pypy_wait", "_subprocess", "_typeshed",
+    "distutils", "pkg_resources", "py", "python",
+    # Adding local module names that were causing false positives
+    "documentversionexplorer", "log_workspace_action", "model_loader", "openaiwhisper",
+    "venv_creator", "video_frame_snatcher", "win32clipboard", "win32con", "win32file",
+    "youtube_caption_fetcher", "youtube_captionfetcher"  # Adding both variations
+}
+PROTECTED_PACKAGES = {
+    "pip", "setuptools", "wheel", "customtkinter", "python-dotenv",
+    "certifi", "charset-normalizer", "idna", "requests", "urllib3",
+    "packaging", "pyparsing", "colorama", "python", "py", "openai-whisper"
+}
+USER_STDLIB_MODULE_LIST = [
+    "abc", "argparse", "asyncio", "base64", "collections", "concurrent", "contextlib", "copy", "csv", "datetime",
+    "decimal", "difflib", "enum", "fileinput", "fnmatch", "functools", "glob", "gzip", "hashlib", "heapq",
+    "hmac", "html", "http", "importlib", "inspect", "io", "itertools", "json", "logging", "math",
+    "multiprocessing", "operator", "os", "pathlib", "pickle", "platform", "pprint", "queue", "random",
+    "re", "selectors", "shutil", "signal", "socket", "sqlite3", "ssl", "stat", "string", "struct",
+    "subprocess", "sys", "tempfile", "threading", "time", "timeit", "types", "typing", "unittest",
+    "urllib", "uuid", "warnings", "weakref", "xml", "xmlrpc", "zipfile", "zlib", "configparser", "email",
+    "imp", "msvcrt", "winsound", "winreg", "sysconfig", "_thread", "builtins"
+]
+USER_MODULE_TO_PACKAGE_MAPPING = {
+    "PIL": "pillow", "sklearn": "scikit-learn", "cv2": "opencv-python", "bs4": "beautifulsoup4",
+    "wx": "wxPython", "tk": "tk", "tkinter": "tkinter", "matplotlib": "matplotlib", "np": "numpy",
+    "pd": "pandas", "plt": "matplotlib", "customtkinter": "customtkinter", "ctk": "customtkinter",
+    "pyside6": "PySide6", "win32com": "pywin32", "win32api": "pywin32", "win32gui": "pywin32",
+    "pythoncom": "pywin32", "pywintypes": "pywin32",
+    "sentence_transformers": "sentence-transformers",  # Adding proper mapping
+    "openaiwhisper": "openai-whisper",  # Adding proper mapping
+    "whisper": "openai-whisper",  # Also map the base module name
+    "openai_whisper": "openai-whisper",  # Add underscore variant
+    "OpenAIWhisper": "openai-whisper",  # Add CamelCase variant
+}
+USER_IMPORT_PATTERNS = [
+    r'^\s*import\s+([a-zA-Z_][a-zA-Z0-9_.]*)',
+    r'^\s*from\s+([a-zA-Z_][a-zA-Z0-9_.]*)\s+import',
+    r'^\s*import\s+([a-zA-Z_][a-zA-Z0-9_.]*)\s+as\s+\w+'
+]
+
+SETTINGS_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'settings.ini')
+RUN_JOURNAL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'collector_run_journal.json')
+
+DEFAULT_EXCLUDE_DIRS = [
+    os.path.join('%USERPROFILE%', 'AppData'),
+    os.path.join('%USERPROFILE%', 'Music'),
+    os.path.join('%USERPROFILE%', 'Searches'),
+    os.path.join('%USERPROFILE%', 'AppData', 'Roaming'),
+    os.path.join('%USERPROFILE%', 'Downloads'),
+    os.path.join('%USERPROFILE%', 'Favorites'),
+]
+DEFAULT_ALWAYS_INCLUDE = {'PySide6', 'OpenAIWhisper'}
+
+# Diagnostic report formats and the file extension each one is saved with
+REPORT_FORMATS = {"text": ".log", "jsonl": ".jsonl", "csv": ".csv"}
+
+
+class OperationCancelled(Exception):
+    """Raised inside the engine when the caller's cancel event is set."""
+
+
+def load_settings(settings_path=SETTINGS_INI):
+    """Return (always_include, always_uninstall, exclude_dirs) from settings.ini.
+
+    Missing or empty sections fall back to the defaults; the second return value
+    tells the caller whether the file should be (re)written with those defaults.
+    """
+    config = configparser.RawConfigParser()
+    needs_save = False
+    if os.path.exists(settings_path):
+        config.read(settings_path)
+        always_include = set(config.get('AlwaysInclude', 'packages', fallback='').splitlines())
+        always_uninstall = set(config.get('AlwaysUninstall', 'packages', fallback='').splitlines())
+        exclude_dirs = set(config.get('ExcludeDirs', 'paths', fallback='').splitlines())
+    else:
+        # Pre-populate with defaults if ini is missing
+        always_include = set(DEFAULT_ALWAYS_INCLUDE)
+        always_uninstall = set()
+        exclude_dirs = set(DEFAULT_EXCLUDE_DIRS)
+        needs_save = True
+    # If the ini exists but AlwaysInclude is empty, pre-populate
+    if not always_include:
+        always_include = set(DEFAULT_ALWAYS_INCLUDE)
+        needs_save = True
+    if not exclude_dirs:
+        exclude_dirs = set(DEFAULT_EXCLUDE_DIRS)
+        needs_save = True
+    return (always_include, always_uninstall, exclude_dirs), needs_save
+
+
+def save_settings(always_include, always_uninstall, exclude_dirs, settings_path=SETTINGS_INI):
+    config = configparser.RawConfigParser()
+    config['AlwaysInclude'] = {'packages': '\n'.join(sorted(always_include))}
+    config['AlwaysUninstall'] = {'packages': '\n'.join(sorted(always_uninstall))}
+    config['ExcludeDirs'] = {'paths': '\n'.join(sorted(exclude_dirs))}
+    with open(settings_path, 'w', encoding='utf-8') as f:
+        config.write(f)
+
+
+def user_is_stdlib_module(module_name_to_check):
+    module_base_name = module_name_to_check.split('.')[0].lower()
+    if module_base_name in ["pillow", "pyside6", "customtkinter", "cv2"]: return False
+    if module_base_name in USER_STDLIB_MODULE_LIST: return True
+    try:
+        spec = importlib.util.find_spec(module_base_name)
+        if spec is None: return False
+        if spec.origin and "site-packages" in spec.origin.lower().replace("\\", "/"): return False
+        if spec.origin and any(lib_path in spec.origin.lower().replace("\\", "/") for lib_path in [os.path.join(sys.prefix, 'lib').lower(), os.path.join(sys.base_prefix, 'lib').lower()]):
+             if "site-packages" not in spec.origin.lower().replace("\\", "/"): return True
+    except Exception: pass
+    return False
+
+
+def user_map_module_to_package(module_name_to_map):
+    # Handle cases like "from package.module import something" -> map "package.module"
+    # For simplicity, we'll map the base first, then if no map, the full.
+    # Or, more effectively, map known full dotted paths if they are common.
+    # For now, using the original simpler logic for direct import names:
+    base_module_name = module_name_to_map.split('.')[0] # e.g. PIL from PIL.Image
+    if base_module_name in USER_MODULE_TO_PACKAGE_MAPPING:
+        return USER_MODULE_TO_PACKAGE_MAPPING[base_module_name]
+    if module_name_to_map in USER_MODULE_TO_PACKAGE_MAPPING: # For direct map like 'cv2'
+         return USER_MODULE_TO_PACKAGE_MAPPING[module_name_to_map]
+    return base_module_name # Default to base module name if no specific mapping
+
+
+def map_and_normalize_imports(raw_imports, always_include=()):
+    """Map and normalize all import names to PyPI package names, filter out stdlib and junk."""
+    current_sys_stdlib = set(sys.stdlib_module_names)
+    if sys.version_info >= (3, 10):
+        current_sys_stdlib.update(sys.builtin_module_names)
+    mapped_pkgs = defaultdict(set)
+    for raw_import_name, source_files in raw_imports.items():
+        base_module_for_check = raw_import_name.split('.')[0]
+
+        # --- HANDLING FOR WHISPER VARIANTS ---
+        # Skip all variants of openai whisper to avoid duplicate installations
+        if (base_module_for_check.lower().replace("_", "") == "openaiwhisper" or
+            base_module_for_check.lower() == "whisper" or
+            base_module_for_check.lower() == "openai-whisper"):
+            mapped_pkgs["openai-whisper"].update(source_files)
+            continue
+
+        if base_module_for_check.lower() in JUNK_IMPORT_WORDS:
+            continue
+        if user_is_stdlib_module(base_module_for_check) or base_module_for_check.lower() in current_sys_stdlib:
+            continue
+        pypi_pkg_name = user_map_module_to_package(raw_import_name)
+        pypi_pkg_base_name = pypi_pkg_name.split('.')[0].lower()
+        if user_is_stdlib_module(pypi_pkg_base_name) or pypi_pkg_base_name in current_sys_stdlib:
+            continue
+        if pypi_pkg_name.startswith('_') and pypi_pkg_name not in {"_cffi_backend"}: continue
+        if not re.match(r"^[a-zA-Z0-9_.-]+$", pypi_pkg_name): continue
+        mapped_pkgs[pypi_pkg_name.lower()].update(source_files)
+    # Always include packages (map and normalize to PyPI names)
+    for pkg in always_include:
+        mapped_name = user_map_module_to_package(pkg).lower()
+        if mapped_name not in mapped_pkgs:
+            mapped_pkgs[mapped_name] = {'[AlwaysInclude]'}
+    return mapped_pkgs
+
+
+def _hidden_startupinfo():
+    startupinfo = None
+    if platform.system() == "Windows":
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    return startupinfo
+
+
+def get_current_installed_pypi_packages(python_executable=sys.executable):
+    """Get a set of currently installed PyPI packages."""
+    try:
+        result = subprocess.check_output(
+            [python_executable, "-m", "pip", "list", "--format=json"],
+            stderr=subprocess.STDOUT,
+            startupinfo=_hidden_startupinfo()
+        ).decode('utf-8')
+        installed_packages = json.loads(result)
+        return {pkg['name'].lower() for pkg in installed_packages}
+    except Exception as e:
+        print(f"Error getting installed packages: {e}", file=sys.stderr)
+        return set()
+
+
+def get_installed_packages_with_deps(python_executable=sys.executable):
+    """Get a mapping of installed packages to their dependencies."""
+    try:
+        startupinfo = _hidden_startupinfo()
+        result = subprocess.check_output(
+            [python_executable, "-m", "pip", "list", "--format=json"],
+            stderr=subprocess.STDOUT,
+            startupinfo=startupinfo
+        ).decode('utf-8')
+        installed_packages = json.loads(result)
+        package_to_deps = {}
+        for pkg in installed_packages:
+            pkg_name = pkg['name']
+            try:
+                deps_result = subprocess.check_output(
+                    [python_executable, "-m", "pip", "show", pkg_name],
+                    stderr=subprocess.STDOUT,
+                    startupinfo=startupinfo
+                ).decode('utf-8')
+                deps = set()
+                for line in deps_result.split('\n'):
+                    if line.startswith('Requires:'):
+                        deps.update(d.strip() for d in line[9:].split(',') if d.strip())
+                package_to_deps[pkg_name] = deps
+            except subprocess.CalledProcessError:
+                package_to_deps[pkg_name] = set()
+        return package_to_deps
+    except Exception as e:
+        print(f"Error getting package dependencies: {e}", file=sys.stderr)
+        return {}
+
+
+class RunJournal:
+    """Persistent record of a Production Mode run (scan results, package list and
+    per-package install status) so an interrupted install loop can be resumed."""
+
+    def __init__(self, path=RUN_JOURNAL_FILE):
+        self.path = path
+        self.data = None
+
+    @staticmethod
+    def fingerprint_inputs(directories, exclude_dirs, always_include, always_uninstall):
+        """Hash of the settings that decide what a run scans and installs."""
+        payload = json.dumps({
+            "directories": sorted(os.path.normpath(d) for d in directories),
+            "exclude_dirs": sorted(exclude_dirs),
+            "always_include": sorted(always_include),
+            "always_uninstall": sorted(always_uninstall),
+            "python": sys.executable,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def file_signatures(file_paths):
+        """Map each file to [mtime_ns, size]; files that vanished are left out."""
+        signatures = {}
+        for file_path in file_paths:
+            try:
+                stat_info = os.stat(file_path)
+                signatures[file_path] = [stat_info.st_mtime_ns, stat_info.st_size]
+            except OSError:
+                continue
+        return signatures
+
+    def load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error reading run journal: {e}", file=sys.stderr)
+            self.data = None
+        return self.data
+
+    def is_resumable(self, inputs_fingerprint):
+        """True if the journal has unfinished installs for the same inputs and none
+        of the scanned files was removed or modified since it was written."""
+        if not self.data or self.data.get("inputs") != inputs_fingerprint:
+            return False
+        if not self.pending_packages():
+            return False
+        recorded = self.data.get("files", {})
+        return self.file_signatures(recorded.keys()) == recorded
+
+    def start(self, inputs_fingerprint, all_py_files, raw_imports, packages_to_install):
+        self.data = {
+            "inputs": inputs_fingerprint,
+            "started": datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "files": self.file_signatures(all_py_files),
+            "raw_imports": {imp: sorted(files) for imp, files in raw_imports.items()},
+            "packages": {pkg: "pending" for pkg in packages_to_install},
+        }
+        self.save()
+
+    def raw_imports(self):
+        raw = defaultdict(set)
+        for imp, files in self.data.get("raw_imports", {}).items():
+            raw[imp].update(files)
+        return raw
+
+    def pending_packages(self):
+        return sorted(pkg for pkg, status in self.data.get("packages", {}).items() if status == "pending")
+
+    def attempted_for_report(self):
+        """Already-attempted packages in the same form the install loop reports them."""
+        report = []
+        for pkg, status in sorted(self.data.get("packages", {}).items()):
+            if status == "installed":
+                report.append(pkg)
+            elif status.startswith("failed"):
+                report.append(f"{pkg} (FAILED: {status.split(':', 1)[1]})")
+        return report
+
+    def mark(self, pkg, status):
+        self.data["packages"][pkg] = status
+        self.save()
+
+    def save(self):
+        # Write to a temp file and swap it in so a crash never leaves a half-written journal
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        self.data = None
+        try:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+        except OSError as e:
+            print(f"Error removing run journal: {e}", file=sys.stderr)
+
+
+class ProgressChannel:
+    """Latest-value progress mailbox between a worker and a UI.
+
+    Workers call publish() as often as they like; it only swaps one tuple
+    reference, so it needs no lock and never touches the UI. The UI calls
+    snapshot() on its own timer and redraws only when the version changed,
+    which keeps display cost constant no matter how many files are processed.
+    """
+
+    def __init__(self):
+        # (version, message, detail, phase, current, total, path)
+        self._state = (0, "", "", None, 0, 0, "")
+
+    def publish(self, event):
+        version, message, detail, phase, current, total, path = self._state
+        kind = event["event"]
+        if kind == "status":
+            message, detail, phase = event["message"], event.get("detail", ""), None
+        elif kind == "progress":
+            phase = event["phase"]
+            current = event.get("current", 0)
+            total = event.get("total", event.get("files", 0))
+            path = event.get("path", "")
+        else:
+            return
+        self._state = (version + 1, message, detail, phase, current, total, path)
+
+    def snapshot(self):
+        return self._state
+
+
+class RequirementsEngine:
+    """Scans directories for Python files, maps their imports to PyPI packages and
+    installs/uninstalls packages for one interpreter.
+
+    Progress is reported through ``on_event(event_dict)``; every event has an
+    ``"event"`` key. Long loops check ``cancel_event`` and raise OperationCancelled.
+    """
+
+    def __init__(self, always_include=(), always_uninstall=(), exclude_dirs=(),
+                 python_executable=sys.executable, cancel_event=None, on_event=None):
+        self.always_include = set(always_include)
+        self.always_uninstall = set(always_uninstall)
+        self.exclude_dirs = set(exclude_dirs)
+        self.python_executable = python_executable
+        self.cancel_event = cancel_event or threading.Event()
+        self.on_event = on_event
+
+    def emit(self, event, **fields):
+        if self.on_event:
+            fields["event"] = event
+            self.on_event(fields)
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise OperationCancelled()
+
+    def inputs_fingerprint(self, directories):
+        return RunJournal.fingerprint_inputs(directories, self.exclude_dirs, self.always_include, self.always_uninstall)
+
+    def discover_files(self, directories):
+        """Walk the directories and collect .py/.pyw files.
+
+        Returns a dict with ``files`` (set of paths), ``file_counts`` (per queued
+        directory), ``scanned_dirs`` and ``skipped_dirs`` (counts).
+        """
+        all_py_files = set()
+        scanned_dirs = set()
+        file_counts = defaultdict(int)
+        duplicate_dirs = set()
+        excluded_names = {name.lower() for name in EXCLUDED_SUBFOLDER_NAMES}
+        # Expand environment variables in exclude_dirs
+        expanded_exclude_dirs = [os.path.normpath(os.path.expandvars(path)) for path in self.exclude_dirs]
+        for dir_idx, directory_to_scan in enumerate(directories):
+            self.check_cancelled()
+            directory_to_scan = os.path.normpath(directory_to_scan)
+            self.emit("status", message=f"Scanning Directory {dir_idx+1}/{len(directories)}", detail=f"...{directory_to_scan[-50:]}")
+            for root, dirs, files_in_dir in os.walk(directory_to_scan, topdown=True):
+                self.check_cancelled()
+                # Exclude subfolders by name
+                dirs[:] = [d for d in dirs if d.lower() not in excluded_names]
+                # Exclude by full path
+                root_norm = os.path.normpath(root)
+                if any(root_norm.startswith(excl) for excl in expanded_exclude_dirs):
+                    continue
+                if root in scanned_dirs:
+                    duplicate_dirs.add(root)
+                    continue
+                scanned_dirs.add(root)
+                for file_name in files_in_dir:
+                    if file_name.lower().endswith(('.py', '.pyw')):
+                        all_py_files.add(os.path.join(root, file_name))
+                        file_counts[directory_to_scan] += 1
+                self.emit("progress", phase="discover", current=len(scanned_dirs), files=len(all_py_files), path=root)
+        discovery = {
+            "files": all_py_files,
+            "file_counts": dict(file_counts),
+            "scanned_dirs": len(scanned_dirs),
+            "skipped_dirs": len(duplicate_dirs),
+        }
+        self.emit("discovered", files=len(all_py_files), file_counts=discovery["file_counts"],
+                  scanned_dirs=discovery["scanned_dirs"], skipped_dirs=discovery["skipped_dirs"])
+        return discovery
+
+    def analyze_imports(self, file_paths, report=None):
+        """Return a map of raw import name -> set of files importing it.
+
+        If a DiagnosticReportWriter is given, each file's imports are written to it
+        as soon as the file has been read.
+        """
+        raw_imports_to_files_map = defaultdict(set)
+        total_files = len(file_paths)
+        self.emit("status", message=f"Analyzing imports from {total_files} files...", detail="")
+        for i, file_path in enumerate(file_paths):
+            self.check_cancelled()
+            self.emit("progress", phase="analyze", current=i + 1, total=total_files, path=file_path)
+            file_imports = set()
+            try:
+                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f_content:
+                    content = f_content.read()
+                    for pattern in USER_IMPORT_PATTERNS:
+                        for match in re.finditer(pattern, content, re.MULTILINE):
+                            module_name_match = match.group(1)
+                            if module_name_match:
+                                file_imports.add(module_name_match)
+            except (PermissionError, FileNotFoundError, OSError) as e:
+                self.emit("warning", message=f"Error reading {file_path}: {e}")
+                continue
+            for module_name in file_imports:
+                raw_imports_to_files_map[module_name].add(file_path)
+            if report:
+                report.file_imports(file_path, file_imports)
+        return raw_imports_to_files_map
+
+    def diagnose(self, raw_imports):
+        """Compare the packages the scripts need against what is installed."""
+        valid_pkgs = map_and_normalize_imports(raw_imports, self.always_include)
+        installed = get_current_installed_pypi_packages(self.python_executable)
+        missing = sorted(set(valid_pkgs.keys()) - installed)
+        always_uninstall_lower = {p.lower() for p in self.always_uninstall}
+        return {
+            "raw_imports": raw_imports,
+            "packages": valid_pkgs,
+            "installed": installed,
+            "missing": missing,
+            # Report view: never suggest installing something on the Always Uninstall list
+            "missing_reportable": [pkg for pkg in missing if pkg.lower() not in always_uninstall_lower],
+            "installed_and_used": set(valid_pkgs.keys()) & installed,
+            "unused": installed - set(valid_pkgs.keys()) - PROTECTED_PACKAGES - self.always_include,
+        }
+
+    def install_packages(self, packages, results, journal=None):
+        """pip install each package, appending "name" or "name (FAILED: ...)" to results."""
+        total = len(packages)
+        for i, pkg_to_install in enumerate(packages):
+            self.check_cancelled()
+            self.emit("status", message=f"Installing package {i+1}/{total}", detail=f"pip install {pkg_to_install}")
+            try:
+                subprocess.check_call([self.python_executable, '-m', 'pip', 'install', pkg_to_install],
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT, startupinfo=_hidden_startupinfo())
+                results.append(pkg_to_install)
+                if journal:
+                    journal.mark(pkg_to_install, "installed")
+                self.emit("installed", package=pkg_to_install)
+            except subprocess.CalledProcessError as e:
+                results.append(f"{pkg_to_install} (FAILED: pip error {e.returncode})")
+                if journal:
+                    journal.mark(pkg_to_install, f"failed:pip error {e.returncode}")
+                self.emit("install_failed", package=pkg_to_install, returncode=e.returncode)
+        return results
+
+    def plan_cleanup(self, needed_pypi_pkgs_set, all_system_pkgs_list):
+        """Work out which installed packages look unused.
+
+        Returns ``(packages, display_lines)`` where display_lines nests unused
+        dependencies under the unused package that pulled them in.
+        """
+        all_installed_with_deps_info = get_installed_packages_with_deps(self.python_executable)
+        all_system_pkgs_set = {pkg.lower() for pkg in all_system_pkgs_list}
+        needed_pypi_pkgs_set = {pkg.lower() for pkg in needed_pypi_pkgs_set}
+        # Exclude protected packages, always_include packages, and include always_uninstall packages
+        potentially_unused = all_system_pkgs_set - needed_pypi_pkgs_set - PROTECTED_PACKAGES - self.always_include
+        always_uninstall_lower = {pkg.lower() for pkg in self.always_uninstall}
+        potentially_unused.update(always_uninstall_lower)
+        if not potentially_unused:
+            return [], []
+
+        def label(pkg):
+            return f"{pkg} [Always Uninstall]" if pkg in always_uninstall_lower else pkg
+
+        display_text_lines = []
+        required_by_map = defaultdict(set)
+        for pkg, deps in all_installed_with_deps_info.items():
+            for dep in deps: required_by_map[dep].add(pkg)
+        unused_dependency_tree = defaultdict(set)
+        for pkg in sorted(potentially_unused):
+            for dep in all_installed_with_deps_info.get(pkg, set()):
+                if dep in potentially_unused and not (required_by_map[dep] - potentially_unused - needed_pypi_pkgs_set):
+                     unused_dependency_tree[pkg].add(dep)
+        processed_for_display = set()
+        sorted_top_level_unused = sorted(potentially_unused - set(d for deps_list in unused_dependency_tree.values() for d in deps_list))
+        for pkg in sorted_top_level_unused:
+            if pkg in processed_for_display: continue
+            display_text_lines.append(label(pkg))
+            processed_for_display.add(pkg)
+            for dep in sorted(unused_dependency_tree.get(pkg, ())):
+                if dep in processed_for_display: continue
+                display_text_lines.append(f"  - {label(dep)}")
+                processed_for_display.add(dep)
+        for pkg in sorted(potentially_unused):
+            if pkg not in processed_for_display:
+                display_text_lines.append(label(pkg))
+        return sorted(potentially_unused), display_text_lines
+
+    def uninstall_packages(self, packages, uninstalled_log=None, failed_log=None):
+        """pip uninstall each package; returns (uninstalled, failed) lists.
+
+        Pass the lists in to keep the partial results when the run is cancelled.
+        """
+        uninstalled_log = [] if uninstalled_log is None else uninstalled_log
+        failed_log = [] if failed_log is None else failed_log
+        total_to_remove = len(packages)
+        for i, pkg_name in enumerate(packages):
+            self.check_cancelled()
+            self.emit("status", message=f"Uninstalling {i+1}/{total_to_remove}: {pkg_name}...", detail="")
+            try:
+                subprocess.check_call([self.python_executable, "-m", "pip", "uninstall", "-y", pkg_name],
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT, startupinfo=_hidden_startupinfo())
+                uninstalled_log.append(pkg_name)
+                self.emit("uninstalled", package=pkg_name)
+            except subprocess.CalledProcessError:
+                failed_log.append(pkg_name)
+                self.emit("uninstall_failed", package=pkg_name)
+            except Exception as e:
+                failed_log.append(f"{pkg_name} (error)")
+                self.emit("uninstall_failed", package=pkg_name, error=str(e))
+        return uninstalled_log, failed_log
+
+    def write_diagnostic_report(self, report_path, diagnosis, fmt="text", compress=False):
+        """Write a complete report for a diagnosis that was made without a streaming writer."""
+        with DiagnosticReportWriter(report_path, fmt, compress) as report:
+            if fmt != "text":
+                files_to_imports = defaultdict(set)
+                for imp, files in diagnosis["raw_imports"].items():
+                    for file_path in files:
+                        files_to_imports[file_path].add(imp)
+                for file_path in sorted(files_to_imports):
+                    report.file_imports(file_path, files_to_imports[file_path])
+            report.finish(diagnosis)
+        return report.path
+
+
+class DiagnosticReportWriter:
+    """Writes the diagnostic report while the scan runs.
+
+    ``jsonl`` and ``csv`` reports get one record per analyzed file as soon as it is
+    read, so other tools can follow a long scan and a cancelled scan still leaves
+    usable partial results. The ``text`` report keeps the grouped-by-import layout
+    and is therefore written by finish(). With ``compress`` the file is gzipped.
+    """
+
+    CSV_COLUMNS = ["record", "name", "file", "installed"]
+    FLUSH_EVERY = 500  # records between flushes, so readers see progress without a flush per file
+
+    def __init__(self, path, fmt="text", compress=False):
+        if fmt not in REPORT_FORMATS:
+            raise ValueError(f"Unknown report format: {fmt}")
+        if compress and not path.endswith(".gz"):
+            path += ".gz"
+        self.path = path
+        self.fmt = fmt
+        # csv needs newline="" so rows are not double-translated on Windows
+        newline = "" if fmt == "csv" else None
+        if compress:
+            self._file = gzip.open(path, "wt", encoding="utf-8", newline=newline)
+        else:
+            self._file = open(path, "w", encoding="utf-8", newline=newline, buffering=1024 * 1024)
+        self._csv = csv.writer(self._file) if fmt == "csv" else None
+        self._unflushed = 0
+        generated = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if fmt == "text":
+            self._file.write("--- SCRIPT LOGIC DIAGNOSTIC REPORT ---\n")
+            self._file.write(f"Report generated on: {generated}\n")
+            self._file.write("Scan limited to user-selected directories.\n")
+        elif fmt == "jsonl":
+            self._record(record="header", generated=generated)
+        else:
+            self._csv.writerow(self.CSV_COLUMNS)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _record(self, **fields):
+        if self.fmt == "jsonl":
+            self._file.write(json.dumps(fields) + "\n")
+        else:
+            self._csv.writerow([fields.get(column, "") for column in self.CSV_COLUMNS])
+        self._unflushed += 1
+        if self._unflushed >= self.FLUSH_EVERY:
+            self._file.flush()
+            self._unflushed = 0
+
+    def file_imports(self, file_path, imports):
+        if self.fmt == "jsonl":
+            self._record(record="file", file=file_path, imports=sorted(imports))
+        elif self.fmt == "csv":
+            for imp in sorted(imports):
+                self._record(record="import", name=imp, file=file_path)
+
+    def finish(self, diagnosis):
+        if self.fmt == "text":
+            self._write_text_sections(diagnosis)
+            return
+        installed = diagnosis["installed"]
+        for pkg, files in sorted(diagnosis["packages"].items()):
+            if self.fmt == "jsonl":
+                self._record(record="package", name=pkg, files=sorted(files), installed=pkg in installed)
+            else:
+                for file_path in sorted(files):
+                    self._record(record="package", name=pkg, file=file_path, installed=pkg in installed)
+        for pkg in sorted(diagnosis["unused"]):
+            self._record(record="unused", name=pkg)
+        for pkg in sorted(diagnosis["missing_reportable"]):
+            self._record(record="missing", name=pkg)
+        if self.fmt == "jsonl":
+            self._record(record="summary", packages=len(diagnosis["packages"]),
+                         unused=len(diagnosis["unused"]), missing=len(diagnosis["missing_reportable"]))
+
+    def _write_text_sections(self, diagnosis):
+        f_report = self._file
+        raw_imports = diagnosis["raw_imports"]
+        valid_pkgs = diagnosis["packages"]
+        # 1. Paths current script and package roster
+        f_report.write("\n\n--- SECTION 1: Paths current script and package roster ---\n")
+        f_report.write("Format: import_name\n----------------------------------------\n[path to each file using this import]\n")
+        if raw_imports:
+            for imp, files in sorted(raw_imports.items()):
+                f_report.write(f"{imp}\n")
+                f_report.write("-"*40 + "\n")
+                for file_path in sorted(files):
+                    f_report.write(f"{file_path}\n")
+                f_report.write("\n")
+        else:
+            f_report.write("No raw imports were collected.\n")
+        # 2. Packages installed with script dependencies
+        f_report.write("\n\n--- SECTION 2: Packages installed with script dependencies ---\n")
+        f_report.write("Format: package_name\n----------------------------------------\n[path to each file using this package]\n")
+        if diagnosis["installed_and_used"]:
+            for pkg in sorted(diagnosis["installed_and_used"]):
+                f_report.write(f"{pkg}\n")
+                f_report.write("-"*40 + "\n")
+                for file_path in sorted(valid_pkgs.get(pkg, set())):
+                    f_report.write(f"{file_path}\n")
+                f_report.write("\n")
+        else:
+            f_report.write("No installed packages are used by your scripts.\n")
+        # 3. Packages Needing Deletion (They are not needed)
+        f_report.write("\n\n--- SECTION 3: Packages Needing Deletion (They are not needed) ---\n")
+        f_report.write("Format: package_name\n")
+        if diagnosis["unused"]:
+            f_report.write("\n".join(sorted(diagnosis["unused"])))
+        else:
+            f_report.write("No packages are staged for deletion.\n")
+        # 4. Packages Needing Installation (They are missing)
+        f_report.write("\n\n--- SECTION 4: Packages Needing Installation (They are missing) ---\n")
+        f_report.write("Format: package_name\n")
+        if diagnosis["missing_reportable"]:
+            f_report.write("\n".join(sorted(diagnosis["missing_reportable"])))
+        else:
+            f_report.write("No packages were identified as missing.\n")
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+def format_discovery_summary(discovery):
+    summary_lines = ["File Discovery Summary:"]
+    for dir_path, count in discovery["file_counts"].items():
+        summary_lines.append(f"\n{dir_path}:")
+        summary_lines.append(f"  - Found {count} Python file(s)")
+    summary_lines.append(f"\nTotal unique Python files found: {len(discovery['files'])}")
+    summary_lines.append(f"Total directories scanned: {discovery['scanned_dirs']}")
+    if discovery["skipped_dirs"] > 0:
+        summary_lines.append(f"Directories skipped (already scanned): {discovery['skipped_dirs']}")
+    return "\n".join(summary_lines)
+
+
+def _to_jsonable(value):
+    if isinstance(value, dict):
+        return {k: _to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (set, frozenset)):
+        return sorted(_to_jsonable(v) for v in value)
+    if isinstance(value, (list, tuple)):
+        return [_to_jsonable(v) for v in value]
+    return value
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Headless Python requirements collector: scan scripts, diagnose, install and clean up packages.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in [
+        ("scan", "Discover Python files and list the raw imports they use"),
+        ("diagnose", "Compare needed packages against the installed ones"),
+        ("install", "Install packages the scanned scripts need but are missing"),
+        ("cleanup", "List (or with --yes uninstall) packages no scanned script uses"),
+    ]:
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument("directories", nargs="+", help="Directories containing Python scripts")
+        sub.add_argument("--format", choices=["ndjson", "json"], default="ndjson",
+                         help="ndjson streams progress events; json prints one result document")
+        sub.add_argument("--settings", default=SETTINGS_INI, help="settings.ini with AlwaysInclude/AlwaysUninstall/ExcludeDirs")
+        sub.add_argument("--exclude", action="append", default=[], help="Extra directory to exclude (repeatable)")
+        sub.add_argument("--python", default=sys.executable, help="Interpreter whose packages are inspected/changed")
+        if name == "diagnose":
+            sub.add_argument("--report", help="Also write the diagnostic report to this path (written while the scan runs)")
+            sub.add_argument("--report-format", choices=sorted(REPORT_FORMATS), default="text", help="Diagnostic report format")
+            sub.add_argument("--compress", action="store_true", help="gzip the diagnostic report")
+        if name == "install":
+            sub.add_argument("--resume", action="store_true", help="Resume an interrupted install run from the journal")
+            sub.add_argument("--journal", default=RUN_JOURNAL_FILE, help="Run journal path")
+        if name == "cleanup":
+            sub.add_argument("--yes", action="store_true", help="Actually uninstall the unused packages")
+    args = parser.parse_args(argv)
+
+    stream = args.format == "ndjson"
+
+    def write_event(event):
+        sys.stdout.write(json.dumps(_to_jsonable(event)) + "\n")
+        sys.stdout.flush()
+
+    (always_include, always_uninstall, exclude_dirs), _ = load_settings(args.settings)
+    exclude_dirs.update(args.exclude)
+    engine = RequirementsEngine(always_include, always_uninstall, exclude_dirs,
+                                python_executable=args.python, on_event=write_event if stream else None)
+    result = {"command": args.command}
+    try:
+        journal = None
+        if args.command == "install":
+            journal = RunJournal(args.journal)
+            fingerprint = engine.inputs_fingerprint(args.directories)
+            if args.resume and journal.load() and journal.is_resumable(fingerprint):
+                engine.emit("resumed", pending=journal.pending_packages())
+                results = journal.attempted_for_report()
+                engine.install_packages(journal.pending_packages(), results, journal=journal)
+                journal.clear()
+                result["installed"] = results
+                return _finish(result, stream, write_event)
+
+        discovery = engine.discover_files(args.directories)
+        report = None
+        if args.command == "diagnose" and args.report:
+            report = DiagnosticReportWriter(args.report, args.report_format, args.compress)
+            result["report"] = report.path
+        try:
+            raw_imports = engine.analyze_imports(discovery["files"], report=report)
+        except BaseException:
+            # A cancelled or failed scan still leaves the per-file records written so far
+            if report:
+                report.close()
+            raise
+        if args.command == "scan":
+            result["files"] = discovery["files"]
+            result["raw_imports"] = raw_imports
+            return _finish(result, stream, write_event)
+
+        diagnosis = engine.diagnose(raw_imports)
+        if args.command == "diagnose":
+            if report:
+                with report:
+                    report.finish(diagnosis)
+            result.update({
+                "packages": diagnosis["packages"],
+                "missing": diagnosis["missing_reportable"],
+                "unused": diagnosis["unused"],
+            })
+        elif args.command == "install":
+            journal.start(fingerprint, discovery["files"], raw_imports, diagnosis["missing"])
+            results = []
+            engine.install_packages(diagnosis["missing"], results, journal=journal)
+            journal.clear()
+            result["installed"] = results
+        elif args.command == "cleanup":
+            unused, _ = engine.plan_cleanup(diagnosis["packages"].keys(), diagnosis["installed"])
+            result["unused"] = unused
+            if args.yes and unused:
+                result["uninstalled"], result["failed"] = engine.uninstall_packages(unused)
+        return _finish(result, stream, write_event)
+    except OperationCancelled:
+        result["cancelled"] = True
+        _finish(result, stream, write_event)
+        return 130
+
+
+def _finish(result, stream, write_event):
+    if stream:
+        result["event"] = "result"
+        write_event(result)
+    else:
+        print(json.dumps(_to_jsonable(result), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,96 +2,24 @@ import customtkinter as ctk
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import os
-import sys
-import importlib.metadata
-import importlib.util
-import datetime
 import subprocess
 import threading
 import platform
 import time
-import re
 import string
 from collections import defaultdict
 import ctypes
-import json
-import configparser
 import getpass
+import queue
 
-# --- Configurations ---
-# These are less critical now that we're not scanning system-wide,
-# but can still be useful for sub-folders within user-selected directories.
-EXCLUDED_SUBFOLDER_NAMES = { # Common folders to skip within a project
-    "__pycache__", ".git", ".hg", ".svn", "venv", ".venv", "env", ".env",
-    "node_modules", "build", "dist", "target", "docs", "tests", "test" 
-}
-
-JUNK_IMPORT_WORDS = {
-    "__main__", "__builtin__", "__init__", "self", "cls", "args", "kwargs", "true", "false", "none",
-    "if", "else", "elif", "for", "while", "try", "except", "finally", "with", "as", "import", "from", "def", "class",
-    "return", "yield", "lambda", "pass", "continue", "break", "global", "nonlocal", "del", "assert",
-    "a", "an", "the", "it", "be", "to", "of", "for", "on", "at", "by", "this", "that", "all", "any", "some",
-    "main", "util", "utils", "helper", "helpers", "config", "setup", "example", "examples",
-    "script", "scripts", "tool", "tools", "lib", "core", "app", "src", "pkg", "module", "package", "project",
-    "data", "api", "client", "server", "common", "base", "interface", "model", "models", "view", "views",
-    "string", "int", "float", "bool", "list", "dict", "set", "tuple", "object", "function", "method",
-    "variable", "constant", "parameter", "argument", "index", "item", "value", "result", "status", "code",
-    "name", "file", "path", "root", "dir", "folder", "user", "users", "system", "windows", "linux", "mac",
-    "http", "https", "url", "uri", "ip", "port", "host", "json", "xml", "csv", "yaml", "html", "css", "js",
-    "date", "time", "datetime", "timestamp", "year", "month", "day", "hour", "minute", "second",
-    "foo", "bar", "baz", "qux",
-    "_abcoll", "_manylinux", "_pydev_bundle", "_pydev_runfiles", "_pydevd_bundle", "_pytest",
-    "_pydevd_bundle_ext", "_pydevd_frame_eval", "_pydevd_frame_eval_ext",
-    "_pydevd_sys_monitoring", "_pypy__", "_pypy_wait", "_subprocess", "_typeshed",
-    "distutils", "pkg_resources", "py", "python",
-    # Adding local module names that were causing false positives
-    "documentversionexplorer", "log_workspace_action", "model_loader", "openaiwhisper",
-    "venv_creator", "video_frame_snatcher", "win32clipboard", "win32con", "win32file",
-    "youtube_caption_fetcher", "youtube_captionfetcher"  # Adding both variations
-}
-PROTECTED_PACKAGES = {
-    "pip", "setuptools", "wheel", "customtkinter", "python-dotenv",
-    "certifi", "charset-normalizer", "idna", "requests", "urllib3", 
-    "packaging", "pyparsing", "colorama", "python", "py", "openai-whisper"
-}
-USER_STDLIB_MODULE_LIST = [
-    "abc", "argparse", "asyncio", "base64", "collections", "concurrent", "contextlib", "copy", "csv", "datetime",
-    "decimal", "difflib", "enum", "fileinput", "fnmatch", "functools", "glob", "gzip", "hashlib", "heapq",
-    "hmac", "html", "http", "importlib", "inspect", "io", "itertools", "json", "logging", "math",
-    "multiprocessing", "operator", "os", "pathlib", "pickle", "platform", "pprint", "queue", "random",
-    "re", "selectors", "shutil", "signal", "socket", "sqlite3", "ssl", "stat", "string", "struct",
-    "subprocess", "sys", "tempfile", "threading", "time", "timeit", "types", "typing", "unittest",
-    "urllib", "uuid", "warnings", "weakref", "xml", "xmlrpc", "zipfile", "zlib", "configparser", "email",
-    "imp", "msvcrt", "winsound", "winreg", "sysconfig", "_thread", "builtins"
-]
-USER_MODULE_TO_PACKAGE_MAPPING = {
-    "PIL": "pillow", "sklearn": "scikit-learn", "cv2": "opencv-python", "bs4": "beautifulsoup4",
-    "wx": "wxPython", "tk": "tk", "tkinter": "tkinter", "matplotlib": "matplotlib", "np": "numpy",
-    "pd": "pandas", "plt": "matplotlib", "customtkinter": "customtkinter", "ctk": "customtkinter",
-    "pyside6": "PySide6", "win32com": "pywin32", "win32api": "pywin32", "win32gui": "pywin32",
-    "pythoncom": "pywin32", "pywintypes": "pywin32",
-    "sentence_transformers": "sentence-transformers",  # Adding proper mapping
-    "openaiwhisper": "openai-whisper",  # Adding proper mapping
-    "whisper": "openai-whisper",  # Also map the base module name
-    "openai_whisper": "openai-whisper",  # Add underscore variant
-    "OpenAIWhisper": "openai-whisper",  # Add CamelCase variant
-}
-USER_IMPORT_PATTERNS = [
-    r'^\s*import\s+([a-zA-Z_][a-zA-Z0-9_.]*)',
-    r'^\s*from\s+([a-zA-Z_][a-zA-Z0-9_.]*)\s+import',
-    r'^\s*import\s+([a-zA-Z_][a-zA-Z0-9_.]*)\s+as\s+\w+'
-]
-
-SETTINGS_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'settings.ini')
-
-DEFAULT_EXCLUDE_DIRS = [
-    os.path.join('%USERPROFILE%', 'AppData'),
-    os.path.join('%USERPROFILE%', 'Music'),
-    os.path.join('%USERPROFILE%', 'Searches'),
-    os.path.join('%USERPROFILE%', 'AppData', 'Roaming'),
-    os.path.join('%USERPROFILE%', 'Downloads'),
-    os.path.join('%USERPROFILE%', 'Favorites'),
-]
+from requirements_engine import (
+    RunJournal, RequirementsEngine, OperationCancelled, ProgressChannel, DiagnosticReportWriter, REPORT_FORMATS,
+    format_discovery_summary, load_settings, save_settings
+)
+import requirements_engine
+
+PROGRESS_REFRESH_MS = 100  # Status labels are redrawn at most 10 times a second
+REPORT_FORMAT_CHOICES = {"Text (.log)": "text", "JSON Lines (.jsonl)": "jsonl", "CSV (.csv)": "csv"}
 
 class RequirementsDoctor(ctk.CTk):
     def __init__(self):
@@ -101,6 +29,11 @@ class RequirementsDoctor(ctk.CTk):
         self.title("Targeted Requirements Doctor")
         self.geometry("800x750")
         self.cancel_event = threading.Event()
+        self.run_journal = RunJournal()
+        self.progress_channel = ProgressChannel()
+        self.rendered_progress_version = 0
+        self.main_thread_calls = queue.Queue()
+        self.scan_thread = None
         self.user_home_dir = os.path.expanduser('~').lower()
         self.queued_directories = []
         self.always_include = set()
@@ -140,6 +73,13 @@ class RequirementsDoctor(ctk.CTk):
         self.mode_dropdown.grid(row=1, column=0, pady=(10, 5), padx=10, sticky="ew")
         self.mode_desc_label = ctk.CTkLabel(mode_section, text="", wraplength=600, justify="left")
         self.mode_desc_label.grid(row=2, column=0, pady=(0, 10), padx=10, sticky="ew")
+        report_opts = ctk.CTkFrame(mode_section, fg_color="transparent")
+        report_opts.grid(row=3, column=0, pady=(0, 10), padx=10, sticky="w")
+        ctk.CTkLabel(report_opts, text="Diagnostic report format:").pack(side="left", padx=(0, 10))
+        self.report_format_var = ctk.StringVar(value="Text (.log)")
+        ctk.CTkComboBox(report_opts, variable=self.report_format_var, values=list(REPORT_FORMAT_CHOICES), width=180).pack(side="left", padx=(0, 10))
+        self.report_compress_var = ctk.StringVar(value="off")
+        ctk.CTkCheckBox(report_opts, text="Compress (gzip)", variable=self.report_compress_var, onvalue="on", offvalue="off").pack(side="left")
 
         # --- Main Action Button ---
         self.start_button = ctk.CTkButton(self.main_frame, text="Run Diagnostic Scan on Queued Directories", command=self.scan_and_install, height=50, font=("Arial", 16))
@@ -246,67 +186,29 @@ class RequirementsDoctor(ctk.CTk):
             remove_btn.pack(side="right", padx=5, pady=5)
 
     def user_is_stdlib_module(self, module_name_to_check):
-        module_base_name = module_name_to_check.split('.')[0].lower()
-        if module_base_name in ["pillow", "pyside6", "customtkinter", "cv2"]: return False
-        if module_base_name in USER_STDLIB_MODULE_LIST: return True
-        try:
-            spec = importlib.util.find_spec(module_base_name)
-            if spec is None: return False
-            if spec.origin and "site-packages" in spec.origin.lower().replace("\\", "/"): return False
-            if spec.origin and any(lib_path in spec.origin.lower().replace("\\", "/") for lib_path in [os.path.join(sys.prefix, 'lib').lower(), os.path.join(sys.base_prefix, 'lib').lower()]):
-                 if "site-packages" not in spec.origin.lower().replace("\\", "/"): return True
-        except Exception: pass
-        return False
+        return requirements_engine.user_is_stdlib_module(module_name_to_check)
 
     def user_map_module_to_package(self, module_name_to_map):
-        # Handle cases like "from package.module import something" -> map "package.module"
-        # For simplicity, we'll map the base first, then if no map, the full.
-        # Or, more effectively, map known full dotted paths if they are common.
-        # For now, using the original simpler logic for direct import names:
-        base_module_name = module_name_to_map.split('.')[0] # e.g. PIL from PIL.Image
-        if base_module_name in USER_MODULE_TO_PACKAGE_MAPPING:
-            return USER_MODULE_TO_PACKAGE_MAPPING[base_module_name]
-        if module_name_to_map in USER_MODULE_TO_PACKAGE_MAPPING: # For direct map like 'cv2'
-             return USER_MODULE_TO_PACKAGE_MAPPING[module_name_to_map]
-        return base_module_name # Default to base module name if no specific mapping
+        return requirements_engine.user_map_module_to_package(module_name_to_map)
 
     def map_and_normalize_imports(self, raw_imports):
         """Map and normalize all import names to PyPI package names, filter out stdlib and junk."""
-        current_sys_stdlib = set(sys.stdlib_module_names)
-        if sys.version_info >= (3, 10):
-            current_sys_stdlib.update(sys.builtin_module_names)
-        mapped_pkgs = defaultdict(set)
-        for raw_import_name, source_files in raw_imports.items():
-            base_module_for_check = raw_import_name.split('.')[0]
-            
-            # --- HANDLING FOR WHISPER VARIANTS ---
-            # Skip all variants of openai whisper to avoid duplicate installations
-            if (base_module_for_check.lower().replace("_", "") == "openaiwhisper" or
-                base_module_for_check.lower() == "whisper" or 
-                base_module_for_check.lower() == "openai-whisper"):
-                print(f"[DEBUG] Whisper variant: Mapping '{raw_import_name}' to 'openai-whisper'")
-                mapped_pkgs["openai-whisper"].update(source_files)
-                continue
-                
-            print(f"[DEBUG] Checking import: {base_module_for_check.lower()}")
-            if base_module_for_check.lower() in JUNK_IMPORT_WORDS:
-                print(f"[DEBUG] Ignoring: {base_module_for_check.lower()} (in JUNK_IMPORT_WORDS)")
-                continue
-            if self.user_is_stdlib_module(base_module_for_check) or base_module_for_check.lower() in current_sys_stdlib:
-                continue
-            pypi_pkg_name = self.user_map_module_to_package(raw_import_name)
-            pypi_pkg_base_name = pypi_pkg_name.split('.')[0].lower()
-            if self.user_is_stdlib_module(pypi_pkg_base_name) or pypi_pkg_base_name in current_sys_stdlib:
-                continue
-            if pypi_pkg_name.startswith('_') and pypi_pkg_name not in {"_cffi_backend"}: continue
-            if not re.match(r"^[a-zA-Z0-9_.-]+$", pypi_pkg_name): continue
-            mapped_pkgs[pypi_pkg_name.lower()].update(source_files)
-        # Always include packages (map and normalize to PyPI names)
-        for pkg in self.always_include:
-            mapped_name = self.user_map_module_to_package(pkg).lower()
-            if mapped_name not in mapped_pkgs:
-                mapped_pkgs[mapped_name] = {'[AlwaysInclude]'}
-        return mapped_pkgs
+        return requirements_engine.map_and_normalize_imports(raw_imports, self.always_include)
+
+    def create_engine(self):
+        """Engine bound to the current settings, reporting progress into the status labels."""
+        return RequirementsEngine(self.always_include, self.always_uninstall, self.exclude_dirs,
+                                  cancel_event=self.cancel_event, on_event=self.handle_engine_event)
+
+    def handle_engine_event(self, event):
+        """Runs on the scan thread: only publishes, never touches Tk."""
+        kind = event["event"]
+        if kind in ("status", "progress"):
+            self.progress_channel.publish(event)
+        elif kind == "install_failed":
+            print(f"[DEBUG] Install failed: {event['package']} (pip error {event['returncode']})")
+        elif kind == "warning":
+            print(event["message"])
 
     def scan_and_install(self):
         if not self.queued_directories:
@@ -317,178 +219,165 @@ class RequirementsDoctor(ctk.CTk):
         self.progress_frame.pack(fill="both", expand=True, padx=20, pady=20)
         self.progress_bar.start()
         self.cancel_event.clear()  # Reset cancel event
-        raw_imports_to_files_map = defaultdict(set)
-        installed_now_for_report = []
+        engine = self.create_engine()
         is_diagnostic_run = "Diagnostic" in self.operation_mode_var.get()
+        inputs_fingerprint = engine.inputs_fingerprint(self.queued_directories)
+        # --- Offer to resume an interrupted Production run with the same inputs ---
+        resume_run = False
+        if not is_diagnostic_run and self.run_journal.load() and self.run_journal.is_resumable(inputs_fingerprint):
+            pending_count = len(self.run_journal.pending_packages())
+            resume_run = messagebox.askyesno(
+                "Resume Previous Run",
+                f"An interrupted run over the same directories was found (started {self.run_journal.data.get('started', 'unknown')}).\n"
+                f"{pending_count} package(s) are still waiting to be installed and no scanned file has changed.\n\n"
+                "Resume it and skip file discovery and analysis?",
+                parent=self
+            )
+            if not resume_run:
+                self.run_journal.clear()
+        report_settings = None
+        if is_diagnostic_run:
+            # The report file is only created once discovery is confirmed, then written while files are analyzed
+            report_format = REPORT_FORMAT_CHOICES.get(self.report_format_var.get(), "text")
+            compress = self.report_compress_var.get() == "on"
+            report_path = self.next_report_path(REPORT_FORMATS[report_format] + (".gz" if compress else ""))
+            report_settings = (report_path, report_format, compress)
+        # The scan itself runs off the Tk thread; poll_scan_worker samples its progress
+        self.scan_thread = threading.Thread(target=self.run_scan, args=(engine, is_diagnostic_run, inputs_fingerprint, resume_run, report_settings), daemon=True)
+        self.scan_thread.start()
+        self.poll_scan_worker()
+
+    def next_report_path(self, extension):
+        """diagnostic_report<extension> in Downloads, numbered so an earlier report is never overwritten."""
+        downloads_dir = self.get_downloads_dir()
+        report_path = os.path.join(downloads_dir, "diagnostic_report" + extension)
+        counter = 2
+        while os.path.exists(report_path):
+            report_path = os.path.join(downloads_dir, f"diagnostic_report ({counter}){extension}")
+            counter += 1
+        return report_path
+
+    def run_scan(self, engine, is_diagnostic_run, inputs_fingerprint, resume_run, report_settings):
+        valid_pypi_pkgs_to_files_map = defaultdict(set)
+        current_installed_system_pkgs_set = set()
+        installed_now_for_report = []
         final_status_message = "Operation completed."
+        installing = False
         try:
-            self.update_status("Initial scan: Discovering Python files...")
-            all_py_files = set()
-            scanned_dirs = set()
-            file_counts = defaultdict(int)
-            duplicate_dirs = set()
-            # Expand environment variables in exclude_dirs
-            expanded_exclude_dirs = [os.path.expandvars(path) for path in self.exclude_dirs]
-            expanded_exclude_dirs = [os.path.normpath(path) for path in expanded_exclude_dirs]
-            for dir_idx, directory_to_scan in enumerate(self.queued_directories):
-                if self.cancel_event.is_set():
-                    self.on_complete(defaultdict(set), [], [], "Operation cancelled.", is_diagnostic_run)
+            if resume_run:
+                self.update_status("Resuming previous run from journal...")
+                valid_pypi_pkgs_to_files_map = self.map_and_normalize_imports(self.run_journal.raw_imports())
+                current_installed_system_pkgs_set = self.get_current_installed_pypi_packages()
+                missing_packages_to_install = self.run_journal.pending_packages()
+                installed_now_for_report = self.run_journal.attempted_for_report()
+            else:
+                self.update_status("Initial scan: Discovering Python files...")
+                discovery = engine.discover_files(self.queued_directories)
+                if not discovery["files"]:
+                    self.run_on_main_thread(self.on_complete, defaultdict(set), [], [], "No Python files found in selected directories.", is_diagnostic_run)
                     return
-                directory_to_scan = os.path.normpath(directory_to_scan)
-                self.update_status(f"Scanning Directory {dir_idx+1}/{len(self.queued_directories)}", f"...{directory_to_scan[-50:]}")
-                for root, dirs, files_in_dir in os.walk(directory_to_scan, topdown=True):
-                    if self.cancel_event.is_set():
-                        self.on_complete(defaultdict(set), [], [], "Operation cancelled.", is_diagnostic_run)
-                        return
-                    # Exclude subfolders by name (as before)
-                    dirs[:] = [d for d in dirs if d.lower() not in {name.lower() for name in EXCLUDED_SUBFOLDER_NAMES}]
-                    # Exclude by full path (new logic)
-                    root_norm = os.path.normpath(root)
-                    if any(root_norm.startswith(excl) for excl in expanded_exclude_dirs):
-                        continue
-                    if root in scanned_dirs:
-                        duplicate_dirs.add(root)
-                        continue
-                    scanned_dirs.add(root)
-                    for file_name in files_in_dir:
-                        if file_name.lower().endswith(('.py', '.pyw')):
-                            full_path = os.path.join(root, file_name)
-                            all_py_files.add(full_path)
-                            file_counts[directory_to_scan] += 1
-            if not all_py_files:
-                self.on_complete(defaultdict(set), [], [], "No Python files found in selected directories.", is_diagnostic_run)
-                return
-            summary_lines = ["File Discovery Summary:"]
-            total_files = len(all_py_files)
-            total_dirs = len(scanned_dirs)
-            skipped_dirs = len(duplicate_dirs)
-            for dir_path, count in file_counts.items():
-                summary_lines.append(f"\n{dir_path}:")
-                summary_lines.append(f"  - Found {count} Python file(s)")
-            summary_lines.append(f"\nTotal unique Python files found: {total_files}")
-            summary_lines.append(f"Total directories scanned: {total_dirs}")
-            if skipped_dirs > 0:
-                summary_lines.append(f"Directories skipped (already scanned): {skipped_dirs}")
-            summary_text = "\n".join(summary_lines)
-            if not messagebox.askyesno(
-                "File Discovery Complete",
-                f"{summary_text}\n\nProceed with analysis?",
-                parent=self
-            ):
-                self.on_complete(defaultdict(set), [], [], "Operation cancelled by user.", is_diagnostic_run)
-                return
-            self.update_status(f"Analyzing imports from {total_files} files...")
-            for i, file_path in enumerate(all_py_files):
-                if self.cancel_event.is_set():
-                    self.on_complete(defaultdict(set), [], [], "Operation cancelled.", is_diagnostic_run)
+                if not self.run_on_main_thread(
+                    messagebox.askyesno,
+                    "File Discovery Complete",
+                    f"{format_discovery_summary(discovery)}\n\nProceed with analysis?",
+                    parent=self
+                ):
+                    self.run_on_main_thread(self.on_complete, defaultdict(set), [], [], "Operation cancelled by user.", is_diagnostic_run)
                     return
-                self.update_status(
-                    f"Analyzing file {i+1}/{total_files} ({(i+1)/total_files*100:.1f}%)",
-                    f"...{file_path}"
-                )
+                report = None
+                if is_diagnostic_run:
+                    try:
+                        report = DiagnosticReportWriter(*report_settings)
+                    except OSError as e:
+                        self.run_on_main_thread(self.on_complete, defaultdict(set), [], [], f"Could not create the diagnostic report: {e}", is_diagnostic_run)
+                        return
                 try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f_content:
-                        content = f_content.read()
-                        for pattern in USER_IMPORT_PATTERNS:
-                            matches = re.finditer(pattern, content, re.MULTILINE)
-                            for match in matches:
-                                module_name_match = match.group(1)
-                                if module_name_match:
-                                    raw_imports_to_files_map[module_name_match].add(file_path)
-                except (PermissionError, FileNotFoundError, OSError) as e:
-                    print(f"Error reading {file_path}: {e}")
-                    continue
-            # --- Consistent mapping/normalization for all steps ---
-            valid_pypi_pkgs_to_files_map = self.map_and_normalize_imports(raw_imports_to_files_map)
-            needed_pypi_pkgs_set = set(valid_pypi_pkgs_to_files_map.keys())
-            current_installed_system_pkgs_set = {pkg.lower() for pkg in self.get_current_installed_pypi_packages()}
-            missing_packages_to_install = sorted(list(needed_pypi_pkgs_set - current_installed_system_pkgs_set))
-            if is_diagnostic_run:
-                self.generate_diagnostic_report(raw_imports_to_files_map, valid_pypi_pkgs_to_files_map, current_installed_system_pkgs_set, missing_packages_to_install)
-                return
-            if not missing_packages_to_install:
-                final_status_message = "System is up to date. No new packages to install based on selected directories."
-                self.on_complete(valid_pypi_pkgs_to_files_map, [], list(current_installed_system_pkgs_set), final_status_message, is_diagnostic_run)
-                return
-            total_missing = len(missing_packages_to_install)
-            for i, pkg_to_install in enumerate(missing_packages_to_install):
-                if self.cancel_event.is_set():
-                    self.on_complete(valid_pypi_pkgs_to_files_map, installed_now_for_report, list(current_installed_system_pkgs_set), "Operation cancelled.", is_diagnostic_run)
+                    raw_imports_to_files_map = engine.analyze_imports(discovery["files"], report=report)
+                    # --- Consistent mapping/normalization for all steps ---
+                    diagnosis = engine.diagnose(raw_imports_to_files_map)
+                    if report:
+                        report.finish(diagnosis)
+                finally:
+                    if report:
+                        report.close()
+                valid_pypi_pkgs_to_files_map = diagnosis["packages"]
+                current_installed_system_pkgs_set = diagnosis["installed"]
+                missing_packages_to_install = diagnosis["missing"]
+                if is_diagnostic_run:
+                    self.run_on_main_thread(self.generate_diagnostic_report, report.path)
                     return
-                self.update_status(f"Installing package {i+1}/{total_missing}", f"pip install {pkg_to_install}")
-                print(f"[DEBUG] Attempting to install: {pkg_to_install}")  # DEBUG LINE
-                try:
-                    startupinfo = None
-                    if platform.system() == "Windows":
-                        startupinfo = subprocess.STARTUPINFO()
-                        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                    subprocess.check_call([sys.executable, '-m', 'pip', 'install', pkg_to_install], stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT, startupinfo=startupinfo)
-                    installed_now_for_report.append(pkg_to_install)
-                except subprocess.CalledProcessError as e:
-                    installed_now_for_report.append(f"{pkg_to_install} (FAILED: pip error {e.returncode})")
+                if not missing_packages_to_install:
+                    final_status_message = "System is up to date. No new packages to install based on selected directories."
+                    self.run_on_main_thread(self.on_complete, valid_pypi_pkgs_to_files_map, [], list(current_installed_system_pkgs_set), final_status_message, is_diagnostic_run)
+                    return
+                # Journal the scan results before installing so a crash or cancel can resume here
+                self.run_journal.start(inputs_fingerprint, discovery["files"], raw_imports_to_files_map, missing_packages_to_install)
+            installing = True
+            engine.install_packages(missing_packages_to_install, installed_now_for_report, journal=self.run_journal)
+            # Every package has been attempted; nothing left to resume
+            self.run_journal.clear()
             num_successful_installs = sum(1 for p in installed_now_for_report if "(FAILED" not in p)
             final_status_message = f"Successfully installed {num_successful_installs} of {len(installed_now_for_report)} attempted package(s)."
+        except OperationCancelled:
+            if installing:
+                self.run_on_main_thread(self.on_complete, valid_pypi_pkgs_to_files_map, installed_now_for_report, list(current_installed_system_pkgs_set), "Operation cancelled. Run again to resume the remaining installs.", is_diagnostic_run)
+            else:
+                self.run_on_main_thread(self.on_complete, defaultdict(set), [], [], "Operation cancelled.", is_diagnostic_run)
+            return
         except Exception as e:
             final_status_message = f"An unexpected error occurred: {str(e)}"
-        final_installed_system_pkgs_set = {pkg.lower() for pkg in self.get_current_installed_pypi_packages()}
-        self.on_complete(valid_pypi_pkgs_to_files_map, installed_now_for_report, list(final_installed_system_pkgs_set), final_status_message, is_diagnostic_run)
-
-    def generate_diagnostic_report(self, raw_imports, valid_pkgs, installed_set, missing_list):
-        self.progress_bar.stop()
+        final_installed_system_pkgs_set = self.get_current_installed_pypi_packages()
+        self.run_on_main_thread(self.on_complete, valid_pypi_pkgs_to_files_map, installed_now_for_report, list(final_installed_system_pkgs_set), final_status_message, is_diagnostic_run)
+
+    def run_on_main_thread(self, func, *args, **kwargs):
+        """Called from the scan thread: have the Tk thread run func and wait for its result."""
+        reply = queue.Queue(maxsize=1)
+        self.main_thread_calls.put((func, args, kwargs, reply))
+        return reply.get()
+
+    def poll_scan_worker(self):
+        """Tk-thread loop while a scan runs: redraw progress and service dialog/completion requests."""
+        worker_alive = self.scan_thread is not None and self.scan_thread.is_alive()
+        self.render_progress()
+        while True:
+            try:
+                func, args, kwargs, reply = self.main_thread_calls.get_nowait()
+            except queue.Empty:
+                break
+            result = None
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                print(f"Error in {getattr(func, '__name__', func)}: {e}")
+            reply.put(result)
+        # Checked before draining so a request queued just before the worker exited is still serviced
+        if worker_alive:
+            self.after(PROGRESS_REFRESH_MS, self.poll_scan_worker)
+
+    def render_progress(self):
+        version, message, detail, phase, current, total, path = self.progress_channel.snapshot()
+        if version == self.rendered_progress_version:
+            return
+        self.rendered_progress_version = version
+        if phase == "analyze" and total:
+            message = f"Analyzing file {current}/{total} ({current/total*100:.1f}%)"
+            detail = f"...{path}"
+        elif phase == "discover":
+            detail = f"{total} Python file(s) found in {current} folder(s)"
+        self.status_drive_label.configure(text=message)
+        self.status_file_label.configure(text=detail)
+
+    def get_downloads_dir(self):
         downloads_dir = os.path.join(os.path.expanduser('~'), 'Downloads')
         if not os.path.exists(downloads_dir):
             try: os.makedirs(downloads_dir)
             except OSError: downloads_dir = os.path.expanduser('~')
-        report_path = os.path.join(downloads_dir, "diagnostic_report.log")
-        with open(report_path, 'w', encoding='utf-8') as f_report: 
-            f_report.write("--- SCRIPT LOGIC DIAGNOSTIC REPORT ---\n")
-            f_report.write(f"Report generated on: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f_report.write(f"Scan limited to user-selected directories.\n")
-            # 1. Paths current script and package roster
-            f_report.write("\n\n--- SECTION 1: Paths current script and package roster ---\n")
-            f_report.write("Format: import_name\n----------------------------------------\n[path to each file using this import]\n")
-            if raw_imports:
-                for imp, files in sorted(raw_imports.items()):
-                    f_report.write(f"{imp}\n")
-                    f_report.write("-"*40 + "\n")
-                    for file_path in sorted(files):
-                        f_report.write(f"{file_path}\n")
-                    f_report.write("\n")
-            else:
-                f_report.write("No raw imports were collected.\n")
-            # 2. Packages installed with script dependencies
-            f_report.write("\n\n--- SECTION 2: Packages installed with script dependencies ---\n")
-            f_report.write("Format: package_name\n----------------------------------------\n[path to each file using this package]\n")
-            # Only include packages that are both installed and used by scripts
-            installed_and_used = set(valid_pkgs.keys()) & set(installed_set)
-            if installed_and_used:
-                for pkg in sorted(installed_and_used):
-                    files = valid_pkgs.get(pkg, set())
-                    f_report.write(f"{pkg}\n")
-                    f_report.write("-"*40 + "\n")
-                    for file_path in sorted(files):
-                        f_report.write(f"{file_path}\n")
-                    f_report.write("\n")
-            else:
-                f_report.write("No installed packages are used by your scripts.\n")
-            # 3. Packages Needing Deletion (They are not needed)
-            f_report.write("\n\n--- SECTION 3: Packages Needing Deletion (They are not needed) ---\n")
-            f_report.write("Format: package_name\n")
-            # Exclude protected packages, always_include packages, and packages in always_uninstall
-            staged_for_deletion = set(installed_set) - set(valid_pkgs.keys()) - PROTECTED_PACKAGES - self.always_include
-            if staged_for_deletion:
-                f_report.write("\n".join(sorted(list(staged_for_deletion))))
-            else:
-                f_report.write("No packages are staged for deletion.\n")
-            # 4. Packages Needing Installation (They are missing)
-            f_report.write("\n\n--- SECTION 4: Packages Needing Installation (They are missing) ---\n")
-            f_report.write("Format: package_name\n")
-            # Filter out packages that are in always_uninstall
-            missing_list = [pkg for pkg in missing_list if pkg.lower() not in {p.lower() for p in self.always_uninstall}]
-            if missing_list:
-                f_report.write("\n".join(sorted(missing_list)))
-            else:
-                f_report.write("No packages were identified as missing.\n")
+        return downloads_dir
+
+    def generate_diagnostic_report(self, report_path):
+        """Announce a finished diagnostic report (already written by the scan) and open its folder."""
+        self.progress_bar.stop()
+        downloads_dir = os.path.dirname(report_path)
         final_message = f"Diagnostic Mode complete.\nA detailed report has been saved to:\n{report_path}"
         # Auto-open the Downloads directory after report is saved
         try:
@@ -509,10 +398,7 @@ class RequirementsDoctor(ctk.CTk):
             return
 
         self.progress_bar.stop()
-        downloads_dir = os.path.join(os.path.expanduser('~'), 'Downloads')
-        if not os.path.exists(downloads_dir):
-            try: os.makedirs(downloads_dir)
-            except OSError: downloads_dir = os.path.expanduser('~')
+        downloads_dir = self.get_downloads_dir()
 
         # --- Install Results Popup ---
         already_present = []
@@ -594,52 +480,11 @@ class RequirementsDoctor(ctk.CTk):
 
     def launch_cleanup_wizard(self, needed_pypi_pkgs_set, all_system_pkgs_list):
         # Use the same normalization and set logic for deletion
-        all_installed_with_deps_info = self.get_installed_packages_with_deps()
-        all_system_pkgs_set = {pkg.lower() for pkg in all_system_pkgs_list}
-        needed_pypi_pkgs_set = {pkg.lower() for pkg in needed_pypi_pkgs_set}
-        # Exclude protected packages, always_include packages, and include always_uninstall packages
-        potentially_unused = all_system_pkgs_set - needed_pypi_pkgs_set - PROTECTED_PACKAGES - self.always_include
-        # Add packages from always_uninstall list
-        always_uninstall_lower = {pkg.lower() for pkg in self.always_uninstall}
-        potentially_unused.update(always_uninstall_lower)
+        potentially_unused, display_text_lines = self.create_engine().plan_cleanup(needed_pypi_pkgs_set, all_system_pkgs_list)
         if not potentially_unused:
             messagebox.showinfo("Cleanup Not Needed", "No unused packages (excluding protected) found to clean up.", parent=self)
             self.restart_app()
             return
-        display_text_lines = []
-        required_by_map = defaultdict(set)
-        for pkg, deps in all_installed_with_deps_info.items():
-            for dep in deps: required_by_map[dep].add(pkg)
-        unused_dependency_tree = defaultdict(set)
-        for pkg in sorted(list(potentially_unused)):
-            deps_of_pkg = all_installed_with_deps_info.get(pkg, set())
-            for dep in deps_of_pkg:
-                if dep in potentially_unused and not (required_by_map[dep] - potentially_unused - needed_pypi_pkgs_set):
-                     unused_dependency_tree[pkg].add(dep)
-        processed_for_display = set()
-        sorted_top_level_unused = sorted(list(potentially_unused - set(d for deps_list in unused_dependency_tree.values() for d in deps_list)))
-        for pkg in sorted_top_level_unused:
-            if pkg in processed_for_display: continue
-            # Mark packages from always_uninstall with a special indicator
-            if pkg in always_uninstall_lower:
-                display_text_lines.append(f"{pkg} [Always Uninstall]")
-            else:
-                display_text_lines.append(f"{pkg}")
-            processed_for_display.add(pkg)
-            if pkg in unused_dependency_tree:
-                for dep in sorted(list(unused_dependency_tree[pkg])):
-                    if dep in processed_for_display: continue
-                    if dep in always_uninstall_lower:
-                        display_text_lines.append(f"  - {dep} [Always Uninstall]")
-                    else:
-                        display_text_lines.append(f"  - {dep}")
-                    processed_for_display.add(dep)
-        for pkg in sorted(list(potentially_unused)):
-            if pkg not in processed_for_display:
-                if pkg in always_uninstall_lower:
-                    display_text_lines.append(f"{pkg} [Always Uninstall]")
-                else:
-                    display_text_lines.append(f"{pkg}")
         display_text = "\n".join(display_text_lines)
         dialog = ctk.CTkToplevel(self)
         dialog.title("Cleanup Wizard (Stage 1): Review & Edit")
@@ -696,44 +541,16 @@ class RequirementsDoctor(ctk.CTk):
             if not final_packages_to_remove:
                 messagebox.showinfo("No Selection", "No packages were selected for uninstallation.", parent=dialog)
                 return
-            def uninstall_thread_target():
-                uninstalled_log, failed_log = [], []
-                total_to_remove = len(final_packages_to_remove)
-                for i, pkg_name in enumerate(final_packages_to_remove):
-                    if self.cancel_event.is_set(): 
-                        try:
-                            if status_label.winfo_exists():
-                                status_label.configure(text="Uninstallation cancelled.")
-                        except Exception:
-                            pass
-                        break
-                    try:
-                        if status_label.winfo_exists():
-                            status_label.configure(text=f"Uninstalling {i+1}/{total_to_remove}: {pkg_name}...")
-                    except Exception:
-                        pass
-                    
-                    try:
-                        startupinfo = None
-                        if platform.system() == "Windows":
-                            startupinfo = subprocess.STARTUPINFO()
-                            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                        subprocess.check_call([sys.executable, "-m", "pip", "uninstall", "-y", pkg_name], stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT, startupinfo=startupinfo)
-                        uninstalled_log.append(pkg_name)
-                    except subprocess.CalledProcessError: 
-                        failed_log.append(pkg_name)
-                    except Exception as e:
-                        print(f"Error uninstalling {pkg_name}: {e}")
-                        failed_log.append(f"{pkg_name} (error)")
-                        
-                report_message = f"Uninstallation process finished.\nSuccessfully uninstalled: {len(uninstalled_log)}\n"
-                if uninstalled_log: report_message += f" ({', '.join(uninstalled_log)})\n"
-                report_message += f"Failed to uninstall: {len(failed_log)}\n"
-                if failed_log: report_message += f" ({', '.join(failed_log)})\n"
-                
+            # Tk is only touched on the main thread: the worker posts these through run_on_main_thread
+            def set_uninstall_status(text):
                 try:
                     if status_label.winfo_exists():
-                        status_label.configure(text="Uninstallation complete!")
+                        status_label.configure(text=text)
+                except Exception:
+                    pass
+            def finish_uninstall(report_message):
+                set_uninstall_status("Uninstallation complete!")
+                try:
                     messagebox.showinfo("Uninstallation Complete", report_message, parent=self)
                 except Exception:
                     # Fallback if dialog was closed
@@ -746,7 +563,27 @@ class RequirementsDoctor(ctk.CTk):
                     pass
                     
                 self.restart_app()
-            threading.Thread(target=uninstall_thread_target, daemon=True).start()
+            def uninstall_thread_target():
+                uninstalled_log, failed_log = [], []
+                def show_uninstall_status(event):
+                    if event["event"] == "status":
+                        self.run_on_main_thread(set_uninstall_status, event["message"])
+                engine = RequirementsEngine(self.always_include, self.always_uninstall, self.exclude_dirs,
+                                            cancel_event=self.cancel_event, on_event=show_uninstall_status)
+                try:
+                    engine.uninstall_packages(final_packages_to_remove, uninstalled_log, failed_log)
+                except OperationCancelled:
+                    self.run_on_main_thread(set_uninstall_status, "Uninstallation cancelled.")
+
+                report_message = f"Uninstallation process finished.\nSuccessfully uninstalled: {len(uninstalled_log)}\n"
+                if uninstalled_log: report_message += f" ({', '.join(uninstalled_log)})\n"
+                report_message += f"Failed to uninstall: {len(failed_log)}\n"
+                if failed_log: report_message += f" ({', '.join(failed_log)})\n"
+                self.run_on_main_thread(finish_uninstall, report_message)
+            # Run as the worker poll_scan_worker services, so its main-thread requests are handled
+            self.scan_thread = threading.Thread(target=uninstall_thread_target, daemon=True)
+            self.scan_thread.start()
+            self.poll_scan_worker()
         button_frame = ctk.CTkFrame(dialog, fg_color="transparent")
         button_frame.pack(pady=10)
         uninstall_button = ctk.CTkButton(button_frame, text="Uninstall Selected Packages", command=do_final_uninstall, fg_color="red")
@@ -757,8 +594,7 @@ class RequirementsDoctor(ctk.CTk):
     def cancel_scan(self):
         """Handle cancellation of ongoing operations."""
         self.cancel_event.set()
-        self.status_drive_label.configure(text="Cancelling operation...")
-        self.status_file_label.configure(text="Please wait...")
+        self.update_status("Cancelling operation...", "Please wait...")
         self.cancel_button.configure(state="disabled")
         
     def restart_app(self):
@@ -766,109 +602,30 @@ class RequirementsDoctor(ctk.CTk):
         self.main_frame.pack(fill="both", expand=True, padx=30, pady=30)
         self.start_button.configure(state="normal")
         self.mode_dropdown.configure(state="normal") 
-        self.status_drive_label.configure(text="Preparing to scan...") # Reset status for next run
-        self.status_file_label.configure(text="")
+        self.update_status("Preparing to scan...") # Reset status for next run
 
     def get_installed_packages_with_deps(self):
         """Get a mapping of installed packages to their dependencies."""
-        try:
-            startupinfo = None
-            if platform.system() == "Windows":
-                startupinfo = subprocess.STARTUPINFO()
-                startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-            
-            # Get pip list output
-            result = subprocess.check_output(
-                [sys.executable, "-m", "pip", "list", "--format=json"],
-                stderr=subprocess.STDOUT,
-                startupinfo=startupinfo
-            ).decode('utf-8')
-            
-            # Parse the JSON output
-            installed_packages = json.loads(result)
-            package_to_deps = {}
-            
-            # For each installed package, get its dependencies
-            for pkg in installed_packages:
-                pkg_name = pkg['name']
-                try:
-                    deps_result = subprocess.check_output(
-                        [sys.executable, "-m", "pip", "show", pkg_name],
-                        stderr=subprocess.STDOUT,
-                        startupinfo=startupinfo
-                    ).decode('utf-8')
-                    
-                    # Parse dependencies from pip show output
-                    deps = set()
-                    for line in deps_result.split('\n'):
-                        if line.startswith('Requires:'):
-                            deps.update(d.strip() for d in line[9:].split(',') if d.strip())
-                    
-                    package_to_deps[pkg_name] = deps
-                except subprocess.CalledProcessError:
-                    package_to_deps[pkg_name] = set()
-            
-            return package_to_deps
-        except Exception as e:
-            print(f"Error getting package dependencies: {e}")
-            return {}
+        return requirements_engine.get_installed_packages_with_deps()
 
     def get_current_installed_pypi_packages(self):
         """Get a set of currently installed PyPI packages."""
-        try:
-            startupinfo = None
-            if platform.system() == "Windows":
-                startupinfo = subprocess.STARTUPINFO()
-                startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-            
-            # Get pip list output
-            result = subprocess.check_output(
-                [sys.executable, "-m", "pip", "list", "--format=json"],
-                stderr=subprocess.STDOUT,
-                startupinfo=startupinfo
-            ).decode('utf-8')
-            
-            # Parse the JSON output and extract package names
-            installed_packages = json.loads(result)
-            return {pkg['name'].lower() for pkg in installed_packages}
-        except Exception as e:
-            print(f"Error getting installed packages: {e}")
-            return set()
+        return requirements_engine.get_current_installed_pypi_packages()
 
     def update_status(self, drive_text, file_text=""):
-        """Update the status labels with current operation information."""
-        self.status_drive_label.configure(text=drive_text)
-        self.status_file_label.configure(text=file_text)
-        self.update_idletasks()  # Force GUI update
+        """Update the status labels with current operation information. Safe from any thread:
+        the text goes through the progress channel and is drawn on the Tk thread."""
+        self.progress_channel.publish({"event": "status", "message": drive_text, "detail": file_text})
+        if threading.current_thread() is threading.main_thread():
+            self.render_progress()
 
     def load_settings_ini(self):
-        config = configparser.RawConfigParser()
-        if os.path.exists(SETTINGS_INI):
-            config.read(SETTINGS_INI)
-            self.always_include = set(config.get('AlwaysInclude', 'packages', fallback='').splitlines())
-            self.always_uninstall = set(config.get('AlwaysUninstall', 'packages', fallback='').splitlines())
-            self.exclude_dirs = set(config.get('ExcludeDirs', 'paths', fallback='').splitlines())
-        else:
-            # Pre-populate with defaults if ini is missing
-            self.always_include = {'PySide6', 'OpenAIWhisper'}
-            self.always_uninstall = set()
-            self.exclude_dirs = set(DEFAULT_EXCLUDE_DIRS)
-            self.save_settings_ini()
-        # If the ini exists but AlwaysInclude is empty, pre-populate
-        if not self.always_include:
-            self.always_include = {'PySide6', 'OpenAIWhisper'}
-            self.save_settings_ini()
-        if not self.exclude_dirs:
-            self.exclude_dirs = set(DEFAULT_EXCLUDE_DIRS)
+        (self.always_include, self.always_uninstall, self.exclude_dirs), needs_save = load_settings()
+        if needs_save:
             self.save_settings_ini()
 
     def save_settings_ini(self):
-        config = configparser.RawConfigParser()
-        config['AlwaysInclude'] = {'packages': '\n'.join(sorted(self.always_include))}
-        config['AlwaysUninstall'] = {'packages': '\n'.join(sorted(self.always_uninstall))}
-        config['ExcludeDirs'] = {'paths': '\n'.join(sorted(self.exclude_dirs))}
-        with open(SETTINGS_INI, 'w', encoding='utf-8') as f:
-            config.write(f)
+        save_settings(self.always_include, self.always_uninstall, self.exclude_dirs)
 
     def edit_always_include(self):
         self._edit_list_dialog('Always Include Packages', self.always_include, self.save_always_include)
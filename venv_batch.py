@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+"""
+Venv Batch - run one operation across many venvs at once.
+
+Supported operations:
+    upgrade PACKAGE      pip install --upgrade PACKAGE in every venv
+    install FILE         bring every venv up to a requirements file (no removals)
+    audit                list outdated packages in every venv
+
+The venvs are processed concurrently by a bounded worker pool, each by its own
+pip subprocess. Before fanning out, wheels for upgrade/install are fetched once
+per Python version into the shared wheel cache (see venv_lock.py). Each venv
+then installs from that cache with --no-index, and only falls back to the
+package index if the cache can't satisfy it. Every venv gets a result row
+(status, summary, seconds), and the whole batch is timed as well.
+
+Command line usage:
+    python venv_batch.py upgrade requests [--venv PATH ...] [--workers 4]
+    python venv_batch.py install requirements.txt [--venv PATH ...]
+    python venv_batch.py audit [--venv PATH ...] [--format json]
+
+Without --venv, the live venvs recorded in the history store are used.
+"""
+import os
+import sys
+import json
+import time
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from venv_history_store import VenvHistoryStore, HISTORY_DB_FILE
+from venv_inventory import read_pyvenv_cfg
+from venv_dedup import known_venvs
+from venv_lock import WHEEL_CACHE_DIR, installed_distributions, requirement_name, venv_python
+import venv_sync
+
+BATCH_WORKERS = 4  # Concurrent pip processes; pip is mostly I/O but unpacking large wheels is CPU heavy
+BATCH_OPERATIONS = ("upgrade", "install", "audit")
+
+
+def _pip(venv_path, args):
+    return subprocess.run([venv_python(venv_path), "-m", "pip", "--disable-pip-version-check"] + args,
+                          capture_output=True, text=True)
+
+
+def _last_error_line(completed):
+    lines = [line for line in (completed.stderr or completed.stdout or "").strip().splitlines() if line.strip()]
+    return lines[-1] if lines else f"pip exited with {completed.returncode}"
+
+
+def _python_version(venv_path):
+    config = read_pyvenv_cfg(venv_path)
+    version = config.get("version") or config.get("version_info", "")
+    return ".".join(version.split(".")[:2]) or "unknown"
+
+
+def prefetch_wheels(venv_paths, pip_args, wheel_cache=WHEEL_CACHE_DIR, progress=None):
+    """Download/build wheels for pip_args once per Python version, into the shared cache.
+
+    Returns {python version: error message} for groups whose prefetch failed; those
+    venvs simply install from the index.
+    """
+    os.makedirs(wheel_cache, exist_ok=True)
+    by_version = {}
+    for venv_path in venv_paths:
+        by_version.setdefault(_python_version(venv_path), venv_path)
+    failures = {}
+    for version, venv_path in by_version.items():
+        if progress:
+            progress(f"Fetching wheels for Python {version} into the shared cache...")
+        completed = _pip(venv_path, ["wheel", "--wheel-dir", wheel_cache, "--find-links", wheel_cache] + pip_args)
+        if completed.returncode != 0:
+            failures[version] = _last_error_line(completed)
+    return failures
+
+
+def _install_with_cache(venv_path, args, wheel_cache, cache_first=True):
+    """pip install from the wheel cache only, then from the index if that fails. Returns (completed, source).
+
+    cache_first=False goes straight to the index, for venvs whose prefetch failed: the
+    cache may hold an older wheel that --no-index would happily settle for.
+    """
+    if cache_first:
+        completed = _pip(venv_path, ["install", "--no-index", "--find-links", wheel_cache] + args)
+        if completed.returncode == 0:
+            return completed, "cache"
+    return _pip(venv_path, ["install", "--find-links", wheel_cache] + args), "index"
+
+
+def upgrade_package(venv_path, package, wheel_cache=WHEEL_CACHE_DIR, cache_first=True):
+    before = installed_distributions(venv_path).get(requirement_name(package))
+    completed, source = _install_with_cache(venv_path, ["--upgrade", package], wheel_cache, cache_first)
+    if completed.returncode != 0:
+        return {"status": "failed", "summary": _last_error_line(completed)}
+    after = installed_distributions(venv_path).get(requirement_name(package))
+    old = before["version"] if before else "not installed"
+    new = after["version"] if after else "?"
+    summary = f"{package}: {old} (unchanged)" if old == new else f"{package}: {old} -> {new}"
+    return {"status": "ok", "summary": f"{summary} [{source}]"}
+
+
+def install_requirements(venv_path, requirements, wheel_cache=WHEEL_CACHE_DIR, cache_first=True):
+    """Minimal sync (venv_sync) against the requirements, never removing anything."""
+    plan = venv_sync.plan_sync(venv_path, requirements, remove_unlisted=False)
+    if venv_sync.plan_is_empty(plan):
+        return {"status": "ok", "summary": f"already satisfied ({len(plan['satisfied'])})"}
+    result = None
+    if cache_first:
+        result = venv_sync.apply_plan(venv_path, plan, ["--no-index", "--find-links", wheel_cache])
+        source = "cache"
+        if result["failed"]:
+            # Re-plan so what the cache did install isn't repeated, then let the index fill the gaps
+            plan = venv_sync.plan_sync(venv_path, requirements, remove_unlisted=False)
+            result = None
+    if result is None:
+        result = venv_sync.apply_plan(venv_path, plan, ["--find-links", wheel_cache])
+        source = "index"
+    changed = len(plan["install"]) + len(plan["upgrade"])
+    if result["failed"]:
+        return {"status": "failed", "summary": f"failed: {', '.join(result['failed'])}"}
+    return {"status": "ok", "summary": f"{changed} installed or changed [{source}]"}
+
+
+def audit_outdated(venv_path):
+    completed = _pip(venv_path, ["list", "--outdated", "--format", "json"])
+    if completed.returncode != 0:
+        return {"status": "failed", "summary": _last_error_line(completed)}
+    try:
+        outdated = json.loads(completed.stdout or "[]")
+    except ValueError:
+        return {"status": "failed", "summary": "could not parse pip output"}
+    if not outdated:
+        return {"status": "ok", "summary": "up to date", "outdated": []}
+    names = ", ".join(f"{p['name']} {p['version']}->{p['latest_version']}" for p in outdated)
+    return {"status": "outdated", "summary": f"{len(outdated)} outdated: {names}", "outdated": outdated}
+
+
+def read_requirements_file(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith(("#", "-"))]
+
+
+def run_batch(operation, venv_paths, argument=None, max_workers=BATCH_WORKERS,
+              wheel_cache=WHEEL_CACHE_DIR, progress=None, on_result=None, cancel_event=None):
+    """Apply operation to every venv with a bounded pool.
+
+    on_result(row) is called from worker threads as each venv finishes. Returns
+    {"rows": [...], "seconds": total, "prefetch_failures": {...}}.
+    """
+    start = time.perf_counter()
+    prefetch_failures = {}
+    if operation == "upgrade":
+        prefetch_failures = prefetch_wheels(venv_paths, [argument], wheel_cache, progress)
+        task = lambda venv_path: upgrade_package(venv_path, argument, wheel_cache,
+                                                 _python_version(venv_path) not in prefetch_failures)
+    elif operation == "install":
+        requirements = read_requirements_file(argument)
+        prefetch_failures = prefetch_wheels(venv_paths, ["-r", argument], wheel_cache, progress)
+        task = lambda venv_path: install_requirements(venv_path, requirements, wheel_cache,
+                                                      _python_version(venv_path) not in prefetch_failures)
+    elif operation == "audit":
+        task = audit_outdated
+    else:
+        raise ValueError(f"Unknown batch operation: {operation}")
+
+    def run_one(venv_path):
+        if cancel_event is not None and cancel_event.is_set():
+            return {"venv": venv_path, "status": "cancelled", "summary": "", "seconds": 0.0}
+        venv_start = time.perf_counter()
+        try:
+            row = task(venv_path)
+        except Exception as e:
+            row = {"status": "failed", "summary": str(e)}
+        row["venv"] = venv_path
+        row["seconds"] = round(time.perf_counter() - venv_start, 2)
+        return row
+
+    rows = []
+    if progress:
+        progress(f"Running {operation} on {len(venv_paths)} venvs ({max_workers} at a time)...")
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="venv-batch") as executor:
+        futures = [executor.submit(run_one, venv_path) for venv_path in venv_paths]
+        for future in as_completed(futures):
+            row = future.result()
+            rows.append(row)
+            if on_result:
+                on_result(row)
+    order = {venv_path: i for i, venv_path in enumerate(venv_paths)}
+    rows.sort(key=lambda r: order[r["venv"]])
+    return {"rows": rows, "seconds": round(time.perf_counter() - start, 2), "prefetch_failures": prefetch_failures}
+
+
+def format_row(row):
+    return f"{row['status']:<9} {row['seconds']:>6.1f}s  {row['venv']}\n{'':<18}{row['summary']}"
+
+
+def format_results(results):
+    rows = results["rows"]
+    counts = {}
+    for row in rows:
+        counts[row["status"]] = counts.get(row["status"], 0) + 1
+    serial = sum(row["seconds"] for row in rows)
+    lines = [format_row(row) for row in rows]
+    lines.append("")
+    lines.append(f"{len(rows)} venvs in {results['seconds']:.1f}s "
+                 f"(sum of per-venv times {serial:.1f}s): "
+                 + ", ".join(f"{count} {status}" for status, count in sorted(counts.items())))
+    for version, error in results["prefetch_failures"].items():
+        lines.append(f"Wheel prefetch for Python {version} failed ({error}); those venvs used the index.")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run an operation across many venvs concurrently.")
+    parser.add_argument("operation", choices=BATCH_OPERATIONS)
+    parser.add_argument("argument", nargs="?", help="Package to upgrade, or requirements file to install")
+    parser.add_argument("--venv", action="append", help="Venv to include (default: live venvs from the history)")
+    parser.add_argument("--db", default=HISTORY_DB_FILE)
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS)
+    parser.add_argument("--wheel-cache", default=WHEEL_CACHE_DIR)
+    parser.add_argument("--format", choices=["text", "json"], default="text")
+    args = parser.parse_args(argv)
+    if args.operation != "audit" and not args.argument:
+        parser.error(f"{args.operation} needs a package or requirements file")
+
+    venv_paths = args.venv or known_venvs(VenvHistoryStore(args.db))
+    progress = (lambda message: print(message, file=sys.stderr)) if args.format == "text" else None
+    results = run_batch(args.operation, venv_paths, args.argument, args.workers, args.wheel_cache, progress)
+    print(json.dumps(results, indent=2) if args.format == "json" else format_results(results))
+    return 1 if any(row["status"] == "failed" for row in results["rows"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
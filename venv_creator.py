@@ -12,9 +12,34 @@ import threading
 import datetime
 import webbrowser
 import platform
-
-# Store environment history in the script root folder
+import time
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from venv_history_store import VenvHistoryStore, HISTORY_DB_FILE, venv_path_key
+import venv_inventory
+import venv_dedup
+import venv_lock
+import venv_sync
+import venv_batch
+import venv_warmup
+
+# Store environment history in the script root folder; the JSON file is only read once to seed the database
 ENV_HISTORY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "venvs_history.json")
+history_store = VenvHistoryStore(HISTORY_DB_FILE, legacy_json_path=ENV_HISTORY_FILE)
+
+# Environment History dialog
+HISTORY_VISIBLE_ROWS = 12  # Row widgets created; scrolling re-points them at other entries
+HISTORY_WHEEL_ROWS = 3  # Rows moved per mouse wheel notch
+HISTORY_PROBE_TTL = 30  # Seconds a filesystem probe result stays fresh
+HISTORY_PROBE_WORKERS = 8
+HISTORY_PROBE_POLL_MS = 100  # How often finished probes are patched into the table
+ASSOCIATION_FILES = [
+    ".venv-association",
+    "run_this.vbs",
+    "run_this.bat",
+    "launcher.py",
+    "launcher_icon.ico"
+]
 
 class VenvCreatorDialog(ctk.CTkToplevel):
     def __init__(self, master, icon_path=None):
@@ -89,6 +114,10 @@ class VenvCreatorDialog(ctk.CTkToplevel):
         add_to_existing_btn = ctk.CTkButton(btn_frame, text="Add to Existing Venv", width=btn_width, height=btn_height, fg_color="#8E44AD", hover_color="#6C3483", command=self.add_packages_to_existing_venv)
         add_to_existing_btn.pack(pady=(0, 8))
         
+        # Rebuild a venv from a lockfile written by an earlier build
+        rebuild_lock_btn = ctk.CTkButton(btn_frame, text="Rebuild from Lock", width=btn_width, height=btn_height, fg_color="#8E44AD", hover_color="#6C3483", command=self.rebuild_venv_from_lock)
+        rebuild_lock_btn.pack(pady=(0, 8))
+        
         # Tooltips
         try:
             from CTkToolTip import CTkToolTip
@@ -97,6 +126,7 @@ class VenvCreatorDialog(ctk.CTkToplevel):
             CTkToolTip(import_btn, message="Import packages from a requirements.txt file")
             CTkToolTip(scrape_btn, message="Scan your project for imports and auto-populate requirements")
             CTkToolTip(add_to_existing_btn, message="Add packages to an existing virtual environment")
+            CTkToolTip(rebuild_lock_btn, message="Recreate a venv from a requirements.lock without resolving dependencies")
         except Exception:
             pass
 
@@ -104,6 +134,11 @@ class VenvCreatorDialog(ctk.CTkToplevel):
         export_btn = ctk.CTkButton(btn_frame, text="Export requirements", width=btn_width, height=btn_height, fg_color="#1565c0", hover_color="#0d47a1", command=self.export_requirements)
         export_btn.pack(side="bottom", pady=(16, 0), fill="x")
 
+        # Post-create option: precompile bytecode so the first launch doesn't compile every import
+        self.precompile_var = tk.BooleanVar(value=False)
+        precompile_cb = ctk.CTkCheckBox(self, text="Precompile bytecode after install (faster first launch)", variable=self.precompile_var)
+        precompile_cb.pack(anchor="w", padx=15, pady=(0, 5))
+
         # Bottom Buttons Frame
         bottom_frame = ctk.CTkFrame(self)
         bottom_frame.pack(fill="x", padx=10, pady=10)
@@ -129,7 +164,7 @@ class VenvCreatorDialog(ctk.CTkToplevel):
         close_btn.pack(side="top", padx=5, pady=(0, 0), anchor="e")
         
         # Increase window height to fit new button
-        self.geometry("600x560")
+        self.geometry("600x640")
 
         # Spinner/progress indicator
         self.progress_label = ctk.CTkLabel(self, text="", font=("Arial", 12, "italic"), text_color="#1A73E8")
@@ -209,7 +244,7 @@ class VenvCreatorDialog(ctk.CTkToplevel):
         dialog.title("Associate Script with Virtual Environment")
         
         # Configure but don't show yet
-        dialog.geometry("600x480")
+        dialog.geometry("600x520")
         dialog.transient(self)
         dialog.withdraw()  # Hide initially
         
@@ -276,6 +311,11 @@ class VenvCreatorDialog(ctk.CTkToplevel):
         startup_cb = ctk.CTkCheckBox(options_frame, text="Auto-start application at Windows login", variable=startup_var)
         startup_cb.pack(anchor="w", padx=5, pady=5)
         
+        # Precompile the script tree and the venv so the first launch starts faster
+        precompile_var = tk.BooleanVar(value=False)
+        precompile_cb = ctk.CTkCheckBox(options_frame, text="Precompile script and venv bytecode (faster first launch)", variable=precompile_var)
+        precompile_cb.pack(anchor="w", padx=5, pady=5)
+        
         # Information text
         info_frame = ctk.CTkFrame(dialog)
         info_frame.pack(fill="both", expand=True, padx=20, pady=10)
@@ -457,6 +497,35 @@ class VenvCreatorDialog(ctk.CTkToplevel):
                 
             if add_startup:
                 success_msg += "\nThe application will also start automatically at Windows login."
+            
+            if precompile_var.get():
+                # compileall runs in its own worker processes; its result is shown once it finishes
+                warm_up_results = queue.Queue()
+                
+                def warm_up_task():
+                    try:
+                        warm_up_results.put((venv_warmup.warm_up(venv_path, [script_dir]), None))
+                    except Exception as e:
+                        warm_up_results.put((None, e))
+                
+                def report_warm_up():
+                    if not self.winfo_exists():
+                        return
+                    try:
+                        warm_up_result, error = warm_up_results.get_nowait()
+                    except queue.Empty:
+                        self.after(HISTORY_PROBE_POLL_MS, report_warm_up)
+                        return
+                    if error is not None:
+                        self.show_error(f"Error precompiling bytecode: {error}")
+                    elif warm_up_result["errors"]:
+                        self.show_info(f"{venv_warmup.format_warm_up(warm_up_result)}:\n" + "\n".join(warm_up_result["errors"][:5]))
+                    else:
+                        self.show_success(venv_warmup.format_warm_up(warm_up_result))
+                
+                threading.Thread(target=warm_up_task, daemon=True).start()
+                self.after(HISTORY_PROBE_POLL_MS, report_warm_up)
+                success_msg += "\nBytecode for the script and its venv is being precompiled in the background."
                 
             # Mention PySide6 installation
             if add_systray:
@@ -672,9 +741,26 @@ class VenvCreatorDialog(ctk.CTkToplevel):
                     except subprocess.CalledProcessError as e:
                         failed.append(pkg)
                 
+                # Pin what was actually installed so the venv can be rebuilt without resolving
+                lock_path = None
+                if success:
+                    self.show_spinner("Writing lockfile...")
+                    try:
+                        lock_path = venv_lock.write_lock(venv_path, success)
+                    except Exception as e:
+                        print(f"Error writing lockfile: {e}")
+                
+                warm_up_result = None
+                if self.precompile_var.get():
+                    self.show_spinner("Precompiling bytecode...")
+                    try:
+                        warm_up_result = venv_warmup.warm_up(venv_path)
+                    except Exception as e:
+                        print(f"Error precompiling bytecode: {e}")
+                
                 self.hide_spinner()
                 self.log_venv_creation(venv_path)
-                self.show_install_summary(success, failed, skipped)
+                self.show_install_summary(success, failed, skipped, lock_path, warm_up_result)
                 
                 # Clear UI after success
                 self.req_listbox.delete(0, tk.END)
@@ -685,6 +771,40 @@ class VenvCreatorDialog(ctk.CTkToplevel):
                 
         threading.Thread(target=venv_task, daemon=True).start()
 
+    def rebuild_venv_from_lock(self):
+        """Create a venv from a requirements.lock: pinned, hash-checked, --no-deps, wheels from the local cache"""
+        lock_path = filedialog.askopenfilename(
+            title="Select lockfile",
+            filetypes=[("Lockfiles", "*.lock"), ("Text files", "*.txt"), ("All files", "*.*")]
+        )
+        if not lock_path:
+            return
+        parent_location = self.location_entry.get().strip() or filedialog.askdirectory(title="Select Destination for the Rebuilt venv")
+        if not parent_location:
+            return
+        venv_path = os.path.join(parent_location, "venv")
+        if os.path.exists(venv_path):
+            self.show_error(f"A 'venv' folder already exists in:\n{parent_location}\n\nDelete it first or choose another location.")
+            return
+        
+        def rebuild_task():
+            self.show_spinner("Rebuilding virtual environment from lockfile...")
+            try:
+                seconds, source = venv_lock.rebuild(lock_path, venv_path)
+                self.hide_spinner()
+                self.log_venv_creation(venv_path)
+                where = "the local wheel cache" if source == "cache" else "the package index (some wheels were not cached)"
+                self.show_success(f"Rebuilt virtual environment in {seconds:.1f}s from {where}:\n{venv_path}")
+                self.location_entry.delete(0, tk.END)
+            except subprocess.CalledProcessError as e:
+                self.hide_spinner()
+                self.show_error(f"Error installing from lockfile:\n{(e.stderr or '').strip()[-500:]}")
+            except Exception as e:
+                self.hide_spinner()
+                self.show_error(f"Error rebuilding virtual environment: {str(e)}")
+        
+        threading.Thread(target=rebuild_task, daemon=True).start()
+
     def show_error(self, message):
         """Show an error message with safe window handling"""
         dialog = ctk.CTkToplevel(self)
@@ -767,7 +887,7 @@ class VenvCreatorDialog(ctk.CTkToplevel):
                 
         threading.Thread(target=install_task, daemon=True).start()
 
-    def show_install_summary(self, success, failed, skipped):
+    def show_install_summary(self, success, failed, skipped, lock_path=None, warm_up_result=None):
         dialog = ctk.CTkToplevel(self)
         dialog.title("Venv Creation Summary")
         
@@ -806,6 +926,10 @@ class VenvCreatorDialog(ctk.CTkToplevel):
             msg += "ℹ️ Skipped standard library modules:\n" + "\n".join(skipped) + "\n\n"
         if not (success or auto_installed or failed or skipped):
             msg = "No additional packages were specified."
+        if lock_path:
+            msg += f"🔒 Lockfile written (use Rebuild from Lock to recreate this venv):\n{lock_path}\n\n"
+        if warm_up_result:
+            msg += f"⚡ {venv_warmup.format_warm_up(warm_up_result)}\n\n"
             
         ctk.CTkLabel(dialog, text=msg, wraplength=400, justify="left").pack(pady=20, padx=20)
         ctk.CTkButton(dialog, text="OK", command=dialog.destroy).pack(pady=10)
@@ -895,32 +1019,15 @@ class VenvCreatorDialog(ctk.CTkToplevel):
             "venv_path": venv_path
         }
         try:
-            if os.path.exists(ENV_HISTORY_FILE):
-                with open(ENV_HISTORY_FILE, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-            else:
-                data = []
-            data.append(entry)
-            with open(ENV_HISTORY_FILE, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2)
+            history_store.add_entry(entry)
         except Exception as e:
             print(f"Error logging venv creation: {e}")
 
     def log_venv_deletion(self, venv_path):
-        """Mark a venv as deleted in the history file."""
+        """Mark a venv as deleted in the history."""
         try:
-            if os.path.exists(ENV_HISTORY_FILE):
-                with open(ENV_HISTORY_FILE, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                
-                # Find the corresponding entry and mark it as deleted
-                for entry in data:
-                    if entry.get("type") == "venv" and entry.get("venv_path") == venv_path:
-                        entry["date_deleted"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                
-                # Save the updated data
-                with open(ENV_HISTORY_FILE, "w", encoding="utf-8") as f:
-                    json.dump(data, f, indent=2)
+            history_store.mark_venv_deleted(venv_path)
+            history_probe_cache.invalidate(venv_path)
         except Exception as e:
             print(f"Error logging venv deletion: {e}")
 
@@ -944,6 +1051,10 @@ class VenvCreatorDialog(ctk.CTkToplevel):
         hide_cb = ctk.CTkCheckBox(controls_frame, text="Hide deleted items", variable=hide_deleted_var)
         hide_cb.pack(side="left", pady=(5, 5))
         
+        # Inventory scan status
+        scan_status_label = ctk.CTkLabel(controls_frame, text="", text_color="#A0A0A0")
+        scan_status_label.pack(side="left", padx=(20, 0))
+        
         # Type filter
         type_frame = ctk.CTkFrame(controls_frame, fg_color="transparent")
         type_frame.pack(side="right")
@@ -959,33 +1070,38 @@ class VenvCreatorDialog(ctk.CTkToplevel):
         # Sorting state
         sort_state = {"column": None, "reverse": False}
 
+        # Virtualized view: only HISTORY_VISIBLE_ROWS rows of widgets exist and are
+        # re-pointed at whichever entries are scrolled into view
+        view_state = {"entries": [], "top": 0, "polling": False}
+
         # Header row with clickable headers for sorting
         headers = [
             ("Type", 100),            # Increased from 80
             ("Date Added", 130),      # Increased from 120
             ("Last Used", 220),         # Changed from "Details"
+            ("Size", 80),
             ("Date Removed", 130),    # Increased from 120
-            ("Path", 450),            # Increased from 350
+            ("Path", 380),
             ("Actions", 180)          # Increased from 120 for button area
         ]
-        
+
         def sort_by_column(col_idx):
             nonlocal sort_state
-            
+
             # If clicking the same column, toggle sort direction
             if sort_state["column"] == col_idx:
                 sort_state["reverse"] = not sort_state["reverse"]
             else:
                 sort_state["column"] = col_idx
                 sort_state["reverse"] = False
-                
+
             refresh_history()
-        
+
         for col, (header, width) in enumerate(headers):
             if col < len(headers) - 1:  # Don't make the last column (buttons) sortable
                 header_label = ctk.CTkButton(
-                    table_frame, 
-                    text=header, 
+                    table_frame,
+                    text=header,
                     font=("Arial", 12, "bold"),
                     width=width,
                     anchor="w",
@@ -997,320 +1113,319 @@ class VenvCreatorDialog(ctk.CTkToplevel):
             else:
                 ctk.CTkLabel(table_frame, text=header, font=("Arial", 12, "bold"), width=width, anchor="w").grid(row=0, column=col, padx=5, pady=(0, 4), sticky="w")
 
-        def get_venv_last_used_date(venv_path):
-            """Get the last modified time of the activate script in the venv"""
-            if not venv_path or not os.path.exists(venv_path):
-                return ""
-                
-            # Path to activate script
-            activate_path = os.path.join(venv_path, "Scripts" if sys.platform == "win32" else "bin", "activate")
-            
-            # Check if activate script exists
-            if os.path.exists(activate_path):
+        def probed(entry, key, default=""):
+            """Cached probe value for an entry, or default if it hasn't been probed yet."""
+            probe = history_probe_cache.get(entry)
+            return probe.get(key, default) if probe else default
+
+        def open_containing_folder(entry):
+            if entry.get("type", "venv") == "association":
+                # For associations, use the script_dir
+                folder = entry.get("script_dir", "")
+            else:
+                folder = entry.get("venv_path", "")
+
+            if os.path.exists(folder):
+                if platform.system() == "Windows":
+                    os.startfile(folder)
+                elif platform.system() == "Darwin":
+                    subprocess.Popen(["open", folder])
+                else:
+                    subprocess.Popen(["xdg-open", folder])
+            else:
+                self.show_error(f"Folder does not exist: {folder}")
+
+        def show_context_menu(event, slot):
+            entry = slot["entry"]
+            if entry is None:
+                return
+            # Create a context menu
+            context_menu = tk.Menu(dialog, tearoff=0)
+
+            # Copy path options
+            if entry.get("type", "venv") == "venv":
+                venv_path = entry.get("venv_path", "")
+                context_menu.add_command(
+                    label="Copy Venv Path",
+                    command=lambda: self.copy_to_clipboard(venv_path)
+                )
+            else:  # association
+                script_path = entry.get("script_path", "")
+                script_dir = entry.get("script_dir", "")
+                venv_path = entry.get("venv_path", "")
+
+                context_menu.add_command(
+                    label="Copy Script Path",
+                    command=lambda: self.copy_to_clipboard(script_path)
+                )
+                context_menu.add_command(
+                    label="Copy Script Directory",
+                    command=lambda: self.copy_to_clipboard(script_dir)
+                )
+                context_menu.add_command(
+                    label="Copy Venv Path",
+                    command=lambda: self.copy_to_clipboard(venv_path)
+                )
+
+            context_menu.add_separator()
+
+            # Force delete option
+            context_menu.add_command(
+                label="Force Delete Entry",
+                command=lambda entry_id=entry["id"]: self.force_delete_entry(entry_id, dialog, refresh_history)
+            )
+
+            # Display the menu
+            try:
+                context_menu.tk_popup(event.x_root, event.y_root)
+            finally:
+                context_menu.grab_release()
+
+        # Build the fixed pool of row widgets once
+        row_slots = []
+        for r in range(HISTORY_VISIBLE_ROWS):
+            row = r + 1  # header is row 0
+            slot = {"entry": None}
+            slot["type"] = ctk.CTkLabel(table_frame, text="", width=80, anchor="w")
+            slot["date"] = ctk.CTkLabel(table_frame, text="", width=120, anchor="w")
+            slot["details"] = ctk.CTkLabel(table_frame, text="", width=200, anchor="w")
+            slot["size"] = ctk.CTkLabel(table_frame, text="", width=70, anchor="w")
+            slot["removed"] = ctk.CTkLabel(table_frame, text="", width=120, anchor="w")
+            slot["path"] = ctk.CTkLabel(table_frame, text="", width=380, anchor="w", cursor="hand2")
+            slot["buttons"] = ctk.CTkFrame(table_frame, fg_color="transparent")
+            slot["resource_btn"] = ctk.CTkButton(
+                slot["buttons"],
+                text="Delete Venv",
+                width=70,  # Wider button
+                height=24,
+                fg_color="#e74c3c",
+                hover_color="#b93a2b"
+            )
+            slot["entry_btn"] = ctk.CTkButton(
+                slot["buttons"],
+                text="Delete Entry",
+                width=70,  # Wider button
+                height=24
+            )
+            slot["entry_btn"].pack(side="right")
+            slot["tooltip"] = None
+            try:
+                from CTkToolTip import CTkToolTip
+                slot["tooltip"] = CTkToolTip(slot["entry_btn"], message="Click to remove this entry from history")
+            except Exception:
+                pass
+
+            cells = ["type", "date", "details", "size", "removed", "path", "buttons"]
+            for col, name in enumerate(cells):
+                slot[name].grid(row=row, column=col, padx=5, sticky="w")
+                # Bind the context menu to the whole row for right-click
+                slot[name].bind("<Button-3>", lambda e, s=slot: show_context_menu(e, s))
+            slot["path"].bind("<Button-1>", lambda e, s=slot: s["entry"] and open_containing_folder(s["entry"]))
+            slot["cells"] = [slot[name] for name in cells]
+            row_slots.append(slot)
+
+        def on_scrollbar(*args):
+            total = len(view_state["entries"])
+            if args[0] == "moveto":
+                top = int(float(args[1]) * total)
+            else:
+                step = int(args[1]) * (HISTORY_VISIBLE_ROWS if args[2] == "pages" else 1)
+                top = view_state["top"] + step
+            set_top(top)
+
+        def on_mouse_wheel(event):
+            if getattr(event, "num", None) == 4:
+                step = -1
+            elif getattr(event, "num", None) == 5:
+                step = 1
+            else:
+                step = -1 if event.delta > 0 else 1
+            set_top(view_state["top"] + step * HISTORY_WHEEL_ROWS)
+
+        def set_top(top):
+            max_top = max(0, len(view_state["entries"]) - HISTORY_VISIBLE_ROWS)
+            top = min(max(0, top), max_top)
+            if top != view_state["top"]:
+                view_state["top"] = top
+                render_rows()
+
+        scrollbar = ctk.CTkScrollbar(table_frame, command=on_scrollbar)
+        scrollbar.grid(row=1, column=len(headers), rowspan=HISTORY_VISIBLE_ROWS, sticky="ns")
+        dialog.bind("<MouseWheel>", on_mouse_wheel)
+        dialog.bind("<Button-4>", on_mouse_wheel)
+        dialog.bind("<Button-5>", on_mouse_wheel)
+
+        def poll_probes():
+            """Tk-thread loop while probes are in flight: patch finished results into visible rows."""
+            if not dialog.winfo_exists():
+                view_state["polling"] = False
+                return
+            finished = history_probe_cache.drain_completed()
+            visible_keys = {history_probe_cache.key_for(slot["entry"]) for slot in row_slots if slot["entry"] is not None}
+            if finished & visible_keys:
+                render_rows(request_probes=False)
+            if history_probe_cache.pending_count():
+                dialog.after(HISTORY_PROBE_POLL_MS, poll_probes)
+            else:
+                view_state["polling"] = False
+
+        def render_slot(slot, entry):
+            slot["entry"] = entry
+            entry_type = entry.get("type", "venv")
+            probe = history_probe_cache.get(entry)
+            date_removed = entry.get("date_deleted", "")
+
+            # Type column
+            slot["type"].configure(text="Virtual Env" if entry_type == "venv" else "Script Association")
+            slot["date"].configure(text=entry.get("date", ""))
+
+            if entry_type == "venv":
+                # Fall back to the last inventory scan until the live probe answers
+                if probe:
+                    details = probe["last_used"]
+                    size_bytes = probe["size"]
+                else:
+                    details = entry.get("last_used") or "Checking..."
+                    size_bytes = entry.get("size_bytes")
+                size_text = format_venv_size(size_bytes) if size_bytes is not None else ""
+            else:
+                details = entry.get("_details", "")
+                size_text = ""
+            slot["details"].configure(text=details)
+            slot["size"].configure(text=size_text)
+
+            # Date removed; add manual deletion indicator if resources don't exist but aren't marked as deleted
+            date_text = date_removed
+            date_color = "white"
+            if probe and not probe["exists"] and not date_removed:
+                date_text = "Manual Delete Detected"
+                date_color = "#FF6B6B"  # Bright red for warning
+            slot["removed"].configure(text=date_text, text_color=date_color)
+
+            # Path column (red once a probe shows it's gone)
+            path_color = "#e74c3c" if probe and not probe["exists"] else "#1A73E8"
+            slot["path"].configure(text=entry.get("_display_path", ""), text_color=path_color)
+
+            # Until the probe answers, resource state is unknown and both actions stay disabled
+            resource_exists = bool(probe and probe["exists"]) and not date_removed
+            probe_pending = probe is None and not date_removed
+
+            resource_btn = slot["resource_btn"]
+            if resource_exists:
+                if entry_type == "venv":
+                    resource_btn.configure(
+                        text="Delete Venv",
+                        command=lambda entry_id=entry["id"], path=entry.get("venv_path", ""):
+                            self.delete_venv_from_history(entry_id, path, dialog, refresh_history)
+                    )
+                else:
+                    resource_btn.configure(
+                        text="Delete Files",
+                        command=lambda entry_id=entry["id"], dir=entry.get("script_dir", ""):
+                            self.delete_association_from_history(dir, dialog, refresh_history, entry_id)
+                    )
+                if resource_btn.winfo_manager() != "pack":
+                    resource_btn.pack(side="left", padx=(0, 4))
+            else:
+                resource_btn.pack_forget()
+
+            entry_enabled = not resource_exists and not probe_pending
+            slot["entry_btn"].configure(
+                fg_color="#FF8C00" if entry_enabled else "#A9A9A9",
+                hover_color="#E57C00" if entry_enabled else "#A9A9A9",
+                command=lambda entry_id=entry["id"], e=entry: self.remove_history_entry(entry_id, dialog, refresh_history, e),
+                state="normal" if entry_enabled else "disabled"
+            )
+            if slot["tooltip"] is not None:
                 try:
-                    # Get the modification time
-                    mod_time = os.path.getmtime(activate_path)
-                    # Convert to datetime and format
-                    return datetime.datetime.fromtimestamp(mod_time).strftime("%Y-%m-%d %H:%M:%S")
+                    if resource_exists:
+                        slot["tooltip"].configure(message="Delete the resources first before removing from history, or right-click and select 'Force Delete Entry'")
+                    else:
+                        slot["tooltip"].configure(message="Click to remove this entry from history")
                 except Exception:
                     pass
-                    
-            return ""
-            
-        def path_exists(path):
-            """Check if a path exists"""
-            return path and os.path.exists(path)
+
+        def render_rows(request_probes=True):
+            entries = view_state["entries"]
+            top = view_state["top"]
+            for r, slot in enumerate(row_slots):
+                idx = top + r
+                if idx < len(entries):
+                    entry = entries[idx]
+                    if request_probes:
+                        history_probe_cache.request(entry)
+                    render_slot(slot, entry)
+                    for widget in slot["cells"]:
+                        if widget.winfo_manager() != "grid":
+                            widget.grid()
+                else:
+                    slot["entry"] = None
+                    for widget in slot["cells"]:
+                        widget.grid_remove()
+
+            # Keep the scrollbar thumb in step with the window onto the list
+            total = len(entries)
+            if total > HISTORY_VISIBLE_ROWS:
+                scrollbar.set(top / total, min(1.0, (top + HISTORY_VISIBLE_ROWS) / total))
+            else:
+                scrollbar.set(0.0, 1.0)
+
+            if history_probe_cache.pending_count() and not view_state["polling"]:
+                view_state["polling"] = True
+                dialog.after(HISTORY_PROBE_POLL_MS, poll_probes)
 
         def refresh_history():
-            # Remove all rows except header
-            for widget in table_frame.winfo_children():
-                info = widget.grid_info()
-                if info and 'row' in info and info['row'] != 0:
-                    widget.destroy()
-            
-            # Load data
+            # Load data (type and deleted filters are applied by the store's indexed query)
             try:
-                if os.path.exists(ENV_HISTORY_FILE):
-                    with open(ENV_HISTORY_FILE, "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                else:
-                    data = []
+                filtered_data = history_store.entries(
+                    entry_type=None if show_type_var.get() == "all" else show_type_var.get(),
+                    include_deleted=not hide_deleted_var.get()
+                )
             except Exception as e:
                 print(f"Error loading environment history: {e}")
-                data = []
-            
-            # Apply filters
-            filtered_data = []
-            for entry in data:
-                # Check for deleted items filter
-                if hide_deleted_var.get() and entry.get("date_deleted"):
-                    continue
-                
-                # Check for type filter
-                entry_type = entry.get("type", "venv")  # Default to "venv" for backward compatibility
-                if show_type_var.get() != "all" and entry_type != show_type_var.get():
-                    continue
-                
-                filtered_data.append(entry)
-                
-            # Add dynamic data for sorting and display
+                filtered_data = []
+
+            # Add display data that doesn't need the filesystem
             for entry in filtered_data:
                 entry_type = entry.get("type", "venv")
-                
+
                 # Different behavior based on entry type
                 if entry_type == "venv":
-                    # Get last used date from file modification time
-                    entry["_details"] = get_venv_last_used_date(entry.get("venv_path", ""))
-                    # Check if venv directory actually exists
-                    entry["_path_exists"] = path_exists(entry.get("venv_path", ""))
-                    # Set display path
                     entry["_display_path"] = entry.get("venv_path", "")
-                    
+
                 elif entry_type == "association":
                     # For associations, show script name and last modified
                     script_name = entry.get("script_name", "")
                     script_mod = entry.get("script_last_modified", "")
                     entry["_details"] = f"Script: {script_name}\nLast Modified: {script_mod}"
-                    
-                    # Check if any association files exist in the script directory
-                    script_dir = entry.get("script_dir", "")
-                    association_files_exist = False
-                    
-                    if os.path.exists(script_dir):
-                        association_files = [
-                            ".venv-association",
-                            "run_this.vbs",
-                            "run_this.bat",
-                            "launcher.py",
-                            "launcher_icon.ico"
-                        ]
-                        
-                        for file_name in association_files:
-                            if os.path.exists(os.path.join(script_dir, file_name)):
-                                association_files_exist = True
-                                break
-                    
-                    # Update path exists flag based on actual file check
-                    entry["_path_exists"] = association_files_exist
-                    
+
                     # Set display path to show both script and venv paths
                     script_path = entry.get("script_path", "")
                     venv_path = entry.get("venv_path", "")
                     entry["_display_path"] = f"Script: {script_path}\nVenv: {venv_path}"
-                
+
             # Apply sorting if a column is selected
             if sort_state["column"] is not None:
                 col_idx = sort_state["column"]
                 reverse = sort_state["reverse"]
-                
-                # Map column index to the appropriate sorting key
+
+                # Map column index to the appropriate sorting key; probed columns use
+                # whatever is cached and sort unprobed rows as empty
                 sort_keys = {
                     0: lambda e: e.get("type", ""),  # Type
                     1: lambda e: e.get("date", ""),  # Date Added
-                    2: lambda e: e.get("_details", ""),  # Last Used
-                    3: lambda e: e.get("date_deleted", ""),  # Date Removed
-                    4: lambda e: e.get("_display_path", "").lower(),  # Path
+                    2: lambda e: e.get("_details") or probed(e, "last_used") or e.get("last_used") or "",  # Last Used
+                    3: lambda e: probed(e, "size", None) or e.get("size_bytes") or 0,  # Size
+                    4: lambda e: e.get("date_deleted", ""),  # Date Removed
+                    5: lambda e: e.get("_display_path", "").lower(),  # Path
                 }
-                
+
                 if col_idx in sort_keys:
                     filtered_data.sort(key=sort_keys[col_idx], reverse=reverse)
-            
-            for i, entry in enumerate(filtered_data):
-                row = i + 1  # header is row 0
-                entry_type = entry.get("type", "venv")
-                date_added = entry.get("date", "")
-                details = entry.get("_details", "")
-                date_removed = entry.get("date_deleted", "")
-                display_path = entry.get("_display_path", "")
-                path_exists_flag = entry.get("_path_exists", False)
-                
-                # Type column (with icon)
-                type_text = "Virtual Env" if entry_type == "venv" else "Script Association"
-                type_label = ctk.CTkLabel(table_frame, text=type_text, width=80, anchor="w")
-                type_label.grid(row=row, column=0, padx=5, sticky="w")
-                
-                # Date added
-                ctk.CTkLabel(table_frame, text=date_added, width=120, anchor="w").grid(row=row, column=1, padx=5, sticky="w")
-                
-                # Last Used column (previously Details)
-                details_label = ctk.CTkLabel(table_frame, text=details, width=200, anchor="w")
-                details_label.grid(row=row, column=2, padx=5, sticky="w")
-                
-                # Date removed
-                date_text = date_removed
-                date_color = "white"
-                
-                # Add manual deletion indicator if resources don't exist but aren't marked as deleted
-                if not path_exists_flag and not date_removed:
-                    date_text = "Manual Delete Detected"
-                    date_color = "#FF6B6B"  # Bright red for warning
-                
-                date_label = ctk.CTkLabel(table_frame, text=date_text, width=120, anchor="w", text_color=date_color)
-                date_label.grid(row=row, column=3, padx=5, sticky="w")
-                
-                # Path column
-                path_color = "#1A73E8" if path_exists_flag else "#e74c3c"
-                
-                def open_containing_folder(path):
-                    if entry_type == "association":
-                        # For associations, use the script_dir
-                        folder = entry.get("script_dir", "")
-                    elif os.path.isfile(path):
-                        folder = os.path.dirname(path)
-                    else:
-                        folder = path
-                    
-                    if os.path.exists(folder):
-                        if platform.system() == "Windows":
-                            os.startfile(folder)
-                        elif platform.system() == "Darwin":
-                            subprocess.Popen(["open", folder])
-                        else:
-                            subprocess.Popen(["xdg-open", folder])
-                    else:
-                        self.show_error(f"Folder does not exist: {folder}")
-                
-                def make_link_callback(entry=entry):
-                    return lambda e: open_containing_folder(entry.get("_display_path", ""))
-                    
-                path_label = ctk.CTkLabel(table_frame, text=display_path, width=450, anchor="w", 
-                                       text_color=path_color, cursor="hand2")
-                path_label.grid(row=row, column=4, padx=5, sticky="w")
-                path_label.bind("<Button-1>", make_link_callback())
-                
-                # Create action buttons frame
-                btn_frame = ctk.CTkFrame(table_frame, fg_color="transparent")
-                btn_frame.grid(row=row, column=5, padx=5, sticky="w")
-                
-                # Resource exists check
-                resource_exists = False
-                
-                if entry_type == "venv":
-                    # Check if the venv directory actually exists
-                    venv_path = entry.get("venv_path", "")
-                    resource_exists = os.path.exists(venv_path)
-                else:  # association
-                    # Check if any association files exist in the script directory
-                    script_dir = entry.get("script_dir", "")
-                    if os.path.exists(script_dir):
-                        association_files = [
-                            ".venv-association",
-                            "run_this.vbs",
-                            "run_this.bat",
-                            "launcher.py",
-                            "launcher_icon.ico"
-                        ]
-                        
-                        for file_name in association_files:
-                            file_path = os.path.join(script_dir, file_name)
-                            if os.path.exists(file_path):
-                                resource_exists = True
-                                break
-                
-                # Always allow delete entry if the item has already been marked as deleted
-                if date_removed:
-                    resource_exists = False
-                
-                # Delete resource buttons
-                if resource_exists and not date_removed:
-                    if entry_type == "venv":
-                        # Venv delete button
-                        venv_btn = ctk.CTkButton(
-                            btn_frame, 
-                            text="Delete Venv", 
-                            width=70,  # Wider button
-                            height=24,
-                            fg_color="#e74c3c", 
-                            hover_color="#b93a2b", 
-                            command=lambda idx=i, path=entry.get("venv_path", ""): 
-                                self.delete_venv_from_history(idx, path, dialog, refresh_history)
-                        )
-                        venv_btn.pack(side="left", padx=(0, 4))
-                    else:
-                        # Script association delete button
-                        files_btn = ctk.CTkButton(
-                            btn_frame, 
-                            text="Delete Files", 
-                            width=70,  # Wider button
-                            height=24,
-                            fg_color="#e74c3c", 
-                            hover_color="#b93a2b", 
-                            command=lambda idx=i, dir=entry.get("script_dir", ""): 
-                                self.delete_association_from_history(dir, dialog, refresh_history, idx)
-                        )
-                        files_btn.pack(side="left", padx=(0, 4))
-                
-                # Delete Entry button (disabled if resources exist)
-                entry_btn = ctk.CTkButton(
-                    btn_frame, 
-                    text="Delete Entry", 
-                    width=70,  # Wider button
-                    height=24,
-                    fg_color="#FF8C00" if not resource_exists else "#A9A9A9", 
-                    hover_color="#E57C00" if not resource_exists else "#A9A9A9", 
-                    command=lambda idx=i, e=entry: self.remove_history_entry(idx, dialog, refresh_history, e),
-                    state="normal" if not resource_exists else "disabled"
-                )
-                entry_btn.pack(side="left")
-                
-                # Add right-click context menu
-                def show_context_menu(event, idx=i):
-                    # Create a context menu
-                    context_menu = tk.Menu(dialog, tearoff=0)
-                    
-                    # Copy path options
-                    if entry_type == "venv":
-                        venv_path = entry.get("venv_path", "")
-                        context_menu.add_command(
-                            label="Copy Venv Path", 
-                            command=lambda: self.copy_to_clipboard(venv_path)
-                        )
-                    else:  # association
-                        script_path = entry.get("script_path", "")
-                        script_dir = entry.get("script_dir", "")
-                        venv_path = entry.get("venv_path", "")
-                        
-                        context_menu.add_command(
-                            label="Copy Script Path", 
-                            command=lambda: self.copy_to_clipboard(script_path)
-                        )
-                        context_menu.add_command(
-                            label="Copy Script Directory", 
-                            command=lambda: self.copy_to_clipboard(script_dir)
-                        )
-                        context_menu.add_command(
-                            label="Copy Venv Path", 
-                            command=lambda: self.copy_to_clipboard(venv_path)
-                        )
-                    
-                    context_menu.add_separator()
-                    
-                    # Force delete option
-                    context_menu.add_command(
-                        label="Force Delete Entry", 
-                        command=lambda: self.force_delete_entry(idx, dialog, refresh_history)
-                    )
-                    
-                    # Display the menu
-                    try:
-                        context_menu.tk_popup(event.x_root, event.y_root)
-                    finally:
-                        context_menu.grab_release()
-                
-                # Bind the context menu to the whole row for right-click
-                for col in range(6):  # All columns
-                    widget = table_frame.grid_slaves(row=row, column=col)[0]
-                    widget.bind("<Button-3>", show_context_menu)
-                
-                # Add tooltip for "Force Delete"
-                try:
-                    from CTkToolTip import CTkToolTip
-                    if resource_exists:
-                        CTkToolTip(entry_btn, message="Delete the resources first before removing from history, or right-click and select 'Force Delete Entry'")
-                    else:
-                        CTkToolTip(entry_btn, message="Click to remove this entry from history")
-                except Exception:
-                    pass
+
+            view_state["entries"] = filtered_data
+            view_state["top"] = min(view_state["top"], max(0, len(filtered_data) - HISTORY_VISIBLE_ROWS))
+            render_rows()
         
         # Create radio buttons now that refresh_history is defined
         def create_radio_button(value, text):
@@ -1358,6 +1473,96 @@ class VenvCreatorDialog(ctk.CTkToplevel):
         )
         view_btn.pack(side="left", padx=5, pady=5)
         
+        def scan_for_venvs():
+            """Crawl a folder for venvs in the background and merge them into the history."""
+            root = filedialog.askdirectory(parent=dialog, title="Select Folder to Search for Virtual Environments")
+            if not root:
+                return
+            messages = queue.Queue()
+            scan_btn.configure(state="disabled")
+            
+            def crawl_task():
+                try:
+                    records = venv_inventory.crawl([root], store=history_store, progress=messages.put)
+                    messages.put(("done", records, None))
+                except Exception as e:
+                    messages.put(("done", None, e))
+            
+            def poll_scan():
+                if not dialog.winfo_exists():
+                    return
+                while True:
+                    try:
+                        message = messages.get_nowait()
+                    except queue.Empty:
+                        dialog.after(HISTORY_PROBE_POLL_MS, poll_scan)
+                        return
+                    if isinstance(message, str):
+                        scan_status_label.configure(text=message)
+                        continue
+                    _, records, error = message
+                    scan_btn.configure(state="normal")
+                    if error is not None:
+                        scan_status_label.configure(text="")
+                        self.show_error(f"Error scanning for virtual environments: {error}")
+                    else:
+                        total = sum(r["size_bytes"] for r in records)
+                        scan_status_label.configure(text=f"Found {len(records)} venvs ({format_venv_size(total)}) under {root}")
+                        refresh_history()
+                    return
+            
+            scan_status_label.configure(text=f"Searching {root}...")
+            threading.Thread(target=crawl_task, daemon=True).start()
+            dialog.after(HISTORY_PROBE_POLL_MS, poll_scan)
+        
+        # Scan for venvs button (bottom left, next to view)
+        scan_btn = ctk.CTkButton(
+            bottom_btn_frame, 
+            text="Scan for Venvs", 
+            width=120, 
+            height=32,
+            fg_color="#2E7D32",  # Green
+            hover_color="#1B5E20", 
+            command=scan_for_venvs
+        )
+        scan_btn.pack(side="left", padx=5, pady=5)
+        
+        # Bulk delete button (bottom left, next to scan)
+        bulk_btn = ctk.CTkButton(
+            bottom_btn_frame, 
+            text="Bulk Delete", 
+            width=120, 
+            height=32,
+            fg_color="#e74c3c", 
+            hover_color="#b93a2b", 
+            command=lambda: self.open_bulk_delete_venvs(dialog, refresh_history)
+        )
+        bulk_btn.pack(side="left", padx=5, pady=5)
+        
+        # Duplicate files report (bottom left, next to bulk delete)
+        dedup_btn = ctk.CTkButton(
+            bottom_btn_frame, 
+            text="Find Duplicates", 
+            width=120, 
+            height=32,
+            fg_color="#8E44AD",  # Purple
+            hover_color="#6C3483", 
+            command=lambda: self.open_dedup_report(dialog)
+        )
+        dedup_btn.pack(side="left", padx=5, pady=5)
+
+        # Batch operations across venvs (bottom left, next to duplicates)
+        batch_btn = ctk.CTkButton(
+            bottom_btn_frame,
+            text="Batch Operations",
+            width=120,
+            height=32,
+            fg_color="#1565c0",  # Blue
+            hover_color="#0d47a1",
+            command=lambda: self.open_batch_operations(dialog)
+        )
+        batch_btn.pack(side="left", padx=5, pady=5)
+        
         # Button dimensions for right-side buttons
         btn_width = 180
         btn_height = 32
@@ -1402,18 +1607,490 @@ class VenvCreatorDialog(ctk.CTkToplevel):
         hide_cb.configure(command=refresh_history)
         refresh_history()
 
-    def remove_history_entry(self, idx, dialog, refresh_history, entry):
-        """Remove an entry from the history."""
-        if not os.path.exists(ENV_HISTORY_FILE):
-            self.show_error("History file not found.")
-            return
+    def open_bulk_delete_venvs(self, parent_dialog, refresh_history):
+        """Dialog for deleting every venv over a size and/or unused for a number of days"""
+        dialog = ctk.CTkToplevel(self)
+        dialog.title("Bulk Delete Virtual Environments")
+        dialog.geometry("760x480")
+        dialog.transient(parent_dialog)
+        dialog.grab_set()
+        dialog.lift()
+        self.center_dialog(dialog, parent=parent_dialog)
+        
+        # Criteria
+        criteria_frame = ctk.CTkFrame(dialog, fg_color="transparent")
+        criteria_frame.pack(fill="x", padx=15, pady=(15, 5))
+        
+        ctk.CTkLabel(criteria_frame, text="Larger than (MB):").pack(side="left", padx=(0, 5))
+        min_size_entry = ctk.CTkEntry(criteria_frame, width=80)
+        min_size_entry.pack(side="left", padx=(0, 20))
+        
+        ctk.CTkLabel(criteria_frame, text="Not used for (days):").pack(side="left", padx=(0, 5))
+        unused_days_entry = ctk.CTkEntry(criteria_frame, width=80)
+        unused_days_entry.pack(side="left", padx=(0, 20))
+        
+        find_btn = ctk.CTkButton(criteria_frame, text="Find Matches", width=120)
+        find_btn.pack(side="left")
         
+        summary_label = ctk.CTkLabel(dialog, text="Venvs that haven't been measured yet are measured when you search.", anchor="w")
+        summary_label.pack(fill="x", padx=15)
+        
+        matches_box = ctk.CTkTextbox(dialog, font=("Consolas", 11))
+        matches_box.pack(fill="both", expand=True, padx=15, pady=10)
+        matches_box.configure(state="disabled")
+        
+        btn_frame = ctk.CTkFrame(dialog, fg_color="transparent")
+        btn_frame.pack(fill="x", padx=15, pady=(0, 15))
+        delete_btn = ctk.CTkButton(btn_frame, text="Delete Matches", width=140, fg_color="#e74c3c", hover_color="#b93a2b", state="disabled")
+        delete_btn.pack(side="left")
+        ctk.CTkButton(btn_frame, text="Close", width=100, command=dialog.destroy).pack(side="right")
+        
+        state = {"matches": []}
+        messages = queue.Queue()
+        
+        def read_criteria():
+            try:
+                min_size_text = min_size_entry.get().strip()
+                unused_days_text = unused_days_entry.get().strip()
+                min_size = int(float(min_size_text) * 1024 * 1024) if min_size_text else None
+                last_used_before = None
+                if unused_days_text:
+                    cutoff = datetime.datetime.now() - datetime.timedelta(days=float(unused_days_text))
+                    last_used_before = cutoff.strftime("%Y-%m-%d %H:%M:%S")
+            except ValueError:
+                self.show_error("Size and days must be numbers.")
+                return None
+            if min_size is None and last_used_before is None:
+                self.show_error("Enter a minimum size, a number of unused days, or both.")
+                return None
+            return min_size, last_used_before
+        
+        def poll(on_done):
+            if not dialog.winfo_exists():
+                return
+            while True:
+                try:
+                    message = messages.get_nowait()
+                except queue.Empty:
+                    dialog.after(HISTORY_PROBE_POLL_MS, lambda: poll(on_done))
+                    return
+                if isinstance(message, str):
+                    summary_label.configure(text=message)
+                else:
+                    on_done(*message)
+                    return
+        
+        def show_matches(matches, error):
+            find_btn.configure(state="normal")
+            if error is not None:
+                summary_label.configure(text="")
+                self.show_error(f"Error finding virtual environments: {error}")
+                return
+            state["matches"] = matches
+            total = sum(e.get("size_bytes") or 0 for e in matches)
+            summary_label.configure(text=f"{len(matches)} matching venvs, {format_venv_size(total)} in total")
+            matches_box.configure(state="normal")
+            matches_box.delete("1.0", "end")
+            for entry in matches:
+                last_used = entry.get("last_used") or "never"
+                matches_box.insert("end", f"{format_venv_size(entry.get('size_bytes') or 0):>10}  {last_used:<19}  {entry.get('venv_path', '')}\n")
+            matches_box.configure(state="disabled")
+            delete_btn.configure(state="normal" if matches else "disabled")
+        
+        def find_matches():
+            criteria = read_criteria()
+            if criteria is None:
+                return
+            find_btn.configure(state="disabled")
+            delete_btn.configure(state="disabled")
+            
+            def find_task():
+                try:
+                    # Measure venvs the inventory hasn't seen yet (e.g. ones created here) so they can match too
+                    unmeasured = [
+                        e["venv_path"] for e in history_store.entries(entry_type="venv", include_deleted=False)
+                        if not e.get("scanned_at") and e.get("venv_path") and os.path.isdir(e["venv_path"])
+                    ]
+                    if unmeasured:
+                        messages.put(f"Measuring {len(unmeasured)} venvs...")
+                        records = []
+                        with ThreadPoolExecutor(max_workers=venv_inventory.INVENTORY_WORKERS) as executor:
+                            for venv_path in unmeasured:
+                                records.append(venv_inventory.inspect_venv(venv_path, executor))
+                        history_store.record_inventory(records)
+                    candidates = {}
+                    for e in history_store.venvs_matching(*criteria):
+                        if os.path.isdir(e.get("venv_path", "")):
+                            candidates.setdefault(venv_path_key(e["venv_path"]), e["venv_path"])
+                    # Stored sizes and last-use times are from the last scan; measure again before offering a permanent delete
+                    min_size, last_used_before = criteria
+                    records = []
+                    with ThreadPoolExecutor(max_workers=venv_inventory.INVENTORY_WORKERS) as executor:
+                        for i, venv_path in enumerate(candidates.values(), 1):
+                            messages.put(f"Checking {i} of {len(candidates)}: {venv_path}")
+                            records.append(venv_inventory.inspect_venv(venv_path, executor))
+                    history_store.record_inventory(records)
+                    matches = [
+                        r for r in records
+                        if (min_size is None or r["size_bytes"] >= min_size)
+                        and (not last_used_before or (r["last_used"] and r["last_used"] < last_used_before))
+                    ]
+                    matches.sort(key=lambda r: r["size_bytes"], reverse=True)
+                    messages.put((matches, None))
+                except Exception as e:
+                    messages.put((None, e))
+            
+            summary_label.configure(text="Searching...")
+            threading.Thread(target=find_task, daemon=True).start()
+            dialog.after(HISTORY_PROBE_POLL_MS, lambda: poll(show_matches))
+        
+        def show_results(deleted, failed):
+            find_btn.configure(state="normal")
+            refresh_history()
+            freed = sum(e.get("size_bytes") or 0 for e in deleted)
+            message = f"Deleted {len(deleted)} virtual environments, freeing {format_venv_size(freed)}."
+            if failed:
+                message += "\n\nCould not delete:\n• " + "\n• ".join(f"{path} ({error})" for path, error in failed)
+            summary_label.configure(text=message.split("\n")[0])
+            state["matches"] = []
+            matches_box.configure(state="normal")
+            matches_box.delete("1.0", "end")
+            matches_box.configure(state="disabled")
+            if failed:
+                self.show_error(message)
+            else:
+                self.show_success(message)
+        
+        def delete_matches():
+            matches = list(state["matches"])
+            delete_btn.configure(state="disabled")
+            find_btn.configure(state="disabled")
+            
+            def delete_task():
+                import shutil
+                deleted, failed = [], []
+                for i, entry in enumerate(matches, 1):
+                    venv_path = entry["venv_path"]
+                    messages.put(f"Deleting {i} of {len(matches)}: {venv_path}")
+                    # Same safety check as the single delete: only remove real venvs
+                    python_exe = os.path.join(venv_path, "Scripts", "python.exe") if sys.platform == "win32" else os.path.join(venv_path, "bin", "python")
+                    if not os.path.exists(python_exe):
+                        failed.append((venv_path, "not a valid virtual environment"))
+                        continue
+                    try:
+                        shutil.rmtree(venv_path)
+                        self.log_venv_deletion(venv_path)
+                        deleted.append(entry)
+                    except Exception as e:
+                        failed.append((venv_path, str(e)))
+                messages.put((deleted, failed))
+            
+            threading.Thread(target=delete_task, daemon=True).start()
+            dialog.after(HISTORY_PROBE_POLL_MS, lambda: poll(show_results))
+        
+        def confirm_delete():
+            matches = state["matches"]
+            if not matches:
+                return
+            total = sum(e.get("size_bytes") or 0 for e in matches)
+            confirm = ConfirmationDialog(
+                self, "Confirm Bulk Deletion",
+                f"Delete {len(matches)} virtual environments ({format_venv_size(total)})?",
+                "The directories listed will be permanently removed.\n\nThis action cannot be undone.",
+                "Delete", "Cancel", icon_path=self.icon_path
+            )
+            confirm.ok_action = lambda: (confirm.destroy(), delete_matches())
+            confirm.cancel_action = lambda: confirm.destroy()
+            if self.winfo_exists() and confirm.winfo_exists():
+                self.center_dialog(confirm, parent=dialog)
+        
+        find_btn.configure(command=find_matches)
+        delete_btn.configure(command=confirm_delete)
+
+    def open_dedup_report(self, parent_dialog):
+        """Report identical installed files across known venvs, with opt-in hardlink consolidation"""
+        dialog = ctk.CTkToplevel(self)
+        dialog.title("Duplicate Files Across Virtual Environments")
+        dialog.geometry("760x520")
+        dialog.transient(parent_dialog)
+        dialog.grab_set()
+        dialog.lift()
+        self.center_dialog(dialog, parent=parent_dialog)
+        
+        report_box = ctk.CTkTextbox(dialog, font=("Consolas", 11))
+        report_box.pack(fill="both", expand=True, padx=15, pady=(15, 10))
+        
+        btn_frame = ctk.CTkFrame(dialog, fg_color="transparent")
+        btn_frame.pack(fill="x", padx=15, pady=(0, 15))
+        consolidate_btn = ctk.CTkButton(btn_frame, text="Consolidate with Hardlinks", width=200, state="disabled")
+        consolidate_btn.pack(side="left")
+        ctk.CTkButton(btn_frame, text="Close", width=100, command=dialog.destroy).pack(side="right")
+        
+        state = {"groups": None}
+        messages = queue.Queue()
+        
+        def show_text(text):
+            report_box.configure(state="normal")
+            report_box.delete("1.0", "end")
+            report_box.insert("1.0", text)
+            report_box.configure(state="disabled")
+        
+        def poll(on_done):
+            if not dialog.winfo_exists():
+                return
+            while True:
+                try:
+                    message = messages.get_nowait()
+                except queue.Empty:
+                    dialog.after(HISTORY_PROBE_POLL_MS, lambda: poll(on_done))
+                    return
+                if isinstance(message, str):
+                    show_text(message)
+                else:
+                    on_done(*message)
+                    return
+        
+        def analysis_done(result, error):
+            if error is not None:
+                show_text(f"Error analyzing virtual environments: {error}")
+                return
+            report, groups = result
+            state["groups"] = groups
+            show_text(venv_dedup.format_report(report))
+            consolidate_btn.configure(state="normal" if groups else "disabled")
+        
+        def analyze_task():
+            try:
+                messages.put((venv_dedup.analyze(store=history_store), None))
+            except Exception as e:
+                messages.put((None, e))
+        
+        def consolidation_done(summary, error):
+            if error is not None:
+                self.show_error(f"Error consolidating files: {error}")
+                return
+            self.show_success(venv_dedup.format_consolidation(summary))
+            # Re-run the analysis so the report reflects what is left
+            threading.Thread(target=analyze_task, daemon=True).start()
+            dialog.after(HISTORY_PROBE_POLL_MS, lambda: poll(analysis_done))
+        
+        def consolidate():
+            groups = state["groups"]
+            consolidate_btn.configure(state="disabled")
+            
+            def consolidate_task():
+                try:
+                    messages.put((venv_dedup.consolidate(groups, progress=messages.put), None))
+                except Exception as e:
+                    messages.put((None, e))
+            
+            show_text("Verifying file hashes against RECORD...")
+            threading.Thread(target=consolidate_task, daemon=True).start()
+            dialog.after(HISTORY_PROBE_POLL_MS, lambda: poll(consolidation_done))
+        
+        def confirm_consolidate():
+            confirm = ConfirmationDialog(
+                self, "Confirm Consolidation",
+                "Replace identical installed files with hardlinks?",
+                f"Files are re-hashed and must match their RECORD hash before being linked to the shared store in:\n{venv_dedup.SHARED_STORE_DIR}\n\nLinked files share one copy on disk; pip upgrades replace files rather than editing them, so venvs stay independent.",
+                "Consolidate", "Cancel", icon_path=self.icon_path
+            )
+            confirm.ok_action = lambda: (confirm.destroy(), consolidate())
+            confirm.cancel_action = lambda: confirm.destroy()
+            if self.winfo_exists() and confirm.winfo_exists():
+                self.center_dialog(confirm, parent=dialog)
+        
+        consolidate_btn.configure(command=confirm_consolidate)
+        show_text("Reading RECORD files in every known virtual environment...")
+        threading.Thread(target=analyze_task, daemon=True).start()
+        dialog.after(HISTORY_PROBE_POLL_MS, lambda: poll(analysis_done))
+
+    def open_batch_operations(self, parent_dialog):
+        """Run an upgrade, requirements install or outdated audit across many venvs at once"""
+        dialog = ctk.CTkToplevel(self)
+        dialog.title("Batch Operations on Virtual Environments")
+        dialog.geometry("860x600")
+        dialog.transient(parent_dialog)
+        dialog.grab_set()
+        dialog.lift()
+        self.center_dialog(dialog, parent=parent_dialog)
+
+        operation_labels = {
+            "Audit Outdated Packages": "audit",
+            "Upgrade Package": "upgrade",
+            "Install Requirements File": "install",
+        }
+
+        # Operation and its argument
+        op_frame = ctk.CTkFrame(dialog, fg_color="transparent")
+        op_frame.pack(fill="x", padx=15, pady=(15, 5))
+
+        argument_entry = ctk.CTkEntry(op_frame, width=300)
+        browse_btn = ctk.CTkButton(op_frame, text="Browse", width=80)
+
+        def operation_changed(label):
+            operation = operation_labels[label]
+            argument_entry.delete(0, "end")
+            argument_entry.configure(
+                state="disabled" if operation == "audit" else "normal",
+                placeholder_text={"upgrade": "Package name", "install": "requirements.txt"}.get(operation, "")
+            )
+            browse_btn.configure(state="normal" if operation == "install" else "disabled")
+
+        operation_menu = ctk.CTkOptionMenu(op_frame, values=list(operation_labels), width=210, command=operation_changed)
+        operation_menu.pack(side="left", padx=(0, 10))
+        argument_entry.pack(side="left", padx=(0, 5))
+        browse_btn.pack(side="left", padx=(0, 20))
+
+        ctk.CTkLabel(op_frame, text="At a time:").pack(side="left", padx=(0, 5))
+        workers_entry = ctk.CTkEntry(op_frame, width=50)
+        workers_entry.insert(0, str(venv_batch.BATCH_WORKERS))
+        workers_entry.pack(side="left")
+
+        def browse_requirements():
+            path = filedialog.askopenfilename(
+                title="Select Requirements File",
+                filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
+            )
+            if path:
+                argument_entry.delete(0, "end")
+                argument_entry.insert(0, path)
+
+        browse_btn.configure(command=browse_requirements)
+        operation_changed(operation_menu.get())
+
+        # Venv selection
+        select_frame = ctk.CTkFrame(dialog, fg_color="transparent")
+        select_frame.pack(fill="x", padx=15, pady=(5, 0))
+        ctk.CTkLabel(select_frame, text="Virtual environments:", anchor="w").pack(side="left")
+
+        venv_list = ctk.CTkScrollableFrame(dialog, height=160)
+        venv_list.pack(fill="x", padx=15, pady=5)
+        venv_vars = []
+        for venv_path in venv_dedup.known_venvs(history_store):
+            var = ctk.BooleanVar(value=True)
+            ctk.CTkCheckBox(venv_list, text=venv_path, variable=var).pack(anchor="w", pady=1)
+            venv_vars.append((venv_path, var))
+
+        def select_all(value):
+            for _, var in venv_vars:
+                var.set(value)
+
+        ctk.CTkButton(select_frame, text="None", width=60, command=lambda: select_all(False)).pack(side="right")
+        ctk.CTkButton(select_frame, text="All", width=60, command=lambda: select_all(True)).pack(side="right", padx=5)
+
+        status_label = ctk.CTkLabel(dialog, text=f"{len(venv_vars)} live venvs in the history.", anchor="w")
+        status_label.pack(fill="x", padx=15)
+
+        results_box = ctk.CTkTextbox(dialog, font=("Consolas", 11))
+        results_box.pack(fill="both", expand=True, padx=15, pady=5)
+        results_box.configure(state="disabled")
+
+        btn_frame = ctk.CTkFrame(dialog, fg_color="transparent")
+        btn_frame.pack(fill="x", padx=15, pady=(5, 15))
+        run_btn = ctk.CTkButton(btn_frame, text="Run", width=120, fg_color="#2E7D32", hover_color="#1B5E20")
+        run_btn.pack(side="left")
+        cancel_btn = ctk.CTkButton(btn_frame, text="Stop", width=100, state="disabled")
+        cancel_btn.pack(side="left", padx=10)
+
+        cancel_event = threading.Event()
+        messages = queue.Queue()
+
+        def close():
+            cancel_event.set()  # Venvs already running finish; the rest are skipped
+            dialog.destroy()
+
+        ctk.CTkButton(btn_frame, text="Close", width=100, command=close).pack(side="right")
+        dialog.protocol("WM_DELETE_WINDOW", close)
+
+        def append_text(text):
+            results_box.configure(state="normal")
+            results_box.insert("end", text + "\n")
+            results_box.see("end")
+            results_box.configure(state="disabled")
+
+        def poll():
+            if not dialog.winfo_exists():
+                return
+            while True:
+                try:
+                    kind, payload = messages.get_nowait()
+                except queue.Empty:
+                    dialog.after(HISTORY_PROBE_POLL_MS, poll)
+                    return
+                if kind == "progress":
+                    status_label.configure(text=payload)
+                elif kind == "row":
+                    append_text(venv_batch.format_row(payload))
+                else:
+                    results, error = payload
+                    run_btn.configure(state="normal")
+                    cancel_btn.configure(state="disabled")
+                    if error is not None:
+                        status_label.configure(text="")
+                        self.show_error(f"Error running batch operation: {error}")
+                    else:
+                        # Rewrite in venv order, with the totals underneath
+                        results_box.configure(state="normal")
+                        results_box.delete("1.0", "end")
+                        results_box.configure(state="disabled")
+                        append_text(venv_batch.format_results(results))
+                        status_label.configure(text=f"Finished in {results['seconds']:.1f}s.")
+                    return
+
+        def run():
+            operation = operation_labels[operation_menu.get()]
+            argument = argument_entry.get().strip() if operation != "audit" else None
+            venv_paths = [venv_path for venv_path, var in venv_vars if var.get()]
+            if not venv_paths:
+                self.show_error("Select at least one virtual environment.")
+                return
+            if operation == "upgrade" and not argument:
+                self.show_error("Enter the name of the package to upgrade.")
+                return
+            if operation == "install" and not (argument and os.path.isfile(argument)):
+                self.show_error("Select an existing requirements file.")
+                return
+            try:
+                workers = max(1, int(workers_entry.get()))
+            except ValueError:
+                self.show_error("The number of venvs at a time must be a whole number.")
+                return
+
+            def batch_task():
+                try:
+                    results = venv_batch.run_batch(
+                        operation, venv_paths, argument, workers,
+                        progress=lambda message: messages.put(("progress", message)),
+                        on_result=lambda row: messages.put(("row", row)),
+                        cancel_event=cancel_event,
+                    )
+                    messages.put(("done", (results, None)))
+                except Exception as e:
+                    messages.put(("done", (None, e)))
+
+            cancel_event.clear()
+            run_btn.configure(state="disabled")
+            cancel_btn.configure(state="normal")
+            results_box.configure(state="normal")
+            results_box.delete("1.0", "end")
+            results_box.configure(state="disabled")
+            status_label.configure(text="Starting...")
+            threading.Thread(target=batch_task, daemon=True).start()
+            dialog.after(HISTORY_PROBE_POLL_MS, poll)
+
+        def stop():
+            cancel_event.set()
+            cancel_btn.configure(state="disabled")
+            status_label.configure(text="Stopping after the venvs already running...")
+
+        run_btn.configure(command=run)
+        cancel_btn.configure(command=stop)
+
+    def remove_history_entry(self, entry_id, dialog, refresh_history, entry):
+        """Remove an entry from the history."""
         try:
-            # Load the current data
-            with open(ENV_HISTORY_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                
-            if 0 <= idx < len(data):
+            if history_store.get_entry(entry_id) is not None:
                 entry_type = entry.get("type", "venv")
                 date_deleted = entry.get("date_deleted", "")
                 
@@ -1465,13 +2142,14 @@ class VenvCreatorDialog(ctk.CTkToplevel):
                 confirm_ref = {"dialog": confirm}
                 
                 # Set action handlers
-                confirm.ok_action = lambda: self.delete_entry_from_json(idx, dialog, refresh_history, confirm_ref["dialog"])
+                confirm.ok_action = lambda: self.delete_entry_from_json(entry_id, dialog, refresh_history, confirm_ref["dialog"])
                 confirm.cancel_action = lambda: confirm.destroy()
                 
                 if self.winfo_exists() and confirm.winfo_exists():
                     self.center_dialog(confirm, parent=dialog)
             else:
-                self.show_error(f"Invalid index for history entry: {idx}")
+                self.show_error("This history entry no longer exists.")
+                refresh_history()
         except Exception as e:
             message_title = "Error"
             message_detail = str(e)
@@ -1488,47 +2166,33 @@ class VenvCreatorDialog(ctk.CTkToplevel):
             if self.winfo_exists() and confirm.winfo_exists():
                 self.center_dialog(confirm, parent=dialog)
 
-    def delete_entry_from_json(self, idx, dialog, refresh_history, confirm_dialog=None):
-        """Remove an entry completely from the JSON history file."""
+    def delete_entry_from_json(self, entry_id, dialog, refresh_history, confirm_dialog=None):
+        """Remove an entry completely from the history store."""
         try:
-            if os.path.exists(ENV_HISTORY_FILE):
-                with open(ENV_HISTORY_FILE, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+            # Remove the entry (returns None if another instance already removed it)
+            entry = history_store.delete_entry(entry_id)
+            
+            if entry is not None:
+                entry_type = entry.get("type", "venv")
                 
-                if 0 <= idx < len(data):
-                    # Get the entry for success message
-                    entry = data[idx]
-                    entry_type = entry.get("type", "venv")
-                    
-                    # Remove the entry
-                    del data[idx]
-                    
-                    # Save the modified data
-                    with open(ENV_HISTORY_FILE, 'w', encoding='utf-8') as f:
-                        json.dump(data, f, indent=2)
-                    
-                    # First close the confirmation dialog if it exists
-                    if confirm_dialog and confirm_dialog.winfo_exists():
-                        confirm_dialog.destroy()
-                        
-                    # Show success message
-                    if entry_type == "venv":
-                        self.show_success(f"Successfully removed virtual environment entry from the Environment History list.")
-                    else:
-                        self.show_success(f"Successfully removed script association entry from the Environment History list.")
+                # First close the confirmation dialog if it exists
+                if confirm_dialog and confirm_dialog.winfo_exists():
+                    confirm_dialog.destroy()
                     
-                    # Refresh the display
-                    refresh_history()
+                # Show success message
+                if entry_type == "venv":
+                    self.show_success(f"Successfully removed virtual environment entry from the Environment History list.")
                 else:
-                    # Close confirmation dialog first
-                    if confirm_dialog and confirm_dialog.winfo_exists():
-                        confirm_dialog.destroy()
-                    self.show_error(f"Invalid index for history entry: {idx}")
+                    self.show_success(f"Successfully removed script association entry from the Environment History list.")
+                
+                # Refresh the display
+                refresh_history()
             else:
                 # Close confirmation dialog first
                 if confirm_dialog and confirm_dialog.winfo_exists():
                     confirm_dialog.destroy()
-                self.show_error("History file not found.")
+                self.show_error("This history entry no longer exists.")
+                refresh_history()
         except Exception as e:
             # Close confirmation dialog first
             if confirm_dialog and confirm_dialog.winfo_exists():
@@ -1537,26 +2201,17 @@ class VenvCreatorDialog(ctk.CTkToplevel):
             if refresh_history:
                 refresh_history()  # Refresh anyway to maintain UI consistency
                 
-    def delete_association_from_history(self, script_dir, dialog, refresh_history, idx=None):
+    def delete_association_from_history(self, script_dir, dialog, refresh_history, entry_id=None):
         """Delete association files and mark the entry as deleted in history."""
         try:
             # Delete the association files
             result = self.delete_association_files(script_dir, show_results=True)
+            history_probe_cache.invalidate(script_dir)
             
-            # If an index is provided, always mark the entry as deleted in the history
-            if idx is not None:
+            # If an entry id is provided, always mark the entry as deleted in the history
+            if entry_id is not None:
                 try:
-                    if os.path.exists(ENV_HISTORY_FILE):
-                        with open(ENV_HISTORY_FILE, 'r', encoding='utf-8') as f:
-                            data = json.load(f)
-                        
-                        if 0 <= idx < len(data):
-                            # Mark as deleted
-                            data[idx]["date_deleted"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                            
-                            # Save the modified data
-                            with open(ENV_HISTORY_FILE, 'w', encoding='utf-8') as f:
-                                json.dump(data, f, indent=2)
+                    history_store.mark_deleted(entry_id)
                 except Exception as e:
                     print(f"Error marking association as deleted: {e}")
                     error_dialog = ConfirmationDialog(
@@ -1656,11 +2311,7 @@ class VenvCreatorDialog(ctk.CTkToplevel):
             return
             
         try:
-            if os.path.exists(ENV_HISTORY_FILE):
-                with open(ENV_HISTORY_FILE, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-            else:
-                data = []
+            data = history_store.entries()
                 
             with open(file_path, "w", encoding="utf-8") as f:
                 f.write("Environment History Log\n")
@@ -1716,8 +2367,8 @@ class VenvCreatorDialog(ctk.CTkToplevel):
         """Open a dialog to view the history file contents in a human-readable format"""
         try:
             # Check if history file exists
-            if not os.path.exists(ENV_HISTORY_FILE):
-                self.show_error("History file does not exist yet.")
+            if history_store.count() == 0:
+                self.show_error("No environment history has been recorded yet.")
                 return
                 
             # Create a new dialog to display the history content
@@ -1756,163 +2407,157 @@ class VenvCreatorDialog(ctk.CTkToplevel):
             x_scrollbar.pack(side="bottom", fill="x")
             text_widget.pack(side="left", fill="both", expand=True)
             
-            # Load and format the history file contents
-            with open(ENV_HISTORY_FILE, "r", encoding="utf-8") as f:
-                try:
-                    data = json.load(f)
+            # Load and format the history entries
+            data = history_store.entries()
                     
-                    # Format the data in a human-readable way
-                    text_widget.tag_configure("title", font=("Arial", 12, "bold"), foreground="#64B5F6")
-                    text_widget.tag_configure("heading", font=("Arial", 11, "bold"), foreground="#81C784")
-                    text_widget.tag_configure("subheading", font=("Arial", 10, "bold"), foreground="#FFB74D")
-                    text_widget.tag_configure("normal", font=("Consolas", 10), foreground="white")
-                    text_widget.tag_configure("deleted", font=("Consolas", 10), foreground="#E57373")
-                    text_widget.tag_configure("path", font=("Consolas", 10), foreground="#AED581")
-                    text_widget.tag_configure("timestamp", font=("Consolas", 10), foreground="#90CAF9")
-                    text_widget.tag_configure("separator", font=("Arial", 10), foreground="#555555")
+            # Format the data in a human-readable way
+            text_widget.tag_configure("title", font=("Arial", 12, "bold"), foreground="#64B5F6")
+            text_widget.tag_configure("heading", font=("Arial", 11, "bold"), foreground="#81C784")
+            text_widget.tag_configure("subheading", font=("Arial", 10, "bold"), foreground="#FFB74D")
+            text_widget.tag_configure("normal", font=("Consolas", 10), foreground="white")
+            text_widget.tag_configure("deleted", font=("Consolas", 10), foreground="#E57373")
+            text_widget.tag_configure("path", font=("Consolas", 10), foreground="#AED581")
+            text_widget.tag_configure("timestamp", font=("Consolas", 10), foreground="#90CAF9")
+            text_widget.tag_configure("separator", font=("Arial", 10), foreground="#555555")
                     
-                    # Add title
-                    text_widget.insert("end", "Environment History\n\n", "title")
+            # Add title
+            text_widget.insert("end", "Environment History\n\n", "title")
                     
-                    # Count entries by type
-                    venv_count = len([e for e in data if e.get("type", "venv") == "venv"])
-                    assoc_count = len([e for e in data if e.get("type", "") == "association"])
-                    deleted_count = len([e for e in data if e.get("date_deleted", "")])
+            # Count entries by type
+            venv_count = len([e for e in data if e.get("type", "venv") == "venv"])
+            assoc_count = len([e for e in data if e.get("type", "") == "association"])
+            deleted_count = len([e for e in data if e.get("date_deleted", "")])
                     
-                    # Add summary
-                    text_widget.insert("end", f"Total Entries: {len(data)}\n", "heading")
-                    text_widget.insert("end", f"Virtual Environments: {venv_count}\n", "normal")
-                    text_widget.insert("end", f"Script Associations: {assoc_count}\n", "normal")
-                    text_widget.insert("end", f"Deleted Items: {deleted_count}\n\n", "normal")
+            # Add summary
+            text_widget.insert("end", f"Total Entries: {len(data)}\n", "heading")
+            text_widget.insert("end", f"Virtual Environments: {venv_count}\n", "normal")
+            text_widget.insert("end", f"Script Associations: {assoc_count}\n", "normal")
+            text_widget.insert("end", f"Deleted Items: {deleted_count}\n\n", "normal")
                     
-                    # Add separator
-                    text_widget.insert("end", "=" * 80 + "\n\n", "separator")
+            # Add separator
+            text_widget.insert("end", "=" * 80 + "\n\n", "separator")
                     
-                    # Add each entry
-                    for i, entry in enumerate(data):
-                        entry_type = entry.get("type", "venv")
-                        date_added = entry.get("date", "Unknown")
-                        date_deleted = entry.get("date_deleted", "")
+            # Add each entry
+            for i, entry in enumerate(data):
+                entry_type = entry.get("type", "venv")
+                date_added = entry.get("date", "Unknown")
+                date_deleted = entry.get("date_deleted", "")
                         
-                        # Entry header
-                        header = f"Entry #{i+1}: "
-                        if entry_type == "venv":
-                            header += "Virtual Environment"
-                        else:
-                            header += "Script Association"
+                # Entry header
+                header = f"Entry #{i+1}: "
+                if entry_type == "venv":
+                    header += "Virtual Environment"
+                else:
+                    header += "Script Association"
                             
-                        if date_deleted:
-                            header += " [DELETED]"
+                if date_deleted:
+                    header += " [DELETED]"
                             
-                        text_widget.insert("end", header + "\n", "heading")
+                text_widget.insert("end", header + "\n", "heading")
                         
-                        # Common fields
-                        text_widget.insert("end", "Date Created: ", "subheading")
-                        text_widget.insert("end", f"{date_added}\n", "timestamp")
+                # Common fields
+                text_widget.insert("end", "Date Created: ", "subheading")
+                text_widget.insert("end", f"{date_added}\n", "timestamp")
                         
-                        if date_deleted:
-                            text_widget.insert("end", "Date Deleted: ", "subheading")
-                            text_widget.insert("end", f"{date_deleted}\n", "deleted")
+                if date_deleted:
+                    text_widget.insert("end", "Date Deleted: ", "subheading")
+                    text_widget.insert("end", f"{date_deleted}\n", "deleted")
                         
-                        # Type-specific fields
-                        if entry_type == "venv":
-                            venv_path = entry.get("venv_path", "")
-                            parent_dir = entry.get("parent", "")
+                # Type-specific fields
+                if entry_type == "venv":
+                    venv_path = entry.get("venv_path", "")
+                    parent_dir = entry.get("parent", "")
                             
-                            text_widget.insert("end", "Parent Directory: ", "subheading")
-                            text_widget.insert("end", f"{parent_dir}\n", "normal")
+                    text_widget.insert("end", "Parent Directory: ", "subheading")
+                    text_widget.insert("end", f"{parent_dir}\n", "normal")
                             
-                            text_widget.insert("end", "Virtual Environment Path: ", "subheading")
-                            text_widget.insert("end", f"{venv_path}\n", "path")
+                    text_widget.insert("end", "Virtual Environment Path: ", "subheading")
+                    text_widget.insert("end", f"{venv_path}\n", "path")
                             
-                            # Check if it exists
-                            exists = os.path.exists(venv_path)
-                            text_widget.insert("end", "Still Exists: ", "subheading")
-                            if exists:
-                                text_widget.insert("end", "Yes\n", "normal")
-                            else:
-                                if date_deleted:
-                                    text_widget.insert("end", "No (Deleted through app)\n", "deleted")
-                                else:
-                                    text_widget.insert("end", "No (Manual Delete Detected Outside of App)\n", "deleted")
+                    # Check if it exists
+                    exists = os.path.exists(venv_path)
+                    text_widget.insert("end", "Still Exists: ", "subheading")
+                    if exists:
+                        text_widget.insert("end", "Yes\n", "normal")
+                    else:
+                        if date_deleted:
+                            text_widget.insert("end", "No (Deleted through app)\n", "deleted")
+                        else:
+                            text_widget.insert("end", "No (Manual Delete Detected Outside of App)\n", "deleted")
                             
-                            # Get last used info
-                            last_used = get_venv_last_used_date(venv_path)
-                            if last_used:
-                                text_widget.insert("end", "Last Used: ", "subheading")
-                                text_widget.insert("end", f"{last_used}\n", "timestamp")
+                    # Get last used info
+                    last_used = get_venv_last_used_date(venv_path)
+                    if last_used:
+                        text_widget.insert("end", "Last Used: ", "subheading")
+                        text_widget.insert("end", f"{last_used}\n", "timestamp")
                             
-                        else:  # association
-                            script_path = entry.get("script_path", "")
-                            script_dir = entry.get("script_dir", "")
-                            script_name = entry.get("script_name", "")
-                            venv_path = entry.get("venv_path", "")
-                            with_systray = entry.get("with_systray", False)
-                            with_startup = entry.get("with_startup", False)
+                else:  # association
+                    script_path = entry.get("script_path", "")
+                    script_dir = entry.get("script_dir", "")
+                    script_name = entry.get("script_name", "")
+                    venv_path = entry.get("venv_path", "")
+                    with_systray = entry.get("with_systray", False)
+                    with_startup = entry.get("with_startup", False)
                             
-                            text_widget.insert("end", "Script Name: ", "subheading")
-                            text_widget.insert("end", f"{script_name}\n", "normal")
+                    text_widget.insert("end", "Script Name: ", "subheading")
+                    text_widget.insert("end", f"{script_name}\n", "normal")
                             
-                            text_widget.insert("end", "Script Path: ", "subheading")
-                            text_widget.insert("end", f"{script_path}\n", "path")
+                    text_widget.insert("end", "Script Path: ", "subheading")
+                    text_widget.insert("end", f"{script_path}\n", "path")
                             
-                            text_widget.insert("end", "Script Directory: ", "subheading")
-                            text_widget.insert("end", f"{script_dir}\n", "path")
+                    text_widget.insert("end", "Script Directory: ", "subheading")
+                    text_widget.insert("end", f"{script_dir}\n", "path")
                             
-                            text_widget.insert("end", "Virtual Environment Path: ", "subheading")
-                            text_widget.insert("end", f"{venv_path}\n", "path")
+                    text_widget.insert("end", "Virtual Environment Path: ", "subheading")
+                    text_widget.insert("end", f"{venv_path}\n", "path")
                             
-                            text_widget.insert("end", "System Tray Support: ", "subheading")
-                            text_widget.insert("end", f"{with_systray}\n", "normal")
+                    text_widget.insert("end", "System Tray Support: ", "subheading")
+                    text_widget.insert("end", f"{with_systray}\n", "normal")
                             
-                            text_widget.insert("end", "Startup at Login: ", "subheading")
-                            text_widget.insert("end", f"{with_startup}\n", "normal")
+                    text_widget.insert("end", "Startup at Login: ", "subheading")
+                    text_widget.insert("end", f"{with_startup}\n", "normal")
                             
-                            # Check if association files exist
-                            if os.path.exists(script_dir):
-                                association_files = [
-                                    ".venv-association",
-                                    "run_this.vbs",
-                                    "run_this.bat",
-                                    "launcher.py",
-                                    "launcher_icon.ico"
-                                ]
+                    # Check if association files exist
+                    if os.path.exists(script_dir):
+                        association_files = [
+                            ".venv-association",
+                            "run_this.vbs",
+                            "run_this.bat",
+                            "launcher.py",
+                            "launcher_icon.ico"
+                        ]
                                 
-                                existing_files = []
-                                for file_name in association_files:
-                                    file_path = os.path.join(script_dir, file_name)
-                                    if os.path.exists(file_path):
-                                        existing_files.append(file_name)
+                        existing_files = []
+                        for file_name in association_files:
+                            file_path = os.path.join(script_dir, file_name)
+                            if os.path.exists(file_path):
+                                existing_files.append(file_name)
                                 
-                                if existing_files:
-                                    text_widget.insert("end", "Association Files Present: ", "subheading")
-                                    text_widget.insert("end", ", ".join(existing_files) + "\n", "normal")
-                                else:
-                                    # Check if venv was deleted
-                                    venv_deleted = False
-                                    for venv_entry in data:
-                                        if venv_entry.get("type") == "venv" and venv_entry.get("venv_path") == venv_path and venv_entry.get("date_deleted"):
-                                            venv_deleted = True
-                                            break
-                                    if date_deleted:
-                                        text_widget.insert("end", "No Association Files Present (Deleted through app)\n", "deleted")
-                                    elif venv_deleted:
-                                        text_widget.insert("end", "No Association Files Present (Deleted due to venv deletion)\n", "deleted")
-                                    else:
-                                        text_widget.insert("end", "No Association Files Present (Manual Delete Detected Outside of App)\n", "deleted")
+                        if existing_files:
+                            text_widget.insert("end", "Association Files Present: ", "subheading")
+                            text_widget.insert("end", ", ".join(existing_files) + "\n", "normal")
+                        else:
+                            # Check if venv was deleted
+                            venv_deleted = False
+                            for venv_entry in data:
+                                if venv_entry.get("type") == "venv" and venv_entry.get("venv_path") == venv_path and venv_entry.get("date_deleted"):
+                                    venv_deleted = True
+                                    break
+                            if date_deleted:
+                                text_widget.insert("end", "No Association Files Present (Deleted through app)\n", "deleted")
+                            elif venv_deleted:
+                                text_widget.insert("end", "No Association Files Present (Deleted due to venv deletion)\n", "deleted")
                             else:
-                                if date_deleted:
-                                    text_widget.insert("end", "Script Directory No Longer Exists (Deleted through app)\n", "deleted")
-                                else:
-                                    text_widget.insert("end", "Script Directory No Longer Exists (Manual Delete Detected Outside of App)\n", "deleted")
+                                text_widget.insert("end", "No Association Files Present (Manual Delete Detected Outside of App)\n", "deleted")
+                    else:
+                        if date_deleted:
+                            text_widget.insert("end", "Script Directory No Longer Exists (Deleted through app)\n", "deleted")
+                        else:
+                            text_widget.insert("end", "Script Directory No Longer Exists (Manual Delete Detected Outside of App)\n", "deleted")
                         
-                        # Add separator
-                        text_widget.insert("end", "\n" + "-" * 80 + "\n\n", "separator")
+                # Add separator
+                text_widget.insert("end", "\n" + "-" * 80 + "\n\n", "separator")
                         
-                except json.JSONDecodeError:
-                    # If JSON is invalid, show raw content
-                    f.seek(0)
-                    text_widget.insert("1.0", f.read())
             
             # Make text widget read-only
             text_widget.configure(state="disabled")
@@ -2021,13 +2666,22 @@ class VenvCreatorDialog(ctk.CTkToplevel):
             # Clean launcher code using f-strings (NO concat)
             launcher_content = f'''import sys
 import os
+import time
+import threading
 import subprocess
-from PySide6.QtWidgets import QApplication, QSystemTrayIcon, QMenu
+from collections import deque
+from PySide6.QtWidgets import QApplication, QSystemTrayIcon, QMenu, QDialog, QVBoxLayout, QTabWidget, QPlainTextEdit
 from PySide6.QtGui import QIcon, QAction, QPixmap, QPainter, QColor, QBrush
+from PySide6.QtCore import QObject, Signal, QTimer
 
 # Debug mode flag - set to True to see console output and use python.exe
 DEBUG_MODE = False
 
+OUTPUT_BUFFER_LINES = 500  # Lines of stdout/stderr kept for "Show Output"
+RESTART_BACKOFF_START = 1.0
+RESTART_BACKOFF_MAX = 30.0
+RESTART_STABLE_SECONDS = 60  # A run at least this long resets the backoff
+
 # Initialize QApplication first
 app = QApplication(sys.argv)
 app.setQuitOnLastWindowClosed(False)
@@ -2069,6 +2723,13 @@ config = get_config()
 SCRIPT_NAME = config.get("main_script", "main.py")
 venv_path = config.get("venv_path", "venv")
 
+# Optional restart policy: restart=no|on-failure|always, restart_max=N (0 = unlimited)
+RESTART_MODE = config.get("restart", "no").lower()
+try:
+    RESTART_MAX = int(config.get("restart_max", "5"))
+except ValueError:
+    RESTART_MAX = 5
+
 def find_python():
     """Find an appropriate Python executable to use based on DEBUG_MODE"""
     script_dir = os.path.dirname(__file__)
@@ -2103,13 +2764,140 @@ if not VENV_PYTHON:
     print("[ERROR] No suitable Python interpreter found. Exiting.")
     sys.exit(1)
 
+class ProcessWatcher(QObject):
+    """Carries events from the waiter and reader threads into the Qt event loop"""
+    exited = Signal(object, int)  # (process, exit code)
+    output = Signal(str, str)  # (stream name, line)
+
+watcher = ProcessWatcher()
+output_buffers = {{"stdout": deque(maxlen=OUTPUT_BUFFER_LINES), "stderr": deque(maxlen=OUTPUT_BUFFER_LINES)}}
+state = {{"process": None, "started": 0.0, "stopping": False, "delay": RESTART_BACKOFF_START, "restarts": 0}}
+
+def read_output(stream, name):
+    # Reader thread: keep the last lines and forward each one to the Qt loop
+    for line in stream:
+        line = line.rstrip("\\n")
+        output_buffers[name].append(line)
+        watcher.output.emit(name, line)
+    stream.close()
+
+def start_script():
+    """Launch the script and start a thread that waits on its process handle"""
+    cmd = [VENV_PYTHON, SCRIPT_NAME]
+    
+    # Print command in debug mode
+    if DEBUG_MODE:
+        print(f"[DEBUG] Running command: {{' '.join(cmd)}}")
+    
+    # Launch process with or without console based on debug mode
+    if DEBUG_MODE:
+        process = subprocess.Popen(
+            cmd,
+            cwd=os.path.dirname(__file__)
+        )
+    else:
+        # Capture output for the tray's output viewer
+        process = subprocess.Popen(
+            cmd,
+            cwd=os.path.dirname(__file__),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            errors="replace",
+            env=dict(os.environ, PYTHONUNBUFFERED="1"),
+            creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+        )
+        for name in ("stdout", "stderr"):
+            threading.Thread(target=read_output, args=(getattr(process, name), name), daemon=True).start()
+    
+    state["process"] = process
+    state["started"] = time.monotonic()
+    # The waiter thread blocks on the handle; the exit is delivered to the Qt loop at once
+    threading.Thread(target=lambda: watcher.exited.emit(process, process.wait()), daemon=True).start()
+    print(f"[DEBUG] Launched process PID: {{process.pid}}")
+
+def restart_delay(code):
+    """Seconds to wait before restarting after an exit, or None to stop"""
+    if RESTART_MODE not in ("on-failure", "always") or (RESTART_MODE == "on-failure" and code == 0):
+        return None
+    if time.monotonic() - state["started"] >= RESTART_STABLE_SECONDS:
+        state["delay"] = RESTART_BACKOFF_START
+        state["restarts"] = 0
+    if RESTART_MAX and state["restarts"] >= RESTART_MAX:
+        return None
+    delay = state["delay"]
+    state["delay"] = min(delay * 2, RESTART_BACKOFF_MAX)
+    state["restarts"] += 1
+    return delay
+
+def restart_script():
+    if state["stopping"]:
+        return
+    try:
+        start_script()
+        tray.setToolTip(f"Launcher for {{SCRIPT_NAME}}")
+    except Exception as e:
+        print(f"[ERROR] Failed to restart script: {{str(e)}}")
+        kill_app()
+
+def process_exited(process, code):
+    if state["stopping"] or process is not state["process"]:
+        return
+    delay = restart_delay(code)
+    if delay is None:
+        print(f"[DEBUG] Script exited with code {{code}}, closing launcher.")
+        kill_app()
+        return
+    print(f"[DEBUG] Script exited with code {{code}}, restarting in {{delay:.0f}}s.")
+    tray.setToolTip(f"{{SCRIPT_NAME}} exited with code {{code}}, restarting in {{delay:.0f}}s")
+    QTimer.singleShot(int(delay * 1000), restart_script)
+
+watcher.exited.connect(process_exited)
+
+# Output viewer: shows the buffered lines and follows new ones while open
+viewer = {{}}
+
+def show_output():
+    if "dialog" not in viewer:
+        dialog = QDialog()
+        dialog.setWindowTitle(f"Output of {{SCRIPT_NAME}}")
+        dialog.resize(800, 500)
+        tabs = QTabWidget(dialog)
+        layout = QVBoxLayout(dialog)
+        layout.addWidget(tabs)
+        for name in ("stdout", "stderr"):
+            text = QPlainTextEdit()
+            text.setReadOnly(True)
+            text.setMaximumBlockCount(OUTPUT_BUFFER_LINES)
+            tabs.addTab(text, name)
+            viewer[name] = text
+        viewer["dialog"] = dialog
+    for name in ("stdout", "stderr"):
+        viewer[name].setPlainText("\\n".join(output_buffers[name]))
+    viewer["dialog"].show()
+    viewer["dialog"].raise_()
+    viewer["dialog"].activateWindow()
+
+def append_output(name, line):
+    if "dialog" in viewer and viewer["dialog"].isVisible():
+        viewer[name].appendPlainText(line)
+
+watcher.output.connect(append_output)
+
 # Example Exit action
 def kill_app():
-    if process.poll() is None:
+    state["stopping"] = True
+    process = state["process"]
+    if process is not None and process.poll() is None:
         process.terminate()
     tray.hide()
     app.quit()
 
+output_action = QAction("Show Output")
+output_action.triggered.connect(show_output)
+output_action.setEnabled(not DEBUG_MODE)
+menu.addAction(output_action)
+
 exit_action = QAction("Exit App")
 exit_action.triggered.connect(kill_app)
 menu.addAction(exit_action)
@@ -2130,27 +2918,7 @@ if not os.path.exists(script_path):
     sys.exit(3)
 
 try:
-    # Prepare command
-    cmd = [VENV_PYTHON, SCRIPT_NAME]
-    
-    # Print command in debug mode
-    if DEBUG_MODE:
-        print(f"[DEBUG] Running command: {{' '.join(cmd)}}")
-    
-    # Launch process with or without console based on debug mode
-    if DEBUG_MODE:
-        process = subprocess.Popen(
-            cmd,
-            cwd=os.path.dirname(__file__)
-        )
-    else:
-        process = subprocess.Popen(
-            cmd,
-            cwd=os.path.dirname(__file__),
-            creationflags=subprocess.CREATE_NO_WINDOW
-        )
-    
-    print(f"[DEBUG] Launched process PID: {{process.pid}}")
+    start_script()
 except Exception as e:
     print(f"[ERROR] Failed to launch script: {{str(e)}}")
 
@@ -2321,18 +3089,11 @@ sys.exit(app.exec())
         }
         
         try:
-            if os.path.exists(ENV_HISTORY_FILE):
-                with open(ENV_HISTORY_FILE, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-            else:
-                data = []
-            data.append(entry)
-            with open(ENV_HISTORY_FILE, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2)
+            history_store.add_entry(entry)
         except Exception as e:
             print(f"Error logging script association: {e}")
 
-    def delete_venv_from_history(self, idx, venv_path, dialog, refresh_history):
+    def delete_venv_from_history(self, entry_id, venv_path, dialog, refresh_history):
         """Delete a venv from the file system and mark it as deleted in history."""
         try:
             # Extract script root directory from venv path
@@ -2486,36 +3247,24 @@ sys.exit(app.exec())
         btn_frame.pack(pady=10)
         ctk.CTkButton(btn_frame, text="OK", command=dialog.destroy).pack(padx=10)
 
-    def force_delete_entry(self, idx, dialog, refresh_history):
+    def force_delete_entry(self, entry_id, dialog, refresh_history):
         """Force delete an entry from history without checking for resource existence"""
         try:
-            if os.path.exists(ENV_HISTORY_FILE):
-                with open(ENV_HISTORY_FILE, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                if 0 <= idx < len(data):
-                    # Get the entry type for the success message
-                    entry_type = data[idx].get("type", "venv")
-                    
-                    # Remove the entry
-                    del data[idx]
-                    
-                    # Save the modified data
-                    with open(ENV_HISTORY_FILE, 'w', encoding='utf-8') as f:
-                        json.dump(data, f, indent=2)
-                    
-                    # Show success message
-                    if entry_type == "venv":
-                        self.show_success(f"Successfully removed virtual environment entry from the Environment History list.")
-                    else:
-                        self.show_success(f"Successfully removed script association entry from the Environment History list.")
-                    
-                    # Refresh the display
-                    refresh_history()
+            # Remove the entry (returns None if it was already removed)
+            entry = history_store.delete_entry(entry_id)
+            
+            if entry is not None:
+                # Show success message
+                if entry.get("type", "venv") == "venv":
+                    self.show_success(f"Successfully removed virtual environment entry from the Environment History list.")
                 else:
-                    self.show_error(f"Invalid index for history entry: {idx}")
+                    self.show_success(f"Successfully removed script association entry from the Environment History list.")
+                
+                # Refresh the display
+                refresh_history()
             else:
-                self.show_error("History file not found.")
+                self.show_error("This history entry no longer exists.")
+                refresh_history()
         except Exception as e:
             self.show_error(f"Error updating history: {str(e)}")
             refresh_history()  # Refresh anyway to maintain UI consistency
@@ -2541,18 +3290,12 @@ sys.exit(app.exec())
         # Try to read existing packages from the venv
         try:
             self.show_spinner("Reading installed packages...")
-            cmd = [pip_exe, "freeze"]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            packages = [line.strip() for line in result.stdout.splitlines() if line.strip()]
-            
-            # Filter out packages with version specifiers and clean up
-            cleaned_packages = []
-            for pkg in packages:
-                if "==" in pkg:
-                    pkg_name = pkg.split("==")[0].strip()
-                    cleaned_packages.append(pkg_name)
-                elif pkg and not pkg.startswith("-"):
-                    cleaned_packages.append(pkg)
+            # Read the distributions' metadata directly instead of starting pip freeze
+            dists = venv_lock.installed_distributions(venv_dir)
+            cleaned_packages = sorted(
+                (dist["name"] for name, dist in dists.items() if name not in venv_sync.PROTECTED_DISTRIBUTIONS),
+                key=str.lower
+            )
                     
             # Populate the requirements listbox
             for pkg in cleaned_packages:
@@ -2597,27 +3340,58 @@ sys.exit(app.exec())
             self.show_error("No valid packages selected. Please add packages to install.")
             return
         
+        # Diff the list against what is installed; only the differences get applied.
+        # Listed stdlib names aren't installed here, but an installed backport of one stays.
+        try:
+            plan = venv_sync.plan_sync(venv_path, requirements, keep=skipped)
+        except Exception as e:
+            self.show_error(f"Error reading installed packages: {str(e)}")
+            return
+        
+        if venv_sync.plan_is_empty(plan):
+            self.show_success(venv_sync.format_plan(plan))
+            return
+        
+        confirm = ConfirmationDialog(
+            self, "Confirm Venv Update", "Apply these changes to the virtual environment?",
+            venv_sync.format_plan(plan, short=True),
+            "Apply", "Cancel", icon_path=self.icon_path
+        )
+        confirm.ok_action = lambda: (confirm.destroy(), self.apply_venv_sync(venv_path, plan, requirements, skipped))
+        confirm.cancel_action = lambda: confirm.destroy()
+        if self.winfo_exists() and confirm.winfo_exists():
+            self.center_dialog(confirm)
+    
+    def apply_venv_sync(self, venv_path, plan, requirements, skipped):
+        """Run a confirmed sync plan (one batched install, one batched uninstall) in the background"""
         def update_task():
             self.show_spinner("Updating virtual environment...")
             try:
-                # Install requirements using pip
-                pip_path = os.path.join(venv_path, "Scripts" if sys.platform == "win32" else "bin", "pip")
-                if sys.platform == "win32":
-                    pip_path += ".exe"
+                result = venv_sync.apply_plan(venv_path, plan)
                 
-                success = []
-                failed = []
-                for pkg in requirements:
+                # Keep an existing lockfile in step with the new contents
+                if os.path.exists(os.path.join(venv_path, venv_lock.LOCK_FILE_NAME)):
                     try:
-                        result = subprocess.run([pip_path, "install", pkg], capture_output=True, text=True, check=True)
-                        success.append(pkg)
-                    except subprocess.CalledProcessError as e:
-                        failed.append(pkg)
+                        venv_lock.write_lock(venv_path, [r for r in requirements if r not in result["failed"]])
+                    except Exception as e:
+                        print(f"Error updating lockfile: {e}")
                 
                 self.hide_spinner()
                 
-                # Show installation summary
-                self.show_install_summary(success, failed, skipped)
+                # Show sync summary
+                msg = f"Virtual environment updated in {result['seconds']:.1f}s.\n\n"
+                if result["installed"]:
+                    msg += "✔️ Installed or changed:\n" + "\n".join(result["installed"]) + "\n\n"
+                if result["removed"]:
+                    msg += "🗑️ Removed:\n" + "\n".join(result["removed"]) + "\n\n"
+                if result["kept"]:
+                    msg += "ℹ️ Kept (needed by new packages):\n" + "\n".join(result["kept"]) + "\n\n"
+                if result["failed"]:
+                    msg += "⛔ Failed:\n" + "\n".join(result["failed"]) + "\n\n"
+                if skipped:
+                    msg += "ℹ️ Skipped standard library modules:\n" + "\n".join(skipped) + "\n\n"
+                msg += f"Already satisfied: {len(plan['satisfied'])}"
+                self.show_custom_success(msg, height=min(600, 160 + 18 * msg.count("\n")))
                 
                 # Reset state
                 self.selected_venv_path = None
@@ -2667,6 +3441,121 @@ def get_venv_last_used_date(venv_path):
             
     return ""
 
+def venv_directory_size(path):
+    """Total size in bytes of the files under path (symlinks are not followed)."""
+    total = 0
+    stack = [path]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            total += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+    return total
+
+def format_venv_size(num_bytes):
+    """Human-readable size for the history table"""
+    size = float(num_bytes)
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+class HistoryProbeCache:
+    """Filesystem facts for history entries (existence, last used, size), probed on a
+    thread pool so slow or network drives never block the Tk thread, and cached for
+    HISTORY_PROBE_TTL seconds."""
+    def __init__(self, ttl=HISTORY_PROBE_TTL, max_workers=HISTORY_PROBE_WORKERS):
+        self.ttl = ttl
+        self.max_workers = max_workers
+        self._results = {}  # key -> (probed_at, result)
+        self._pending = set()
+        self._completed = queue.Queue()
+        self._lock = threading.Lock()
+        self._executor = None
+
+    @staticmethod
+    def key_for(entry):
+        if entry.get("type", "venv") == "association":
+            return ("association", entry.get("script_dir", ""))
+        return ("venv", entry.get("venv_path", ""))
+
+    def get(self, entry):
+        """Fresh cached result for entry, or None."""
+        key = self.key_for(entry)
+        with self._lock:
+            cached = self._results.get(key)
+        if cached and time.monotonic() - cached[0] < self.ttl:
+            return cached[1]
+        return None
+
+    def request(self, entry):
+        """Queue a probe unless a fresh result exists or one is already running."""
+        key = self.key_for(entry)
+        if self.get(entry) is not None:
+            return
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="history-probe")
+        self._executor.submit(self._probe, key)
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def drain_completed(self):
+        """Keys whose probes finished since the last call (Tk thread)."""
+        finished = set()
+        while True:
+            try:
+                finished.add(self._completed.get_nowait())
+            except queue.Empty:
+                return finished
+
+    def invalidate(self, path):
+        """Forget results for a venv path or association script directory."""
+        with self._lock:
+            for key in [k for k in self._results if k[1] == path]:
+                del self._results[key]
+
+    def _probe(self, key):
+        kind, path = key
+        try:
+            if kind == "venv":
+                exists = bool(path) and os.path.exists(path)
+                result = {
+                    "exists": exists,
+                    "last_used": get_venv_last_used_date(path) if exists else "",
+                    "size": venv_directory_size(path) if exists else None,
+                }
+            else:
+                # Association resources exist while any of the generated files remain
+                exists = bool(path) and os.path.isdir(path) and any(
+                    os.path.exists(os.path.join(path, name)) for name in ASSOCIATION_FILES
+                )
+                result = {"exists": exists}
+        except Exception as e:
+            print(f"Error probing {path}: {e}")
+            result = {"exists": False, "last_used": "", "size": None}
+        with self._lock:
+            self._results[key] = (time.monotonic(), result)
+            self._pending.discard(key)
+        self._completed.put(key)
+
+history_probe_cache = HistoryProbeCache()
+
 # Helper to check if a module is part of the standard library
 def is_stdlib_module(module_name):
     if module_name.lower() == "pillow":  # Pillow is not stdlib
@@ -2758,8 +3647,8 @@ class ConfirmationDialog(ctk.CTkToplevel):
         """Open a dialog to view the history file contents"""
         try:
             # Check if history file exists
-            if not os.path.exists(ENV_HISTORY_FILE):
-                self.show_error("History file does not exist yet.")
+            if history_store.count() == 0:
+                self.show_error("No environment history has been recorded yet.")
                 return
                 
             # Create a new dialog to display the history content
@@ -2798,18 +3687,11 @@ class ConfirmationDialog(ctk.CTkToplevel):
             x_scrollbar.pack(side="bottom", fill="x")
             text_widget.pack(side="left", fill="both", expand=True)
             
-            # Load and insert the history file contents
-            with open(ENV_HISTORY_FILE, "r", encoding="utf-8") as f:
-                # Pretty format the JSON for better readability
-                import json
-                try:
-                    data = json.load(f)
-                    formatted_json = json.dumps(data, indent=4)
-                    text_widget.insert("1.0", formatted_json)
-                except json.JSONDecodeError:
-                    # If JSON is invalid, show raw content
-                    f.seek(0)
-                    text_widget.insert("1.0", f.read())
+            # Load and insert the history entries
+            # Pretty format the JSON for better readability
+            data = history_store.entries()
+            formatted_json = json.dumps(data, indent=4)
+            text_widget.insert("1.0", formatted_json)
             
             # Make text widget read-only
             text_widget.configure(state="disabled")
@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+"""
+Venv Dedup - find byte-identical installed files across venvs and optionally
+replace them with hardlinks to a shared store.
+
+Every venv the creator builds installs its own copy of the same wheels (PySide6
+alone is several hundred MB per venv). The analysis reads each distribution's
+RECORD file in every known venv's site-packages and groups files by their
+recorded hash and size, so the report needs no file reads. Files already
+hardlinked together are counted once.
+
+Consolidation is opt-in. Each file is re-hashed and must still match its RECORD
+hash before anything is linked. The first verified copy is linked into the
+shared store, and the others are then atomically replaced by hardlinks to that
+store file. Only files on the same volume as the store can be linked. pip
+replaces files rather than writing into them, so upgrading a package in one
+venv does not affect the others.
+
+Command line usage:
+    python venv_dedup.py report [--venv PATH ...] [--format json]
+    python venv_dedup.py consolidate [--venv PATH ...] [--store DIR] [--yes]
+
+Without --venv, the live venvs recorded in the history store are analyzed.
+"""
+import os
+import sys
+import csv
+import json
+import base64
+import hashlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from venv_history_store import VenvHistoryStore, HISTORY_DB_FILE, venv_path_key
+from venv_inventory import site_packages_dirs, format_size
+
+if sys.platform == "darwin":
+    BASE_DATA_DIR = os.path.expanduser("~/Library/Application Support")
+elif sys.platform == "win32":
+    BASE_DATA_DIR = os.getenv('APPDATA') or os.path.expanduser("~\\AppData\\Roaming")
+else:
+    BASE_DATA_DIR = os.path.expanduser("~/.local/share")
+APP_DATA_DIR = os.path.join(BASE_DATA_DIR, "Python_Global_Package_Manager")
+SHARED_STORE_DIR = os.path.join(APP_DATA_DIR, "venv_shared_store")
+
+DEDUP_WORKERS = min(16, (os.cpu_count() or 4) * 2)
+HASH_CHUNK_SIZE = 1024 * 1024
+# Files smaller than this aren't worth a link (a hardlink still costs a directory entry)
+MIN_DEDUP_SIZE = 4096
+
+
+def known_venvs(store=None):
+    """Live venv paths from the history store that still exist on disk."""
+    store = store or VenvHistoryStore(HISTORY_DB_FILE)
+    paths = {}
+    for entry in store.entries(entry_type="venv", include_deleted=False):
+        venv_path = entry.get("venv_path")
+        if venv_path and venv_path_key(venv_path) not in paths and os.path.isdir(venv_path):
+            paths[venv_path_key(venv_path)] = venv_path
+    return list(paths.values())
+
+
+def _dist_name_version(dist_info_name):
+    stem = dist_info_name[:-len(".dist-info")]
+    name, _, version = stem.partition("-")
+    return name, version
+
+
+def _read_record(venv_path, site_dir, dist_info_name):
+    """Installed files of one distribution that RECORD lists with a hash, with their stat."""
+    name, version = _dist_name_version(dist_info_name)
+    record_path = os.path.join(site_dir, dist_info_name, "RECORD")
+    files = []
+    try:
+        with open(record_path, "r", encoding="utf-8", newline="") as f:
+            rows = list(csv.reader(f))
+    except OSError:
+        return files
+    site_root = os.path.normcase(os.path.abspath(site_dir))
+    for row in rows:
+        if len(row) < 3 or not row[1] or "=" not in row[1]:
+            continue
+        relative_path, hash_field, size_field = row[0], row[1], row[2]
+        full_path = os.path.abspath(os.path.join(site_dir, relative_path))
+        # Console scripts etc. (../../bin/...) are rewritten per venv; only site-packages content is shared
+        if not os.path.normcase(full_path).startswith(site_root + os.sep):
+            continue
+        algorithm, _, digest = hash_field.partition("=")
+        try:
+            recorded_size = int(size_field)
+            st = os.stat(full_path, follow_symlinks=False)
+        except (ValueError, OSError):
+            continue
+        files.append({
+            "venv": venv_path,
+            "dist": name,
+            "version": version,
+            "path": full_path,
+            "algorithm": algorithm,
+            "digest": digest,
+            "size": st.st_size,
+            # A size that no longer matches RECORD means the file was modified after install
+            "modified": st.st_size != recorded_size,
+            "dev": st.st_dev,
+            "ino": st.st_ino,
+            "mode": st.st_mode & 0o7777,
+        })
+    return files
+
+
+def collect_files(venv_paths, max_workers=DEDUP_WORKERS):
+    """Every hashed RECORD entry in the venvs' site-packages, read in parallel per distribution."""
+    jobs = []
+    for venv_path in venv_paths:
+        for site_dir in site_packages_dirs(venv_path):
+            try:
+                with os.scandir(site_dir) as it:
+                    jobs.extend((venv_path, site_dir, entry.name) for entry in it if entry.name.endswith(".dist-info"))
+            except OSError:
+                pass
+    files = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for result in executor.map(lambda job: _read_record(*job), jobs):
+            files.extend(result)
+    return files
+
+
+def group_duplicates(files, min_size=MIN_DEDUP_SIZE):
+    """{(algorithm, digest, size): [files]} for content present as more than one inode."""
+    groups = defaultdict(list)
+    for file in files:
+        if not file["modified"] and file["size"] >= min_size:
+            groups[(file["algorithm"], file["digest"], file["size"])].append(file)
+    return {
+        key: group for key, group in groups.items()
+        if len({(f["dev"], f["ino"]) for f in group}) > 1
+    }
+
+
+def build_report(venv_paths, files, groups):
+    """Duplicate bytes per distribution/version, largest first, plus totals."""
+    by_dist = {}
+    for (_, _, size), group in groups.items():
+        inodes = {(f["dev"], f["ino"]) for f in group}
+        for file in group:
+            stats = by_dist.setdefault((file["dist"], file["version"]), {
+                "dist": file["dist"], "version": file["version"], "venvs": set(),
+                "files": 0, "duplicate_bytes": 0,
+            })
+            stats["venvs"].add(file["venv"])
+        first = group[0]
+        stats = by_dist[(first["dist"], first["version"])]
+        stats["files"] += 1
+        stats["duplicate_bytes"] += size * (len(inodes) - 1)
+    rows = []
+    for stats in by_dist.values():
+        if stats["duplicate_bytes"]:
+            stats["venvs"] = len(stats["venvs"])
+            rows.append(stats)
+    rows.sort(key=lambda r: r["duplicate_bytes"], reverse=True)
+    return {
+        "venvs_analyzed": len(venv_paths),
+        "files_analyzed": len(files),
+        "duplicate_groups": len(groups),
+        "duplicate_bytes": sum(r["duplicate_bytes"] for r in rows),
+        "distributions": rows,
+    }
+
+
+def analyze(venv_paths=None, store=None, max_workers=DEDUP_WORKERS):
+    """Collect, group and report. Returns (report, groups); groups feed consolidate()."""
+    if venv_paths is None:
+        venv_paths = known_venvs(store)
+    files = collect_files(venv_paths, max_workers)
+    groups = group_duplicates(files)
+    return build_report(venv_paths, files, groups), groups
+
+
+def format_report(report):
+    lines = [
+        f"Analyzed {report['files_analyzed']} installed files in {report['venvs_analyzed']} venvs.",
+        f"Duplicate content: {format_size(report['duplicate_bytes'])} in {report['duplicate_groups']} groups of identical files.",
+        "",
+        f"{'Duplicate':>10}  {'Venvs':>5}  {'Files':>6}  Distribution",
+    ]
+    for row in report["distributions"]:
+        lines.append(f"{format_size(row['duplicate_bytes']):>10}  {row['venvs']:>5}  {row['files']:>6}  {row['dist']} {row['version']}")
+    return "\n".join(lines)
+
+
+def file_digest(path, algorithm):
+    """RECORD-style digest (urlsafe base64, no padding) of a file's content."""
+    hasher = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return base64.urlsafe_b64encode(hasher.digest()).rstrip(b"=").decode("ascii")
+
+
+def _verified(file):
+    try:
+        return file_digest(file["path"], file["algorithm"]) == file["digest"]
+    except (OSError, ValueError):
+        return False
+
+
+def _replace_with_link(source, target):
+    """Atomically make target a hardlink to source."""
+    temp_path = target + ".dedup-tmp"
+    if os.path.lexists(temp_path):
+        os.remove(temp_path)
+    os.link(source, temp_path)
+    try:
+        os.replace(temp_path, target)
+    except OSError:
+        os.remove(temp_path)
+        raise
+
+
+def consolidate(groups, store_dir=SHARED_STORE_DIR, progress=None, max_workers=DEDUP_WORKERS):
+    """Replace verified duplicates with hardlinks into store_dir. Returns a summary dict."""
+    os.makedirs(store_dir, exist_ok=True)
+    store_dev = os.stat(store_dir).st_dev
+    summary = {"linked_files": 0, "saved_bytes": 0, "failed_verification": 0,
+               "other_volume": 0, "mode_mismatch": 0, "errors": []}
+
+    # Only files on the store's volume can be linked; hash those in parallel up front
+    candidates = [f for group in groups.values() for f in group if f["dev"] == store_dev]
+    summary["other_volume"] = sum(len(group) for group in groups.values()) - len(candidates)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        verified = dict(zip((f["path"] for f in candidates), executor.map(_verified, candidates)))
+
+    for i, ((algorithm, digest, size), group) in enumerate(groups.items(), 1):
+        if progress and i % 100 == 0:
+            progress(f"Linking group {i} of {len(groups)}...")
+        files = [f for f in group if f["dev"] == store_dev]
+        summary["failed_verification"] += sum(1 for f in files if not verified.get(f["path"]))
+        files = [f for f in files if verified.get(f["path"])]
+        if not files:
+            continue
+        store_path = os.path.join(store_dir, algorithm, digest[:2], f"{digest}-{size}")
+        try:
+            if not os.path.exists(store_path):
+                os.makedirs(os.path.dirname(store_path), exist_ok=True)
+                os.link(files[0]["path"], store_path)
+            store_stat = os.stat(store_path)
+        except OSError as e:
+            summary["errors"].append(f"{files[0]['path']}: {e}")
+            continue
+        for file in files:
+            if (file["dev"], file["ino"]) == (store_stat.st_dev, store_stat.st_ino):
+                continue
+            # Linked files share permission bits, so only merge files that already agree
+            if file["mode"] != store_stat.st_mode & 0o7777:
+                summary["mode_mismatch"] += 1
+                continue
+            try:
+                _replace_with_link(store_path, file["path"])
+            except OSError as e:
+                summary["errors"].append(f"{file['path']}: {e}")
+                continue
+            summary["linked_files"] += 1
+            summary["saved_bytes"] += size
+    return summary
+
+
+def format_consolidation(summary):
+    lines = [f"Linked {summary['linked_files']} files, freeing {format_size(summary['saved_bytes'])}."]
+    if summary["failed_verification"]:
+        lines.append(f"Skipped {summary['failed_verification']} files whose content no longer matches RECORD.")
+    if summary["other_volume"]:
+        lines.append(f"Skipped {summary['other_volume']} files on a different volume than the shared store.")
+    if summary["mode_mismatch"]:
+        lines.append(f"Skipped {summary['mode_mismatch']} files with different permissions.")
+    if summary["errors"]:
+        lines.append(f"{len(summary['errors'])} errors, first: {summary['errors'][0]}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Report and consolidate duplicate files across venvs.")
+    parser.add_argument("command", choices=["report", "consolidate"])
+    parser.add_argument("--venv", action="append", help="Venv to include (default: live venvs from the history)")
+    parser.add_argument("--db", default=HISTORY_DB_FILE, help="History database listing known venvs")
+    parser.add_argument("--store", default=SHARED_STORE_DIR, help="Shared store directory for consolidation")
+    parser.add_argument("--format", choices=["text", "json"], default="text")
+    parser.add_argument("--yes", action="store_true", help="Actually link files (consolidate is a dry run without it)")
+    args = parser.parse_args(argv)
+
+    venv_paths = args.venv or known_venvs(VenvHistoryStore(args.db))
+    report, groups = analyze(venv_paths)
+    if args.format == "json":
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(report))
+
+    if args.command == "consolidate":
+        if not args.yes:
+            print("\nDry run: pass --yes to replace duplicates with hardlinks.")
+            return 0
+        summary = consolidate(groups, args.store, progress=lambda m: print(m, file=sys.stderr))
+        print(json.dumps(summary, indent=2) if args.format == "json" else "\n" + format_consolidation(summary))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
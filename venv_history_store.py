@@ -0,0 +1,399 @@
+#!/usr/bin/env python
+"""
+Venv History Store - SQLite-backed environment history for the venv creator.
+
+Replaces the old venvs_history.json list, which was loaded, mutated and
+rewritten in full on every change. Each entry is one row; writes are single
+transactions so concurrent app instances don't clobber each other, and the
+columns the history dialog filters and sorts on are indexed.
+
+The first time the store is opened next to an existing venvs_history.json the
+entries are imported once; the JSON file is left in place as a backup.
+
+Command line usage:
+    python venv_history_store.py list [--type venv|association] [--hide-deleted]
+    python venv_history_store.py export history.json
+    python venv_history_store.py compact
+    python venv_history_store.py --db other.db --legacy-json venvs_history.json list
+"""
+import os
+import sys
+import json
+import sqlite3
+import datetime
+import threading
+from contextlib import contextmanager
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+HISTORY_DB_FILE = os.path.join(SCRIPT_DIR, "venvs_history.db")
+LEGACY_HISTORY_FILE = os.path.join(SCRIPT_DIR, "venvs_history.json")
+
+HISTORY_SCHEMA_VERSION = 3
+HISTORY_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Seconds to wait on a lock held by another app instance before giving up
+HISTORY_BUSY_TIMEOUT = 10
+
+# Entry keys that get their own (indexed) column; everything else lives in the JSON "extra" blob
+INDEXED_FIELDS = ("type", "date", "date_deleted", "venv_path", "script_dir", "size_bytes", "last_used", "scanned_at")
+
+SORTABLE_COLUMNS = {
+    "id": "id",
+    "type": "type",
+    "date": "date",
+    "date_deleted": "date_deleted",
+    "venv_path": "venv_path",
+    "size_bytes": "size_bytes",
+    "last_used": "last_used",
+}
+
+
+def venv_path_key(venv_path):
+    """Comparison key for a venv path: the creator joins paths ("C:/x\\venv") while the
+    crawler normalizes them, and Windows paths are case-insensitive."""
+    return os.path.normcase(os.path.normpath(venv_path)) if venv_path else None
+
+
+def history_timestamp(when=None):
+    """Format a datetime (default: now) the way history entries store dates."""
+    return (when or datetime.datetime.now()).strftime(HISTORY_DATE_FORMAT)
+
+
+class VenvHistoryStore:
+    """Environment history rows in a SQLite database (WAL mode)."""
+
+    def __init__(self, db_path=HISTORY_DB_FILE, legacy_json_path=None):
+        # Only the default database picks up the default JSON history; one elsewhere starts empty
+        if legacy_json_path is None and os.path.abspath(db_path) == os.path.abspath(HISTORY_DB_FILE):
+            legacy_json_path = LEGACY_HISTORY_FILE
+        self.db_path = db_path
+        self.legacy_json_path = legacy_json_path
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self):
+        # A connection per call keeps the store usable from worker threads
+        self._ensure_initialized()
+        conn = self._open()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _open(self):
+        conn = sqlite3.connect(self.db_path, timeout=HISTORY_BUSY_TIMEOUT, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    @contextmanager
+    def _transaction(self, conn):
+        # BEGIN IMMEDIATE takes the write lock up front so read-modify-write sequences are atomic
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _ensure_initialized(self):
+        if self._initialized:
+            return
+        with self._init_lock:
+            if self._initialized:
+                return
+            db_dir = os.path.dirname(self.db_path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            conn = self._open()
+            try:
+                conn.execute("PRAGMA journal_mode = WAL")
+                conn.execute("PRAGMA synchronous = NORMAL")
+                with self._transaction(conn):
+                    self._create_schema(conn)
+                    self._migrate_legacy_json(conn)
+            finally:
+                conn.close()
+            self._initialized = True
+
+    def _create_schema(self, conn):
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= HISTORY_SCHEMA_VERSION:
+            return
+        if version < 1:
+            self._create_schema_v1(conn)
+        if version < 2:
+            # Inventory columns (venv_inventory.py), indexed so the dialog can sort and bulk-select on them
+            conn.execute("ALTER TABLE history ADD COLUMN size_bytes INTEGER")
+            conn.execute("ALTER TABLE history ADD COLUMN last_used TEXT")
+            conn.execute("ALTER TABLE history ADD COLUMN scanned_at TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_history_size_bytes ON history(size_bytes)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_history_last_used ON history(last_used)")
+        if version < 3:
+            self._add_venv_key_column(conn)
+        conn.execute(f"PRAGMA user_version = {HISTORY_SCHEMA_VERSION}")
+
+    def _create_schema_v1(self, conn):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                type TEXT NOT NULL DEFAULT 'venv',
+                date TEXT,
+                date_deleted TEXT,
+                venv_path TEXT,
+                script_dir TEXT,
+                extra TEXT NOT NULL DEFAULT '{}'
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_history_venv_path ON history(venv_path)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_history_type ON history(type)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_history_date ON history(date)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_history_date_deleted ON history(date_deleted)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_history_script_dir ON history(script_dir)")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _add_venv_key_column(self, conn):
+        """Match venvs on venv_path_key() instead of the path as written, and drop the
+        "discovered" rows earlier crawls added for venvs the history already had."""
+        conn.execute("ALTER TABLE history ADD COLUMN venv_key TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_history_venv_key ON history(venv_key)")
+        live_keys = set()
+        discovered = []
+        for row in conn.execute("SELECT * FROM history").fetchall():
+            key = venv_path_key(row["venv_path"])
+            conn.execute("UPDATE history SET venv_key = ? WHERE id = ?", (key, row["id"]))
+            if row["type"] != "venv" or key is None or row["date_deleted"]:
+                continue
+            if json.loads(row["extra"] or "{}").get("discovered"):
+                discovered.append((row, key))
+            else:
+                live_keys.add(key)
+        for row, key in discovered:
+            if key not in live_keys:
+                continue
+            # Keep the crawler's measurements on the original entry
+            conn.execute(
+                "UPDATE history SET size_bytes = ?, last_used = ?, scanned_at = ? "
+                "WHERE type = 'venv' AND venv_key = ? AND id != ? AND scanned_at IS NULL",
+                (row["size_bytes"], row["last_used"], row["scanned_at"], key, row["id"])
+            )
+            conn.execute("DELETE FROM history WHERE id = ?", (row["id"],))
+
+    def _migrate_legacy_json(self, conn):
+        """One-time import of venvs_history.json into an empty database."""
+        if not self.legacy_json_path or not os.path.exists(self.legacy_json_path):
+            return
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_json_migrated'").fetchone():
+            return
+        try:
+            with open(self.legacy_json_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            # Leave the flag unset so the import is retried once the file is readable
+            print(f"Error reading legacy history file {self.legacy_json_path}: {e}")
+            return
+        if isinstance(data, list):
+            for entry in data:
+                if isinstance(entry, dict):
+                    self._insert(conn, entry)
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('legacy_json_migrated', ?)",
+            (history_timestamp(),)
+        )
+
+    @staticmethod
+    def _row_values(entry):
+        """Column values for an entry dict, in INDEXED_FIELDS order followed by the venv key and extra blob."""
+        values = [entry.get(field) for field in INDEXED_FIELDS]
+        values[0] = values[0] or "venv"
+        extra = {k: v for k, v in entry.items() if k not in INDEXED_FIELDS and k != "id"}
+        return values + [venv_path_key(entry.get("venv_path")), json.dumps(extra)]
+
+    def _insert(self, conn, entry):
+        columns = ", ".join(INDEXED_FIELDS + ("venv_key", "extra"))
+        placeholders = ", ".join("?" * (len(INDEXED_FIELDS) + 2))
+        cursor = conn.execute(f"INSERT INTO history ({columns}) VALUES ({placeholders})", self._row_values(entry))
+        return cursor.lastrowid
+
+    def _update(self, conn, entry_id, entry):
+        assignments = ", ".join(f"{column} = ?" for column in INDEXED_FIELDS + ("venv_key", "extra"))
+        conn.execute(f"UPDATE history SET {assignments} WHERE id = ?", self._row_values(entry) + [entry_id])
+
+    @staticmethod
+    def _row_to_entry(row):
+        """Rebuild the dict shape the JSON history used, plus the row "id"."""
+        entry = json.loads(row["extra"] or "{}")
+        entry["id"] = row["id"]
+        for field in INDEXED_FIELDS:
+            value = row[field]
+            if value is not None:
+                entry[field] = value
+        return entry
+
+    def add_entry(self, entry):
+        """Append an entry and return its id."""
+        with self._connect() as conn, self._transaction(conn):
+            return self._insert(conn, entry)
+
+    def get_entry(self, entry_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM history WHERE id = ?", (entry_id,)).fetchone()
+        return self._row_to_entry(row) if row else None
+
+    def entries(self, entry_type=None, include_deleted=True, venv_path=None, order_by="id", descending=False):
+        """Return history entries as dicts, filtered in SQL."""
+        clauses, params = [], []
+        if entry_type:
+            clauses.append("type = ?")
+            params.append(entry_type)
+        if not include_deleted:
+            clauses.append("(date_deleted IS NULL OR date_deleted = '')")
+        if venv_path is not None:
+            clauses.append("venv_key = ?")
+            params.append(venv_path_key(venv_path))
+        sql = "SELECT * FROM history"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY {SORTABLE_COLUMNS.get(order_by, 'id')} {'DESC' if descending else 'ASC'}"
+        with self._connect() as conn:
+            return [self._row_to_entry(row) for row in conn.execute(sql, params)]
+
+    def venvs_matching(self, min_size_bytes=None, last_used_before=None):
+        """Live (not deleted) venv entries at least min_size_bytes big and/or last used
+        before a history timestamp, largest first. Entries without inventory data never match."""
+        clauses = ["type = 'venv'", "(date_deleted IS NULL OR date_deleted = '')"]
+        params = []
+        if min_size_bytes is not None:
+            clauses.append("size_bytes >= ?")
+            params.append(min_size_bytes)
+        if last_used_before:
+            clauses.append("last_used != '' AND last_used < ?")
+            params.append(last_used_before)
+        sql = f"SELECT * FROM history WHERE {' AND '.join(clauses)} ORDER BY size_bytes DESC"
+        with self._connect() as conn:
+            return [self._row_to_entry(row) for row in conn.execute(sql, params)]
+
+    def count(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def update_entry(self, entry_id, **fields):
+        """Set fields on one entry. Returns False if the entry no longer exists."""
+        with self._connect() as conn, self._transaction(conn):
+            row = conn.execute("SELECT * FROM history WHERE id = ?", (entry_id,)).fetchone()
+            if row is None:
+                return False
+            entry = self._row_to_entry(row)
+            entry.update(fields)
+            self._update(conn, entry_id, entry)
+            return True
+
+    def delete_entry(self, entry_id):
+        """Remove an entry completely. Returns the removed entry, or None if it was already gone."""
+        with self._connect() as conn, self._transaction(conn):
+            row = conn.execute("SELECT * FROM history WHERE id = ?", (entry_id,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("DELETE FROM history WHERE id = ?", (entry_id,))
+            return self._row_to_entry(row)
+
+    def mark_deleted(self, entry_id, when=None):
+        """Stamp date_deleted on one entry."""
+        with self._connect() as conn, self._transaction(conn):
+            cursor = conn.execute(
+                "UPDATE history SET date_deleted = ? WHERE id = ?",
+                (history_timestamp(when), entry_id)
+            )
+            return cursor.rowcount > 0
+
+    def mark_venv_deleted(self, venv_path, when=None):
+        """Stamp date_deleted on every venv entry for venv_path. Returns the number of rows updated."""
+        with self._connect() as conn, self._transaction(conn):
+            cursor = conn.execute(
+                "UPDATE history SET date_deleted = ? WHERE type = 'venv' AND venv_key = ?",
+                (history_timestamp(when), venv_path_key(venv_path))
+            )
+            return cursor.rowcount
+
+    def record_inventory(self, records):
+        """Store crawler results (see venv_inventory.py) in one transaction.
+
+        Each record updates every venv row for the same venv (compared by venv_path_key); venvs the history
+        has never seen are added as new entries flagged "discovered". Returns the
+        number of new entries.
+        """
+        added = 0
+        with self._connect() as conn, self._transaction(conn):
+            for record in records:
+                fields = {k: v for k, v in record.items() if k != "venv_path"}
+                rows = conn.execute(
+                    "SELECT * FROM history WHERE type = 'venv' AND venv_key = ?", (venv_path_key(record["venv_path"]),)
+                ).fetchall()
+                for row in rows:
+                    entry = self._row_to_entry(row)
+                    entry.update(fields)
+                    self._update(conn, row["id"], entry)
+                if not rows:
+                    entry = {
+                        "type": "venv",
+                        "date": record.get("scanned_at") or history_timestamp(),
+                        "parent": os.path.basename(os.path.dirname(record["venv_path"])),
+                        "venv_path": record["venv_path"],
+                        "discovered": True,
+                    }
+                    entry.update(fields)
+                    self._insert(conn, entry)
+                    added += 1
+        return added
+
+    def export_json(self, path):
+        """Write all entries to a JSON file in the legacy list format."""
+        data = []
+        for entry in self.entries():
+            entry.pop("id", None)
+            data.append(entry)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+        return len(data)
+
+    def compact(self):
+        """Fold the WAL back into the database and reclaim free pages."""
+        with self._connect() as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            conn.execute("VACUUM")
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect and maintain the venv history database.")
+    parser.add_argument("--db", default=HISTORY_DB_FILE, help="Path to the history database")
+    parser.add_argument("--legacy-json", help="venvs_history.json to import into a new database "
+                                              "(default: the one next to the default database, for that database only)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    list_parser = sub.add_parser("list", help="Print history entries as JSON lines")
+    list_parser.add_argument("--type", choices=["venv", "association"])
+    list_parser.add_argument("--hide-deleted", action="store_true")
+    export_parser = sub.add_parser("export", help="Write history to a JSON file")
+    export_parser.add_argument("path")
+    sub.add_parser("compact", help="Checkpoint the WAL and vacuum the database")
+    args = parser.parse_args(argv)
+
+    store = VenvHistoryStore(args.db, args.legacy_json)
+    if args.command == "list":
+        for entry in store.entries(entry_type=args.type, include_deleted=not args.hide_deleted):
+            print(json.dumps(entry))
+    elif args.command == "export":
+        count = store.export_json(args.path)
+        print(f"Exported {count} entries to {args.path}")
+    elif args.command == "compact":
+        store.compact()
+        print(f"Compacted {args.db}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
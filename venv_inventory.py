@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+"""
+Venv Inventory - find virtual environments under chosen roots and measure them.
+
+The history store only knows about venvs the creator made itself. This crawler
+walks directory trees looking for pyvenv.cfg, and for every venv it finds
+records the on-disk size (a parallel scandir-based du), the interpreter version
+from pyvenv.cfg, the number of installed distributions and when it was last
+activated. Results are written to the history store so the Environment History
+dialog can sort and bulk-delete by size and last use.
+
+Command line usage:
+    python venv_inventory.py ROOT [ROOT ...] [--no-store] [--format json]
+"""
+import os
+import sys
+import json
+import datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from venv_history_store import VenvHistoryStore, HISTORY_DB_FILE, history_timestamp
+
+INVENTORY_WORKERS = min(32, (os.cpu_count() or 4) * 4)  # I/O bound; extra threads hide disk/network latency
+# Directories never worth descending into while looking for venvs
+INVENTORY_SKIP_DIRS = {".git", ".hg", ".svn", "__pycache__", "node_modules", "site-packages", "$RECYCLE.BIN"}
+
+
+class InventoryCancelled(Exception):
+    """Raised inside the crawler when the caller sets the cancel event."""
+
+
+def is_venv_dir(path):
+    return os.path.isfile(os.path.join(path, "pyvenv.cfg"))
+
+
+def read_pyvenv_cfg(venv_path):
+    """Key/value pairs from pyvenv.cfg (keys lower-cased)."""
+    config = {}
+    try:
+        with open(os.path.join(venv_path, "pyvenv.cfg"), "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                if "=" in line:
+                    key, value = line.split("=", 1)
+                    config[key.strip().lower()] = value.strip()
+    except OSError:
+        pass
+    return config
+
+
+def site_packages_dirs(venv_path):
+    """site-packages directories of a venv (Windows Lib/ layout or POSIX lib/pythonX.Y/)."""
+    found = []
+    windows_dir = os.path.join(venv_path, "Lib", "site-packages")
+    if os.path.isdir(windows_dir):
+        found.append(windows_dir)
+    for lib_name in ("lib", "lib64"):
+        lib_dir = os.path.join(venv_path, lib_name)
+        try:
+            with os.scandir(lib_dir) as it:
+                for entry in it:
+                    candidate = os.path.join(entry.path, "site-packages")
+                    if entry.name.startswith("python") and os.path.isdir(candidate):
+                        if not any(os.path.samefile(candidate, existing) for existing in found):
+                            found.append(candidate)
+        except OSError:
+            pass
+    return found
+
+
+def count_distributions(venv_path):
+    """Number of installed distributions (.dist-info / .egg-info entries) in the venv."""
+    count = 0
+    for site_dir in site_packages_dirs(venv_path):
+        try:
+            with os.scandir(site_dir) as it:
+                count += sum(1 for entry in it if entry.name.endswith((".dist-info", ".egg-info")))
+        except OSError:
+            pass
+    return count
+
+
+def venv_last_used(venv_path):
+    """Modification time of the activate script, formatted like history dates, or ""."""
+    activate_path = os.path.join(venv_path, "Scripts" if sys.platform == "win32" else "bin", "activate")
+    try:
+        return history_timestamp(datetime.datetime.fromtimestamp(os.path.getmtime(activate_path)))
+    except OSError:
+        return ""
+
+
+def _scan_one(path):
+    """List one directory: (subdirectory paths, bytes of regular files directly inside)."""
+    subdirs = []
+    file_bytes = 0
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        file_bytes += entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    pass
+    except OSError:
+        pass
+    return path, subdirs, file_bytes
+
+
+def _parallel_walk(roots, executor, handle, cancel_event=None):
+    """Breadth-first walk with one scandir per pool task.
+
+    handle(path, subdirs, file_bytes) returns the subdirectories to descend into.
+    The calling thread only hands out work, so pool workers never wait on each other.
+    """
+    pending = {executor.submit(_scan_one, root) for root in roots}
+    try:
+        while pending:
+            if cancel_event is not None and cancel_event.is_set():
+                raise InventoryCancelled()
+            done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, subdirs, file_bytes = future.result()
+                for subdir in handle(path, subdirs, file_bytes):
+                    pending.add(executor.submit(_scan_one, subdir))
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def directory_size(path, executor, cancel_event=None):
+    """Total bytes of regular files under path, scanning directories in parallel."""
+    total = [0]
+
+    def handle(_path, subdirs, file_bytes):
+        total[0] += file_bytes
+        return subdirs
+
+    _parallel_walk([path], executor, handle, cancel_event)
+    return total[0]
+
+
+def discover_venvs(roots, executor, cancel_event=None, progress=None):
+    """Paths of every venv under roots. Venvs are not descended into."""
+    found = []
+    scanned = [0]
+
+    def handle(path, subdirs, _file_bytes):
+        scanned[0] += 1
+        if progress and scanned[0] % 500 == 0:
+            progress(f"Searched {scanned[0]} folders, found {len(found)} venvs...")
+        if is_venv_dir(path):
+            found.append(os.path.normpath(path))
+            return []
+        return [d for d in subdirs if os.path.basename(d) not in INVENTORY_SKIP_DIRS]
+
+    _parallel_walk([os.path.abspath(root) for root in roots], executor, handle, cancel_event)
+    return sorted(found)
+
+
+def inspect_venv(venv_path, executor, cancel_event=None):
+    """Inventory record for one venv, in the shape VenvHistoryStore.record_inventory expects."""
+    config = read_pyvenv_cfg(venv_path)
+    return {
+        "venv_path": venv_path,
+        "size_bytes": directory_size(venv_path, executor, cancel_event),
+        "last_used": venv_last_used(venv_path),
+        "scanned_at": history_timestamp(),
+        "python_version": config.get("version") or config.get("version_info", ""),
+        "base_python": config.get("home", ""),
+        "dist_count": count_distributions(venv_path),
+    }
+
+
+def crawl(roots, store=None, progress=None, cancel_event=None, max_workers=INVENTORY_WORKERS):
+    """Discover and inspect every venv under roots; store the results if a store is given.
+
+    Returns the list of inventory records.
+    """
+    records = []
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="venv-inventory") as executor:
+        venv_paths = discover_venvs(roots, executor, cancel_event, progress)
+        for i, venv_path in enumerate(venv_paths, 1):
+            if progress:
+                progress(f"Measuring venv {i} of {len(venv_paths)}: {venv_path}")
+            records.append(inspect_venv(venv_path, executor, cancel_event))
+    if store is not None and records:
+        store.record_inventory(records)
+    return records
+
+
+def format_size(num_bytes):
+    size = float(num_bytes or 0)
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def main(argv=None):
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Find virtual environments and measure their disk usage.")
+    parser.add_argument("roots", nargs="+", help="Directories to search")
+    parser.add_argument("--db", default=HISTORY_DB_FILE, help="History database to record results in")
+    parser.add_argument("--no-store", action="store_true", help="Only print results, don't update the history")
+    parser.add_argument("--format", choices=["text", "json"], default="text")
+    parser.add_argument("--workers", type=int, default=INVENTORY_WORKERS)
+    args = parser.parse_args(argv)
+
+    store = None if args.no_store else VenvHistoryStore(args.db)
+    start = time.perf_counter()
+    progress = (lambda message: print(message, file=sys.stderr)) if args.format == "text" else None
+    records = crawl(args.roots, store=store, progress=progress, max_workers=args.workers)
+    elapsed = time.perf_counter() - start
+
+    records.sort(key=lambda r: r["size_bytes"], reverse=True)
+    if args.format == "json":
+        print(json.dumps({"elapsed_seconds": round(elapsed, 3), "venvs": records}, indent=2))
+    else:
+        for record in records:
+            print(f"{format_size(record['size_bytes']):>10}  {record['python_version'] or '?':<8} "
+                  f"{record['dist_count']:>4} dists  {record['last_used'] or 'never':<19}  {record['venv_path']}")
+        total = sum(r["size_bytes"] for r in records)
+        print(f"{len(records)} venvs, {format_size(total)} total, scanned in {elapsed:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,342 @@
+#!/usr/bin/env python
+"""
+Venv Lock - pinned, hash-checked lockfiles for venvs built by the venv creator,
+and fast rebuilds from them.
+
+create_venv installs bare package names, so rebuilding a venv later resolves
+everything again and can drift. After a successful build, write_lock() records
+every distribution reachable from the requested packages. Each entry gets its
+exact version, the environment markers that pulled it in, and the sha256 of its
+wheel. The wheels are also stored in a shared local wheel cache. The lockfile
+uses pip's hash-checking requirements format (the same layout pip-tools writes),
+so plain pip can install it as well.
+
+rebuild() skips resolution entirely. It runs
+pip install --no-deps --require-hashes against the lockfile and looks in the
+wheel cache first (--no-index). The package index is only used when the cache
+is missing a wheel.
+
+Command line usage:
+    python venv_lock.py lock VENV REQUIREMENT [REQUIREMENT ...] [--output requirements.lock]
+    python venv_lock.py rebuild LOCKFILE VENV
+    python venv_lock.py benchmark REQUIREMENT [REQUIREMENT ...] [--workdir DIR]
+"""
+import os
+import re
+import sys
+import json
+import time
+import venv
+import shutil
+import hashlib
+import platform
+import tempfile
+import subprocess
+from email.parser import HeaderParser
+
+from venv_history_store import history_timestamp
+from venv_inventory import site_packages_dirs, read_pyvenv_cfg
+
+if sys.platform == "darwin":
+    BASE_DATA_DIR = os.path.expanduser("~/Library/Application Support")
+elif sys.platform == "win32":
+    BASE_DATA_DIR = os.getenv('APPDATA') or os.path.expanduser("~\\AppData\\Roaming")
+else:
+    BASE_DATA_DIR = os.path.expanduser("~/.local/share")
+APP_DATA_DIR = os.path.join(BASE_DATA_DIR, "Python_Global_Package_Manager")
+# Shared by lockfile rebuilds and batch operations so each wheel is downloaded once
+WHEEL_CACHE_DIR = os.path.join(APP_DATA_DIR, "wheel_cache")
+
+LOCK_FILE_NAME = "requirements.lock"
+NAME_PATTERN = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+
+
+def normalize_name(name):
+    """PEP 503 normalized distribution name."""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def requirement_name(requirement):
+    """Distribution name of a requirement string ("requests[socks]>=2; ..." -> "requests")."""
+    match = NAME_PATTERN.match(requirement)
+    return normalize_name(match.group(1)) if match else None
+
+
+def venv_python(venv_path):
+    if sys.platform == "win32":
+        return os.path.join(venv_path, "Scripts", "python.exe")
+    return os.path.join(venv_path, "bin", "python")
+
+
+def installed_distributions(venv_path):
+    """{normalized name: {"name", "version", "requires", "path"}} read straight from the
+    venv's .dist-info/.egg-info metadata, without starting its interpreter."""
+    dists = {}
+    parser = HeaderParser()
+    for site_dir in site_packages_dirs(venv_path):
+        try:
+            entries = list(os.scandir(site_dir))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.name.endswith(".dist-info"):
+                metadata_path = os.path.join(entry.path, "METADATA")
+            elif entry.name.endswith(".egg-info"):
+                metadata_path = os.path.join(entry.path, "PKG-INFO") if entry.is_dir() else entry.path
+            else:
+                continue
+            try:
+                with open(metadata_path, "r", encoding="utf-8", errors="replace") as f:
+                    headers = parser.parse(f)
+            except OSError:
+                continue
+            name, version = headers.get("Name"), headers.get("Version")
+            if not name or not version:
+                continue
+            dists[normalize_name(name)] = {
+                "name": name,
+                "version": version,
+                "requires": headers.get_all("Requires-Dist") or [],
+                "path": entry.path,
+            }
+    return dists
+
+
+def _split_requirement(requirement):
+    """("name", "marker" or "") for a Requires-Dist value; extra-only conditions count as unconditional
+    because the extra was evidently requested if the dependency is installed."""
+    spec, _, marker = requirement.partition(";")
+    marker = marker.strip()
+    if "extra" in marker:
+        marker = ""
+    return requirement_name(spec), marker
+
+
+def resolve_locked_set(dists, requirements):
+    """Installed distributions reachable from requirements, each with the marker that pulled it in.
+
+    Returns {normalized name: marker}; an empty marker means the dependency is unconditional.
+    """
+    # pip/setuptools seeded by venv.create only end up locked if something requires them
+    requested = set()
+    pending = []
+    for requirement in requirements:
+        name = requirement_name(requirement)
+        if name in dists:
+            requested.add(name)  # Requested directly: unconditional
+            pending.append(name)
+    edges = {}
+    seen = set(pending)
+    while pending:
+        parent = pending.pop()
+        for requirement in dists[parent]["requires"]:
+            child, marker = _split_requirement(requirement)
+            if child not in dists:
+                continue  # Marker excluded it on this platform, or it isn't installed
+            edges.setdefault(child, []).append(marker)
+            if child not in seen:
+                seen.add(child)
+                pending.append(child)
+    locked = {}
+    for name in seen:
+        if name in requested or any(not marker for marker in edges.get(name, [])):
+            locked[name] = ""
+        else:
+            unique = sorted(set(edges[name]))
+            locked[name] = unique[0] if len(unique) == 1 else " or ".join(f"({m})" for m in unique)
+    return locked
+
+
+def file_sha256(path):
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _wheel_name_version(file_name):
+    """(normalized name, version) of a wheel filename, or None if it isn't one.
+
+    Names and versions never contain "-" in wheel filenames, but older wheels keep
+    dots in the name ("ruamel.yaml-0.18.6-py3-none-any.whl"), so compare normalized.
+    """
+    if not file_name.endswith(".whl"):
+        return None
+    parts = file_name[:-4].split("-")
+    if len(parts) < 5:
+        return None
+    return normalize_name(parts[0]), parts[1].lower()
+
+
+def cached_wheels(name, version, wheel_cache=WHEEL_CACHE_DIR):
+    """Wheel files for name==version in the cache."""
+    wanted = (normalize_name(name), version.lower())
+    try:
+        return sorted(
+            os.path.join(wheel_cache, file_name) for file_name in os.listdir(wheel_cache)
+            if _wheel_name_version(file_name) == wanted
+        )
+    except OSError:
+        return []
+
+
+def fill_wheel_cache(venv_path, pins, wheel_cache=WHEEL_CACHE_DIR):
+    """Put a wheel for every pin that isn't cached yet into the cache, in one pip call.
+
+    pip serves this from its HTTP cache right after an install, so it rarely downloads anything.
+    """
+    os.makedirs(wheel_cache, exist_ok=True)
+    missing = [f"{name}=={version}" for name, version in pins if not cached_wheels(name, version, wheel_cache)]
+    if not missing:
+        return
+    subprocess.run(
+        [venv_python(venv_path), "-m", "pip", "wheel", "--no-deps", "--wheel-dir", wheel_cache] + missing,
+        capture_output=True, text=True, check=True
+    )
+
+
+def write_lock(venv_path, requirements, lock_path=None, wheel_cache=WHEEL_CACHE_DIR):
+    """Write a fully pinned, hashed lockfile for the venv. Returns the lockfile path.
+
+    pip's hash-checking mode needs a hash on every line, so if any pin has no cached
+    wheel to hash, the lockfile is written pinned but without hashes.
+    """
+    lock_path = lock_path or os.path.join(venv_path, LOCK_FILE_NAME)
+    dists = installed_distributions(venv_path)
+    locked = resolve_locked_set(dists, requirements)
+    pins = sorted((dists[name]["name"], dists[name]["version"]) for name in locked)
+    fill_wheel_cache(venv_path, pins, wheel_cache)
+    hashes_by_pin = {
+        (name, version): sorted({file_sha256(path) for path in cached_wheels(name, version, wheel_cache)})
+        for name, version in pins
+    }
+    unhashed = [f"{name}=={version}" for (name, version), hashes in hashes_by_pin.items() if not hashes]
+
+    lines = [
+        f"# Locked by venv_creator on {history_timestamp()}",
+        f"# Python {read_pyvenv_cfg(venv_path).get('version', '?')} on {sys.platform} ({platform.machine()})",
+        f"# Requested: {', '.join(requirements)}",
+        "# Rebuild without resolving: python venv_lock.py rebuild <this file> <venv dir>",
+    ]
+    if unhashed:
+        lines.append(f"# No hashes: no wheel available for {', '.join(unhashed)}")
+    lines.append("")
+    for name, version in pins:
+        marker = locked[normalize_name(name)]
+        line = f"{name}=={version}"
+        if marker:
+            line += f" ; {marker}"
+        hashes = [] if unhashed else hashes_by_pin[(name, version)]
+        if hashes:
+            lines.append(line + " \\")
+            lines.extend(f"    --hash=sha256:{digest}" + (" \\" if i < len(hashes) - 1 else "")
+                         for i, digest in enumerate(hashes))
+        else:
+            lines.append(line)
+    tmp_path = lock_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, lock_path)
+    return lock_path
+
+
+def lock_has_hashes(lock_path):
+    with open(lock_path, "r", encoding="utf-8") as f:
+        return "--hash=" in f.read()
+
+
+def install_from_lock(venv_path, lock_path, wheel_cache=WHEEL_CACHE_DIR):
+    """Install a lockfile into an existing venv without dependency resolution.
+
+    Tries the local wheel cache alone first; only if a wheel is missing does pip
+    fall back to the index (still pinned, hash-checked and --no-deps).
+    """
+    base_cmd = [venv_python(venv_path), "-m", "pip", "install", "--no-deps", "--disable-pip-version-check",
+                "-r", lock_path, "--find-links", wheel_cache]
+    if lock_has_hashes(lock_path):
+        base_cmd.append("--require-hashes")
+    result = subprocess.run(base_cmd + ["--no-index"], capture_output=True, text=True)
+    if result.returncode == 0:
+        return "cache"
+    subprocess.run(base_cmd, capture_output=True, text=True, check=True)
+    return "index"
+
+
+def rebuild(lock_path, venv_path, wheel_cache=WHEEL_CACHE_DIR):
+    """Create venv_path and install the lockfile into it. Returns (seconds, source)."""
+    start = time.perf_counter()
+    venv.create(venv_path, with_pip=True)
+    source = install_from_lock(venv_path, lock_path, wheel_cache)
+    shutil.copyfile(lock_path, os.path.join(venv_path, LOCK_FILE_NAME))
+    return time.perf_counter() - start, source
+
+
+def build_unpinned(venv_path, requirements):
+    """The create_venv path: fresh venv, one resolving pip install per requirement. Returns seconds."""
+    start = time.perf_counter()
+    venv.create(venv_path, with_pip=True)
+    for requirement in requirements:
+        subprocess.run([venv_python(venv_path), "-m", "pip", "install", "--disable-pip-version-check", requirement],
+                       capture_output=True, text=True, check=True)
+    return time.perf_counter() - start
+
+
+def benchmark(requirements, workdir=None, wheel_cache=WHEEL_CACHE_DIR):
+    """Time the unpinned build against a rebuild from the lock it produced."""
+    own_workdir = workdir is None
+    workdir = workdir or tempfile.mkdtemp(prefix="venv_lock_bench_")
+    try:
+        unpinned_path = os.path.join(workdir, "unpinned")
+        unpinned_seconds = build_unpinned(unpinned_path, requirements)
+        lock_start = time.perf_counter()
+        lock_path = write_lock(unpinned_path, requirements, os.path.join(workdir, LOCK_FILE_NAME), wheel_cache)
+        lock_seconds = time.perf_counter() - lock_start
+        rebuild_seconds, source = rebuild(lock_path, os.path.join(workdir, "from_lock"), wheel_cache)
+        return {
+            "requirements": list(requirements),
+            "unpinned_seconds": round(unpinned_seconds, 2),
+            "lock_seconds": round(lock_seconds, 2),
+            "rebuild_seconds": round(rebuild_seconds, 2),
+            "rebuild_source": source,
+            "speedup": round(unpinned_seconds / rebuild_seconds, 2) if rebuild_seconds else None,
+        }
+    finally:
+        if own_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write lockfiles for venvs and rebuild venvs from them.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    lock_parser = sub.add_parser("lock", help="Write a lockfile for an existing venv")
+    lock_parser.add_argument("venv")
+    lock_parser.add_argument("requirements", nargs="+")
+    lock_parser.add_argument("--output")
+    rebuild_parser = sub.add_parser("rebuild", help="Create a venv from a lockfile")
+    rebuild_parser.add_argument("lockfile")
+    rebuild_parser.add_argument("venv")
+    bench_parser = sub.add_parser("benchmark", help="Compare an unpinned build with a rebuild from lock")
+    bench_parser.add_argument("requirements", nargs="+")
+    bench_parser.add_argument("--workdir")
+    for sub_parser in (lock_parser, rebuild_parser, bench_parser):
+        sub_parser.add_argument("--wheel-cache", default=WHEEL_CACHE_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == "lock":
+        print(write_lock(args.venv, args.requirements, args.output, args.wheel_cache))
+    elif args.command == "rebuild":
+        if os.path.exists(args.venv):
+            print(f"{args.venv} already exists; remove it first.", file=sys.stderr)
+            return 1
+        seconds, source = rebuild(args.lockfile, args.venv, args.wheel_cache)
+        print(f"Rebuilt {args.venv} in {seconds:.2f}s (wheels from {source})")
+    elif args.command == "benchmark":
+        print(json.dumps(benchmark(args.requirements, args.workdir, args.wheel_cache), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+"""
+Venv Sync - bring an existing venv to a desired requirement set with the
+smallest install/upgrade/remove plan.
+
+update_existing_venv used to run one "pip install" per listed package, even for
+packages that were already satisfied. plan_sync() reads the venv's installed
+distributions straight from their metadata and checks each requirement's version
+specifier and environment marker against them. It then returns only what has to
+change:
+- install: requirements that are not installed;
+- upgrade: installed, but the version doesn't satisfy the specifier;
+- remove: installed distributions that nothing in the desired set needs.
+
+apply_plan() runs the whole install/upgrade list as one pip call and the
+removals as another.
+
+Version specifiers are checked with the "packaging" library when it is
+available. Without it, only exact "==" pins are compared locally, and any other
+specifier is left for pip to decide.
+
+Command line usage:
+    python venv_sync.py VENV REQUIREMENT [REQUIREMENT ...] [--keep-unlisted] [--apply]
+    python venv_sync.py VENV -r requirements.txt [--apply]
+"""
+import sys
+import json
+import time
+import subprocess
+
+from venv_inventory import read_pyvenv_cfg
+from venv_lock import installed_distributions, requirement_name, resolve_locked_set, venv_python
+
+try:
+    from packaging.requirements import Requirement, InvalidRequirement
+    PACKAGING_AVAILABLE = True
+except ImportError:
+    PACKAGING_AVAILABLE = False
+
+# Installed by venv.create itself; never planned for removal
+PROTECTED_DISTRIBUTIONS = {"pip", "setuptools", "wheel"}
+PLAN_PREVIEW_LIMIT = 15  # Items listed per category in format_plan(short=True)
+
+
+def _marker_environment(venv_path):
+    """Marker variables that differ between this interpreter and the venv's."""
+    config = read_pyvenv_cfg(venv_path)
+    version = config.get("version") or config.get("version_info", "")
+    if not version:
+        return {}
+    parts = version.split(".")
+    return {"python_version": ".".join(parts[:2]), "python_full_version": version}
+
+
+def _check_requirement(requirement, dists, environment):
+    """Classify one requirement string: ("install" | "upgrade" | "satisfied" | "skip", name, installed_version)."""
+    if PACKAGING_AVAILABLE:
+        try:
+            parsed = Requirement(requirement)
+        except InvalidRequirement:
+            return "install", requirement_name(requirement), None  # Let pip report it
+        name = requirement_name(parsed.name)
+        if parsed.marker is not None and not parsed.marker.evaluate(environment):
+            return "skip", name, None
+        installed = dists.get(name)
+        if installed is None:
+            return "install", name, None
+        if parsed.specifier and not parsed.specifier.contains(installed["version"], prereleases=True):
+            return "upgrade", name, installed["version"]
+        return "satisfied", name, installed["version"]
+
+    # Without packaging: bare names and exact pins are decided here, anything else by pip
+    name = requirement_name(requirement)
+    installed = dists.get(name)
+    if installed is None:
+        return "install", name, None
+    spec = requirement.split(";", 1)[0]
+    if "==" in spec:
+        pinned = spec.split("==", 1)[1].strip()
+        return ("satisfied" if pinned == installed["version"] else "upgrade"), name, installed["version"]
+    if any(op in spec for op in ("<", ">", "~=", "!=")):
+        return "upgrade", name, installed["version"]
+    return "satisfied", name, installed["version"]
+
+
+def plan_sync(venv_path, desired, remove_unlisted=True, keep=()):
+    """Diff the venv's installed distributions against the desired requirement strings.
+
+    keep names distributions that are left installed (with their dependencies) without
+    being part of the desired set, e.g. stdlib backports the caller doesn't install.
+    """
+    dists = installed_distributions(venv_path)
+    environment = _marker_environment(venv_path)
+    plan = {"install": [], "upgrade": [], "satisfied": [], "skipped": [], "remove": []}
+    wanted = []
+    for requirement in desired:
+        requirement = requirement.strip()
+        if not requirement or requirement.startswith("#"):
+            continue
+        action, name, installed_version = _check_requirement(requirement, dists, environment)
+        if action == "install":
+            plan["install"].append(requirement)
+        elif action == "upgrade":
+            plan["upgrade"].append({"requirement": requirement, "installed": installed_version})
+        elif action == "satisfied":
+            plan["satisfied"].append(f"{dists[name]['name']}=={installed_version}")
+        else:
+            plan["skipped"].append(requirement)
+        if action != "skip":
+            wanted.append(requirement)
+    if remove_unlisted:
+        plan["remove"] = removable_distributions(dists, wanted + list(keep))
+    return plan
+
+
+def removable_distributions(dists, wanted):
+    """Installed distribution names that no wanted requirement reaches through Requires-Dist."""
+    needed = set(resolve_locked_set(dists, wanted))
+    return sorted(
+        dist["name"] for name, dist in dists.items()
+        if name not in needed and name not in PROTECTED_DISTRIBUTIONS
+    )
+
+
+def plan_is_empty(plan):
+    return not (plan["install"] or plan["upgrade"] or plan["remove"])
+
+
+def format_plan(plan, short=False):
+    def listing(items):
+        if short and len(items) > PLAN_PREVIEW_LIMIT:
+            return items[:PLAN_PREVIEW_LIMIT] + [f"... and {len(items) - PLAN_PREVIEW_LIMIT} more"]
+        return items
+
+    if plan_is_empty(plan):
+        return f"Nothing to do: all {len(plan['satisfied'])} requirements are already satisfied."
+    lines = []
+    if plan["install"]:
+        lines.append(f"Install ({len(plan['install'])}):")
+        lines.extend(f"  + {item}" for item in listing(plan["install"]))
+    if plan["upgrade"]:
+        lines.append(f"Change version ({len(plan['upgrade'])}):")
+        lines.extend(f"  ~ {item}" if isinstance(item, str) else f"  ~ {item['requirement']} (installed {item['installed']})"
+                     for item in listing(plan["upgrade"]))
+    if plan["remove"]:
+        lines.append(f"Remove ({len(plan['remove'])}):")
+        lines.extend(f"  - {item}" for item in listing(plan["remove"]))
+    lines.append(f"Already satisfied: {len(plan['satisfied'])}")
+    if plan["skipped"]:
+        lines.append(f"Not for this environment (marker): {', '.join(plan['skipped'])}")
+    return "\n".join(lines)
+
+
+def _pip(venv_path, args):
+    return subprocess.run([venv_python(venv_path), "-m", "pip", "--disable-pip-version-check"] + args,
+                          capture_output=True, text=True)
+
+
+def apply_plan(venv_path, plan, extra_pip_args=()):
+    """Run the plan: one pip install for install+upgrade, then one pip uninstall.
+
+    If the batch install fails, each requirement is retried alone so the result says
+    which ones failed. Removals are rechecked after installing, because newly installed
+    packages may need some of them. Returns a result dict.
+    """
+    start = time.perf_counter()
+    to_install = plan["install"] + [item["requirement"] for item in plan["upgrade"]]
+    result = {"installed": [], "failed": [], "removed": [], "kept": [], "errors": []}
+    if to_install:
+        batch = _pip(venv_path, ["install"] + list(extra_pip_args) + to_install)
+        if batch.returncode == 0:
+            result["installed"] = to_install
+        else:
+            for requirement in to_install:
+                single = _pip(venv_path, ["install"] + list(extra_pip_args) + [requirement])
+                if single.returncode == 0:
+                    result["installed"].append(requirement)
+                else:
+                    result["failed"].append(requirement)
+                    result["errors"].append(single.stderr.strip()[-500:])
+    if plan["remove"]:
+        dists = installed_distributions(venv_path)
+        wanted = [r for r in plan["install"] if r not in result["failed"]] + \
+                 [item["requirement"] for item in plan["upgrade"] if item["requirement"] not in result["failed"]] + \
+                 plan["satisfied"]
+        still_removable = set(removable_distributions(dists, wanted))
+        to_remove = [name for name in plan["remove"] if name in still_removable]
+        result["kept"] = [name for name in plan["remove"] if name not in still_removable]
+        if to_remove:
+            uninstall = _pip(venv_path, ["uninstall", "-y"] + to_remove)
+            if uninstall.returncode == 0:
+                result["removed"] = to_remove
+            else:
+                result["errors"].append(uninstall.stderr.strip()[-500:])
+    result["seconds"] = round(time.perf_counter() - start, 2)
+    return result
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Plan and apply the minimal changes to match a venv to requirements.")
+    parser.add_argument("venv")
+    parser.add_argument("requirements", nargs="*")
+    parser.add_argument("-r", "--requirement-file", action="append", default=[])
+    parser.add_argument("--keep-unlisted", action="store_true", help="Never plan removals")
+    parser.add_argument("--apply", action="store_true", help="Execute the plan (default: only print it)")
+    parser.add_argument("--format", choices=["text", "json"], default="text")
+    args = parser.parse_args(argv)
+
+    desired = list(args.requirements)
+    for path in args.requirement_file:
+        with open(path, "r", encoding="utf-8") as f:
+            desired.extend(line.strip() for line in f)
+    plan = plan_sync(args.venv, desired, remove_unlisted=not args.keep_unlisted)
+    print(json.dumps(plan, indent=2) if args.format == "json" else format_plan(plan))
+    if args.apply and not plan_is_empty(plan):
+        result = apply_plan(args.venv, plan)
+        print(json.dumps(result, indent=2))
+        return 1 if result["failed"] or result["errors"] else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
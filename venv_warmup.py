@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+"""
+Venv Warm-up - precompile bytecode so the first launch doesn't pay for it.
+
+Packages installed with --no-compile, or copied in, have no .pyc files. The
+first launch of an associated script then compiles every module it imports.
+It does so again on each launch where __pycache__ can't be written.
+warm_up() byte-compiles the venv's site-packages and the associated script's
+tree ahead of time. It runs "compileall -j" with the venv's own interpreter,
+because .pyc files are tied to the Python version. compileall spreads the
+files over a pool of worker processes.
+
+benchmark() measures the script's startup before and after warming up:
+- On Windows, it measures the time until the script (or the interpreter the
+  venv launcher starts for it) shows its first visible window.
+- Elsewhere there is no portable way to see windows, so it times importing the
+  modules the script imports at top level instead.
+Python writes .pyc files as it imports, so only the first "before" launch is
+cold. --cold deletes the __pycache__ directories first so that launch is a
+true cold start.
+
+Command line usage:
+    python venv_warmup.py VENV [--script-dir DIR ...] [--workers N]
+    python venv_warmup.py VENV --benchmark SCRIPT [--runs 3] [--cold]
+"""
+import os
+import re
+import ast
+import sys
+import time
+import shutil
+import subprocess
+
+from venv_inventory import site_packages_dirs, is_venv_dir, INVENTORY_SKIP_DIRS
+from venv_lock import venv_python
+
+WARMUP_WORKERS = 0  # compileall -j 0 starts one worker process per CPU
+FIRST_WINDOW_TIMEOUT = 60  # Seconds to wait for the script's first window in benchmark()
+
+
+def script_tree_targets(script_dir):
+    """Top-level .py files and directories of a script's folder, leaving out venvs and tool folders"""
+    targets = []
+    try:
+        with os.scandir(script_dir) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if not _skipped_dir(entry):
+                        targets.append(entry.path)
+                elif entry.name.endswith((".py", ".pyw")):
+                    targets.append(entry.path)
+    except OSError:
+        pass
+    return sorted(targets)
+
+
+def _skipped_dir(entry):
+    return entry.name in INVENTORY_SKIP_DIRS or entry.name.startswith(".") or is_venv_dir(entry.path)
+
+
+def script_tree_exclude(script_dirs):
+    """Regex for compileall -x that skips files in venvs, hidden and tool folders at any depth
+    under the script folders (compileall recurses into everything it is given).
+
+    Anchored to the script folders, since site-packages is compiled in the same run.
+    """
+    sep = r"[\\/]"
+    skip_names = "|".join(re.escape(name) for name in sorted(INVENTORY_SKIP_DIRS))
+    patterns = []
+    for script_dir in script_dirs:
+        patterns.append(f"^{re.escape(script_dir)}{sep}(?:.*{sep})?(?:{skip_names}|\\.[^\\\\/]*){sep}")
+        # Venvs can have any name, so find them; the walk doesn't enter folders it skips
+        pending = [script_dir]
+        while pending:
+            try:
+                with os.scandir(pending.pop()) as it:
+                    subdirs = [entry for entry in it if entry.is_dir(follow_symlinks=False)]
+            except OSError:
+                continue
+            for entry in subdirs:
+                if entry.name in INVENTORY_SKIP_DIRS or entry.name.startswith("."):
+                    continue  # Already matched by name
+                if is_venv_dir(entry.path):
+                    patterns.append(f"^{re.escape(entry.path)}{sep}")
+                else:
+                    pending.append(entry.path)
+    return "|".join(patterns)
+
+
+def warm_up(venv_path, script_dirs=(), workers=WARMUP_WORKERS):
+    """Byte-compile site-packages and the script trees with the venv's interpreter.
+
+    Returns {"targets", "seconds", "errors"}; errors lists files compileall
+    couldn't compile (test data with bad syntax and the like), which is not fatal.
+    """
+    script_dirs = [os.path.abspath(script_dir) for script_dir in script_dirs]
+    targets = site_packages_dirs(venv_path)
+    for script_dir in script_dirs:
+        targets.extend(script_tree_targets(script_dir))
+    command = [venv_python(venv_path), "-m", "compileall", "-q", "-j", str(workers)]
+    if script_dirs:
+        command += ["-x", script_tree_exclude(script_dirs)]
+    start = time.perf_counter()
+    completed = subprocess.run(command + targets, capture_output=True, text=True)
+    errors = [line for line in completed.stdout.splitlines() if line.startswith("***")]
+    if completed.returncode != 0 and not errors:
+        errors = [(completed.stderr or completed.stdout).strip()[-500:]]
+    return {"targets": targets, "seconds": round(time.perf_counter() - start, 2), "errors": errors}
+
+
+def format_warm_up(result):
+    message = f"Precompiled {len(result['targets'])} locations in {result['seconds']:.1f}s"
+    if result["errors"]:
+        message += f" ({len(result['errors'])} files could not be compiled)"
+    return message
+
+
+def clear_bytecode(paths):
+    """Delete __pycache__ directories under paths. Returns how many were removed."""
+    removed = 0
+    for path in paths:
+        if not os.path.isdir(path):
+            continue
+        for root, dirs, _files in os.walk(path):
+            if "__pycache__" in dirs:
+                shutil.rmtree(os.path.join(root, "__pycache__"), ignore_errors=True)
+                dirs.remove("__pycache__")
+                removed += 1
+    return removed
+
+
+def script_imports(script_path):
+    """Absolute module names the script imports at top level"""
+    with open(script_path, "r", encoding="utf-8", errors="replace") as f:
+        tree = ast.parse(f.read(), filename=script_path)
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def _descendant_pids(root_pid):
+    """root_pid and all of its child processes (Windows, via a Toolhelp snapshot)"""
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESSENTRY32(ctypes.Structure):
+        _fields_ = [("dwSize", wintypes.DWORD), ("cntUsage", wintypes.DWORD), ("th32ProcessID", wintypes.DWORD),
+                    ("th32DefaultHeapID", ctypes.c_void_p), ("th32ModuleID", wintypes.DWORD),
+                    ("cntThreads", wintypes.DWORD), ("th32ParentProcessID", wintypes.DWORD),
+                    ("pcPriClassBase", ctypes.c_long), ("dwFlags", wintypes.DWORD), ("szExeFile", ctypes.c_char * 260)]
+
+    kernel32 = ctypes.windll.kernel32
+    kernel32.CreateToolhelp32Snapshot.restype = wintypes.HANDLE
+    kernel32.Process32First.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESSENTRY32)]
+    kernel32.Process32Next.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESSENTRY32)]
+    kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+    snapshot = kernel32.CreateToolhelp32Snapshot(0x2, 0)  # TH32CS_SNAPPROCESS
+    parents = {}
+    try:
+        entry = PROCESSENTRY32()
+        entry.dwSize = ctypes.sizeof(entry)
+        more = kernel32.Process32First(snapshot, ctypes.byref(entry))
+        while more:
+            parents[entry.th32ProcessID] = entry.th32ParentProcessID
+            more = kernel32.Process32Next(snapshot, ctypes.byref(entry))
+    finally:
+        kernel32.CloseHandle(snapshot)
+    pids = {root_pid}
+    added = True
+    while added:
+        added = False
+        for pid, parent in parents.items():
+            if parent in pids and pid not in pids:
+                pids.add(pid)
+                added = True
+    return pids
+
+
+def time_to_first_window(python_exe, script_path, timeout=FIRST_WINDOW_TIMEOUT):
+    """Seconds from launch until a visible window of the script appears (Windows), or None"""
+    import ctypes
+    from ctypes import wintypes
+
+    user32 = ctypes.windll.user32
+    enum_proc = ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)
+    start = time.perf_counter()
+    process = subprocess.Popen([python_exe, script_path], cwd=os.path.dirname(os.path.abspath(script_path)))
+    try:
+        while time.perf_counter() - start < timeout:
+            # The venv's python.exe is a redirector, so the window may belong to a child process
+            pids = _descendant_pids(process.pid)
+            found = []
+
+            def check_window(hwnd, _lparam):
+                pid = wintypes.DWORD()
+                user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+                if pid.value in pids and user32.IsWindowVisible(hwnd):
+                    found.append(hwnd)
+                    return False
+                return True
+
+            user32.EnumWindows(enum_proc(check_window), 0)
+            if found:
+                return time.perf_counter() - start
+            if process.poll() is not None:
+                return None
+            time.sleep(0.01)
+        return None
+    finally:
+        subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)], capture_output=True)
+
+
+def time_imports(python_exe, script_path):
+    """Seconds to start the interpreter and import what the script imports at top level"""
+    statements = "; ".join(f"import {name}" for name in script_imports(script_path)) or "pass"
+    start = time.perf_counter()
+    completed = subprocess.run([python_exe, "-c", statements], cwd=os.path.dirname(os.path.abspath(script_path)),
+                               capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing the script's modules failed: {completed.stderr.strip()[-300:]}")
+    return elapsed
+
+
+def benchmark(venv_path, script_path, runs=3, cold=False, workers=WARMUP_WORKERS):
+    """Startup time of script_path before and after warm_up(). Returns a result dict."""
+    python_exe = venv_python(venv_path)
+    script_dir = os.path.dirname(os.path.abspath(script_path))
+    if sys.platform == "win32":
+        metric = "time to first window"
+        measure = lambda: time_to_first_window(python_exe, script_path)
+    else:
+        metric = "import time of the script's top-level imports"
+        measure = lambda: time_imports(python_exe, script_path)
+
+    if cold:
+        clear_bytecode(site_packages_dirs(venv_path) + script_tree_targets(script_dir))
+    before = measure()  # Only this first launch is cold: it writes .pyc files as it imports
+    warm = warm_up(venv_path, [script_dir], workers)
+    after = sorted(t for t in (measure() for _ in range(runs)) if t is not None)
+    return {
+        "metric": metric,
+        "before_seconds": before,
+        "after_seconds": after[len(after) // 2] if after else None,
+        "warm_up": warm,
+    }
+
+
+def format_benchmark(result):
+    def seconds(value):
+        return f"{value * 1000:.0f} ms" if value is not None else "no window seen"
+
+    lines = [
+        f"Metric: {result['metric']}",
+        f"Before warm-up (first launch): {seconds(result['before_seconds'])}",
+        f"After warm-up (median):        {seconds(result['after_seconds'])}",
+        format_warm_up(result["warm_up"]),
+    ]
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Precompile a venv's bytecode and measure the startup effect.")
+    parser.add_argument("venv")
+    parser.add_argument("--script-dir", action="append", default=[], help="Script folder to compile as well")
+    parser.add_argument("--workers", type=int, default=WARMUP_WORKERS, help="compileall worker processes (0 = one per CPU)")
+    parser.add_argument("--benchmark", metavar="SCRIPT", help="Measure SCRIPT's startup before and after warming up")
+    parser.add_argument("--runs", type=int, default=3, help="Launches after warming up (median is reported)")
+    parser.add_argument("--cold", action="store_true", help="Delete existing __pycache__ folders before measuring")
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        print(format_benchmark(benchmark(args.venv, args.benchmark, args.runs, args.cold, args.workers)))
+        return 0
+    result = warm_up(args.venv, args.script_dir, args.workers)
+    print(format_warm_up(result))
+    for error in result["errors"]:
+        print(f"  {error}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())